@@ -1,18 +1,26 @@
+import asyncio
+import json
 import logging
+import time
 import uuid
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Set
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl, validator
 from rq import Queue
 
 # Import settings using direct file path to avoid package/module conflict
 # Import settings from the new configuration module
 from app.config.configuration import get_settings
+from app.constants import APIConfig, JobCostConfig, RedisKeys
 from app.dependencies import get_clips_queue, get_redis, get_storage
 from app.models import Job, JobResponse, JobStatus
+from app.queue import JobLanes, queue_health_sampler
+from app.repositories.job_repository import delete_job, update_job
+from app.services.job_cancellation import FINISHED_STATUSES, request_cancellation
+from app.services.job_cost import charge_client_work, estimate_job_cost_cached
 from app.storage import LocalStorageManager
 
 settings = get_settings()
@@ -50,9 +58,37 @@ class JobCreateRequest(BaseModel):
         return v
 
 
+def _text(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _client_ip(http_request: Request) -> str:
+    """Client IP, as the rate limiting middleware sees it"""
+    for header in ["X-Forwarded-For", "X-Real-IP", "CF-Connecting-IP"]:
+        value = http_request.headers.get(header)
+        if value:
+            return value.split(",")[0].strip()
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def _queue_position(redis, job_id: str, lane: str) -> dict:
+    """Queue position and estimated wait fields of a queued job"""
+    queue_health = queue_health_sampler.current()
+    position = JobLanes(redis).position(
+        job_id, lane, workers=queue_health.workers if queue_health else 1
+    )
+    if position is None:
+        return {}
+    return {
+        "queue_position": position.jobs_ahead,
+        "estimated_wait_seconds": position.estimated_wait_seconds,
+    }
+
+
 @router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
 async def create_job(
     request: JobCreateRequest,
+    http_request: Request,
     redis=Depends(get_redis),
     clips_queue: Queue = Depends(get_clips_queue),
 ):
@@ -64,9 +100,23 @@ async def create_job(
             detail="Redis service unavailable",
         )
 
-    # Check queue capacity with T-003 protection
-    queue_length = redis.llen("rq:queue:default")
-    if queue_length >= 15:  # T-003 reduced limit
+    # Admission is in estimated worker-seconds, not jobs
+    cost = await estimate_job_cost_cached(
+        redis,
+        str(request.url),
+        float(request.in_ts),
+        float(request.out_ts),
+        request.format_id,
+    )
+
+    # Check queue capacity with T-003 protection (sampled, no Redis call here)
+    queue_health = queue_health_sampler.current()
+    if (
+        queue_health is not None
+        and queue_health.pending_work_seconds > 0
+        and queue_health.pending_work_seconds + cost.seconds
+        > queue_health.work_capacity
+    ):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Queue at capacity. T-003 DoS protection active. Try again later.",
@@ -75,6 +125,19 @@ async def create_job(
     # Generate job ID
     job_id = str(uuid.uuid4())
 
+    client_ip = _client_ip(http_request)
+    charged, used = charge_client_work(
+        redis, client_ip, job_id, cost.seconds, time.time()
+    )
+    if not charged:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=(
+                f"Hourly processing quota exceeded: {used:.0f}s of "
+                f"{JobCostConfig.CLIENT_WORKER_SECONDS_PER_HOUR}s worker time used"
+            ),
+        )
+
     # Create job object
     job = Job(
         id=job_id,
@@ -85,8 +148,7 @@ async def create_job(
         status=JobStatus.queued,
     )
 
-    # Store in Redis
-    job_key = f"job:{job_id}"
+    # Store in Redis, indexed by creation time and status
     job_data = {
         "id": job.id,
         "url": str(job.url),
@@ -95,10 +157,13 @@ async def create_job(
         "status": job.status.value,
         "created_at": job.created_at.isoformat(),
         "format_id": job.format_id or "",
+        "estimated_cost": str(cost.seconds),
+        # The worker claims jobs from their lane (cheap jobs go first)
+        "lane": JobLanes.lane_for(cost.seconds),
     }
 
-    redis.hset(job_key, mapping=job_data)
-    redis.expire(job_key, 3600)  # 1 hour TTL
+    update_job(redis, job.id, job_data, created_at=job.created_at)
+    JobLanes(redis).enqueue(job.id, cost.seconds)
 
     # FIXED: Queue job for processing using RQ
     # Convert Decimal to float for worker compatibility
@@ -117,10 +182,18 @@ async def create_job(
         result_ttl=86400,  # Keep result for 1 day
     )
 
-    logger.info(f"Created and queued job {job_id} for URL: {request.url}")
+    logger.info(
+        f"Created and queued job {job_id} for URL: {request.url} "
+        f"(~{cost.seconds}s of worker time)"
+    )
 
     return JobResponse(
-        id=job.id, status=job.status, created_at=job.created_at, format_id=job.format_id
+        id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        format_id=job.format_id,
+        estimated_cost_seconds=cost.seconds,
+        **_queue_position(redis, job.id, job_data["lane"]),
     )
 
 
@@ -162,6 +235,158 @@ async def get_job(job_id: str, redis=Depends(get_redis)):
             job_data.get("format_id") if job_data.get("format_id") != "" else None
         ),
         video_title=job_data.get("video_title"),
+        estimated_cost_seconds=(
+            float(job_data["estimated_cost"])
+            if job_data.get("estimated_cost")
+            else None
+        ),
+        **(
+            _queue_position(redis, job_id, job_data["lane"])
+            if job_data.get("lane") and job_data["status"] == JobStatus.queued.value
+            else {}
+        ),
+    )
+
+
+@router.post(
+    "/jobs/{job_id}/cancel",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def cancel_job(job_id: str, redis=Depends(get_redis)):
+    """Cancel a queued or running job"""
+
+    if not redis:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Redis service unavailable",
+        )
+
+    current = redis.hget(f"job:{job_id}", "status")
+    if current is not None and JobStatus(_text(current)) in FINISHED_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Job already finished"
+        )
+
+    if request_cancellation(redis, job_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+
+    return await get_job(job_id, redis)
+
+
+# Fields of the job hash sent in progress events
+JOB_EVENT_FIELDS = ("status", "progress", "stage", "download_url", "error_code")
+
+# Pending cancellations of jobs whose stream closed, kept until they run
+_abandoned_streams: Set[asyncio.Task] = set()
+
+
+def _watchers_key(job_id: str) -> str:
+    return f"{RedisKeys.JOB_PREFIX}{job_id}{RedisKeys.WATCHERS_SUFFIX}"
+
+
+def _add_watcher(redis, job_id: str, delta: int) -> None:
+    """Count a cancelling stream of a job opening (+1) or closing (-1)"""
+    pipe = redis.pipeline(transaction=False)
+    pipe.incrby(_watchers_key(job_id), delta)
+    pipe.expire(_watchers_key(job_id), RedisKeys.JOB_TTL)
+    pipe.execute()
+
+
+async def _cancel_if_abandoned(redis, job_id: str) -> None:
+    """
+    Cancel a job once its stream had time to reconnect and did not
+
+    EventSource reconnects on its own after network blips, possibly to
+    another API process, so the open streams are counted in Redis.
+    """
+    await asyncio.sleep(APIConfig.JOB_EVENTS_RECONNECT_GRACE)
+    try:
+        watchers = await asyncio.to_thread(redis.get, _watchers_key(job_id))
+        if int(watchers or 0) > 0:
+            return
+        logger.info(f"🔌 Progress stream of job {job_id} not reopened, cancelling")
+        await asyncio.to_thread(request_cancellation, redis, job_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cancel job {job_id}: {e}")
+
+
+async def _job_events(
+    redis, job_id: str, http_request: Request, cancel_on_disconnect: bool
+):
+    """Server-sent events of a job's progress until it finishes"""
+    finished = False
+    last_event = None
+    last_sent = time.monotonic()
+    if cancel_on_disconnect:
+        await asyncio.to_thread(_add_watcher, redis, job_id, 1)
+    try:
+        while not await http_request.is_disconnected():
+            raw = await asyncio.to_thread(redis.hgetall, f"job:{job_id}")
+            job_data = {_text(k): _text(v) for k, v in raw.items()}
+            if not job_data:
+                # Expired while being watched
+                finished = True
+                yield 'event: error\ndata: {"detail": "Job not found"}\n\n'
+                return
+
+            event = {field: job_data.get(field) for field in JOB_EVENT_FIELDS}
+            if event != last_event:
+                yield f"data: {json.dumps(event)}\n\n"
+                last_event, last_sent = event, time.monotonic()
+            elif time.monotonic() - last_sent >= APIConfig.JOB_EVENTS_KEEPALIVE:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+
+            if event["status"] in FINISHED_STATUSES:
+                finished = True
+                return
+            await asyncio.sleep(APIConfig.JOB_EVENTS_INTERVAL)
+    finally:
+        # Also runs when the response is cancelled on disconnect, so no
+        # awaiting here: the decision is left to a task of its own
+        if cancel_on_disconnect:
+            try:
+                _add_watcher(redis, job_id, -1)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not release stream of job {job_id}: {e}")
+            if not finished:
+                task = asyncio.create_task(_cancel_if_abandoned(redis, job_id))
+                _abandoned_streams.add(task)
+                task.add_done_callback(_abandoned_streams.discard)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    http_request: Request,
+    cancel_on_disconnect: bool = False,
+    redis=Depends(get_redis),
+):
+    """
+    Stream job progress as server-sent events
+
+    With cancel_on_disconnect, closing the stream before the job finishes
+    cancels the job, unless a stream for it is reopened within
+    ``JOB_EVENTS_RECONNECT_GRACE`` seconds.
+    """
+
+    if not redis:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Redis service unavailable",
+        )
+    if not await asyncio.to_thread(redis.exists, f"job:{job_id}"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+
+    return StreamingResponse(
+        _job_events(redis, job_id, http_request, cancel_on_disconnect),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -274,8 +499,7 @@ async def cleanup_job(
     deleted = await storage.delete(job_id)
 
     # Delete job data from Redis
-    job_key = f"job:{job_id}"
-    redis.delete(job_key)
+    delete_job(redis, job_id)
 
     return {"message": "Job cleaned up successfully", "file_deleted": deleted}
 
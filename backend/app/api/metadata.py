@@ -1,19 +1,43 @@
 import asyncio
+import functools
+import json
 import logging
 import re
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
-import yt_dlp
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from rq import Queue
 from yt_dlp.utils import DownloadError
 
 from ..cache.metadata_cache import MetadataCache
+from ..constants import ExtractionConfig
 from ..dependencies import get_async_redis, get_clips_queue
+from ..extraction import (
+    PERMANENT_FAILURES,
+    AttemptOutcome,
+    CircuitOpenError,
+    CookieSession,
+    CookieSessionPool,
+    ExtractionCircuitBreaker,
+    ExtractionTicketStore,
+    FailureClass,
+    Priority,
+    StrategySelector,
+    TicketStatus,
+    classify_extraction_error,
+    hedge_delay_for,
+    politeness,
+    run_hedged,
+    ydl_pool,
+)
+from ..metrics import metadata_extraction_hedges_total, metadata_extraction_seconds
+from ..middleware.admin_auth import is_admin_request
 from ..models import Job, JobCreateRequest, JobStatus
 from ..utils.job_utils import generate_job_id
+from ..utils.platform_detection import PlatformDetector
 
 # Ensure yt-dlp uses any available cookies (Instagram/Youtube) across all endpoints
 from ..utils.ytdlp_options import build_common_ydl_opts
@@ -169,6 +193,10 @@ def get_optimized_ydl_opts() -> Dict:
     }
 
 
+# Names of the get_fallback_ydl_opts() configs, in order, for strategy stats
+FALLBACK_CONFIG_NAMES = ("tv", "android", "desktop_chrome", "minimal")
+
+
 def get_fallback_ydl_opts() -> List[Dict]:
     """Get fallback configurations if primary fails - multiple strategies for bot detection avoidance"""
     return [
@@ -227,8 +255,26 @@ def get_fallback_ydl_opts() -> List[Dict]:
     ]
 
 
-async def extract_metadata_with_fallback(url: str) -> Dict:
-    """Extract metadata with fallback configurations and smart retry for bot detection"""
+def _extract_info_sync(
+    ydl_opts: Dict, url: str, label: Optional[str] = None
+) -> Optional[Dict]:
+    """Run a blocking yt-dlp info extraction (called from a worker thread)"""
+    with (
+        politeness.slot(url, Priority.INTERACTIVE),
+        ydl_pool.checkout(ydl_opts, label=label) as ydl,
+    ):
+        return ydl.extract_info(url, download=False)
+
+
+async def extract_metadata_with_fallback(url: str, redis_client=None) -> Dict:
+    """
+    Extract metadata with fallback configurations and smart retry for bot detection
+
+    Args:
+        url: Video URL
+        redis_client: Redis client for adaptive config ordering; without one
+            the configs are tried in their static order
+    """
     # Prepare configuration list based on the domain so that we use the most appropriate
     # headers / client hints up-front.  This improves reliability, especially for
     # platforms (like Instagram) that are sensitive to the `User-Agent` & `Referer`.
@@ -255,31 +301,42 @@ async def extract_metadata_with_fallback(url: str) -> Dict:
 
         # For Instagram we use multiple fallback strategies to handle IP blocking
         configs = [
-            instagram_primary_opts,
-            {
-                **instagram_primary_opts,
-                "http_headers": {
-                    k: v for k, v in instagram_base_headers.items() if k != "Referer"
+            ("ios_referer", instagram_primary_opts),
+            (
+                "ios_no_referer",
+                {
+                    **instagram_primary_opts,
+                    "http_headers": {
+                        k: v
+                        for k, v in instagram_base_headers.items()
+                        if k != "Referer"
+                    },
                 },
-            },
+            ),
             # Additional fallback with different User-Agent for IP restrictions
-            {
-                **instagram_primary_opts,
-                "http_headers": {
-                    **instagram_base_headers,
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            (
+                "desktop_chrome",
+                {
+                    **instagram_primary_opts,
+                    "http_headers": {
+                        **instagram_base_headers,
+                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                    },
+                    "retries": 3,
                 },
-                "retries": 3,
-            },
+            ),
             # Minimal fallback without special headers
-            {
-                "quiet": True,
-                "no_warnings": True,
-                "extract_flat": False,
-                "skip_download": True,
-                "socket_timeout": 120,
-                "retries": 2,
-            },
+            (
+                "minimal",
+                {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "extract_flat": False,
+                    "skip_download": True,
+                    "socket_timeout": 120,
+                    "retries": 2,
+                },
+            ),
         ]
     elif _is_facebook_url(url):
         facebook_base_headers = {
@@ -303,29 +360,38 @@ async def extract_metadata_with_fallback(url: str) -> Dict:
         }
 
         configs = [
-            facebook_primary_opts,
-            {
-                **facebook_primary_opts,
-                "http_headers": {
-                    k: v for k, v in facebook_base_headers.items() if k != "Referer"
+            ("ios_referer", facebook_primary_opts),
+            (
+                "ios_no_referer",
+                {
+                    **facebook_primary_opts,
+                    "http_headers": {
+                        k: v for k, v in facebook_base_headers.items() if k != "Referer"
+                    },
                 },
-            },
-            {
-                **facebook_primary_opts,
-                "http_headers": {
-                    **facebook_base_headers,
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            ),
+            (
+                "desktop_chrome",
+                {
+                    **facebook_primary_opts,
+                    "http_headers": {
+                        **facebook_base_headers,
+                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                    },
+                    "retries": 3,
                 },
-                "retries": 3,
-            },
-            {
-                "quiet": True,
-                "no_warnings": True,
-                "extract_flat": False,
-                "skip_download": True,
-                "socket_timeout": 120,
-                "retries": 2,
-            },
+            ),
+            (
+                "minimal",
+                {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "extract_flat": False,
+                    "skip_download": True,
+                    "socket_timeout": 120,
+                    "retries": 2,
+                },
+            ),
         ]
     elif _is_reddit_url(url):
         # Reddit URLs are handled separately
@@ -339,77 +405,149 @@ async def extract_metadata_with_fallback(url: str) -> Dict:
             },
             "socket_timeout": 30,
         }
-        configs = [reddit_primary_opts]
+        configs = [("reddit_desktop", reddit_primary_opts)]
     else:
-        configs = [get_optimized_ydl_opts()] + get_fallback_ydl_opts()
+        configs = [("optimized", get_optimized_ydl_opts())] + list(
+            zip(FALLBACK_CONFIG_NAMES, get_fallback_ydl_opts())
+        )
+
+    # Try the configs that have recently been fastest to succeed first
+    platform = PlatformDetector.detect_platform(url).value
+    selector = StrategySelector(redis_client, ladder="metadata")
+    configs_by_name = dict(configs)
+    # Rotate over the platform's cookie sessions, if any are configured
+    sessions = CookieSessionPool(redis_client)
+    # Fail fast while the platform (or a config) is rate limiting us
+    breaker = ExtractionCircuitBreaker(redis_client, ladder="metadata")
+
+    last_error: Optional[Exception] = None
 
     # Smart retry parameters for bot detection - REDUCED for better UX
     max_retries = 2  # Reduced from 3 to 2
     base_wait_time = 30  # Reduced from 120s to 30s (start with 30s, then 60s)
 
+    # Start the next config alongside a slow one once it exceeds the recent p90
+    hedge_delay = hedge_delay_for(
+        await selector.latency_quantile(platform, ExtractionConfig.HEDGE_QUANTILE)
+    )
+
+    def is_permanent(error: BaseException) -> bool:
+        return classify_extraction_error(error) in PERMANENT_FAILURES
+
+    async def record_outcome(
+        outcome: AttemptOutcome, session: Optional[CookieSession] = None
+    ) -> None:
+        if outcome.hedged:
+            metadata_extraction_hedges_total.labels(platform, "launched").inc()
+        await breaker.record(platform, outcome.error, outcome.name)
+        if outcome.error is not None:
+            logger.warning(
+                f"⚠️ Config '{outcome.name}' failed after {outcome.latency:.1f}s: {outcome.error}"
+            )
+            if is_permanent(outcome.error):
+                # Private/removed/geo-blocked content is not the config's fault
+                return
+        await sessions.report(session, outcome.error, outcome.latency)
+        await selector.record(platform, outcome.name, outcome.success, outcome.latency)
+
     for retry_attempt in range(max_retries):
-        for i, ydl_opts in enumerate(configs):
-            try:
-                logger.info(
-                    f"🔍 Attempting metadata extraction with config {i+1}/{len(configs)} (retry {retry_attempt + 1}/{max_retries})"
+        await breaker.check(platform)
+        ordered_names = await breaker.allowed_configs(
+            platform, await selector.rank(platform, list(configs_by_name))
+        )
+        session = await sessions.acquire(platform)
+        if session is not None:
+            logger.info(f"🍪 Using {platform} cookie session '{session.session_id}'")
+        logger.info(
+            f"🔍 Attempting metadata extraction with configs {ordered_names} (retry {retry_attempt + 1}/{max_retries}, hedging after {hedge_delay:.1f}s)"
+        )
+        attempts = [
+            (
+                name,
+                functools.partial(
+                    _extract_info_sync,
+                    (
+                        configs_by_name[name]
+                        if session is None
+                        else {
+                            **configs_by_name[name],
+                            "cookiefile": session.cookie_file,
+                        }
+                    ),
+                    url,
+                    label=f"metadata:{platform}:{name}",
+                ),
+            )
+            for name in ordered_names
+        ]
+
+        try:
+            outcome = await run_hedged(
+                attempts,
+                hedge_delay,
+                is_fatal=is_permanent,
+                on_outcome=functools.partial(record_outcome, session=session),
+            )
+
+        except DownloadError as e:
+            last_error = e
+            failure_class = classify_extraction_error(e)
+
+            if failure_class in PERMANENT_FAILURES:
+                # Private/removed/geo-blocked content: no config will fix it
+                logger.warning(f"⛔ Permanent {failure_class.value} failure: {e}")
+                raise
+
+            # Check for bot detection/rate limiting patterns
+            if (
+                failure_class is FailureClass.RATE_LIMITED
+                or "sign in" in str(e).lower()
+            ):
+                logger.warning(
+                    f"⚠️ YouTube bot detection triggered (retry {retry_attempt + 1}): {e}"
                 )
 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-
-                    if info:
-                        logger.info(
-                            f"✅ Successfully extracted metadata with config {i+1} (retry {retry_attempt + 1})"
-                        )
-                        return info
-
-            except DownloadError as e:
-                error_str = str(e).lower()
-
-                # Check for bot detection/rate limiting patterns
-                if (
-                    "sign in" in error_str
-                    or "confirm you're not a bot" in error_str
-                    or "too many requests" in error_str
-                    or "http error 429" in error_str
-                ):
-                    logger.warning(
-                        f"⚠️ YouTube bot detection triggered (config {i+1}, retry {retry_attempt + 1}): {e}"
-                    )
-
-                    # If this is the last config and not the last retry, wait before retrying
-                    if i == len(configs) - 1 and retry_attempt < max_retries - 1:
-                        wait_time = base_wait_time * (2**retry_attempt)  # 30s, then 60s
-                        logger.info(
-                            f"🕒 YouTube rate limit detected. Waiting {wait_time}s before retry {retry_attempt + 2}/{max_retries}..."
-                        )
-                        logger.info(
-                            "💡 This is normal for YouTube videos - we're working around temporary restrictions"
-                        )
-                        await asyncio.sleep(wait_time)
-                        break  # Break inner loop to start next retry attempt
-
-                    # If this is the last retry, raise the exception
-                    if retry_attempt == max_retries - 1:
-                        logger.error(
-                            f"❌ Final retry failed after {max_retries} attempts"
-                        )
-                        raise
-
-                    # Continue to next config
-                    continue
+                # If this is the last retry, raise the exception
+                if retry_attempt == max_retries - 1:
+                    logger.error(f"❌ Final retry failed after {max_retries} attempts")
+                    raise
 
-                else:
-                    # Other DownloadError - continue to next config
-                    logger.warning(f"⚠️ DownloadError with config {i+1}: {e}")
+                if session is not None:
+                    # The session is cooling down now; retry with another one
+                    logger.info("🍪 Retrying straight away with another cookie session")
                     continue
 
-            except Exception as e:
-                logger.warning(f"⚠️ Unexpected error with config {i+1}: {e}")
+                # Wait before retrying every config again
+                wait_time = base_wait_time * (2**retry_attempt)  # 30s, then 60s
+                logger.info(
+                    f"🕒 YouTube rate limit detected. Waiting {wait_time}s before retry {retry_attempt + 2}/{max_retries}..."
+                )
+                logger.info(
+                    "💡 This is normal for YouTube videos - we're working around temporary restrictions"
+                )
+                await asyncio.sleep(wait_time)
                 continue
 
+            # Other DownloadError - retry all configs
+            logger.warning(f"⚠️ DownloadError with every config: {e}")
+            continue
+
+        except Exception as e:
+            last_error = e
+            logger.warning(f"⚠️ Unexpected error with every config: {e}")
+            continue
+
+        if outcome.hedged:
+            metadata_extraction_hedges_total.labels(platform, "won").inc()
+        logger.info(
+            f"✅ Successfully extracted metadata with config '{outcome.name}' in {outcome.latency:.1f}s (retry {retry_attempt + 1})"
+        )
+        return outcome.result
+
     # If we get here, all configs and retries failed
-    raise DownloadError("Failed to extract metadata after all retry attempts")
+    raise DownloadError(
+        f"Failed to extract metadata after all retry attempts: {last_error or 'no result'}"
+    )
 
 
 @router.post("/metadata", response_model=Job)
@@ -448,341 +586,447 @@ async def create_clip_job(
     return job
 
 
-@router.post("/metadata/extract", response_model=VideoMetadata)
-async def extract_video_metadata(
-    request: UrlRequest, redis_client=Depends(get_async_redis)
-):
-    """Extract video metadata including available formats/resolutions with caching"""
-    try:
-        url = str(request.url)
-        logger.info(f"🔍 Extracting detailed metadata for: {url}")
-
-        # Initialize cache
-        cache = MetadataCache(redis_client)
+def _metadata_from_cache_entry(cache_entry: Dict) -> VideoMetadata:
+    """Rebuild the API response model from a cached format metadata entry"""
+    metadata = cache_entry.get("metadata", {})
+
+    # Reconstruct VideoFormat objects
+    formats = []
+    for fmt_data in metadata.get("formats", []):
+        formats.append(VideoFormat(**fmt_data))
+
+    return VideoMetadata(
+        title=metadata.get("title", "No Title"),
+        duration=metadata.get("duration", 0),
+        thumbnail=metadata.get("thumbnail", ""),
+        uploader=metadata.get("uploader", "Unknown Uploader"),
+        upload_date=metadata.get("upload_date", "Unknown Date"),
+        view_count=metadata.get("view_count", 0),
+        formats=formats,
+        manifest_url=metadata.get("manifest_url"),
+    )
 
-        # Check cache first (use proper cache key generation for detailed metadata)
-        cached_detailed = await cache.get_format_metadata(url)
-        if cached_detailed:
-            logger.info(f"✅ Cache hit for detailed metadata: {url}")
-            metadata = cached_detailed.get("metadata", {})
-
-            # Reconstruct VideoFormat objects
-            formats = []
-            for fmt_data in metadata.get("formats", []):
-                formats.append(VideoFormat(**fmt_data))
-
-            return VideoMetadata(
-                title=metadata.get("title", "No Title"),
-                duration=metadata.get("duration", 0),
-                thumbnail=metadata.get("thumbnail", ""),
-                uploader=metadata.get("uploader", "Unknown Uploader"),
-                upload_date=metadata.get("upload_date", "Unknown Date"),
-                view_count=metadata.get("view_count", 0),
-                formats=formats,
-                manifest_url=metadata.get("manifest_url"),
-            )
 
-        # Log cache miss
-        logger.info(f"❌ Cache miss for detailed metadata: {url}")
+async def _extract_and_cache_metadata(url: str, cache: MetadataCache) -> VideoMetadata:
+    """
+    Run a full extraction for a URL and store the result in the format cache.
 
-        # Extract metadata with fallback
-        start_time = time.time()
-        info = await extract_metadata_with_fallback(url)
-        extraction_time = time.time() - start_time
-
-        # Extract basic metadata
-        title = info.get("title", "No Title")
-        duration = float(info.get("duration", 0))
-        thumbnail_url = info.get("thumbnail", "")
-        uploader = info.get("uploader", "Unknown Uploader")
-        upload_date = info.get("upload_date", "Unknown Date")
-        view_count = int(info.get("view_count") or 0)
-
-        # Get available formats, ensuring it's a list
-        raw_formats = info.get("formats", [])
-        if not isinstance(raw_formats, list):
-            raw_formats = []
-
-        # Process formats for audio merging *before* converting to Pydantic models
-        logger.info("Processing formats to check for separate audio streams...")
-        processed_formats = _process_formats_for_audio(raw_formats)
-
-        # TEMP DEBUG: Log format counts
-        merged_count = sum(
-            1
-            for f in processed_formats
-            if f.get("vcodec") != "none" and f.get("acodec") != "none"
-        )
-        video_only_count = sum(
-            1
-            for f in processed_formats
-            if f.get("vcodec") != "none" and f.get("acodec") == "none"
-        )
-        audio_only_count = sum(
-            1
-            for f in processed_formats
-            if f.get("vcodec") == "none" and f.get("acodec") != "none"
+    Raises:
+        DownloadError: If every extraction strategy failed
+    """
+    # Extract metadata with fallback
+    platform = PlatformDetector.detect_platform(url).value
+    start_time = time.time()
+    try:
+        info = await extract_metadata_with_fallback(url, redis_client=cache.redis)
+    except Exception:
+        metadata_extraction_seconds.labels(platform, "failure").observe(
+            time.time() - start_time
         )
-        logger.info(
-            f"🔍 DEBUG counts after processing: merged={merged_count}, video_only={video_only_count}, audio_only={audio_only_count}"
+        raise
+    extraction_time = time.time() - start_time
+    metadata_extraction_seconds.labels(platform, "success").observe(extraction_time)
+
+    # Extract basic metadata
+    title = info.get("title", "No Title")
+    duration = float(info.get("duration", 0))
+    thumbnail_url = info.get("thumbnail", "")
+    uploader = info.get("uploader", "Unknown Uploader")
+    upload_date = info.get("upload_date", "Unknown Date")
+    view_count = int(info.get("view_count") or 0)
+
+    # Get available formats, ensuring it's a list
+    raw_formats = info.get("formats", [])
+    if not isinstance(raw_formats, list):
+        raw_formats = []
+
+    # Process formats for audio merging *before* converting to Pydantic models
+    logger.info("Processing formats to check for separate audio streams...")
+    processed_formats = _process_formats_for_audio(raw_formats)
+
+    # TEMP DEBUG: Log format counts
+    merged_count = sum(
+        1
+        for f in processed_formats
+        if f.get("vcodec") != "none" and f.get("acodec") != "none"
+    )
+    video_only_count = sum(
+        1
+        for f in processed_formats
+        if f.get("vcodec") != "none" and f.get("acodec") == "none"
+    )
+    audio_only_count = sum(
+        1
+        for f in processed_formats
+        if f.get("vcodec") == "none" and f.get("acodec") != "none"
+    )
+    logger.info(
+        f"🔍 DEBUG counts after processing: merged={merged_count}, video_only={video_only_count}, audio_only={audio_only_count}"
+    )
+    logger.info("Format processing complete.")
+
+    # Create Pydantic models from the processed data
+    video_formats = [
+        VideoFormat(
+            format_id=f.get("format_id", "unknown"),
+            ext=f.get("ext", "unknown"),
+            resolution=f.get("resolution", "unknown"),
+            url=f.get("url", ""),
+            filesize=f.get("filesize"),
+            fps=f.get("fps"),
+            vcodec=f.get("vcodec") or "none",
+            acodec=f.get("acodec") or "none",
+            format_note=f.get("format_note") or "",
         )
-        logger.info("Format processing complete.")
-
-        # Create Pydantic models from the processed data
-        video_formats = [
-            VideoFormat(
-                format_id=f.get("format_id", "unknown"),
-                ext=f.get("ext", "unknown"),
-                resolution=f.get("resolution", "unknown"),
-                url=f.get("url", ""),
-                filesize=f.get("filesize"),
-                fps=f.get("fps"),
-                vcodec=f.get("vcodec") or "none",
-                acodec=f.get("acodec") or "none",
-                format_note=f.get("format_note") or "",
+        for f in processed_formats
+        if (
+            (
+                f.get("vcodec") != "none"  # video stream (must have resolution)
+                and f.get("resolution")
             )
-            for f in processed_formats
-            if (
-                (
-                    f.get("vcodec") != "none"  # video stream (must have resolution)
-                    and f.get("resolution")
-                )
-                or (
-                    f.get("vcodec") == "none"
-                    and f.get("acodec")
-                    != "none"  # audio-only (keep even w/o resolution)
-                )
+            or (
+                f.get("vcodec") == "none"
+                and f.get("acodec") != "none"  # audio-only (keep even w/o resolution)
             )
-        ]
-
-        # Sort formats from best to worst resolution, then by file extension
-        def resolution_sort_key(fmt):
-            try:
-                resolution = fmt.resolution or "0x0"
-                width, height = map(int, resolution.split("x"))
-                filesize = fmt.filesize or 0
-                return (width * height, filesize)
-            except (ValueError, AttributeError):
-                return (0, 0)
-
-        video_formats.sort(key=resolution_sort_key, reverse=True)
-
-        # Decide whether we need to keep an audio-only track.
-        has_merged_video = any(
-            fmt.vcodec != "none" and fmt.acodec != "none" for fmt in video_formats
         )
+    ]
 
-        MAX_FORMATS = 20  # Global cap on number of formats returned
+    # Sort formats from best to worst resolution, then by file extension
+    def resolution_sort_key(fmt):
+        try:
+            resolution = fmt.resolution or "0x0"
+            width, height = map(int, resolution.split("x"))
+            filesize = fmt.filesize or 0
+            return (width * height, filesize)
+        except (ValueError, AttributeError):
+            return (0, 0)
+
+    video_formats.sort(key=resolution_sort_key, reverse=True)
+
+    # Decide whether we need to keep an audio-only track.
+    has_merged_video = any(
+        fmt.vcodec != "none" and fmt.acodec != "none" for fmt in video_formats
+    )
 
-        if has_merged_video:
-            # Merged formats already contain audio – drop any extra audio-only tracks
-            video_formats = [
-                fmt
-                for fmt in video_formats
-                if not (fmt.vcodec == "none" and fmt.acodec != "none")
-            ][:MAX_FORMATS]
-        else:
-            # DASH scenario – ensure at least one audio-only track is preserved
-            audio_only_fmt = next(
-                (
-                    fmt
-                    for fmt in video_formats
-                    if fmt.vcodec == "none" and fmt.acodec != "none"
-                ),
-                None,
-            )
+    MAX_FORMATS = 20  # Global cap on number of formats returned
 
-            non_audio_formats = [
+    if has_merged_video:
+        # Merged formats already contain audio – drop any extra audio-only tracks
+        video_formats = [
+            fmt
+            for fmt in video_formats
+            if not (fmt.vcodec == "none" and fmt.acodec != "none")
+        ][:MAX_FORMATS]
+    else:
+        # DASH scenario – ensure at least one audio-only track is preserved
+        audio_only_fmt = next(
+            (
                 fmt
                 for fmt in video_formats
-                if not (fmt.vcodec == "none" and fmt.acodec != "none")
+                if fmt.vcodec == "none" and fmt.acodec != "none"
+            ),
+            None,
+        )
+
+        non_audio_formats = [
+            fmt
+            for fmt in video_formats
+            if not (fmt.vcodec == "none" and fmt.acodec != "none")
+        ]
+
+        trimmed_non_audio = non_audio_formats[
+            : MAX_FORMATS - (1 if audio_only_fmt else 0)
+        ]
+        video_formats = trimmed_non_audio + ([audio_only_fmt] if audio_only_fmt else [])
+
+    # TEMP DEBUG: Log format counts to diagnose Facebook audio issue
+    merged_count = sum(
+        1 for f in video_formats if f.vcodec != "none" and f.acodec != "none"
+    )
+    video_only_count = sum(
+        1 for f in video_formats if f.vcodec != "none" and f.acodec == "none"
+    )
+    audio_only_count = sum(
+        1 for f in video_formats if f.vcodec == "none" and f.acodec != "none"
+    )
+    logger.info(
+        f"🔍 DEBUG counts after processing: merged={merged_count}, video_only={video_only_count}, audio_only={audio_only_count}"
+    )
+
+    # Limit to reasonable number of formats
+    # video_formats = video_formats[:20]
+
+    metadata = VideoMetadata(
+        title=title,
+        duration=duration,
+        thumbnail=thumbnail_url,
+        uploader=uploader,
+        upload_date=upload_date,
+        view_count=view_count,
+        formats=video_formats,
+        manifest_url=info.get("manifest_url"),
+    )
+
+    # Cache the detailed metadata
+    cache_data = {
+        "title": title,
+        "duration": duration,
+        "thumbnail": thumbnail_url,
+        "uploader": uploader,
+        "upload_date": upload_date,
+        "view_count": view_count,
+        "formats": [
+            fmt.dict() for fmt in video_formats
+        ],  # Convert to dict for JSON serialization
+        "extraction_time": extraction_time,
+        "manifest_url": info.get("manifest_url"),
+    }
+
+    # Use the proper cache method for format metadata
+    cache_success = await cache.set_format_metadata(url, cache_data)
+    if cache_success:
+        logger.info(f"✅ Cached detailed metadata for: {url}")
+    else:
+        logger.warning(f"⚠️ Failed to cache detailed metadata for: {url}")
+
+    logger.info(
+        f"✅ Extracted detailed metadata: {title} - {len(video_formats)} formats in {extraction_time:.2f}s"
+    )
+    logger.info(
+        f"🔍 Backend: Format IDs extracted: {[f.format_id for f in video_formats[:10]]}"
+    )
+
+    return metadata
+
+
+# Strong references to in-flight background refreshes (asyncio only keeps weak ones)
+_background_refreshes: Set[asyncio.Task] = set()
+
+
+async def _refresh_format_metadata(url: str, redis_client) -> None:
+    """Re-extract a stale format cache entry without blocking any request"""
+    cache = MetadataCache(redis_client)
+    if not await cache.acquire_refresh_lock(url):
+        logger.debug(f"Background refresh already running for: {url}")
+        return
+
+    try:
+        logger.info(f"🔄 Background refresh of detailed metadata for: {url}")
+        await _extract_and_cache_metadata(url, cache)
+    except Exception as e:
+        # The stale entry keeps being served until its hard TTL
+        logger.warning(f"⚠️ Background refresh failed for {url}: {e}")
+    finally:
+        await cache.release_refresh_lock(url)
+
+
+def _schedule_background_refresh(url: str, redis_client) -> None:
+    """Start a background refresh for a stale format cache entry"""
+    task = asyncio.create_task(_refresh_format_metadata(url, redis_client))
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+
+
+def _http_error_for_download_error(url: str, e: DownloadError) -> HTTPException:
+    """Map a failed extraction to the HTTP error returned to the client"""
+    error_str = str(e).lower()
+    url_str = url.lower()
+
+    # Enhanced logging for all DownloadError cases to help debug production issues
+    logger.error(f"DownloadError occurred for {url}")
+    logger.error(f"Error type: {type(e).__name__}")
+    logger.error(f"Raw error message: {str(e)}")
+    logger.error(f"Lowercase error message: {error_str}")
+
+    # Instagram-specific error handling
+    if "instagram.com" in url_str:
+        if any(
+            keyword in error_str
+            for keyword in ["login", "authentication", "cookies", "sign in"]
+        ):
+            logger.warning(f"Instagram authentication required for {url}: {e}")
+            return HTTPException(
+                status_code=429,
+                detail="Instagram requires authentication for this content. Please try again later or use a different URL.",
+            )
+        elif "timeout" in error_str or "timed out" in error_str:
+            logger.warning(f"Instagram timeout for {url}: {e}")
+            return HTTPException(
+                status_code=504,
+                detail="Instagram is taking too long to respond. Please try again in a moment.",
+            )
+        elif any(
+            keyword in error_str
+            for keyword in [
+                "private",
+                "unavailable",
+                "not found",
+                "does not exist",
+                "blocked",
+                "restricted",
             ]
+        ):
+            logger.warning(f"Instagram content unavailable for {url}: {e}")
+            return HTTPException(
+                status_code=422,
+                detail="This Instagram content is private, unavailable, or restricted in your region. Please try a different URL.",
+            )
+        else:
+            # Enhanced logging for unhandled Instagram errors
+            logger.error(f"Unhandled Instagram error for {url}: {e}")
+            logger.error(f"Error type: {type(e).__name__}")
+            logger.error(f"Full error message: {str(e)}")
+            return HTTPException(
+                status_code=503,
+                detail="Instagram content temporarily unavailable. This may be due to regional restrictions or temporary blocking. Please try again later or use a different URL.",
+            )
 
-            trimmed_non_audio = non_audio_formats[
-                : MAX_FORMATS - (1 if audio_only_fmt else 0)
+    # Facebook-specific error handling
+    if "facebook.com" in url_str or "fb.watch" in url_str:
+        if any(
+            keyword in error_str
+            for keyword in ["login", "authentication", "cookies", "sign in"]
+        ):
+            logger.warning(f"Facebook authentication required for {url}: {e}")
+            return HTTPException(
+                status_code=429,
+                detail="Facebook requires authentication for this content. Please try again later or use a different URL.",
+            )
+        elif "timeout" in error_str or "timed out" in error_str:
+            logger.warning(f"Facebook timeout for {url}: {e}")
+            return HTTPException(
+                status_code=504,
+                detail="Facebook is taking too long to respond. Please try again in a moment.",
+            )
+        elif any(
+            keyword in error_str
+            for keyword in [
+                "private",
+                "unavailable",
+                "not found",
+                "does not exist",
+                "blocked",
+                "restricted",
             ]
-            video_formats = trimmed_non_audio + (
-                [audio_only_fmt] if audio_only_fmt else []
+        ):
+            logger.warning(f"Facebook content unavailable for {url}: {e}")
+            return HTTPException(
+                status_code=422,
+                detail="This Facebook content is private, unavailable, or restricted in your region. Please try a different URL.",
+            )
+        else:
+            # Enhanced logging for unhandled Facebook errors
+            logger.error(f"Unhandled Facebook error for {url}: {e}")
+            logger.error(f"Error type: {type(e).__name__}")
+            logger.error(f"Full error message: {str(e)}")
+            return HTTPException(
+                status_code=503,
+                detail="Facebook content temporarily unavailable. This may be due to regional restrictions or temporary blocking. Please try again later or use a different URL.",
             )
 
-        # TEMP DEBUG: Log format counts to diagnose Facebook audio issue
-        merged_count = sum(
-            1 for f in video_formats if f.vcodec != "none" and f.acodec != "none"
+    # YouTube-specific error handling
+    if "http error 429" in error_str or "too many requests" in error_str:
+        logger.warning(f"Rate limiting detected for {url}: {e}")
+        return HTTPException(
+            status_code=429,
+            detail="Too many requests to the video service. Please try again in a few minutes.",
         )
-        video_only_count = sum(
-            1 for f in video_formats if f.vcodec != "none" and f.acodec == "none"
+    elif "timeout" in error_str or "timed out" in error_str:
+        logger.warning(f"Timeout error for {url}: {e}")
+        return HTTPException(
+            status_code=504,
+            detail="The video service is taking too long to respond. Please try again.",
         )
-        audio_only_count = sum(
-            1 for f in video_formats if f.vcodec == "none" and f.acodec != "none"
+    elif classify_extraction_error(e) in PERMANENT_FAILURES:
+        logger.warning(f"Content permanently unavailable for {url}: {e}")
+        return HTTPException(
+            status_code=422,
+            detail="This video is private, has been removed, or is not available in your region. Please try a different URL.",
         )
-        logger.info(
-            f"🔍 DEBUG counts after processing: merged={merged_count}, video_only={video_only_count}, audio_only={audio_only_count}"
+    else:
+        logger.error(f"DownloadError for {url}: {e}")
+        return HTTPException(
+            status_code=503,
+            detail="The video service is currently unavailable. Please try again later.",
         )
 
-        # Limit to reasonable number of formats
-        # video_formats = video_formats[:20]
-
-        metadata = VideoMetadata(
-            title=title,
-            duration=duration,
-            thumbnail=thumbnail_url,
-            uploader=uploader,
-            upload_date=upload_date,
-            view_count=view_count,
-            formats=video_formats,
-            manifest_url=info.get("manifest_url"),
-        )
 
-        # Cache the detailed metadata
-        cache_data = {
-            "title": title,
-            "duration": duration,
-            "thumbnail": thumbnail_url,
-            "uploader": uploader,
-            "upload_date": upload_date,
-            "view_count": view_count,
-            "formats": [
-                fmt.dict() for fmt in video_formats
-            ],  # Convert to dict for JSON serialization
-            "extraction_time": extraction_time,
-            "manifest_url": info.get("manifest_url"),
-        }
+async def _cached_video_metadata(
+    url: str, cache: MetadataCache, bypass_negative_cache: bool = False
+) -> Optional[VideoMetadata]:
+    """
+    Answer a metadata request from the positive or negative cache
+
+    Stale entries are served while a background refresh runs.
 
-        # Use the proper cache method for format metadata
-        cache_success = await cache.set_format_metadata(url, cache_data)
-        if cache_success:
-            logger.info(f"✅ Cached detailed metadata for: {url}")
+    Returns:
+        Cached metadata, or None on a cache miss
+
+    Raises:
+        HTTPException: If a permanent failure for the URL is negative-cached
+    """
+    # Check cache first (use proper cache key generation for detailed metadata)
+    cached_detailed = await cache.get_format_metadata(url)
+    if cached_detailed:
+        if cached_detailed.get("stale"):
+            # Serve the stale entry now, refresh it off the request path
+            logger.info(f"🕰️ Serving stale detailed metadata for: {url}")
+            _schedule_background_refresh(url, cache.redis)
         else:
-            logger.warning(f"⚠️ Failed to cache detailed metadata for: {url}")
+            logger.info(f"✅ Cache hit for detailed metadata: {url}")
+        return _metadata_from_cache_entry(cached_detailed)
 
-        logger.info(
-            f"✅ Extracted detailed metadata: {title} - {len(video_formats)} formats in {extraction_time:.2f}s"
-        )
-        logger.info(
-            f"🔍 Backend: Format IDs extracted: {[f.format_id for f in video_formats[:10]]}"
-        )
+    # Replay a known permanent failure instead of running the fallback ladder
+    if not bypass_negative_cache:
+        negative = await cache.get_negative_result(url)
+        if negative:
+            raise HTTPException(
+                status_code=negative["status_code"], detail=negative["detail"]
+            )
 
-        return metadata
+    return None
 
-    except DownloadError as e:
-        error_str = str(e).lower()
-        url_str = str(request.url).lower()
-
-        # Enhanced logging for all DownloadError cases to help debug production issues
-        logger.error(f"DownloadError occurred for {request.url}")
-        logger.error(f"Error type: {type(e).__name__}")
-        logger.error(f"Raw error message: {str(e)}")
-        logger.error(f"Lowercase error message: {error_str}")
-
-        # Instagram-specific error handling
-        if "instagram.com" in url_str:
-            if any(
-                keyword in error_str
-                for keyword in ["login", "authentication", "cookies", "sign in"]
-            ):
-                logger.warning(
-                    f"Instagram authentication required for {request.url}: {e}"
-                )
-                raise HTTPException(
-                    status_code=429,
-                    detail="Instagram requires authentication for this content. Please try again later or use a different URL.",
-                )
-            elif "timeout" in error_str or "timed out" in error_str:
-                logger.warning(f"Instagram timeout for {request.url}: {e}")
-                raise HTTPException(
-                    status_code=504,
-                    detail="Instagram is taking too long to respond. Please try again in a moment.",
-                )
-            elif any(
-                keyword in error_str
-                for keyword in [
-                    "private",
-                    "unavailable",
-                    "not found",
-                    "does not exist",
-                    "blocked",
-                    "restricted",
-                ]
-            ):
-                logger.warning(f"Instagram content unavailable for {request.url}: {e}")
-                raise HTTPException(
-                    status_code=422,
-                    detail="This Instagram content is private, unavailable, or restricted in your region. Please try a different URL.",
-                )
-            else:
-                # Enhanced logging for unhandled Instagram errors
-                logger.error(f"Unhandled Instagram error for {request.url}: {e}")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Full error message: {str(e)}")
-                raise HTTPException(
-                    status_code=503,
-                    detail="Instagram content temporarily unavailable. This may be due to regional restrictions or temporary blocking. Please try again later or use a different URL.",
-                )
 
-        # Facebook-specific error handling
-        if "facebook.com" in url_str or "fb.watch" in url_str:
-            if any(
-                keyword in error_str
-                for keyword in ["login", "authentication", "cookies", "sign in"]
-            ):
-                logger.warning(
-                    f"Facebook authentication required for {request.url}: {e}"
-                )
-                raise HTTPException(
-                    status_code=429,
-                    detail="Facebook requires authentication for this content. Please try again later or use a different URL.",
-                )
-            elif "timeout" in error_str or "timed out" in error_str:
-                logger.warning(f"Facebook timeout for {request.url}: {e}")
-                raise HTTPException(
-                    status_code=504,
-                    detail="Facebook is taking too long to respond. Please try again in a moment.",
-                )
-            elif any(
-                keyword in error_str
-                for keyword in [
-                    "private",
-                    "unavailable",
-                    "not found",
-                    "does not exist",
-                    "blocked",
-                    "restricted",
-                ]
-            ):
-                logger.warning(f"Facebook content unavailable for {request.url}: {e}")
-                raise HTTPException(
-                    status_code=422,
-                    detail="This Facebook content is private, unavailable, or restricted in your region. Please try a different URL.",
-                )
-            else:
-                # Enhanced logging for unhandled Facebook errors
-                logger.error(f"Unhandled Facebook error for {request.url}: {e}")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Full error message: {str(e)}")
-                raise HTTPException(
-                    status_code=503,
-                    detail="Facebook content temporarily unavailable. This may be due to regional restrictions or temporary blocking. Please try again later or use a different URL.",
-                )
+async def _resolve_video_metadata(
+    url: str, redis_client, bypass_negative_cache: bool = False
+) -> VideoMetadata:
+    """
+    Get metadata from the caches or a full extraction
 
-        # YouTube-specific error handling
-        if "http error 429" in error_str or "too many requests" in error_str:
-            logger.warning(f"Rate limiting detected for {request.url}: {e}")
-            raise HTTPException(
-                status_code=429,
-                detail="Too many requests to the video service. Please try again in a few minutes.",
-            )
-        elif "timeout" in error_str or "timed out" in error_str:
-            logger.warning(f"Timeout error for {request.url}: {e}")
-            raise HTTPException(
-                status_code=504,
-                detail="The video service is taking too long to respond. Please try again.",
-            )
-        else:
-            logger.error(f"DownloadError for {request.url}: {e}")
-            raise HTTPException(
-                status_code=503,
-                detail="The video service is currently unavailable. Please try again later.",
+    Raises:
+        HTTPException: With the status the metadata endpoints return on failure
+    """
+    # Initialize cache
+    cache = MetadataCache(redis_client)
+
+    try:
+        cached = await _cached_video_metadata(url, cache, bypass_negative_cache)
+        if cached:
+            return cached
+
+        # Log cache miss
+        logger.info(f"❌ Cache miss for detailed metadata: {url}")
+        return await _extract_and_cache_metadata(url, cache)
+
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        logger.warning(f"🔌 Rejected metadata request for {url}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except DownloadError as e:
+        http_error = _http_error_for_download_error(url, e)
+
+        # Remember permanent failures so retries are answered instantly
+        failure_class = classify_extraction_error(e)
+        if failure_class in PERMANENT_FAILURES:
+            await cache.set_negative_result(
+                url, failure_class.value, http_error.status_code, http_error.detail
             )
+        raise http_error
     except Exception as e:
         logger.error(f"❌ yt-dlp failed to extract info for {url}: {e}")
         # Log the full exception for debugging
@@ -794,6 +1038,235 @@ async def extract_video_metadata(
         )
 
 
+def _allow_negative_cache_bypass(http_request: Request, requested: bool) -> bool:
+    """Only admins may skip the negative cache"""
+    if requested and not is_admin_request(http_request):
+        logger.warning("Ignoring bypass_negative_cache from non-admin request")
+        return False
+    return requested
+
+
+@router.post("/metadata/extract", response_model=VideoMetadata)
+async def extract_video_metadata(
+    request: UrlRequest,
+    http_request: Request,
+    bypass_negative_cache: bool = False,
+    redis_client=Depends(get_async_redis),
+):
+    """
+    Extract video metadata including available formats/resolutions with caching
+
+    Permanent failures (private, removed, geo-blocked) are negative-cached and
+    replayed; admins can force a fresh attempt with ``bypass_negative_cache``.
+    Slow platforms hold this request open for the whole extraction; clients
+    that cannot wait should use ``/metadata/extract/async``.
+    """
+    url = str(request.url)
+    logger.info(f"🔍 Extracting detailed metadata for: {url}")
+
+    bypass_negative_cache = _allow_negative_cache_bypass(
+        http_request, bypass_negative_cache
+    )
+    return await _resolve_video_metadata(url, redis_client, bypass_negative_cache)
+
+
+class ExtractionError(BaseModel):
+    status_code: int
+    detail: str
+
+
+class ExtractionTicket(BaseModel):
+    ticket_id: str
+    url: str
+    status: TicketStatus
+    created_at: float
+    updated_at: float
+    result: Optional[VideoMetadata] = None
+    error: Optional[ExtractionError] = None
+    status_url: str
+    events_url: str
+
+
+def _ticket_response(ticket: Dict) -> ExtractionTicket:
+    """Build the API model of a stored ticket, with its polling URLs"""
+    base_url = f"/api/v1/metadata/extract/{ticket['ticket_id']}"
+    return ExtractionTicket(
+        **ticket, status_url=base_url, events_url=f"{base_url}/events"
+    )
+
+
+# Background extractions per process, and strong references to their tasks
+_async_extraction_slots = asyncio.Semaphore(ExtractionConfig.ASYNC_MAX_CONCURRENT)
+_async_extractions: Set[asyncio.Task] = set()
+
+
+async def _run_extraction_ticket(
+    ticket_id: str, url: str, redis_client, bypass_negative_cache: bool
+) -> None:
+    """Run a ticket's extraction in the background pool and store the outcome"""
+    tickets = ExtractionTicketStore(redis_client)
+    try:
+        async with _async_extraction_slots:
+            await tickets.mark_running(ticket_id)
+            metadata = await _resolve_video_metadata(
+                url, redis_client, bypass_negative_cache
+            )
+        await tickets.complete(ticket_id, url, metadata.dict())
+        logger.info(f"✅ Extraction ticket {ticket_id} completed for: {url}")
+    except HTTPException as e:
+        await tickets.fail(ticket_id, url, e.status_code, str(e.detail))
+    except Exception as e:
+        logger.error(f"❌ Extraction ticket {ticket_id} failed for {url}: {e}")
+        await tickets.fail(
+            ticket_id, url, 500, "Metadata extraction failed unexpectedly."
+        )
+
+
+@router.post(
+    "/metadata/extract/async", response_model=ExtractionTicket, status_code=202
+)
+async def extract_video_metadata_async(
+    request: UrlRequest,
+    http_request: Request,
+    response: Response,
+    bypass_negative_cache: bool = False,
+    redis_client=Depends(get_async_redis),
+):
+    """
+    Start a metadata extraction without holding the request open
+
+    Returns 202 with an extraction ticket to poll (``status_url``) or stream
+    (``events_url``). Cache hits and negative-cache hits are answered at once
+    with a finished ticket and status 200. Requests for a URL that is already
+    being extracted share its ticket.
+    """
+    if redis_client is None:
+        raise HTTPException(
+            status_code=503, detail="Asynchronous extraction is unavailable."
+        )
+
+    url = str(request.url)
+    bypass_negative_cache = _allow_negative_cache_bypass(
+        http_request, bypass_negative_cache
+    )
+    tickets = ExtractionTicketStore(redis_client)
+
+    try:
+        cached = await _cached_video_metadata(
+            url, MetadataCache(redis_client), bypass_negative_cache
+        )
+    except HTTPException as e:
+        ticket, _ = await tickets.create(url, TicketStatus.FAILED)
+        await tickets.fail(ticket["ticket_id"], url, e.status_code, str(e.detail))
+        response.status_code = 200
+        return _ticket_response(await tickets.get(ticket["ticket_id"]))
+
+    if cached:
+        ticket, _ = await tickets.create(url, TicketStatus.DONE)
+        await tickets.complete(ticket["ticket_id"], url, cached.dict())
+        response.status_code = 200
+        return _ticket_response(await tickets.get(ticket["ticket_id"]))
+
+    ticket, created = await tickets.create(url)
+    if created:
+        logger.info(f"🎟️ Extraction ticket {ticket['ticket_id']} queued for: {url}")
+        task = asyncio.create_task(
+            _run_extraction_ticket(
+                ticket["ticket_id"], url, redis_client, bypass_negative_cache
+            )
+        )
+        _async_extractions.add(task)
+        task.add_done_callback(_async_extractions.discard)
+
+    response.headers["Retry-After"] = str(int(ExtractionConfig.TICKET_POLL_INTERVAL))
+    return _ticket_response(ticket)
+
+
+@router.get("/metadata/extract/{ticket_id}", response_model=ExtractionTicket)
+async def get_extraction_ticket(
+    ticket_id: str, response: Response, redis_client=Depends(get_async_redis)
+):
+    """Poll an extraction ticket"""
+    if redis_client is None:
+        raise HTTPException(
+            status_code=503, detail="Asynchronous extraction is unavailable."
+        )
+
+    ticket = await ExtractionTicketStore(redis_client).get(ticket_id)
+    if ticket is None:
+        raise HTTPException(
+            status_code=404, detail="Extraction ticket not found or has expired."
+        )
+
+    if ticket["status"] in (TicketStatus.PENDING, TicketStatus.RUNNING):
+        response.headers["Retry-After"] = str(
+            int(ExtractionConfig.TICKET_POLL_INTERVAL)
+        )
+    return _ticket_response(ticket)
+
+
+def _sse_event(event: str, data: Dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/metadata/extract/{ticket_id}/events")
+async def stream_extraction_ticket(
+    ticket_id: str, http_request: Request, redis_client=Depends(get_async_redis)
+):
+    """
+    Stream an extraction ticket as server-sent events
+
+    Emits one event per status change (pending, running, done, failed) with
+    the ticket as data, and closes after the final one.
+    """
+    if redis_client is None:
+        raise HTTPException(
+            status_code=503, detail="Asynchronous extraction is unavailable."
+        )
+
+    tickets = ExtractionTicketStore(redis_client)
+    if await tickets.get(ticket_id) is None:
+        raise HTTPException(
+            status_code=404, detail="Extraction ticket not found or has expired."
+        )
+
+    async def events():
+        last_status = None
+        last_sent = time.monotonic()
+        deadline = last_sent + ExtractionConfig.TICKET_TTL
+
+        while time.monotonic() < deadline:
+            if await http_request.is_disconnected():
+                return
+
+            ticket = await tickets.get(ticket_id)
+            if ticket is None:
+                yield _sse_event("expired", {"ticket_id": ticket_id})
+                return
+
+            if ticket["status"] != last_status:
+                last_status = ticket["status"]
+                last_sent = time.monotonic()
+                yield _sse_event(last_status, _ticket_response(ticket).dict())
+                if last_status in (TicketStatus.DONE, TicketStatus.FAILED):
+                    return
+            elif (
+                time.monotonic() - last_sent
+                >= ExtractionConfig.TICKET_HEARTBEAT_INTERVAL
+            ):
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            await asyncio.sleep(ExtractionConfig.TICKET_POLL_INTERVAL)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/metadata/cached", response_model=VideoMetadata)
 async def get_cached_video_metadata(
     request: UrlRequest, redis_client=Depends(get_async_redis)
@@ -810,23 +1283,7 @@ async def get_cached_video_metadata(
         cached_metadata = await cache.get_format_metadata(url)
         if cached_metadata:
             logger.info(f"✅ Cache hit for cached metadata: {url}")
-            metadata = cached_metadata.get("metadata", {})
-
-            # Reconstruct VideoFormat objects
-            formats = []
-            for fmt_data in metadata.get("formats", []):
-                formats.append(VideoFormat(**fmt_data))
-
-            return VideoMetadata(
-                title=metadata.get("title", "No Title"),
-                duration=metadata.get("duration", 0),
-                thumbnail=metadata.get("thumbnail", ""),
-                uploader=metadata.get("uploader", "Unknown Uploader"),
-                upload_date=metadata.get("upload_date", "Unknown Date"),
-                view_count=metadata.get("view_count", 0),
-                formats=formats,
-                manifest_url=metadata.get("manifest_url"),
-            )
+            return _metadata_from_cache_entry(cached_metadata)
 
         # Log cache miss
         logger.info(f"❌ Cache miss for cached metadata: {url}")
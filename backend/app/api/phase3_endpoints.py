@@ -10,6 +10,13 @@ from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from ..cache.metadata_cache import MetadataCache
 from ..constants import AsyncConfig, CacheConfig
 from ..dependencies import get_job_repository, get_redis_client
+from ..extraction import (
+    CookieSessionPool,
+    get_circuit_states,
+    get_strategy_rankings,
+    ydl_pool,
+)
+from ..extraction.sessions import get_sessions_dir
 from ..factories.storage_factory import StorageFactory
 from ..logging.config import get_logger
 from ..middleware.rate_limiter import RateLimiter, get_rate_limiter
@@ -37,6 +44,9 @@ async def get_cache_stats(redis_client=Depends(get_redis_client)) -> Dict[str, A
             "cache_config": {
                 "metadata_ttl": CacheConfig.METADATA_TTL,
                 "format_ttl": CacheConfig.FORMAT_TTL,
+                "format_soft_ttl": CacheConfig.FORMAT_SOFT_TTL,
+                "format_hard_ttl": CacheConfig.FORMAT_HARD_TTL,
+                "platform_format_ttls": CacheConfig.PLATFORM_FORMAT_TTLS,
                 "thumbnail_ttl": CacheConfig.THUMBNAIL_TTL,
             },
         }
@@ -82,26 +92,133 @@ async def clear_cache(
     Clear cache entries by type
 
     Args:
-        cache_type: Type of cache to clear (metadata, format, thumbnail) or all
+        cache_type: Type of cache to clear (metadata, format, thumbnail, negative) or all
     """
     try:
-        if cache_type and cache_type not in ["metadata", "format", "thumbnail", "all"]:
+        if cache_type and cache_type not in [
+            "metadata",
+            "format",
+            "thumbnail",
+            "negative",
+            "all",
+        ]:
             raise HTTPException(status_code=400, detail="Invalid cache type")
 
-        # This would implement cache clearing logic
-        # For now, return success message
+        cache = MetadataCache(redis_client)
+        cache_types = None if cache_type in (None, "all") else [cache_type]
+        cleared = await cache.clear_cache(cache_types)
 
         return {
             "status": "success",
             "message": f"Cache cleared: {cache_type or 'all'}",
             "cache_type": cache_type or "all",
+            "deleted_entries": sum(cleared.values()),
+            "deleted_by_type": cleared,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to clear cache: {str(e)}")
         raise HTTPException(status_code=500, detail="Cache clearing failed")
 
 
+@router.get("/extraction/strategies")
+async def get_extraction_strategies(
+    redis_client=Depends(get_redis_client),
+) -> Dict[str, Any]:
+    """
+    Get the current adaptive ordering of yt-dlp configs
+
+    Returns, per ladder (metadata, download) and platform, the configs ordered
+    by expected time-to-success with their time-decayed stats
+    """
+    try:
+        rankings = await get_strategy_rankings(redis_client)
+
+        return {
+            "status": "success",
+            "rankings": rankings,
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to get extraction strategies: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Failed to retrieve extraction strategies"
+        )
+
+
+@router.get("/extraction/ytdlp-pool")
+async def get_ytdlp_pool_stats() -> Dict[str, Any]:
+    """
+    Get YoutubeDL pool statistics for this API process
+
+    Returns per-profile reuse counts, average construction time and the
+    construction time saved per call
+    """
+    return {
+        "status": "success",
+        "pool": ydl_pool.stats(),
+    }
+
+
+@router.get("/extraction/sessions")
+async def get_cookie_sessions(
+    redis_client=Depends(get_redis_client),
+) -> Dict[str, Any]:
+    """
+    Get the health of every configured cookie session
+
+    Returns, per platform, each session's health score, remaining cool-down,
+    consecutive strikes and use of its rate budget
+    """
+    try:
+        sessions_dir = get_sessions_dir()
+        pool = CookieSessionPool(redis_client)
+        platforms = (
+            sorted(p.name for p in sessions_dir.iterdir() if p.is_dir())
+            if sessions_dir.is_dir()
+            else []
+        )
+
+        return {
+            "status": "success",
+            "sessions_dir": str(sessions_dir),
+            "sessions": {
+                platform: await pool.get_health(platform) for platform in platforms
+            },
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to get cookie sessions: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Failed to retrieve cookie sessions"
+        )
+
+
+@router.get("/extraction/breakers")
+async def get_extraction_breakers(
+    redis_client=Depends(get_redis_client),
+) -> Dict[str, Any]:
+    """
+    Get the state of the extraction circuit breakers
+
+    Returns every platform and config breaker that has opened at least once,
+    with its state, seconds until the next probe and number of trips
+    """
+    try:
+        return {
+            "status": "success",
+            "breakers": await get_circuit_states(redis_client),
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to get circuit breakers: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Failed to retrieve circuit breakers"
+        )
+
+
 @router.post("/cleanup/jobs")
 async def trigger_job_cleanup(
     background_tasks: BackgroundTasks,
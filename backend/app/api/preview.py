@@ -0,0 +1,182 @@
+"""
+Preview endpoints: low-resolution proxy rendition and scrub sprites.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from ..cache.metadata_cache import MetadataCache
+from ..config.configuration import get_settings
+from ..constants import JobCostConfig, PreviewConfig
+from ..dependencies import get_async_redis, get_redis
+from ..queue import queue_health_sampler
+from ..services.job_cost import charge_client_work
+from ..services.preview_service import (
+    PREVIEW_FILES,
+    PREVIEW_SPRITE,
+    PREVIEW_VIDEO,
+    PREVIEW_VTT,
+    PreviewStatus,
+    PreviewStore,
+    estimate_preview_cost,
+    get_previews_dir,
+    is_preview_id,
+    preview_id_for,
+    queue_preview,
+)
+from .jobs import _client_ip
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+MEDIA_TYPES = {
+    PREVIEW_VIDEO: "video/mp4",
+    PREVIEW_SPRITE: "image/jpeg",
+    PREVIEW_VTT: "text/vtt",
+}
+
+
+class PreviewResponse(BaseModel):
+    preview_id: str
+    status: PreviewStatus
+    video_url: Optional[str] = None
+    sprite_url: Optional[str] = None
+    vtt_url: Optional[str] = None
+    thumbnail_interval: Optional[float] = None
+    error: Optional[str] = None
+
+
+async def _admit_preview(
+    url: str, http_request: Request, redis_client, sync_redis
+) -> float:
+    """
+    Admit a new preview like a clip job: its video must have cached metadata
+    with a known duration, and its worker time must fit the queue and the
+    client's hourly quota (which it is charged to)
+
+    Returns:
+        The video duration in seconds
+
+    Raises:
+        HTTPException: If the preview is not admitted
+    """
+    cached = await MetadataCache(redis_client).get_format_metadata(url)
+    metadata: Dict[str, Any] = (cached or {}).get("metadata") or {}
+    duration = float(metadata.get("duration") or 0)
+    if not duration:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Extract the video's metadata before requesting its preview",
+        )
+    if duration > PreviewConfig.MAX_DURATION:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Video too long for a preview ({duration:.0f}s)",
+        )
+
+    cost = estimate_preview_cost(metadata)
+    queue_health = queue_health_sampler.current()
+    if (
+        queue_health is not None
+        and queue_health.pending_work_seconds > 0
+        and queue_health.pending_work_seconds + cost.seconds
+        > queue_health.work_capacity
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Queue at capacity. Try again later.",
+        )
+
+    if sync_redis is None:
+        raise HTTPException(status_code=503, detail="Redis service unavailable")
+    charged, used = charge_client_work(
+        sync_redis,
+        _client_ip(http_request),
+        f"preview-{preview_id_for(url)}",
+        cost.seconds,
+        time.time(),
+    )
+    if not charged:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=(
+                f"Hourly processing quota exceeded: {used:.0f}s of "
+                f"{JobCostConfig.CLIENT_WORKER_SECONDS_PER_HOUR}s worker time used"
+            ),
+        )
+    return duration
+
+
+@router.get("/preview", response_model=PreviewResponse)
+async def get_preview(
+    url: str,
+    response: Response,
+    http_request: Request,
+    redis_client=Depends(get_async_redis),
+    sync_redis=Depends(get_redis),
+) -> PreviewResponse:
+    """
+    Get the preview of a video, queueing one if there is none yet
+
+    The video's metadata must have been extracted first. Poll until
+    ``status`` is ``ready``; the response then links the 240p proxy
+    rendition, the sprite sheet and its WebVTT index (cue payloads are
+    ``sprite.jpg#xywh=x,y,w,h`` fragments relative to the index).
+    """
+    if not get_settings().preview_enabled:
+        raise HTTPException(status_code=404, detail="Previews are not enabled")
+    if redis_client is None:
+        raise HTTPException(status_code=503, detail="Preview state unavailable")
+
+    store = PreviewStore(redis_client)
+    preview = await store.get(preview_id_for(url))
+    if preview is None:
+        duration = await _admit_preview(url, http_request, redis_client, sync_redis)
+        preview_id = await queue_preview(redis_client, url, duration)
+        if preview_id is None:
+            raise HTTPException(status_code=503, detail="Could not queue preview")
+        preview = await store.get(preview_id) or {
+            "id": preview_id,
+            "status": PreviewStatus.QUEUED.value,
+        }
+
+    status = PreviewStatus(preview["status"])
+    if status is not PreviewStatus.READY:
+        response.status_code = 202 if status is not PreviewStatus.FAILED else 200
+        return PreviewResponse(
+            preview_id=preview["id"], status=status, error=preview.get("error")
+        )
+
+    base = f"/api/v1/preview/{preview['id']}"
+    return PreviewResponse(
+        preview_id=preview["id"],
+        status=status,
+        video_url=f"{base}/{PREVIEW_VIDEO}",
+        sprite_url=f"{base}/{PREVIEW_SPRITE}",
+        vtt_url=f"{base}/{PREVIEW_VTT}",
+        thumbnail_interval=float(preview.get("thumbnail_interval") or 0) or None,
+    )
+
+
+@router.get("/preview/{preview_id}/{filename}")
+async def get_preview_file(preview_id: str, filename: str) -> FileResponse:
+    """Serve a file of a finished preview (with Range support for seeking)"""
+    # Security: only known file names of well-formed ids, no path traversal
+    if not is_preview_id(preview_id) or filename not in PREVIEW_FILES:
+        raise HTTPException(status_code=404, detail="Preview file not found")
+
+    path = get_previews_dir() / preview_id / filename
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Preview not found or expired")
+
+    return FileResponse(
+        path=str(path),
+        media_type=MEDIA_TYPES[filename],
+        headers={"Cache-Control": f"public, max-age={PreviewConfig.TTL}"},
+    )
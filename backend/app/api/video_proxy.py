@@ -1,14 +1,113 @@
 import logging
+from typing import Dict, Optional, Tuple
 
 import httpx
 from fastapi import APIRouter, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from ..cache.range_cache import (
+    CachedMedia,
+    RangeCache,
+    get_range_cache,
+    parse_byte_range,
+    parse_content_range,
+    resolve_byte_range,
+)
+from ..utils.http_client import get_http_client, stream_body
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _media_headers(content_type: str) -> Dict[str, str]:
+    """Headers of every proxied media response"""
+    return {
+        "Content-Type": content_type,
+        "Accept-Ranges": "bytes",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
+        "Access-Control-Allow-Headers": "Range, Content-Type",
+        "Cache-Control": "public, max-age=3600",  # Cache for 1 hour
+    }
+
+
+def _serve_cached_range(
+    cache: RangeCache,
+    entry: CachedMedia,
+    url: str,
+    headers: Dict[str, str],
+    byte_range: Tuple[Optional[int], Optional[int]],
+) -> Response:
+    """
+    Answer a Range request from the range cache, fetching only the gaps
+
+    Args:
+        cache: Range cache holding the entry
+        entry: Cached ranges of the media
+        url: Signed upstream URL, used to fetch the gaps
+        headers: Upstream request headers
+        byte_range: Parsed Range header
+    """
+    interval = resolve_byte_range(byte_range, entry.size)
+    if interval is None:
+        return Response(
+            status_code=416,
+            headers={
+                **_media_headers(entry.content_type),
+                "Content-Range": f"bytes */{entry.size}",
+            },
+        )
+    start, end = interval
+
+    async def fetch(gap_start: int, gap_end: int):
+        client = get_http_client()
+        response = await client.send(
+            client.build_request(
+                "GET",
+                url,
+                headers={**headers, "Range": f"bytes={gap_start}-{gap_end - 1}"},
+            ),
+            stream=True,
+            follow_redirects=True,
+        )
+        content_range = parse_content_range(response.headers.get("content-range", ""))
+        if (
+            response.status_code != 206
+            or content_range is None
+            or content_range[0] != gap_start
+            or content_range[2] != entry.size
+        ):
+            await response.aclose()
+            raise RuntimeError(
+                f"Upstream answered {response.status_code} "
+                f"({response.headers.get('content-range')}) to bytes {gap_start}-{gap_end - 1}"
+            )
+        async for chunk in stream_body(response):
+            yield chunk
+
+    plan = entry.plan(start, end)
+    cached_bytes = sum(
+        seg_end - seg_start for seg_start, seg_end, cached in plan if cached
+    )
+    logger.info(
+        f"📼 Serving bytes {start}-{end - 1}/{entry.size}: "
+        f"{cached_bytes} from cache, {end - start - cached_bytes} from upstream"
+    )
+
+    return StreamingResponse(
+        cache.stream(entry, start, end, fetch),
+        status_code=206,
+        headers={
+            **_media_headers(entry.content_type),
+            "Content-Length": str(end - start),
+            "Content-Range": f"bytes {start}-{end - 1}/{entry.size}",
+        },
+        media_type=entry.content_type,
+    )
+
+
 @router.get("/proxy")
 async def proxy_video(url: str, request: Request):
     """
@@ -65,54 +164,80 @@ async def proxy_video(url: str, request: Request):
             headers["Range"] = range_header
             logger.info(f"📋 Range request: {range_header}")
 
-        logger.info("🔗 Creating httpx client...")
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            logger.info("📡 Making GET request...")
-            response = await client.get(url, headers=headers, follow_redirects=True)
-            logger.info(f"📡 Received response: {response.status_code}")
+        # Seeks over ranges fetched before are served from the range cache
+        cache = get_range_cache()
+        byte_range = parse_byte_range(range_header) if range_header else None
+        if cache is not None and byte_range is not None:
+            entry = await cache.get(url)
+            if entry is not None:
+                return _serve_cached_range(cache, entry, url, headers, byte_range)
 
-            if response.status_code not in [200, 206]:  # 206 for partial content
-                logger.error(
-                    f"❌ Video proxy failed: {response.status_code} {response.text}"
-                )
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to fetch video: {response.status_code}",
-                )
+        # Pooled keep-alive connections; the body is streamed, not buffered
+        client = get_http_client()
+        logger.info("📡 Making GET request...")
+        response = await client.send(
+            client.build_request("GET", url, headers=headers),
+            stream=True,
+            follow_redirects=True,
+        )
+        logger.info(f"📡 Received response: {response.status_code}")
 
-            logger.info("✅ Preparing response headers...")
-            # Prepare response headers
-            response_headers = {
-                "Content-Type": response.headers.get("content-type", "video/mp4"),
-                "Accept-Ranges": "bytes",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
-                "Access-Control-Allow-Headers": "Range, Content-Type",
-                "Cache-Control": "public, max-age=3600",  # Cache for 1 hour
-            }
-
-            # Include content-length and range headers if present
-            if "content-length" in response.headers:
-                response_headers["Content-Length"] = response.headers["content-length"]
-
-            if "content-range" in response.headers:
-                response_headers["Content-Range"] = response.headers["content-range"]
-
-            logger.info(
-                f"✅ Video proxy successful: {response.status_code}, Content-Type: {response_headers['Content-Type']}"
+        if response.status_code not in [200, 206]:  # 206 for partial content
+            await response.aclose()
+            logger.error(f"❌ Video proxy failed: {response.status_code}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to fetch video: {response.status_code}",
             )
 
-            # Stream the video content
-            async def generate():
-                async for chunk in response.aiter_bytes(chunk_size=8192):
-                    yield chunk
+        logger.info("✅ Preparing response headers...")
+        # Prepare response headers
+        response_headers = _media_headers(
+            response.headers.get("content-type", "video/mp4")
+        )
 
-            return StreamingResponse(
-                generate(),
-                status_code=response.status_code,
-                headers=response_headers,
-                media_type=response_headers["Content-Type"],
-            )
+        # Include content-length and range headers if present
+        if "content-length" in response.headers:
+            response_headers["Content-Length"] = response.headers["content-length"]
+
+        if "content-range" in response.headers:
+            response_headers["Content-Range"] = response.headers["content-range"]
+
+        # The body is relayed as received, so keep its encoding (if any)
+        if "content-encoding" in response.headers:
+            response_headers["Content-Encoding"] = response.headers["content-encoding"]
+
+        logger.info(
+            f"✅ Video proxy successful: {response.status_code}, Content-Type: {response_headers['Content-Type']}"
+        )
+
+        # Stream the video content; the upstream response is closed when the
+        # body ends or the client disconnects (which cancels the stream)
+        body = stream_body(response)
+
+        # Keep what we relay so later seeks over it are local reads
+        if cache is not None and "content-encoding" not in response.headers:
+            if response.status_code == 206:
+                content_range = parse_content_range(
+                    response.headers.get("content-range", "")
+                )
+            elif "content-length" in response.headers:
+                size = int(response.headers["content-length"])
+                content_range = (0, size, size)
+            else:
+                content_range = None
+            if content_range is not None:
+                start, _, size = content_range
+                entry = await cache.open(url, size, response_headers["Content-Type"])
+                body = cache.write_through(entry, start, body)
+
+        return StreamingResponse(
+            body,
+            status_code=response.status_code,
+            headers=response_headers,
+            media_type=response_headers["Content-Type"],
+            background=BackgroundTask(response.aclose),
+        )
 
     except httpx.TimeoutException as e:
         logger.error(f"❌ Video proxy timeout: {e}")
@@ -1,8 +1,10 @@
 """
 Cache package for metadata and video information caching.
-Provides Redis-based caching for improved performance.
+Provides Redis-based caching for improved performance and an on-disk
+byte-range cache for proxied media.
 """
 
 from .metadata_cache import MetadataCache
+from .range_cache import RangeCache, get_range_cache
 
-__all__ = ["MetadataCache"]
+__all__ = ["MetadataCache", "RangeCache", "get_range_cache"]
@@ -0,0 +1,129 @@
+"""
+Compact binary encoding for metadata cache entries.
+
+Entries are stored as a small fixed header followed by compact JSON that is
+raw-deflated against a shared preset dictionary of the strings every format
+metadata entry repeats (field names, codecs, CDN hosts and signed URL query
+parameters). Expiry is left to Redis-native TTLs; the header only carries the
+soft (stale-while-revalidate) deadline.
+
+Legacy entries (plain JSON envelopes with an embedded ``cached_at``) are
+recognised on read so existing cache contents stay valid during rollout.
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Leading NUL can never start a legacy JSON entry
+MAGIC = b"\x00M"
+CODEC_VERSION = 1
+
+# magic, codec version, dictionary id, soft expiry (unix seconds, 0 = none)
+HEADER = struct.Struct(">2sBBd")
+
+# Shared preset dictionaries, keyed by id. Never edit a published dictionary:
+# add a new id instead so entries written by older replicas stay readable.
+# Deflate favours matches closer to the end, so the most frequent strings last.
+_PRESET_DICTIONARIES = {
+    1: (
+        b"https://scontent.cdninstagram.com/o1/v/t16/f1/m84/"
+        b"https://video.xx.fbcdn.net/v/t42.1790-2/"
+        b"&_nc_cat=&_nc_sid=&_nc_ohc=&_nc_ht=&_nc_oc=&efg=&ccb=&oh=00_&oe="
+        b".googlevideo.com/videoplayback?expire=&ei=&ip=&id=&itag=&source=youtube"
+        b"&requiressl=yes&mh=&mm=&mn=&ms=&mv=&mvi=&pl=&initcwndbps=&vprv=1&mime="
+        b"video%2Fmp4&gir=yes&clen=&dur=&lmt=&mt=&fvip=&keepalive=yes&c=ANDROID"
+        b"&txp=&sparams=expire%2Cei%2Cip%2Cid%2Citag%2Csource%2Crequiressl&sig="
+        b"&lsparams=mh%2Cmm%2Cmn%2Cms%2Cmv%2Cmvi%2Cpl%2Cinitcwndbps&lsig="
+        b'"title":"duration":"thumbnail":"uploader":"upload_date":"view_count":'
+        b'"extraction_time":"manifest_url":null,"formats":[{"format_id":"'
+        b'"mp4a.40.2","vp09.00.40.08","avc1.4d401f","avc1.64001F","avc1.640028"'
+        b'"format_note":"","format_note":"DASH video","format_note":"DASH audio"'
+        b'"fps":30.0,"fps":null,"filesize":null,"vcodec":"none","acodec":"none",'
+        b'"ext":"m4a","ext":"webm","resolution":"audio only","ext":"mp4",'
+        b'"resolution":"1920x1080","resolution":"1280x720","resolution":"640x360",'
+        b'"url":"https://rr1---sn-'
+        b'{"url":"https://www.youtube.com/watch?v=","metadata":{"title":"'
+    ),
+}
+CURRENT_DICTIONARY_ID = 1
+
+COMPRESSION_LEVEL = 6
+
+
+def _compress(payload: bytes, dictionary_id: int) -> bytes:
+    compressor = zlib.compressobj(
+        COMPRESSION_LEVEL,
+        zlib.DEFLATED,
+        -zlib.MAX_WBITS,
+        zdict=_PRESET_DICTIONARIES[dictionary_id],
+    )
+    return compressor.compress(payload) + compressor.flush()
+
+
+def _decompress(payload: bytes, dictionary_id: int) -> bytes:
+    decompressor = zlib.decompressobj(
+        -zlib.MAX_WBITS, zdict=_PRESET_DICTIONARIES[dictionary_id]
+    )
+    return decompressor.decompress(payload) + decompressor.flush()
+
+
+def encode_entry(
+    entry: Dict[str, Any], soft_expires_at: Optional[float] = None
+) -> bytes:
+    """
+    Encode a cache entry into the compact binary format
+
+    Args:
+        entry: JSON-serialisable entry (url + metadata)
+        soft_expires_at: Unix time after which the entry is stale, if any
+
+    Returns:
+        Encoded bytes ready to store in Redis
+    """
+    payload = json.dumps(entry, separators=(",", ":"), default=str).encode("utf-8")
+    header = HEADER.pack(
+        MAGIC, CODEC_VERSION, CURRENT_DICTIONARY_ID, soft_expires_at or 0.0
+    )
+    return header + _compress(payload, CURRENT_DICTIONARY_ID)
+
+
+def is_encoded(raw: Union[bytes, str, None]) -> bool:
+    """Check whether a raw Redis value uses the compact binary format"""
+    return isinstance(raw, (bytes, bytearray)) and raw[:2] == MAGIC
+
+
+def decode_entry(raw: Union[bytes, str]) -> Tuple[Dict[str, Any], Optional[float]]:
+    """
+    Decode a raw Redis value in either the compact or the legacy JSON format
+
+    Args:
+        raw: Value returned by Redis GET
+
+    Returns:
+        Tuple of (entry, soft_expires_at). ``soft_expires_at`` is None for
+        legacy entries and entries without a soft TTL.
+
+    Raises:
+        ValueError: If the value is corrupt or uses an unknown dictionary
+    """
+    if not is_encoded(raw):
+        # Legacy JSON envelope written before the compact encoding
+        return json.loads(raw), None
+
+    if len(raw) < HEADER.size:
+        raise ValueError("Truncated cache entry")
+
+    _, version, dictionary_id, soft_expires_at = HEADER.unpack_from(raw)
+    if version != CODEC_VERSION or dictionary_id not in _PRESET_DICTIONARIES:
+        raise ValueError(
+            f"Unsupported cache entry encoding (version={version}, dict={dictionary_id})"
+        )
+
+    try:
+        payload = _decompress(bytes(raw[HEADER.size :]), dictionary_id)
+    except zlib.error as e:
+        raise ValueError(f"Corrupt cache entry: {e}") from e
+
+    return json.loads(payload), (soft_expires_at or None)
@@ -3,14 +3,34 @@ Cache module for storing video metadata to reduce repeated extraction calls.
 """
 
 import asyncio
+import functools
 import hashlib
 import json
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis as AsyncRedis
+from redis.client import NEVER_DECODE
+
+from ..constants import CacheConfig
+from ..metrics import (
+    metadata_cache_entry_bytes,
+    metadata_cache_operation_seconds,
+    metadata_cache_requests_total,
+)
+from ..utils.platform_detection import PlatformDetector
+from .codec import decode_entry, encode_entry, is_encoded
 
 logger = logging.getLogger(__name__)
 
+# Query parameters carrying the expiry of signed CDN URLs, with their base
+# (googlevideo `expire` is decimal epoch, fbcdn/cdninstagram `oe` is hex epoch)
+SIGNED_URL_EXPIRY_PARAMS = (("expire", 10), ("x-expires", 10), ("oe", 16))
+
 
 class MetadataCache:
     """Cache for video metadata to avoid repeated API calls"""
@@ -25,8 +45,12 @@ class MetadataCache:
         self.redis = redis_client
         self.metadata_prefix = "metadata"
         self.format_prefix = "format_metadata"
+        self.negative_prefix = "negative_metadata"
         self.metadata_ttl = 3600  # 1 hour
-        self.format_ttl = 7200  # 2 hours (format metadata is more expensive)
+        self.format_ttl = CacheConfig.FORMAT_HARD_TTL  # Hard TTL for format metadata
+        self.format_soft_ttl = CacheConfig.FORMAT_SOFT_TTL
+        self.refresh_lock_prefix = "refresh_lock:format:"
+        self.encoding_stats_key = "cache_stats:encoding"
 
         # Debug: log the type of Redis client being used
         if redis_client is not None:
@@ -55,6 +79,17 @@ class MetadataCache:
         # Cache key prefixes
         self.thumbnail_prefix = "cache:thumbnail:"
 
+        # Index keys maintained on write so administration never needs KEYS:
+        # a set of entry keys per URL and an expiry-scored sorted set per type
+        self.url_index_prefix = "cache:index:url:"
+        self.type_index_prefix = "cache:index:type:"
+        self.cache_type_prefixes = {
+            "metadata": self.metadata_prefix,
+            "format": self.format_prefix,
+            "thumbnail": self.thumbnail_prefix,
+            "negative": self.negative_prefix,
+        }
+
     def _generate_url_hash(self, url: str) -> str:
         """Generate a consistent hash for URL-based cache keys"""
         return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
@@ -71,6 +106,213 @@ class MetadataCache:
 
         return f"{prefix}{url_hash}"
 
+    def _is_redis_py(self) -> bool:
+        """Whether the client is a real redis-py client (sync or asyncio)"""
+        return isinstance(self.redis, (SyncRedis, AsyncRedis))
+
+    async def _get_raw(self, cache_key: str) -> Any:
+        """
+        Fetch a raw value, bypassing response decoding for binary entries
+
+        The shared async pool is created with ``decode_responses=True``, which
+        would fail on compact entries, so the read skips decoding there.
+        """
+        if self._is_redis_py() and self.redis.get_encoder().decode_responses:
+            result = self.redis.execute_command(
+                "GET", cache_key, **{NEVER_DECODE: True}
+            )
+        else:
+            result = self.redis.get(cache_key)
+
+        # Handle async vs sync Redis clients
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    async def _execute(self, *commands: Tuple[str, tuple]) -> List[Any]:
+        """
+        Run several commands, in a single round trip when pipelines are available
+
+        Args:
+            commands: (method name, args) tuples
+
+        Returns:
+            List of command results in order
+        """
+        if self._is_redis_py():
+            pipe = self.redis.pipeline(transaction=False)
+            for name, args in commands:
+                getattr(pipe, name)(*args)
+            results = pipe.execute()
+            if asyncio.iscoroutine(results):
+                results = await results
+            return results
+
+        results = []
+        for name, args in commands:
+            result = getattr(self.redis, name)(*args)
+            if asyncio.iscoroutine(result):
+                result = await result
+            results.append(result)
+        return results
+
+    def _index_commands(
+        self, cache_type: str, url: str, cache_key: str, ttl: int
+    ) -> List[Tuple[str, tuple]]:
+        """
+        Commands registering a freshly written key in the URL and type indexes
+
+        Args:
+            cache_type: One of metadata, format, thumbnail
+            url: Video URL the entry belongs to
+            cache_key: Redis key of the entry
+            ttl: TTL of the entry in seconds
+
+        Returns:
+            Commands to run alongside the write (see ``_execute``)
+        """
+        url_index_key = f"{self.url_index_prefix}{self._generate_url_hash(url)}"
+        type_index_key = f"{self.type_index_prefix}{cache_type}"
+        now = time.time()
+        return [
+            ("sadd", (url_index_key, cache_key)),
+            # Outlive every entry type so the set never drops a live key
+            ("expire", (url_index_key, max(self.thumbnail_ttl, ttl))),
+            ("zadd", (type_index_key, {cache_key: now + ttl})),
+            # Drop expired keys as we go so the index stays bounded by live ones
+            ("zremrangebyscore", (type_index_key, "-inf", now)),
+        ]
+
+    async def _scan(self, command: str, *args, **kwargs) -> AsyncIterator[List[Any]]:
+        """
+        Iterate a SCAN-family command in batches without blocking Redis
+
+        Args:
+            command: scan, sscan or zscan
+            *args: Leading command arguments (the key for sscan/zscan)
+            **kwargs: match/count options
+
+        Yields:
+            Batches of keys (or members / (member, score) pairs)
+        """
+        cursor = 0
+        while True:
+            result = getattr(self.redis, command)(*args, cursor=cursor, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = await result
+            cursor, batch = result
+            if batch:
+                yield list(batch)
+            if int(cursor) == 0:
+                break
+
+    async def _read_entry(
+        self, cache_key: str, ttl: int
+    ) -> Optional[Tuple[Dict[str, Any], Optional[float]]]:
+        """
+        Read and decode a cache entry in either the compact or legacy format
+
+        Args:
+            cache_key: Redis key of the entry
+            ttl: Hard TTL used to validate legacy entries
+
+        Returns:
+            Tuple of (entry, soft_expires_at) or None on miss/expiry
+
+        Raises:
+            ValueError: If the stored entry is corrupt or malformed
+        """
+        raw = await self._get_raw(cache_key)
+        if not raw:
+            return None
+
+        entry, soft_expires_at = decode_entry(raw)
+        if is_encoded(raw):
+            # Hard expiry is enforced by the Redis TTL itself
+            entry["cache_version"] = "2.0"
+            return entry, soft_expires_at
+
+        # Legacy JSON envelope: validate structure and the embedded timestamp
+        if "metadata" not in entry or "cached_at" not in entry:
+            raise ValueError("Invalid cache entry structure")
+
+        hard_expires_at = entry.get("hard_expires_at")
+        if hard_expires_at is None:
+            cached_time = datetime.fromisoformat(entry["cached_at"])
+            expired = datetime.utcnow() - cached_time >= timedelta(seconds=ttl)
+        else:
+            expired = time.time() >= hard_expires_at
+
+        if expired:
+            return None
+        return entry, entry.get("soft_expires_at")
+
+    async def _write_entry(
+        self,
+        cache_type: str,
+        cache_key: str,
+        url: str,
+        metadata: Dict[str, Any],
+        ttl: int,
+        soft_expires_at: Optional[float] = None,
+    ) -> bool:
+        """
+        Encode and store a cache entry with a Redis-native TTL
+
+        Returns:
+            True if Redis accepted the write
+        """
+        started = time.perf_counter()
+        encoded = encode_entry({"url": url, "metadata": metadata}, soft_expires_at)
+
+        # Store with TTL, index the key and count its size in one round trip
+        results = await self._execute(
+            ("setex", (cache_key, ttl, encoded)),
+            *self._index_commands(cache_type, url, cache_key, ttl),
+            *self._size_commands(
+                cache_type, len(encoded), self._legacy_size(url, metadata)
+            ),
+        )
+        result = results[0]
+
+        # Convert result to boolean (Redis setex returns True on success)
+        success = bool(result) if result is not None else False
+        self._track_cache_operation(cache_type, "set", url, started)
+        if success:
+            metadata_cache_entry_bytes.labels(cache_type).observe(len(encoded))
+        else:
+            logger.warning(f"⚠️ Redis setex returned {result} for {cache_type} cache")
+        return success
+
+    @staticmethod
+    def _legacy_size(url: str, metadata: Dict[str, Any]) -> int:
+        """Bytes the entry would take in the legacy JSON envelope"""
+        return len(
+            json.dumps(
+                {
+                    "url": url,
+                    "metadata": metadata,
+                    "cached_at": datetime.utcnow().isoformat(),
+                    "cache_version": "1.0",
+                },
+                default=str,
+            ).encode("utf-8")
+        )
+
+    def _size_commands(
+        self, cache_type: str, encoded_size: int, legacy_size: int
+    ) -> List[Tuple[str, tuple]]:
+        """
+        Commands counting a written entry and its bytes, compact and as
+        legacy JSON, for the admin stats
+        """
+        key = self.encoding_stats_key
+        return [
+            ("hincrby", (key, f"{cache_type}:entries", 1)),
+            ("hincrby", (key, f"{cache_type}:encoded_bytes", encoded_size)),
+            ("hincrby", (key, f"{cache_type}:legacy_bytes", legacy_size)),
+        ]
+
     async def get_metadata(self, url: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve cached video metadata
@@ -87,48 +329,42 @@ class MetadataCache:
                 return None
 
             cache_key = self._generate_cache_key(self.metadata_prefix, url)
+            started = time.perf_counter()
+            outcome = "miss"
 
-            # Get from cache - handle both async and sync Redis clients
             try:
-                result = self.redis.get(cache_key)
-
-                # Handle async vs sync Redis clients
-                if asyncio.iscoroutine(result):
-                    result = await result
+                cached = await self._read_entry(cache_key, self.metadata_ttl)
+                if cached:
+                    outcome = "hit"
+                    logger.info(f"✅ Cache hit for metadata: {url}")
+                    return cached[0]
 
-                if result:
-                    cache_entry = json.loads(result)
-
-                    # Validate cache entry structure
-                    if "metadata" in cache_entry and "cached_at" in cache_entry:
-                        cached_time = datetime.fromisoformat(cache_entry["cached_at"])
-                        if datetime.utcnow() - cached_time < timedelta(
-                            seconds=self.metadata_ttl
-                        ):
-                            logger.info(f"✅ Cache hit for metadata: {url}")
-                            return cache_entry
-                        else:
-                            logger.info(f"⏰ Cache expired for metadata: {url}")
-                    else:
-                        logger.warning(f"⚠️ Invalid cache entry structure for: {url}")
-                else:
-                    logger.debug(f"Cache miss for metadata: {url}")
+                logger.debug(f"Cache miss for metadata: {url}")
 
+            except ValueError as decode_error:
+                outcome = "error"
+                logger.warning(f"⚠️ Invalid cache entry for {url}: {decode_error}")
             except Exception as redis_error:
+                outcome = "error"
                 logger.error(f"Redis get failed: {redis_error}")
+            finally:
+                self._track_cache_operation("metadata", "get", url, started, outcome)
 
         except Exception as e:
             logger.error(f"Failed to get metadata from cache: {str(e)}")
 
         return None
 
-    async def set_metadata(self, url: str, metadata: Dict[str, Any]) -> bool:
+    async def set_metadata(
+        self, url: str, metadata: Dict[str, Any], ttl: Optional[int] = None
+    ) -> bool:
         """
         Cache video metadata
 
         Args:
             url: Video URL
             metadata: Metadata dictionary to cache
+            ttl: Override of the default metadata TTL in seconds
 
         Returns:
             True if successfully cached, False otherwise
@@ -140,32 +376,12 @@ class MetadataCache:
 
             cache_key = self._generate_cache_key(self.metadata_prefix, url)
 
-            # Add cache metadata
-            cache_entry = {
-                "url": url,
-                "metadata": metadata,
-                "cached_at": datetime.utcnow().isoformat(),
-                "cache_version": "1.0",
-            }
-
-            # Store with TTL - handle both async and sync Redis clients
             try:
-                result = self.redis.setex(
-                    cache_key, self.metadata_ttl, json.dumps(cache_entry, default=str)
+                success = await self._write_entry(
+                    "metadata", cache_key, url, metadata, ttl or self.metadata_ttl
                 )
-
-                # Handle async vs sync Redis clients
-                if asyncio.iscoroutine(result):
-                    result = await result
-
-                # Convert result to boolean (Redis setex returns True on success)
-                success = bool(result) if result is not None else False
                 if success:
                     logger.info(f"✅ Cached metadata for: {url}")
-                else:
-                    logger.warning(
-                        f"⚠️ Redis setex returned {result} for metadata cache"
-                    )
                 return success
             except Exception as redis_error:
                 logger.error(f"Redis setex failed: {redis_error}")
@@ -175,10 +391,76 @@ class MetadataCache:
             logger.error(f"Failed to cache metadata: {str(e)}")
             return False
 
+    def _signed_url_expiry(self, metadata: Dict[str, Any]) -> Optional[float]:
+        """
+        Find the earliest expiry among the signed format URLs of an entry
+
+        Args:
+            metadata: Detailed metadata with formats
+
+        Returns:
+            Earliest expiry as a unix timestamp, or None if no URL is signed
+        """
+        expiries = []
+        for fmt in metadata.get("formats") or []:
+            fmt_url = fmt.get("url") if isinstance(fmt, dict) else None
+            if not fmt_url:
+                continue
+            query = parse_qs(urlparse(fmt_url).query)
+            for param, base in SIGNED_URL_EXPIRY_PARAMS:
+                values = query.get(param)
+                if not values:
+                    continue
+                try:
+                    expiries.append(float(int(values[0], base)))
+                except ValueError:
+                    continue
+                break
+        return min(expiries) if expiries else None
+
+    def get_format_ttls(
+        self, url: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Tuple[int, int]:
+        """
+        Resolve soft and hard TTLs for a format metadata entry
+
+        The platform defaults are capped by the expiry of the signed format
+        URLs so we never serve links the CDN will already reject. That cap
+        wins over ``MIN_FORMAT_TTL``: URLs about to expire are cached only
+        until they do, and already expired ones not at all.
+
+        Args:
+            url: Video URL
+            metadata: Detailed metadata with formats (optional)
+
+        Returns:
+            Tuple of (soft_ttl, hard_ttl) in seconds; a hard TTL of 0 means
+            the entry must not be cached
+        """
+        platform = PlatformDetector.detect_platform(url).value
+        soft_ttl, hard_ttl = CacheConfig.PLATFORM_FORMAT_TTLS.get(
+            platform, (self.format_soft_ttl, self.format_ttl)
+        )
+
+        url_expiry = self._signed_url_expiry(metadata or {})
+        if url_expiry is not None:
+            remaining = url_expiry - time.time() - CacheConfig.SIGNED_URL_EXPIRY_MARGIN
+            if remaining < CacheConfig.MIN_FORMAT_TTL:
+                hard_ttl = max(int(remaining), 0)
+                return min(soft_ttl, hard_ttl // 2), hard_ttl
+            hard_ttl = min(hard_ttl, int(remaining))
+
+        hard_ttl = max(hard_ttl, CacheConfig.MIN_FORMAT_TTL)
+        soft_ttl = max(min(soft_ttl, hard_ttl // 2), CacheConfig.MIN_FORMAT_TTL // 2)
+        return soft_ttl, hard_ttl
+
     async def get_format_metadata(self, url: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve cached detailed format metadata
 
+        Entries past their soft TTL are still returned, flagged with
+        ``stale=True`` so the caller can refresh them in the background.
+
         Args:
             url: Video URL to look up
 
@@ -191,37 +473,36 @@ class MetadataCache:
                 return None
 
             cache_key = self._generate_cache_key(self.format_prefix, url)
+            started = time.perf_counter()
+            outcome = "miss"
 
-            # Get from cache - handle both async and sync Redis clients
             try:
-                result = self.redis.get(cache_key)
-
-                # Handle async vs sync Redis clients
-                if asyncio.iscoroutine(result):
-                    result = await result
-
-                if result:
-                    cache_entry = json.loads(result)
-
-                    # Validate cache entry structure
-                    if "metadata" in cache_entry and "cached_at" in cache_entry:
-                        cached_time = datetime.fromisoformat(cache_entry["cached_at"])
-                        if datetime.utcnow() - cached_time < timedelta(
-                            seconds=self.format_ttl
-                        ):
-                            logger.info(f"✅ Cache hit for format metadata: {url}")
-                            return cache_entry
-                        else:
-                            logger.info(f"⏰ Format cache expired for: {url}")
+                cached = await self._read_entry(cache_key, self.format_ttl)
+                if cached:
+                    cache_entry, soft_expires_at = cached
+                    cache_entry["stale"] = (
+                        soft_expires_at is not None and time.time() >= soft_expires_at
+                    )
+                    if cache_entry["stale"]:
+                        outcome = "stale"
+                        logger.info(f"🕰️ Stale cache hit for format metadata: {url}")
                     else:
-                        logger.warning(
-                            f"⚠️ Invalid format cache entry structure for: {url}"
-                        )
-                else:
-                    logger.debug(f"Format cache miss for: {url}")
+                        outcome = "hit"
+                        logger.info(f"✅ Cache hit for format metadata: {url}")
+                    return cache_entry
 
+                logger.debug(f"Format cache miss for: {url}")
+
+            except ValueError as decode_error:
+                outcome = "error"
+                logger.warning(
+                    f"⚠️ Invalid format cache entry for {url}: {decode_error}"
+                )
             except Exception as redis_error:
+                outcome = "error"
                 logger.error(f"Redis get failed: {redis_error}")
+            finally:
+                self._track_cache_operation("format", "get", url, started, outcome)
 
         except Exception as e:
             logger.error(f"Failed to get format metadata from cache: {str(e)}")
@@ -245,32 +526,23 @@ class MetadataCache:
                 return False
 
             cache_key = self._generate_cache_key(self.format_prefix, url)
+            soft_ttl, hard_ttl = self.get_format_ttls(url, metadata)
+            if hard_ttl <= 0:
+                logger.info(f"⏭️ Not caching format metadata with expired URLs: {url}")
+                return False
 
-            # Add cache metadata
-            cache_entry = {
-                "url": url,
-                "metadata": metadata,
-                "cached_at": datetime.utcnow().isoformat(),
-                "cache_version": "1.0",
-            }
-
-            # Store with TTL - handle both async and sync Redis clients
             try:
-                result = self.redis.setex(
-                    cache_key, self.format_ttl, json.dumps(cache_entry, default=str)
+                success = await self._write_entry(
+                    "format",
+                    cache_key,
+                    url,
+                    metadata,
+                    hard_ttl,
+                    soft_expires_at=time.time() + soft_ttl,
                 )
-
-                # Handle async vs sync Redis clients
-                if asyncio.iscoroutine(result):
-                    result = await result
-
-                # Convert result to boolean (Redis setex returns True on success)
-                success = bool(result) if result is not None else False
                 if success:
-                    logger.info(f"✅ Cached format metadata for: {url}")
-                else:
-                    logger.warning(
-                        f"⚠️ Redis setex returned {result} for format metadata cache"
+                    logger.info(
+                        f"✅ Cached format metadata for: {url} (soft={soft_ttl}s, hard={hard_ttl}s)"
                     )
                 return success
             except Exception as redis_error:
@@ -281,6 +553,118 @@ class MetadataCache:
             logger.error(f"Failed to cache format metadata: {str(e)}")
             return False
 
+    async def get_negative_result(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached permanent extraction failure
+
+        Args:
+            url: Video URL to look up
+
+        Returns:
+            Dict with failure_class, status_code and detail, or None
+        """
+        if self.redis is None:
+            return None
+
+        cache_key = self._generate_cache_key(self.negative_prefix, url)
+        started = time.perf_counter()
+        outcome = "miss"
+        try:
+            cached = await self._read_entry(
+                cache_key, max(CacheConfig.NEGATIVE_TTLS.values())
+            )
+            if cached:
+                outcome = "hit"
+                logger.info(f"🚫 Negative cache hit for: {url}")
+                return cached[0]["metadata"]
+            return None
+        except Exception as e:
+            outcome = "error"
+            logger.error(f"Failed to get negative cache entry: {str(e)}")
+            return None
+        finally:
+            self._track_cache_operation("negative", "get", url, started, outcome)
+
+    async def set_negative_result(
+        self, url: str, failure_class: str, status_code: int, detail: str
+    ) -> bool:
+        """
+        Remember a permanent extraction failure so it is replayed instantly
+
+        Args:
+            url: Video URL that failed
+            failure_class: Classified failure (private, removed, geo_blocked)
+            status_code: HTTP status returned to the client
+            detail: HTTP error detail returned to the client
+
+        Returns:
+            True if successfully cached, False otherwise
+        """
+        ttl = CacheConfig.NEGATIVE_TTLS.get(failure_class)
+        if self.redis is None or not ttl:
+            return False
+
+        cache_key = self._generate_cache_key(self.negative_prefix, url)
+        try:
+            success = await self._write_entry(
+                "negative",
+                cache_key,
+                url,
+                {
+                    "failure_class": failure_class,
+                    "status_code": status_code,
+                    "detail": detail,
+                },
+                ttl,
+            )
+            if success:
+                logger.info(
+                    f"🚫 Negative-cached {failure_class} failure for {ttl}s: {url}"
+                )
+            return success
+        except Exception as e:
+            logger.error(f"Failed to set negative cache entry: {str(e)}")
+            return False
+
+    async def acquire_refresh_lock(self, url: str) -> bool:
+        """
+        Claim the background refresh of a stale format entry
+
+        Args:
+            url: Video URL being refreshed
+
+        Returns:
+            True if this caller should run the refresh, False if another
+            process already is
+        """
+        if self.redis is None:
+            return False
+
+        lock_key = self._generate_cache_key(self.refresh_lock_prefix, url)
+        try:
+            result = self.redis.set(
+                lock_key, "1", nx=True, ex=CacheConfig.FORMAT_REFRESH_LOCK_TTL
+            )
+            if asyncio.iscoroutine(result):
+                result = await result
+            return bool(result)
+        except Exception as e:
+            logger.debug(f"Failed to acquire refresh lock: {str(e)}")
+            return False
+
+    async def release_refresh_lock(self, url: str) -> None:
+        """Release the background refresh claim for a URL"""
+        if self.redis is None:
+            return
+
+        lock_key = self._generate_cache_key(self.refresh_lock_prefix, url)
+        try:
+            result = self.redis.delete(lock_key)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.debug(f"Failed to release refresh lock: {str(e)}")
+
     async def get_format_info(
         self, url: str, quality: str = "best"
     ) -> Optional[Dict[str, Any]]:
@@ -299,19 +683,23 @@ class MetadataCache:
                 self.format_prefix, url, quality=quality
             )
 
+            started = time.perf_counter()
             cached_data = await self.redis.get(cache_key)
 
             if cached_data:
                 format_info = json.loads(cached_data)
                 logger.debug(f"Cache hit for format info: {url} (quality: {quality})")
+                self._track_cache_operation("format", "get", url, started, "hit")
 
                 return format_info
 
             logger.debug(f"Cache miss for format info: {url} (quality: {quality})")
+            self._track_cache_operation("format", "get", url, started, "miss")
             return None
 
         except Exception as e:
             logger.error(f"Failed to get format info from cache: {str(e)}")
+            self._track_cache_operation("format", "get", url, None, "error")
             return None
 
     async def set_format_info(
@@ -341,9 +729,14 @@ class MetadataCache:
                 "cache_version": "1.0",
             }
 
-            success = await self.redis.setex(
-                cache_key, self.format_ttl, json.dumps(cache_entry, default=str)
+            results = await self._execute(
+                (
+                    "setex",
+                    (cache_key, self.format_ttl, json.dumps(cache_entry, default=str)),
+                ),
+                *self._index_commands("format", url, cache_key, self.format_ttl),
             )
+            success = results[0]
 
             if success:
                 logger.debug(f"Cached format info for: {url} (quality: {quality})")
@@ -366,20 +759,24 @@ class MetadataCache:
         """
         try:
             cache_key = self._generate_cache_key(self.thumbnail_prefix, url)
+            started = time.perf_counter()
             thumbnail_url = await self.redis.get(cache_key)
 
             if thumbnail_url:
                 logger.debug(f"Cache hit for thumbnail: {url}")
+                self._track_cache_operation("thumbnail", "get", url, started, "hit")
                 return (
                     thumbnail_url.decode("utf-8")
                     if isinstance(thumbnail_url, bytes)
                     else thumbnail_url
                 )
 
+            self._track_cache_operation("thumbnail", "get", url, started, "miss")
             return None
 
         except Exception as e:
             logger.error(f"Failed to get thumbnail from cache: {str(e)}")
+            self._track_cache_operation("thumbnail", "get", url, None, "error")
             return None
 
     async def set_thumbnail_url(self, url: str, thumbnail_url: str) -> bool:
@@ -396,9 +793,11 @@ class MetadataCache:
         try:
             cache_key = self._generate_cache_key(self.thumbnail_prefix, url)
 
-            success = await self.redis.setex(
-                cache_key, self.thumbnail_ttl, thumbnail_url
+            results = await self._execute(
+                ("setex", (cache_key, self.thumbnail_ttl, thumbnail_url)),
+                *self._index_commands("thumbnail", url, cache_key, self.thumbnail_ttl),
             )
+            success = results[0]
 
             if success:
                 logger.debug(f"Cached thumbnail for: {url}")
@@ -421,21 +820,33 @@ class MetadataCache:
         """
         try:
             url_hash = self._generate_url_hash(url)
+            url_index_key = f"{self.url_index_prefix}{url_hash}"
 
-            # Find all keys related to this URL
-            patterns = [
-                f"{self.metadata_prefix}{url_hash}*",
-                f"{self.format_prefix}{url_hash}*",
-                f"{self.thumbnail_prefix}{url_hash}*",
-            ]
-
-            deleted_count = 0
+            members = self.redis.smembers(url_index_key)
+            if asyncio.iscoroutine(members):
+                members = await members
 
-            for pattern in patterns:
-                keys = await self.redis.keys(pattern)
-                if keys:
-                    deleted = await self.redis.delete(*keys)
-                    deleted_count += deleted
+            # Indexed keys plus the deterministic keys of entries written
+            # before the index existed
+            keys = {
+                key.decode("utf-8") if isinstance(key, bytes) else key
+                for key in members or ()
+            }
+            keys.update(
+                self._generate_cache_key(prefix, url)
+                for prefix in self.cache_type_prefixes.values()
+            )
+            keys = sorted(keys)
+
+            results = await self._execute(
+                ("delete", tuple(keys)),
+                ("delete", (url_index_key,)),
+                *(
+                    ("zrem", (f"{self.type_index_prefix}{cache_type}", *keys))
+                    for cache_type in self.cache_type_prefixes
+                ),
+            )
+            deleted_count = int(results[0] or 0)
 
             if deleted_count > 0:
                 logger.info(f"Invalidated {deleted_count} cache entries for: {url}")
@@ -446,6 +857,83 @@ class MetadataCache:
             logger.error(f"Failed to invalidate cache for URL: {str(e)}")
             return 0
 
+    async def clear_cache(
+        self, cache_types: Optional[List[str]] = None, batch_size: int = 500
+    ) -> Dict[str, int]:
+        """
+        Delete every entry of the given cache types in non-blocking batches
+
+        Indexed keys are walked with ZSCAN; a SCAN pass over the type prefix
+        then catches entries written before the index existed.
+
+        Args:
+            cache_types: Types to clear (metadata, format, thumbnail); all if None
+            batch_size: Keys per SCAN batch / UNLINK call
+
+        Returns:
+            Number of deleted entries per cache type
+        """
+        cache_types = cache_types or list(self.cache_type_prefixes)
+        cleared = {}
+
+        for cache_type in cache_types:
+            prefix = self.cache_type_prefixes[cache_type]
+            type_index_key = f"{self.type_index_prefix}{cache_type}"
+            deleted = 0
+
+            async for batch in self._scan("zscan", type_index_key, count=batch_size):
+                keys = [member for member, _score in batch]
+                result = self.redis.unlink(*keys)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                deleted += int(result or 0)
+
+            async for keys in self._scan("scan", match=f"{prefix}*", count=batch_size):
+                result = self.redis.unlink(*keys)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                deleted += int(result or 0)
+
+            result = self.redis.delete(type_index_key)
+            if asyncio.iscoroutine(result):
+                await result
+
+            cleared[cache_type] = deleted
+            logger.info(f"🧹 Cleared {deleted} {cache_type} cache entries")
+
+        if set(cache_types) == set(self.cache_type_prefixes):
+            # Nothing is left for the per-URL sets to point at
+            async for keys in self._scan(
+                "scan", match=f"{self.url_index_prefix}*", count=batch_size
+            ):
+                result = self.redis.unlink(*keys)
+                if asyncio.iscoroutine(result):
+                    await result
+
+        return cleared
+
+    async def _prune_type_indexes(self) -> Dict[str, int]:
+        """
+        Drop expired keys from the type indexes
+
+        Returns:
+            Number of pruned index entries per cache type
+        """
+        now = time.time()
+        results = await self._execute(
+            *(
+                (
+                    "zremrangebyscore",
+                    (f"{self.type_index_prefix}{cache_type}", "-inf", now),
+                )
+                for cache_type in self.cache_type_prefixes
+            )
+        )
+        return {
+            cache_type: int(removed or 0)
+            for cache_type, removed in zip(self.cache_type_prefixes, results)
+        }
+
     async def get_cache_stats(self) -> Dict[str, Any]:
         """
         Get cache usage statistics
@@ -456,14 +944,19 @@ class MetadataCache:
         try:
             stats = {}
 
-            # Count keys by type
-            for cache_type, prefix in [
-                ("metadata", self.metadata_prefix),
-                ("format", self.format_prefix),
-                ("thumbnail", self.thumbnail_prefix),
-            ]:
-                keys = await self.redis.keys(f"{prefix}*")
-                stats[f"{cache_type}_count"] = len(keys)
+            # Count live keys by type from the expiry-scored indexes
+            await self._prune_type_indexes()
+            counts = await self._execute(
+                *(
+                    ("zcard", (f"{self.type_index_prefix}{cache_type}",))
+                    for cache_type in self.cache_type_prefixes
+                )
+            )
+            for cache_type, count in zip(self.cache_type_prefixes, counts):
+                stats[f"{cache_type}_count"] = int(count or 0)
+
+            stats["encoding"] = await self._get_encoding_stats()
+            stats["operations"] = self._get_cache_metrics()
 
             return stats
 
@@ -471,27 +964,55 @@ class MetadataCache:
             logger.error(f"Failed to get cache stats: {str(e)}")
             return {}
 
+    async def _get_encoding_stats(self) -> Dict[str, Dict[str, float]]:
+        """Average Redis bytes per entry, legacy JSON vs compact encoding"""
+        try:
+            raw = self.redis.hgetall(self.encoding_stats_key)
+            if asyncio.iscoroutine(raw):
+                raw = await raw
+        except Exception as e:
+            logger.debug(f"Failed to get encoding stats: {str(e)}")
+            return {}
+
+        counters = {
+            (k.decode("utf-8") if isinstance(k, bytes) else k): int(v)
+            for k, v in (raw or {}).items()
+        }
+
+        encoding = {}
+        for cache_type in ("metadata", "format"):
+            entries = counters.get(f"{cache_type}:entries", 0)
+            if not entries:
+                continue
+            encoded = counters.get(f"{cache_type}:encoded_bytes", 0) / entries
+            legacy = counters.get(f"{cache_type}:legacy_bytes", 0) / entries
+            encoding[cache_type] = {
+                "entries_written": entries,
+                "legacy_bytes_per_entry": round(legacy, 1),
+                "encoded_bytes_per_entry": round(encoded, 1),
+                "compression_ratio": round(legacy / encoded, 2) if encoded else 0.0,
+            }
+        return encoding
+
     async def cleanup_expired_cache(self) -> Dict[str, int]:
         """
         Clean up expired cache entries (Redis handles TTL automatically)
-        This method can be used for manual cleanup if needed
+        Prunes expired keys from the type indexes so counts stay accurate
 
         Returns:
             Dictionary with cleanup statistics
         """
         try:
-            # Redis automatically handles TTL expiration
-            # This method can be used for additional cleanup logic
-
+            pruned = await self._prune_type_indexes()
             stats = await self.get_cache_stats()
 
             logger.info(f"Cache cleanup completed. Current stats: {stats}")
 
             return {
-                "expired_entries_removed": 0,  # Redis handles this automatically
+                "expired_entries_removed": sum(pruned.values()),
                 "current_cache_size": sum(
                     stats.get(f"{cache_type}_count", 0)
-                    for cache_type in ["metadata", "format", "thumbnail"]
+                    for cache_type in self.cache_type_prefixes
                 ),
             }
 
@@ -499,48 +1020,61 @@ class MetadataCache:
             logger.error(f"Cache cleanup failed: {str(e)}")
             return {"expired_entries_removed": 0, "current_cache_size": 0}
 
-    async def _update_access_time(self, cache_key: str) -> None:
-        """Update access time for LRU tracking"""
-        try:
-            access_key = f"access:{cache_key}"
-            await self.redis.setex(access_key, 86400, datetime.utcnow().isoformat())
-        except Exception as e:
-            logger.debug(f"Failed to update access time: {str(e)}")
-
-    async def _track_cache_operation(
-        self, operation_type: str, operation: str, count: int = 1
+    def _track_cache_operation(
+        self,
+        cache_type: str,
+        operation: str,
+        url: str,
+        started: Optional[float] = None,
+        result: Optional[str] = None,
     ) -> None:
-        """Track cache operations for metrics"""
+        """
+        Record a cache operation in the Prometheus metrics
+
+        Args:
+            cache_type: metadata, format or thumbnail
+            operation: get or set
+            url: Video URL (used for the platform label)
+            started: perf_counter() value when the operation began
+            result: Lookup result (hit, stale, miss, error) for gets
+        """
         try:
-            metrics_key = f"cache_metrics:{operation_type}:{operation}"
-            await self.redis.incrby(metrics_key, count)
-            await self.redis.expire(metrics_key, 86400)  # Expire metrics after 24 hours
+            platform = PlatformDetector.detect_platform(url).value
+            if started is not None:
+                metadata_cache_operation_seconds.labels(
+                    cache_type, platform, operation
+                ).observe(time.perf_counter() - started)
+            if result is not None:
+                metadata_cache_requests_total.labels(cache_type, platform, result).inc()
         except Exception as e:
             logger.debug(f"Failed to track cache operation: {str(e)}")
 
-    async def _get_cache_metrics(self) -> Dict[str, int]:
-        """Get cache operation metrics"""
-        try:
-            metrics = {}
-
-            # Get all metric keys
-            metric_keys = await self.redis.keys("cache_metrics:*")
-
-            for key in metric_keys:
-                if isinstance(key, bytes):
-                    key = key.decode("utf-8")
-
-                value = await self.redis.get(key)
-                if value:
-                    # Extract metric name from key
-                    metric_name = key.replace("cache_metrics:", "").replace(":", "_")
-                    metrics[metric_name] = int(value)
+    def _get_cache_metrics(self) -> Dict[str, Any]:
+        """
+        Get lookup counts and hit ratios recorded by this process
 
-            return metrics
+        Returns:
+            Counts per ``<cache_type>_<result>`` plus a hit ratio per cache type
+        """
+        metrics: Dict[str, Any] = {}
+        for metric in metadata_cache_requests_total.collect():
+            for sample in metric.samples:
+                if not sample.name.endswith("_total"):
+                    continue
+                key = f"{sample.labels['cache_type']}_{sample.labels['result']}"
+                metrics[key] = metrics.get(key, 0) + int(sample.value)
+
+        for cache_type in self.cache_type_prefixes:
+            served = metrics.get(f"{cache_type}_hit", 0) + metrics.get(
+                f"{cache_type}_stale", 0
+            )
+            total = served + sum(
+                metrics.get(f"{cache_type}_{result}", 0) for result in ("miss", "error")
+            )
+            if total:
+                metrics[f"{cache_type}_hit_ratio"] = round(served / total, 4)
 
-        except Exception as e:
-            logger.debug(f"Failed to get cache metrics: {str(e)}")
-            return {}
+        return metrics
 
 
 # Cache decorator for functions
@@ -548,14 +1082,24 @@ def cache_metadata(ttl: int = 3600):
     """
     Decorator to cache function results in Redis
 
+    The wrapped coroutine must take ``(cache, url, ...)`` and return a
+    JSON-serialisable metadata dict; results are stored as metadata entries.
+
     Args:
         ttl: Time to live in seconds
     """
 
     def decorator(func):
-        async def wrapper(*args, **kwargs):
-            # This would need to be implemented based on specific caching needs
-            return await func(*args, **kwargs)
+        @functools.wraps(func)
+        async def wrapper(cache: MetadataCache, url: str, *args, **kwargs):
+            cached = await cache.get_metadata(url)
+            if cached:
+                return cached.get("metadata")
+
+            result = await func(cache, url, *args, **kwargs)
+            if result is not None:
+                await cache.set_metadata(url, result, ttl=ttl)
+            return result
 
         return wrapper
 
@@ -0,0 +1,536 @@
+"""
+Sparse on-disk cache of byte ranges of proxied CDN media.
+
+The preview player seeks around Instagram/Facebook CDN videos through the
+video proxy, and every seek is a new Range request. This cache keeps the
+bytes already fetched for a video in a sparse file, so ranges seen before
+are read from local disk and only the gaps between cached ranges go to the
+CDN.
+
+- Entries are keyed by the CDN URL without its signature/expiry query
+  parameters and edge host, so the same video fetched through a freshly
+  signed URL (or from another edge) hits the same entry.
+- Each entry is a data file written at the fetched offsets, plus a JSON
+  index of the byte ranges it holds (kept sorted and merged) and the total
+  size of the video. An upstream size mismatch replaces the entry.
+- The total of cached bytes is kept under a budget by evicting whole
+  entries, least recently used first.
+
+Every API process shares the directory, so the files are the only state:
+entries are read from their index on every lookup, recency is the index
+file's mtime (touched on each hit) and the budget is checked against the
+bytes the data files hold on disk. The index records the inode of the data
+file its ranges were written to, and reads check it against the file they
+opened, so an entry another process evicted or recreated is never served
+from a file that no longer holds its bytes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from ..config.configuration import get_settings
+from ..constants import ProxyConfig
+from ..metrics import video_proxy_bytes_total
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that sign a CDN URL or pin it to a session/edge rather
+# than identify the media (fbcdn/cdninstagram also use any ``_nc_*`` param)
+SIGNATURE_PARAMS = frozenset(
+    {"oh", "oe", "efg", "ccb", "edm", "expires", "x-expires", "signature", "sig"}
+)
+# CDNs whose edge hosts serve the same object under the same path
+CDN_DOMAINS = ("cdninstagram.com", "fbcdn.net", "fbsbx.com")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+# Fetches bytes [start, end) of the media from upstream
+Fetcher = Callable[[int, int], AsyncIterator[bytes]]
+
+
+def normalize_cdn_url(url: str) -> str:
+    """
+    Cache key of a CDN URL: host and path plus the identifying query params
+
+    Args:
+        url: Signed CDN URL
+
+    Returns:
+        The URL without signature/expiry parameters, with CDN edge hosts
+        folded into their domain and the remaining parameters sorted
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    for domain in CDN_DOMAINS:
+        if host == domain or host.endswith("." + domain):
+            host = domain
+            break
+
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if name.lower() not in SIGNATURE_PARAMS and not name.startswith("_nc_")
+    )
+    key = f"{host}{parsed.path}"
+    return f"{key}?{urlencode(query)}" if query else key
+
+
+def parse_byte_range(header: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a single-range ``Range`` header
+
+    Returns:
+        (first byte, last byte) with None for an open end, or None for
+        headers the cache does not serve (multiple ranges, other units)
+    """
+    match = _RANGE_RE.match(header.strip().replace(" ", ""))
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first = int(match.group(1)) if match.group(1) else None
+    last = int(match.group(2)) if match.group(2) else None
+    if first is not None and last is not None and last < first:
+        return None
+    return first, last
+
+
+def resolve_byte_range(
+    byte_range: Tuple[Optional[int], Optional[int]], size: int
+) -> Optional[Tuple[int, int]]:
+    """
+    Resolve a parsed range against the media size
+
+    Returns:
+        Half-open [start, end) byte interval, or None if unsatisfiable
+    """
+    first, last = byte_range
+    if first is None:
+        # Suffix range: the last N bytes
+        start, end = max(size - last, 0), size
+    else:
+        start, end = first, size if last is None else min(last + 1, size)
+    if start >= end:
+        return None
+    return start, end
+
+
+def parse_content_range(header: str) -> Optional[Tuple[int, int, int]]:
+    """Parse ``bytes first-last/size`` into ([start, end), size)"""
+    match = _CONTENT_RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last, size = (int(group) for group in match.groups())
+    return first, last + 1, size
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sort [start, end) ranges and merge overlapping or adjacent ones"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+@dataclass
+class CachedMedia:
+    """Byte ranges of one media file held on disk"""
+
+    key: str
+    size: int
+    content_type: str
+    ranges: List[Tuple[int, int]] = field(default_factory=list)
+    inode: Optional[int] = None  # Data file the ranges were written to
+
+    @property
+    def stored_bytes(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+
+    def add_range(self, start: int, end: int) -> None:
+        self.ranges = merge_ranges(self.ranges + [(start, end)])
+
+    def covers(self, start: int, end: int) -> bool:
+        return any(
+            cached_start <= start and end <= cached_end
+            for cached_start, cached_end in self.ranges
+        )
+
+    def plan(self, start: int, end: int) -> List[Tuple[int, int, bool]]:
+        """
+        Split [start, end) into cached segments and gaps to fetch
+
+        Cached islands smaller than ``ProxyConfig.RANGE_CACHE_MIN_SEGMENT``
+        are fetched along with the gaps around them, so a fragmented entry
+        does not turn into many tiny upstream requests.
+
+        Returns:
+            (start, end, cached) segments covering the interval in order
+        """
+        segments: List[Tuple[int, int, bool]] = []
+
+        def add(seg_start: int, seg_end: int, cached: bool) -> None:
+            if cached and seg_end - seg_start < ProxyConfig.RANGE_CACHE_MIN_SEGMENT:
+                cached = False
+            if segments and segments[-1][2] == cached:
+                segments[-1] = (segments[-1][0], seg_end, cached)
+            else:
+                segments.append((seg_start, seg_end, cached))
+
+        position = start
+        for cached_start, cached_end in self.ranges:
+            if cached_end <= position:
+                continue
+            if cached_start >= end:
+                break
+            if cached_start > position:
+                add(position, cached_start, False)
+            position = min(cached_end, end)
+            add(max(cached_start, start), position, True)
+        if position < end:
+            add(position, end, False)
+        return segments
+
+    def to_dict(self) -> Dict:
+        return {
+            "key": self.key,
+            "size": self.size,
+            "content_type": self.content_type,
+            "ranges": self.ranges,
+            "inode": self.inode,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CachedMedia":
+        return cls(
+            key=data["key"],
+            size=int(data["size"]),
+            content_type=data["content_type"],
+            ranges=[tuple(r) for r in data["ranges"]],
+            inode=data.get("inode"),
+        )
+
+
+class RangeCache:
+    """Size-bounded, LRU-evicted cache of media byte ranges on disk"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        """
+        Initialize range cache
+
+        Args:
+            directory: Directory for data and index files (created if missing)
+            max_bytes: Budget for the bytes held by all entries
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._writers: Dict[str, int] = {}  # Entries this process writes to
+        self._prepared = False
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def _data_path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.data"
+
+    def _index_path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.json"
+
+    def _prepare(self) -> None:
+        if not self._prepared:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._prepared = True
+
+    def _read_index(self, digest: str) -> Optional[CachedMedia]:
+        path = self._index_path(digest)
+        try:
+            return CachedMedia.from_dict(json.loads(path.read_text()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠️ Dropping unreadable range cache index {path}: {e}")
+            self._remove_files(digest)
+            return None
+
+    def _save(self, digest: str, entry: CachedMedia) -> None:
+        """Write an entry's index atomically"""
+        path = self._index_path(digest)
+        partial = path.with_suffix(".json.partial")
+        try:
+            partial.write_text(json.dumps(entry.to_dict()))
+            os.replace(partial, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to save range cache index: {e}")
+
+    def _remove_files(self, digest: str) -> None:
+        # Index first, so no index outlives its data file
+        for path in (self._index_path(digest), self._data_path(digest)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ Failed to remove range cache file {path}: {e}")
+
+    def _usage(self) -> List[Tuple[float, str, int]]:
+        """(last used, digest, bytes on disk) of every entry in the directory"""
+        usage = []
+        with os.scandir(self.directory) as items:
+            for item in items:
+                if not item.name.endswith(".data"):
+                    continue
+                digest = item.name[: -len(".data")]
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                # Sparse files only hold the blocks that were written
+                size = getattr(stat, "st_blocks", 0) * 512 or stat.st_size
+                try:
+                    used = max(stat.st_mtime, self._index_path(digest).stat().st_mtime)
+                except FileNotFoundError:
+                    used = stat.st_mtime
+                usage.append((used, digest, size))
+        return usage
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the directory fits the budget"""
+        usage = self._usage()
+        total = sum(size for _, _, size in usage)
+        for _, digest, size in sorted(usage):
+            if total <= self.max_bytes:
+                break
+            if self._writers.get(digest):
+                continue
+            total -= size
+            self._remove_files(digest)
+            logger.info(f"📼 Evicted range cache entry {digest}")
+
+    @property
+    def stored_bytes(self) -> int:
+        self._prepare()
+        return sum(size for _, _, size in self._usage())
+
+    def _get(self, url: str) -> Optional[CachedMedia]:
+        self._prepare()
+        digest = self._digest(normalize_cdn_url(url))
+        entry = self._read_index(digest)
+        if entry is not None:
+            try:
+                os.utime(self._index_path(digest))  # Mark recently used
+            except OSError:
+                pass
+        return entry
+
+    async def get(self, url: str) -> Optional[CachedMedia]:
+        """
+        Get the cached entry of a media URL, marking it recently used
+
+        Returns:
+            The entry, or None if nothing of the media is cached
+        """
+        return await asyncio.to_thread(self._get, url)
+
+    async def open(self, url: str, size: int, content_type: str) -> CachedMedia:
+        """
+        Get or create the entry of a media URL of a known size
+
+        An existing entry whose size differs is stale (the URL now serves
+        another file) and is replaced.
+        """
+        entry = await self.get(url)
+        if entry is not None and entry.size == size:
+            return entry
+
+        if entry is not None:
+            logger.info(f"📼 Size of {entry.key} changed, replacing cached ranges")
+            await asyncio.to_thread(self._remove_files, self._digest(entry.key))
+        return CachedMedia(
+            key=normalize_cdn_url(url), size=size, content_type=content_type
+        )
+
+    def _open_verified(self, entry: CachedMedia, start: int, end: int) -> int:
+        """Open an entry's data file, checking it still holds [start, end)"""
+        digest = self._digest(entry.key)
+        fd = os.open(self._data_path(digest), os.O_RDONLY)
+        try:
+            # Read after opening: an index naming the inode we hold describes
+            # this very file, whatever other processes do to the path
+            on_disk = self._read_index(digest)
+            if (
+                on_disk is None
+                or on_disk.inode != os.fstat(fd).st_ino
+                or not on_disk.covers(start, end)
+            ):
+                raise OSError(f"Range cache entry {digest} changed on disk")
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    async def read(
+        self, entry: CachedMedia, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Read cached bytes [start, end) of an entry in chunks
+
+        Raises:
+            OSError: If the data file is missing, was replaced or is shorter
+                than its index says
+        """
+        fd = await asyncio.to_thread(self._open_verified, entry, start, end)
+        try:
+            position = start
+            while position < end:
+                size = min(ProxyConfig.MAX_CHUNK_SIZE, end - position)
+                chunk = await asyncio.to_thread(os.pread, fd, size, position)
+                if not chunk:
+                    raise OSError(f"Range cache data ends at {position}")
+                position += len(chunk)
+                video_proxy_bytes_total.labels("cache").inc(len(chunk))
+                yield chunk
+        finally:
+            os.close(fd)
+
+    def _open_for_write(self, entry: CachedMedia) -> int:
+        self._prepare()
+        fd = os.open(
+            self._data_path(self._digest(entry.key)), os.O_WRONLY | os.O_CREAT, 0o644
+        )
+        inode = os.fstat(fd).st_ino
+        if entry.inode != inode:
+            # The ranges we knew of are in a file that is gone
+            entry.ranges = []
+            entry.inode = inode
+        return fd
+
+    def _finish_write(self, entry: CachedMedia, fd: Optional[int]) -> None:
+        """Record the ranges written through ``fd``, then enforce the budget"""
+        digest = self._digest(entry.key)
+        try:
+            if fd is not None and entry.ranges:
+                try:
+                    current = os.stat(self._data_path(digest)).st_ino
+                except FileNotFoundError:
+                    current = None
+                # Only index ranges of the file still at the path (it was not
+                # evicted or replaced while we wrote)
+                if current == entry.inode:
+                    on_disk = self._read_index(digest)
+                    if on_disk is not None and on_disk.inode == entry.inode:
+                        # Keep ranges other processes wrote meanwhile
+                        entry.ranges = merge_ranges(entry.ranges + on_disk.ranges)
+                    self._save(digest, entry)
+        finally:
+            if fd is not None:
+                os.close(fd)
+        self._evict()
+
+    async def write_through(
+        self, entry: CachedMedia, start: int, body: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        """
+        Relay an upstream body starting at ``start``, caching it on the way
+
+        Each chunk is written at its offset before it is yielded. The bytes
+        written are recorded in the entry's index when the body ends, fails
+        or the consumer stops (e.g. the client disconnected mid-video).
+        """
+        digest = self._digest(entry.key)
+        self._writers[digest] = self._writers.get(digest, 0) + 1
+        fd: Optional[int] = None
+        try:
+            fd = await asyncio.to_thread(self._open_for_write, entry)
+        except OSError as e:
+            logger.warning(f"⚠️ Range cache not writable, relaying uncached: {e}")
+
+        position = start
+        try:
+            async for chunk in body:
+                if fd is not None:
+                    try:
+                        await asyncio.to_thread(os.pwrite, fd, chunk, position)
+                    except OSError as e:
+                        logger.warning(f"⚠️ Range cache write failed: {e}")
+                        entry.add_range(start, position)
+                        await asyncio.to_thread(self._finish_write, entry, fd)
+                        fd = None
+                if fd is not None:
+                    position += len(chunk)
+                video_proxy_bytes_total.labels("upstream").inc(len(chunk))
+                yield chunk
+        finally:
+            try:
+                if fd is not None:
+                    entry.add_range(start, position)
+                    await asyncio.to_thread(self._finish_write, entry, fd)
+            finally:
+                self._writers[digest] -= 1
+
+    async def stream(
+        self, entry: CachedMedia, start: int, end: int, fetch: Fetcher
+    ) -> AsyncIterator[bytes]:
+        """
+        Serve bytes [start, end): cached segments from disk, gaps from upstream
+
+        Args:
+            entry: Entry of the media
+            start: First byte
+            end: Byte after the last
+            fetch: Fetches a byte interval from upstream (used for the gaps)
+        """
+        for seg_start, seg_end, cached in entry.plan(start, end):
+            if cached:
+                position = seg_start
+                try:
+                    async for chunk in self.read(entry, seg_start, seg_end):
+                        position += len(chunk)
+                        yield chunk
+                    continue
+                except OSError as e:
+                    # Evicted, replaced or damaged under us: start the entry
+                    # over and fetch the rest of the segment instead
+                    logger.warning(f"⚠️ Range cache read failed, refetching: {e}")
+                    entry.ranges = []
+                    entry.inode = None
+                    seg_start = position
+
+            async for chunk in self.write_through(
+                entry, seg_start, fetch(seg_start, seg_end)
+            ):
+                yield chunk
+
+
+_range_cache: Optional[RangeCache] = None
+
+
+def get_range_cache() -> Optional[RangeCache]:
+    """
+    Get the process-wide range cache
+
+    Returns:
+        The cache, or None if disabled (``RANGE_CACHE_MAX_MB=0``)
+    """
+    global _range_cache
+    settings = get_settings()
+    if settings.range_cache_max_mb <= 0:
+        return None
+    if _range_cache is None:
+        directory = settings.range_cache_dir or os.path.join(
+            tempfile.gettempdir(), "meme-maker-range-cache"
+        )
+        _range_cache = RangeCache(
+            Path(directory), settings.range_cache_max_mb * 1024 * 1024
+        )
+    return _range_cache
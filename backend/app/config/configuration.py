@@ -100,6 +100,10 @@ class Settings(BaseSettings):
     rate_limit_enabled: bool = Field(default=True, description="Enable rate limiting")
     rate_limit_times: int = Field(default=100, description="Rate limit times")
     rate_limit_seconds: int = Field(default=60, description="Rate limit seconds")
+    rate_limit_fail_open: bool = Field(
+        default=True,
+        description="Allow requests when the Redis rate limit state is unavailable",
+    )
 
     # Additional Redis settings
     redis_db: int = Field(default=0, description="Redis database number")
@@ -115,6 +119,24 @@ class Settings(BaseSettings):
         default="", description="Base64 encoded Instagram cookies"
     )
 
+    # yt-dlp politeness: JSON per-platform overrides of rate/burst/max_concurrent
+    politeness_limits: str = Field(
+        default="", description="Per-platform yt-dlp politeness limits (JSON)"
+    )
+
+    # Low-resolution previews rendered by the worker after metadata extraction
+    preview_enabled: bool = Field(
+        default=False, description="Render 240p previews and scrub sprites"
+    )
+
+    # Video proxy byte-range cache (0 MB disables it)
+    range_cache_dir: str = Field(
+        default="", description="Directory of the proxy range cache (temp dir if empty)"
+    )
+    range_cache_max_mb: int = Field(
+        default=1024, description="Disk budget of the proxy range cache in MB"
+    )
+
     # Pydantic settings configuration
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -37,9 +37,17 @@ class RedisKeys:
     QUEUE_DEFAULT = "rq:queue:default"
     METADATA_PREFIX = "metadata:"
     PROGRESS_PREFIX = "progress:"
+    WORKER_HEARTBEATS = "workers:heartbeat"  # ZSET of worker id -> last seen
+    CLIENT_WORK_PREFIX = "work:client:"  # ZSET of a client's job costs
+    CANCEL_SUFFIX = ":cancel"  # job:<id>:cancel, set while a job is cancelled
+    WATCHERS_SUFFIX = ":watchers"  # job:<id>:watchers, open cancelling streams
+    JOBS_BY_CREATED = "jobs:by_created"  # ZSET of job id -> creation time
+    JOBS_BY_STATUS_PREFIX = "jobs:status:"  # ZSET per status, job id -> update
+    CLIP_EXPIRY = "clips:expiry"  # ZSET of clip path -> expiry time
 
     # TTL values in seconds
     JOB_TTL = 3600  # 1 hour
+    JOB_INDEX_RETENTION = 86400  # Creation index entries kept for 24 hours
     METADATA_TTL = 7200  # 2 hours
     PROGRESS_TTL = 1800  # 30 minutes
 
@@ -115,6 +123,11 @@ class StorageConfig:
     # File organization
     DATE_FORMAT = "%Y/%m/%d"
     FILENAME_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+    DAY_DIRECTORY_FORMAT = "%Y-%m-%d"  # Clips are saved in one directory per day
+
+    # Clip expiry
+    CLIP_EXPIRY_BATCH_SIZE = 500  # Expired clips deleted per batch
+    CLIP_EXPIRY_BATCH_PAUSE = 0.05  # Seconds between batches, to spare the disk
 
 
 class RateLimits:
@@ -124,9 +137,11 @@ class RateLimits:
     REQUESTS_PER_MINUTE = 50  # Increased from 30 to 50 for job polling
     REQUESTS_PER_HOUR = 400  # Increased from 200 to 400
 
-    # 🚨 T-003 CRITICAL PROTECTION: Enhanced job limits
-    JOBS_PER_HOUR = 10  # Increased from 5 to 10 jobs/IP/hour
-    JOBS_PER_DAY = 30  # Increased from 20 to 30 daily limit per IP
+    # 🚨 T-003 CRITICAL PROTECTION: Job submissions are admitted by the
+    # worker-seconds quota (JobCostConfig.CLIENT_WORKER_SECONDS_PER_HOUR).
+    # This count is only a flood backstop: the quota admits at most about
+    # 225 of the cheapest (~4s) jobs an hour, so it never binds first.
+    JOBS_PER_HOUR = 300
     METADATA_REQUESTS_PER_MINUTE = 15  # Increased from 10 to 15
 
     # 🚨 T-003 QUEUE PROTECTION: Queue monitoring limits
@@ -137,7 +152,6 @@ class RateLimits:
     # 🚨 T-003 JOB COMPLEXITY: Resource-based limits
     MAX_CLIP_DURATION = 60  # Reduced from 180 seconds (1 minute max)
     MAX_VIDEO_SIZE_MB = 25  # NEW: Max video size limit
-    CONCURRENT_JOBS_PER_IP = 2  # NEW: Max 2 concurrent jobs per IP
 
     # 🚨 T-003 CIRCUIT BREAKER: Auto-protection thresholds
     ERROR_RATE_THRESHOLD = 0.1  # Circuit breaker at 10% error rate
@@ -158,6 +172,17 @@ class RateLimits:
         2  # Reduced from 15 to 2 minutes penalty for burst detection
     )
 
+    # Distributed (Redis) rate limiting
+    LOCAL_LEASE_TOKENS = 5  # Tokens a process takes from Redis at once
+    LOCAL_LEASE_CAPACITY_SHARE = 0.1  # Never lease more than this share of a limit
+    LOCAL_LEASE_SECONDS = 1.0  # Unused leased tokens go back to Redis after this
+    LEASE_RETENTION_SECONDS = 300  # Expired leases kept this long to be refunded
+    REDIS_RETRY_SECONDS = 5  # Skip Redis for this long after it failed
+
+    # In-memory per-client state
+    MAX_TRACKED_CLIENTS = 100_000  # Least recently seen clients evicted beyond
+    BUCKET_IDLE_TTL = 3600  # Unused token buckets dropped after an hour
+
 
 class MetricsConfig:
     """Metrics and monitoring constants"""
@@ -203,6 +228,90 @@ class APIConfig:
     DEFAULT_TIMEOUT = 30
     LONG_TIMEOUT = 300  # 5 minutes for processing
 
+    # Job progress event stream
+    JOB_EVENTS_INTERVAL = 0.5  # Seconds between job polls
+    JOB_EVENTS_KEEPALIVE = 15  # Seconds between keepalives while unchanged
+    JOB_EVENTS_RECONNECT_GRACE = 10  # Seconds a closed stream has to reconnect
+
+
+class ProxyConfig:
+    """Shared outbound HTTP client and video proxy streaming"""
+
+    # Keep-alive connection pool shared by every request of the process
+    MAX_CONNECTIONS = 100
+    MAX_KEEPALIVE_CONNECTIONS = 20
+    KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection is kept
+    CONNECT_TIMEOUT = 10.0
+    READ_TIMEOUT = 30.0
+    POOL_TIMEOUT = 10.0  # Max wait for a free connection
+
+    # Streamed chunks grow while the client keeps up and shrink when it lags
+    MIN_CHUNK_SIZE = 64 * 1024
+    MAX_CHUNK_SIZE = 1024 * 1024
+    FAST_SEND_SECONDS = 0.05
+
+    # Cached islands smaller than this are refetched with the gaps around them
+    RANGE_CACHE_MIN_SEGMENT = 64 * 1024
+
+
+class PreviewConfig:
+    """Low-resolution preview renditions and scrub sprites"""
+
+    TTL = 6 * 3600  # Previews (state and files) live for 6 hours
+    FAILED_TTL = 600  # A failed preview may be queued again after this
+    MAX_DURATION = 1800  # Longer videos get no preview
+    # Never the full-resolution source: the smallest format if none is <=480p
+    SOURCE_FORMAT = "b[height<=480]/bv*[height<=480]+ba/worst"
+    SOURCE_RESOLUTION = "854x480"  # What the source is costed at
+
+    # Proxy rendition: small, low bitrate, a keyframe every second
+    HEIGHT = 240
+    VIDEO_CRF = 32
+    VIDEO_MAXRATE = "300k"
+    VIDEO_BUFSIZE = "600k"
+    AUDIO_BITRATE = "48k"
+    KEYFRAME_INTERVAL = 1  # seconds
+    FFMPEG_TIMEOUT = 600  # seconds per ffmpeg run
+
+    # Sprite sheet of timeline thumbnails
+    THUMB_WIDTH = 160
+    THUMB_HEIGHT = 90
+    SPRITE_COLUMNS = 10
+    MAX_THUMBNAILS = 100
+    MIN_THUMB_INTERVAL = 1.0  # seconds
+
+
+class QueueHealthConfig:
+    """Background sampling of queue health for admission control"""
+
+    SAMPLE_INTERVAL = 0.5  # seconds between samples
+    MAX_SNAPSHOT_AGE = 5.0  # Older snapshots are not trusted (sampler stalled)
+    WORKER_TIMEOUT = 900  # Workers are counted until this long after last seen
+
+
+class JobCostConfig:
+    """Worker-time estimates of clip jobs, for admission control"""
+
+    JOB_OVERHEAD_SECONDS = 4.0  # yt-dlp start-up, probing and storing
+    DOWNLOAD_BYTES_PER_SECOND = 8 * 1024 * 1024
+    ENCODE_SECONDS_PER_MEGAPIXEL = 0.3  # Per clip second, libx264 "fast"
+    BYTES_PER_SECOND_PER_MEGAPIXEL = 300_000  # Source bitrate if size unknown
+    SEGMENT_PADDING_SECONDS = 12  # Segments fetched around an HLS/DASH clip
+    DEFAULT_RESOLUTION = (1280, 720)  # When the format is unknown
+    # Decoding these is slower than H.264
+    CODEC_DECODE_FACTORS = {
+        "vp9": 1.2,
+        "vp09": 1.2,
+        "hev1": 1.3,
+        "hvc1": 1.3,
+        "av01": 1.5,
+    }
+    UNKNOWN_JOB_SECONDS = 30.0  # Jobs queued without an estimate
+
+    # Admission: queued and running work per live worker, and per client
+    MAX_PENDING_SECONDS_PER_WORKER = 900
+    CLIENT_WORKER_SECONDS_PER_HOUR = 900
+
 
 class SecurityConfig:
     """Security-related constants"""
@@ -230,6 +339,18 @@ class WorkerConfig:
     HIGH_PRIORITY_QUEUE = "high"
     LOW_PRIORITY_QUEUE = "low"
 
+    # Scheduling lanes: jobs predicted to be cheap go to the high lane
+    LANE_PREFIX = "lane:"  # ZSET of job ids per lane
+    FAST_LANE_MAX_COST = 20.0  # Estimated worker-seconds
+    LANE_WEIGHTS = {HIGH_PRIORITY_QUEUE: 4, DEFAULT_QUEUE: 1}
+    SJF_COST_FACTOR = 1.0  # Seconds a job's cost delays it within its lane
+    LANE_MAX_WAIT = 300  # Lane heads overdue by this long are served first
+    POSITION_COST_SAMPLE = 50  # Jobs per lane whose cost a wait estimate reads
+
+    # Cancellation: how often running jobs check their cancel flag
+    CANCEL_CHECK_INTERVAL = 0.25  # seconds
+    CANCEL_KILL_GRACE = 0.5  # Seconds from SIGTERM to SIGKILL of ffmpeg
+
 
 class AsyncConfig:
     """AsyncIO configuration constants"""
@@ -256,7 +377,92 @@ class CacheConfig:
     FORMAT_TTL = 7200  # 2 hours for format detection
     THUMBNAIL_TTL = 86400  # 24 hours for thumbnails
 
+    # Stale-while-revalidate windows for format metadata (soft, hard) in seconds.
+    # Fresh until the soft TTL, served stale while a background refresh runs
+    # until the hard TTL, dropped after that.
+    FORMAT_SOFT_TTL = 1800  # 30 minutes
+    FORMAT_HARD_TTL = 7200  # 2 hours
+    PLATFORM_FORMAT_TTLS = {
+        # Instagram/Facebook CDN URLs carry short-lived `oe` signatures
+        "instagram": (600, 3600),
+        "facebook": (600, 3600),
+        "tiktok": (600, 3600),
+        # googlevideo URLs are signed for ~6 hours (`expire` param)
+        "youtube": (1800, 18000),
+    }
+    SIGNED_URL_EXPIRY_MARGIN = 300  # Stop serving 5 minutes before URLs expire
+    MIN_FORMAT_TTL = 60  # Never cache for less than a minute
+    FORMAT_REFRESH_LOCK_TTL = 120  # One background refresh per URL at a time
+
+    # Negative cache for permanent extraction failures, TTL per failure class
+    NEGATIVE_TTLS = {
+        "private": 300,  # Owners flip visibility; recheck after 5 minutes
+        "geo_blocked": 900,  # 15 minutes
+        "removed": 1800,  # 30 minutes
+    }
+
     # Cache key prefixes
     METADATA_PREFIX = "cache:metadata:"
     FORMAT_PREFIX = "cache:format:"
     THUMBNAIL_PREFIX = "cache:thumbnail:"
+
+
+class ExtractionConfig:
+    """yt-dlp extraction strategy, hedging, pooling, session and politeness constants"""
+
+    STRATEGY_HALF_LIFE = 6 * 3600  # Outcomes lose half their weight every 6 hours
+    STRATEGY_EXPLORATION_RATE = 0.1  # Share of rankings drawn by Thompson sampling
+    STRATEGY_PRIOR_LATENCY = 10.0  # Assumed seconds per attempt for unseen configs
+    STRATEGY_STATS_TTL = 7 * 86400  # Drop stats for ladders unused for a week
+    STRATEGY_RESCALE_HALF_LIVES = 32  # Renormalise forward-decay weights after this
+
+    # Hedged extraction: start the next config if the running one is slower
+    # than the recent p90 success latency, with a process-wide cap on hedges
+    HEDGE_QUANTILE = 0.9
+    HEDGE_MIN_SAMPLES = 20  # Use the default delay until this many successes
+    HEDGE_DEFAULT_DELAY = 8.0  # seconds
+    HEDGE_MIN_DELAY = 1.0  # seconds
+    HEDGE_MAX_DELAY = 30.0  # seconds
+    HEDGE_BUDGET = 4  # Hedged attempts allowed to run at once per process
+    LATENCY_SAMPLES = 200  # Recent success latencies kept per ladder/platform
+
+    # Asynchronous extraction (202 + ticket) mode
+    TICKET_TTL = 900  # Tickets and their results live for 15 minutes
+    ASYNC_MAX_CONCURRENT = 4  # Background extractions per API process
+    TICKET_POLL_INTERVAL = 1.0  # Seconds between event stream checks / Retry-After
+    TICKET_HEARTBEAT_INTERVAL = 15.0  # Keep-alive comments on idle event streams
+
+    # Pool of reusable YoutubeDL instances per options profile
+    POOL_MAX_IDLE_PER_PROFILE = 4
+    POOL_MAX_PROFILES = 32
+    POOL_MAX_USES = 50  # Recycle after this many checkouts
+    POOL_MAX_AGE = 600  # Recycle after 10 minutes
+
+    # Cookie session rotation (cookies/sessions/<platform>/*.txt)
+    SESSION_RATE_BUDGET = 20  # Extractions per session per window
+    SESSION_RATE_WINDOW = 60  # seconds
+    SESSION_RATE_LIMIT_COOLDOWN = 300  # First cool-down after a rate limit
+    SESSION_LOGIN_COOLDOWN = 1800  # First cool-down after a login challenge
+    SESSION_MAX_COOLDOWN = 6 * 3600  # Cool-downs double per strike up to this
+    SESSION_MIN_WEIGHT = 0.05  # Selection weight floor so no session starves
+
+    # Deployment-wide politeness per platform (override with POLITENESS_LIMITS)
+    POLITENESS_LIMITS = {
+        "youtube": {"rate": 2.0, "burst": 10, "max_concurrent": 8},
+        "instagram": {"rate": 0.5, "burst": 4, "max_concurrent": 3},
+        "facebook": {"rate": 0.5, "burst": 4, "max_concurrent": 3},
+        "default": {"rate": 2.0, "burst": 10, "max_concurrent": 8},
+    }
+    POLITENESS_INTERACTIVE_RESERVE = 1  # Tokens and slots background work leaves
+    POLITENESS_LEASE_TTL = 900  # Slots of crashed callers free up after this
+    POLITENESS_INTERACTIVE_TIMEOUT = 15.0  # Max wait before proceeding anyway
+    POLITENESS_BACKGROUND_TIMEOUT = 300.0
+    POLITENESS_MAX_POLL = 1.0  # Max seconds between attempts while waiting
+
+    # Circuit breakers per platform and per ladder config, shared via Redis
+    BREAKER_WINDOW = 60  # Sliding window for counting rate-limit failures
+    BREAKER_MIN_FAILURES = 5  # Rate-limit failures in the window before opening
+    BREAKER_FAILURE_RATIO = 0.5  # ...which must also be this share of attempts
+    BREAKER_OPEN_SECONDS = 60  # First open period; doubles on every re-open
+    BREAKER_MAX_OPEN_SECONDS = 900
+    BREAKER_PROBE_TIMEOUT = 120  # A half-open probe that never reports expires
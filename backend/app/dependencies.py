@@ -67,7 +67,7 @@ def get_job_repository():
     """FastAPI dependency for job repository"""
     from .repositories.job_repository import JobRepository
 
-    return JobRepository()
+    return JobRepository(get_redis())
 
 
 def get_clips_queue() -> Queue:
@@ -0,0 +1,42 @@
+"""
+Extraction package for yt-dlp orchestration shared by the API and workers.
+Provides failure classification for extraction and download errors,
+adaptive ordering of fallback configs, hedged execution of attempts,
+tickets for asynchronous extraction, pooled YoutubeDL instances,
+health-scored rotation of cookie sessions, deployment-wide politeness
+scheduling per platform and shared circuit breakers.
+"""
+
+from .breaker import CircuitOpenError, ExtractionCircuitBreaker, get_circuit_states
+from .errors import PERMANENT_FAILURES, FailureClass, classify_extraction_error
+from .hedging import AttemptOutcome, HedgeBudget, hedge_delay_for, run_hedged
+from .politeness import PolitenessScheduler, Priority, politeness
+from .sessions import SESSION_FAILURES, CookieSession, CookieSessionPool
+from .strategy import StrategySelector, get_strategy_rankings
+from .tickets import ExtractionTicketStore, TicketStatus
+from .ydl_pool import YoutubeDLPool, ydl_pool
+
+__all__ = [
+    "FailureClass",
+    "PERMANENT_FAILURES",
+    "classify_extraction_error",
+    "StrategySelector",
+    "get_strategy_rankings",
+    "AttemptOutcome",
+    "HedgeBudget",
+    "hedge_delay_for",
+    "run_hedged",
+    "ExtractionTicketStore",
+    "TicketStatus",
+    "YoutubeDLPool",
+    "ydl_pool",
+    "CookieSession",
+    "CookieSessionPool",
+    "SESSION_FAILURES",
+    "PolitenessScheduler",
+    "Priority",
+    "politeness",
+    "CircuitOpenError",
+    "ExtractionCircuitBreaker",
+    "get_circuit_states",
+]
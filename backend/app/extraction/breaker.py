@@ -0,0 +1,328 @@
+"""
+Per-platform and per-config circuit breakers for extraction and download.
+
+When a platform starts answering with 429s or bot-detection challenges,
+further attempts only deepen the block and tie up API requests and workers
+on calls that are doomed to fail. Breakers are fed with the outcome of every
+metadata and download attempt and trip when rate-limit failures spike:
+
+- closed: attempts flow; rate-limited failures are counted in a sliding
+  window and the breaker opens once they pass both a count and a ratio.
+- open: attempts fail fast with ``CircuitOpenError`` until the open period
+  ends. The period doubles every time the breaker re-opens.
+- half-open: one probe attempt at a time is let through; a success closes
+  the breaker, another rate-limit failure re-opens it.
+
+There is one breaker per platform, shared by the metadata and download
+ladders since a block affects both, and one per ladder config so a single
+client fingerprint that is being challenged can be skipped while the others
+keep working. State lives in Redis hashes updated by Lua scripts, so every
+API replica and worker sees the same breakers and transitions are atomic.
+If Redis is unavailable the breakers stay closed.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from ..constants import ExtractionConfig
+from ..metrics import extraction_circuit_events_total
+from ..middleware.queue_protection import CircuitBreakerState
+from ..utils.redis_values import resolve, to_text
+from .errors import PERMANENT_FAILURES, FailureClass, classify_extraction_error
+
+logger = logging.getLogger(__name__)
+
+BREAKER_KEY_PREFIX = "extraction:breaker:"
+# Set of breaker scopes that have opened at least once, for administration
+BREAKER_INDEX_KEY = "extraction:breaker_index"
+
+# KEYS: breaker hash; ARGV: probe timeout
+# Returns {allowed, retry_after_seconds, state}
+ALLOW_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HGET', KEYS[1], 'state')
+if not state or state == 'closed' then
+    return {1, 0, 'closed'}
+end
+
+local open_until = tonumber(redis.call('HGET', KEYS[1], 'open_until')) or 0
+if now < open_until then
+    return {0, math.ceil(open_until - now), 'open'}
+end
+
+local probe_until = tonumber(redis.call('HGET', KEYS[1], 'probe_until')) or 0
+if now < probe_until then
+    return {0, math.ceil(probe_until - now), 'half_open'}
+end
+
+redis.call('HSET', KEYS[1], 'state', 'half_open',
+    'probe_until', tostring(now + tonumber(ARGV[1])))
+return {1, 0, 'half_open'}
+"""
+
+# KEYS: breaker hash
+# ARGV: outcome (success|tripping|failure), window, min failures, failure
+#       ratio, open seconds, max open seconds, key ttl
+# Returns the transition: opened, recovered, or the unchanged state
+RECORD_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local outcome = ARGV[1]
+local window = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[7])
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+
+local function trip()
+    local trips = redis.call('HINCRBY', KEYS[1], 'trips', 1)
+    local open_for = math.min(tonumber(ARGV[5]) * 2 ^ (trips - 1), tonumber(ARGV[6]))
+    redis.call('HSET', KEYS[1], 'state', 'open',
+        'open_until', tostring(now + open_for), 'probe_until', '0',
+        'attempts', 0, 'failures', 0, 'prev_attempts', 0, 'prev_failures', 0)
+    redis.call('EXPIRE', KEYS[1], ttl)
+    return 'opened'
+end
+
+if state ~= 'closed' then
+    local open_until = tonumber(redis.call('HGET', KEYS[1], 'open_until')) or 0
+    if now < open_until then
+        -- Late result of an attempt started before the breaker opened
+        return 'open'
+    end
+    if outcome == 'success' then
+        redis.call('DEL', KEYS[1])
+        return 'recovered'
+    elseif outcome == 'tripping' then
+        return trip()
+    end
+    -- Inconclusive probe: let the next one through
+    redis.call('HSET', KEYS[1], 'probe_until', '0')
+    return state
+end
+
+-- Closed: count outcomes in the current and previous fixed windows
+local bucket = math.floor(now / window)
+local fields = redis.call('HMGET', KEYS[1],
+    'bucket', 'attempts', 'failures', 'prev_attempts', 'prev_failures')
+local current = tonumber(fields[1]) or bucket
+local attempts = tonumber(fields[2]) or 0
+local failures = tonumber(fields[3]) or 0
+local prev_attempts = tonumber(fields[4]) or 0
+local prev_failures = tonumber(fields[5]) or 0
+if bucket ~= current then
+    if bucket == current + 1 then
+        prev_attempts, prev_failures = attempts, failures
+    else
+        prev_attempts, prev_failures = 0, 0
+    end
+    attempts, failures = 0, 0
+end
+
+attempts = attempts + 1
+if outcome == 'tripping' then
+    failures = failures + 1
+end
+redis.call('HSET', KEYS[1], 'state', 'closed', 'bucket', bucket,
+    'attempts', attempts, 'failures', failures,
+    'prev_attempts', prev_attempts, 'prev_failures', prev_failures)
+redis.call('EXPIRE', KEYS[1], ttl)
+
+-- Sliding window estimate: the previous window counts for its overlap
+local overlap = 1 - (now / window - bucket)
+local total_failures = failures + prev_failures * overlap
+local total_attempts = attempts + prev_attempts * overlap
+if outcome == 'tripping' and total_failures >= tonumber(ARGV[3])
+        and total_failures / total_attempts >= tonumber(ARGV[4]) then
+    return trip()
+end
+return 'closed'
+"""
+
+
+class CircuitOpenError(Exception):
+    """Raised when a platform's circuit breaker rejects an attempt"""
+
+    def __init__(self, platform: str, retry_after: int):
+        self.platform = platform
+        self.retry_after = retry_after
+        super().__init__(
+            f"{platform.capitalize()} is temporarily rate limiting or blocking "
+            f"requests from this service. Please try again in {retry_after} seconds."
+        )
+
+
+class ExtractionCircuitBreaker:
+    """Redis-backed circuit breakers for one extraction ladder"""
+
+    def __init__(self, redis_client=None, ladder: str = "metadata"):
+        """
+        Initialize circuit breakers
+
+        Args:
+            redis_client: Redis client instance (sync or async), None keeps
+                every breaker closed
+            ladder: Config ladder the per-config breakers belong to
+        """
+        self.redis = redis_client
+        self.ladder = ladder
+        self._allow_script = None
+        self._record_script = None
+        if redis_client is not None:
+            self._allow_script = redis_client.register_script(ALLOW_SCRIPT)
+            self._record_script = redis_client.register_script(RECORD_SCRIPT)
+
+    def _scope(self, platform: str, config_name: Optional[str] = None) -> str:
+        if config_name is None:
+            return platform
+        return f"{platform}:{self.ladder}:{config_name}"
+
+    async def _allow(self, scope: str) -> Tuple[bool, int]:
+        if self._allow_script is None:
+            return True, 0
+        try:
+            allowed, retry_after, state = await resolve(
+                self._allow_script(
+                    keys=[f"{BREAKER_KEY_PREFIX}{scope}"],
+                    args=[ExtractionConfig.BREAKER_PROBE_TIMEOUT],
+                )
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Circuit breaker unavailable, allowing attempt: {e}")
+            return True, 0
+
+        if int(allowed) and to_text(state) == CircuitBreakerState.HALF_OPEN.value:
+            logger.info(f"🔌 Circuit '{scope}' half-open, letting a probe through")
+        return bool(int(allowed)), int(retry_after)
+
+    async def check(self, platform: str) -> None:
+        """
+        Fail fast if the platform's breaker is open
+
+        Raises:
+            CircuitOpenError: If attempts on the platform are being rejected
+        """
+        allowed, retry_after = await self._allow(self._scope(platform))
+        if not allowed:
+            extraction_circuit_events_total.labels(platform, "rejected").inc()
+            raise CircuitOpenError(platform, max(retry_after, 1))
+
+    async def allowed_configs(
+        self, platform: str, config_names: Sequence[str]
+    ) -> List[str]:
+        """
+        Drop configs whose own breaker is open
+
+        Args:
+            platform: Platform the URL belongs to
+            config_names: Config names in the order they would be attempted
+
+        Returns:
+            The configs that may be attempted, in the same order
+
+        Raises:
+            CircuitOpenError: If every config's breaker is open
+        """
+        allowed = []
+        retry_after = None
+        for name in config_names:
+            ok, wait = await self._allow(self._scope(platform, name))
+            if ok:
+                allowed.append(name)
+            else:
+                logger.info(f"🔌 Skipping config '{name}': its circuit is open")
+                retry_after = wait if retry_after is None else min(retry_after, wait)
+
+        if config_names and not allowed:
+            extraction_circuit_events_total.labels(platform, "rejected").inc()
+            raise CircuitOpenError(platform, max(retry_after or 0, 1))
+        return allowed
+
+    async def _record_scope(self, scope: str, platform: str, outcome: str) -> None:
+        transition = to_text(
+            await resolve(
+                self._record_script(
+                    keys=[f"{BREAKER_KEY_PREFIX}{scope}"],
+                    args=[
+                        outcome,
+                        ExtractionConfig.BREAKER_WINDOW,
+                        ExtractionConfig.BREAKER_MIN_FAILURES,
+                        ExtractionConfig.BREAKER_FAILURE_RATIO,
+                        ExtractionConfig.BREAKER_OPEN_SECONDS,
+                        ExtractionConfig.BREAKER_MAX_OPEN_SECONDS,
+                        ExtractionConfig.BREAKER_MAX_OPEN_SECONDS * 4,
+                    ],
+                )
+            )
+        )
+        if transition == "opened":
+            await resolve(self.redis.sadd(BREAKER_INDEX_KEY, scope))
+            extraction_circuit_events_total.labels(platform, "opened").inc()
+            logger.warning(f"🔌 Circuit '{scope}' opened after rate-limit failures")
+        elif transition == "recovered":
+            extraction_circuit_events_total.labels(platform, "recovered").inc()
+            logger.info(f"🔌 Circuit '{scope}' closed again after a successful probe")
+
+    async def record(
+        self,
+        platform: str,
+        error: Optional[Union[BaseException, str]] = None,
+        config_name: Optional[str] = None,
+    ) -> None:
+        """
+        Feed the outcome of one attempt to the platform and config breakers
+
+        Args:
+            platform: Platform the URL belongs to
+            error: Error of the attempt, None on success
+            config_name: Config that was attempted, if the ladder has configs
+        """
+        if self._record_script is None:
+            return
+
+        if error is None:
+            outcome = "success"
+        else:
+            failure_class = classify_extraction_error(error)
+            if failure_class in PERMANENT_FAILURES:
+                # Private/removed content says nothing about being blocked
+                return
+            outcome = (
+                "tripping" if failure_class is FailureClass.RATE_LIMITED else "failure"
+            )
+
+        scopes = [self._scope(platform)]
+        if config_name is not None:
+            scopes.append(self._scope(platform, config_name))
+        try:
+            for scope in scopes:
+                await self._record_scope(scope, platform, outcome)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to record circuit breaker outcome: {e}")
+
+
+async def get_circuit_states(redis_client) -> List[Dict[str, Any]]:
+    """
+    Get the state of every breaker that has opened at least once
+
+    Args:
+        redis_client: Redis client instance (sync or async)
+
+    Returns:
+        Per breaker scope: state, seconds until the next probe and trips
+    """
+    members = await resolve(redis_client.smembers(BREAKER_INDEX_KEY))
+    states = []
+    for scope in sorted(to_text(m) for m in members):
+        raw = await resolve(redis_client.hgetall(f"{BREAKER_KEY_PREFIX}{scope}"))
+        fields = {to_text(k): to_text(v) for k, v in raw.items()}
+        open_until = float(fields.get("open_until", 0) or 0)
+        states.append(
+            {
+                "scope": scope,
+                "state": fields.get("state", CircuitBreakerState.CLOSED.value),
+                "retry_after_seconds": max(int(open_until - time.time()), 0),
+                "trips": int(fields.get("trips", 0)),
+            }
+        )
+    return states
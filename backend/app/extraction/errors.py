@@ -0,0 +1,101 @@
+"""
+Classification of yt-dlp extraction/download errors.
+
+yt-dlp reports everything as ``DownloadError`` with a free-form message, so the
+failure class is derived from well-known message fragments. Order matters:
+bot-detection prompts also say "sign in", and YouTube geo blocks also say
+"video unavailable", so the more specific classes are checked first.
+"""
+
+from enum import Enum
+from typing import Tuple, Union
+
+
+class FailureClass(str, Enum):
+    """Why an extraction or download attempt failed"""
+
+    RATE_LIMITED = "rate_limited"  # 429s and bot-detection challenges
+    GEO_BLOCKED = "geo_blocked"
+    PRIVATE = "private"
+    REMOVED = "removed"
+    LOGIN_REQUIRED = "login_required"
+    TIMEOUT = "timeout"
+    UNKNOWN = "unknown"
+
+
+# Failures that retrying (with any config) will not fix for a while
+PERMANENT_FAILURES = frozenset(
+    {FailureClass.PRIVATE, FailureClass.REMOVED, FailureClass.GEO_BLOCKED}
+)
+
+_PATTERNS: Tuple[Tuple[FailureClass, Tuple[str, ...]], ...] = (
+    (
+        FailureClass.RATE_LIMITED,
+        (
+            "confirm you're not a bot",
+            "confirm you’re not a bot",
+            "sign in to confirm",
+            "too many requests",
+            "http error 429",
+            "rate-limit",
+            "rate limit",
+        ),
+    ),
+    (
+        FailureClass.GEO_BLOCKED,
+        (
+            "not available in your country",
+            "not made this video available in your country",
+            "blocked it in your country",
+            "geo restrict",
+            "geo-restrict",
+            "georestrict",
+            "restricted in your region",
+        ),
+    ),
+    (
+        FailureClass.PRIVATE,
+        (
+            "private video",
+            "video is private",
+            "account is private",
+            "this content is private",
+        ),
+    ),
+    (
+        FailureClass.REMOVED,
+        (
+            "has been removed",
+            "video has been deleted",
+            "no longer available",
+            "account has been terminated",
+            "account associated with this video has been terminated",
+            "does not exist",
+            "http error 404",
+            "this video is unavailable",
+            "video unavailable",
+        ),
+    ),
+    (
+        FailureClass.LOGIN_REQUIRED,
+        ("login required", "log in", "login", "sign in", "authentication", "cookies"),
+    ),
+    (FailureClass.TIMEOUT, ("timed out", "timeout")),
+)
+
+
+def classify_extraction_error(error: Union[BaseException, str]) -> FailureClass:
+    """
+    Classify a yt-dlp error message
+
+    Args:
+        error: Exception raised by yt-dlp or its message
+
+    Returns:
+        The failure class, UNKNOWN if nothing matched
+    """
+    message = str(error).lower()
+    for failure_class, fragments in _PATTERNS:
+        if any(fragment in message for fragment in fragments):
+            return failure_class
+    return FailureClass.UNKNOWN
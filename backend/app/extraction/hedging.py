@@ -0,0 +1,196 @@
+"""
+Hedged execution of blocking yt-dlp attempts.
+
+The first attempt starts immediately. If it has not finished within the hedge
+delay (derived from the recent p90 success latency) the next attempt starts
+alongside it, and so on; the first successful result wins. A failed attempt
+is replaced by the next one straight away, as in a plain sequential fallback.
+
+yt-dlp cannot be interrupted mid-extraction, so losing attempts are abandoned
+rather than killed: their threads run to completion (bounded by the config's
+``socket_timeout``) and their real outcome is still reported. A process-wide
+budget caps how many hedged attempts may be running at once, counting
+abandoned threads until they actually exit, so hedging cannot exhaust the
+thread pool or multiply load on a struggling platform.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set, Tuple
+
+from ..constants import ExtractionConfig
+
+logger = logging.getLogger(__name__)
+
+
+class HedgeBudget:
+    """Process-wide cap on hedged attempts whose threads are still running"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_acquire(self) -> bool:
+        """Reserve a hedge slot without waiting"""
+        with self._lock:
+            if self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self) -> None:
+        """Return a hedge slot (called from the attempt's thread)"""
+        with self._lock:
+            self._in_flight = max(self._in_flight - 1, 0)
+
+
+hedge_budget = HedgeBudget(ExtractionConfig.HEDGE_BUDGET)
+
+
+@dataclass
+class AttemptOutcome:
+    """Result of one attempt, reported even for abandoned attempts"""
+
+    name: str
+    result: Any
+    error: Optional[BaseException]
+    latency: float
+    hedged: bool
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and bool(self.result)
+
+
+# Outcome reports of abandoned attempts, referenced until they complete
+_pending_reports: Set[asyncio.Task] = set()
+
+
+def hedge_delay_for(p90: Optional[float]) -> float:
+    """
+    Hedge delay for a recent success-latency quantile
+
+    Args:
+        p90: Recent latency quantile in seconds, None if not known yet
+
+    Returns:
+        Seconds to wait on an attempt before hedging it
+    """
+    if p90 is None:
+        return ExtractionConfig.HEDGE_DEFAULT_DELAY
+    return min(
+        max(p90, ExtractionConfig.HEDGE_MIN_DELAY), ExtractionConfig.HEDGE_MAX_DELAY
+    )
+
+
+async def run_hedged(
+    attempts: Sequence[Tuple[str, Callable[[], Any]]],
+    hedge_delay: float,
+    budget: HedgeBudget = hedge_budget,
+    is_fatal: Callable[[BaseException], bool] = lambda error: False,
+    on_outcome: Optional[Callable[[AttemptOutcome], Awaitable[None]]] = None,
+) -> AttemptOutcome:
+    """
+    Run blocking attempts in threads, hedging slow ones, until one succeeds
+
+    Args:
+        attempts: (name, callable) pairs in preference order
+        hedge_delay: Seconds to wait on running attempts before hedging
+        budget: Hedge budget to draw from
+        is_fatal: Errors for which no other attempt can succeed
+        on_outcome: Coroutine called with every attempt's outcome
+
+    Returns:
+        Outcome of the winning attempt
+
+    Raises:
+        The error of the last failed attempt if none succeeded, or the first
+        fatal error
+    """
+    loop = asyncio.get_running_loop()
+    remaining = list(attempts)
+    # Attempts still awaited, and every attempt launched (for outcome reports)
+    running: Dict[asyncio.Future, Tuple[str, float, bool]] = {}
+    launched: Dict[asyncio.Future, Tuple[str, float, bool]] = {}
+    outcomes: Dict[asyncio.Future, AttemptOutcome] = {}
+    last_error: Optional[BaseException] = None
+
+    def outcome_of(future: asyncio.Future) -> AttemptOutcome:
+        if future not in outcomes:
+            name, started, hedged = launched[future]
+            error = future.exception()
+            outcomes[future] = AttemptOutcome(
+                name=name,
+                result=None if error else future.result(),
+                error=error,
+                latency=time.monotonic() - started,
+                hedged=hedged,
+            )
+        return outcomes[future]
+
+    def report(future: asyncio.Future) -> None:
+        if future.cancelled():
+            return
+        outcome = outcome_of(future)
+        if on_outcome is not None:
+            task = loop.create_task(on_outcome(outcome))
+            _pending_reports.add(task)
+            task.add_done_callback(_pending_reports.discard)
+
+    def launch(hedged: bool) -> None:
+        name, attempt = remaining.pop(0)
+
+        def run() -> Any:
+            try:
+                return attempt()
+            finally:
+                if hedged:
+                    budget.release()
+
+        future = loop.run_in_executor(None, run)
+        running[future] = launched[future] = (name, time.monotonic(), hedged)
+        future.add_done_callback(report)
+        if hedged:
+            logger.info(f"🪁 Hedging with '{name}' after {hedge_delay:.1f}s")
+
+    launch(hedged=False)
+    while running:
+        done, _ = await asyncio.wait(
+            running,
+            timeout=hedge_delay if remaining else None,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+
+        if not done:
+            # Every running attempt is slower than usual: hedge if allowed
+            if budget.try_acquire():
+                launch(hedged=True)
+            else:
+                logger.info("🪁 Hedge budget exhausted, waiting on running attempts")
+            continue
+
+        for future in done:
+            name, _, _ = running.pop(future)
+            outcome = outcome_of(future)
+            if outcome.success:
+                # Losers are abandoned; their threads finish in the background
+                return outcome
+
+            last_error = outcome.error or ValueError(
+                f"Attempt '{name}' returned no result"
+            )
+            if is_fatal(last_error):
+                raise last_error
+
+        if not running and remaining:
+            launch(hedged=False)
+
+    raise last_error
@@ -0,0 +1,294 @@
+"""
+Distributed per-platform politeness scheduling for yt-dlp calls.
+
+Every API replica and worker draws from the same per-platform token bucket
+(requests per second with a burst) and concurrency semaphore in Redis before
+calling a platform, so the deployment as a whole stays under the rate that
+trips bot detection instead of each process backing off on its own.
+
+Both are updated by one Lua script, so checking and taking a token and a slot
+is atomic across processes. Semaphore slots are leases that expire, so a
+crashed process cannot hold a slot forever. Background work (worker
+downloads) must leave a reserve of tokens and slots untouched, so interactive
+metadata requests are served first when a platform is busy.
+
+Waiting happens in the calling thread; yt-dlp calls are blocking and already
+run off the event loop. If Redis is unavailable, or a caller waits longer than
+its priority's timeout, the call proceeds without a slot (failing open) so
+scheduling never turns into an outage.
+"""
+
+import json
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from ..config.configuration import get_settings
+from ..constants import ExtractionConfig
+from ..metrics import politeness_wait_seconds
+from ..utils.platform_detection import PlatformDetector
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY_PREFIX = "extraction:politeness:bucket:"
+LEASES_KEY_PREFIX = "extraction:politeness:leases:"
+
+# KEYS: token bucket hash, lease sorted set (lease id -> expiry)
+# ARGV: rate, burst, max concurrent, reserve, lease id, lease ttl
+# Returns {1, 0} when a token and slot were taken, otherwise {0, wait_ms}
+# where wait_ms is the time until enough tokens accrue (-1: no free slot)
+ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_concurrent = tonumber(ARGV[3])
+local reserve = tonumber(ARGV[4])
+local lease_ttl = tonumber(ARGV[6])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) + reserve >= max_concurrent then
+    return {0, -1}
+end
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - last, 0) * rate)
+
+local granted = 0
+local wait_ms = 0
+if tokens >= 1 + reserve then
+    tokens = tokens - 1
+    granted = 1
+    redis.call('ZADD', KEYS[2], now + lease_ttl, ARGV[5])
+    redis.call('EXPIRE', KEYS[2], math.ceil(lease_ttl))
+else
+    wait_ms = math.ceil((1 + reserve - tokens) / rate * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return {granted, wait_ms}
+"""
+
+
+def _default_redis():
+    """The backend's sync Redis client, None until initialised"""
+    from .. import redis
+
+    return redis
+
+
+class Priority(str, Enum):
+    """Who is waiting on a yt-dlp call"""
+
+    INTERACTIVE = "interactive"  # A user waiting on an API response
+    BACKGROUND = "background"  # Queued work (downloads, worker title lookups)
+
+
+@dataclass(frozen=True)
+class PlatformLimits:
+    """Politeness limits of one platform, shared by the whole deployment"""
+
+    rate: float  # Calls started per second
+    burst: int  # Calls that may start back to back after an idle period
+    max_concurrent: int  # Calls in flight at once
+
+    def reserve_for(self, priority: Priority) -> int:
+        """Tokens and slots a caller must leave free for higher priorities"""
+        if priority is Priority.INTERACTIVE:
+            return 0
+        return min(
+            ExtractionConfig.POLITENESS_INTERACTIVE_RESERVE, self.max_concurrent - 1
+        )
+
+
+def load_platform_limits(overrides: str = "") -> Dict[str, PlatformLimits]:
+    """
+    Build per-platform limits from the defaults and a JSON override
+
+    Args:
+        overrides: JSON object such as ``{"youtube": {"rate": 1, "burst": 5}}``;
+            platforms and fields left out keep their defaults
+
+    Returns:
+        Mapping of platform name to limits, with a ``default`` entry
+    """
+    merged = {
+        platform: dict(limits)
+        for platform, limits in ExtractionConfig.POLITENESS_LIMITS.items()
+    }
+    if overrides:
+        try:
+            for platform, limits in json.loads(overrides).items():
+                merged.setdefault(platform, dict(merged["default"])).update(limits)
+        except (ValueError, AttributeError, TypeError) as e:
+            logger.warning(f"⚠️ Ignoring invalid politeness limits override: {e}")
+
+    return {
+        platform: PlatformLimits(
+            rate=float(limits["rate"]),
+            burst=int(limits["burst"]),
+            max_concurrent=int(limits["max_concurrent"]),
+        )
+        for platform, limits in merged.items()
+    }
+
+
+class PolitenessScheduler:
+    """Per-platform token bucket and concurrency semaphore in Redis"""
+
+    def __init__(
+        self,
+        redis_client=None,
+        limits: Optional[Dict[str, PlatformLimits]] = None,
+        lease_ttl: float = ExtractionConfig.POLITENESS_LEASE_TTL,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize politeness scheduler
+
+        Args:
+            redis_client: Sync Redis client instance; defaults to the backend's
+                client once it is initialised (workers ``bind`` their own)
+            limits: Per-platform limits, defaults to ``load_platform_limits``
+                with the ``POLITENESS_LIMITS`` setting
+            lease_ttl: Seconds after which a slot of a crashed caller is freed
+            sleep: Sleep function (injectable for tests)
+        """
+        self._limits = limits
+        self.lease_ttl = lease_ttl
+        self._sleep = sleep
+        self.bind(redis_client)
+
+    def bind(self, redis_client) -> None:
+        """Use a (sync) Redis client, e.g. the worker's connection"""
+        self.redis = redis_client
+        self._script = (
+            redis_client.register_script(ACQUIRE_SCRIPT) if redis_client else None
+        )
+
+    @property
+    def limits(self) -> Dict[str, PlatformLimits]:
+        if self._limits is None:
+            self._limits = load_platform_limits(get_settings().politeness_limits)
+        return self._limits
+
+    def limits_for(self, platform: str) -> PlatformLimits:
+        return self.limits.get(platform) or self.limits["default"]
+
+    def try_acquire(
+        self, platform: str, priority: Priority = Priority.INTERACTIVE
+    ) -> Tuple[Optional[str], float]:
+        """
+        Take a token and a slot if both are available
+
+        Returns:
+            Tuple of (lease id or None, seconds to wait before trying again)
+        """
+        limits = self.limits_for(platform)
+        lease = uuid.uuid4().hex
+        granted, wait_ms = self._script(
+            keys=[f"{BUCKET_KEY_PREFIX}{platform}", f"{LEASES_KEY_PREFIX}{platform}"],
+            args=[
+                limits.rate,
+                limits.burst,
+                limits.max_concurrent,
+                limits.reserve_for(priority),
+                lease,
+                self.lease_ttl,
+            ],
+        )
+        if int(granted):
+            return lease, 0.0
+
+        wait_ms = int(wait_ms)
+        if wait_ms < 0:
+            # No free slot: poll until a running call releases one
+            return None, ExtractionConfig.POLITENESS_MAX_POLL
+        return None, min(wait_ms / 1000, ExtractionConfig.POLITENESS_MAX_POLL)
+
+    def release(self, platform: str, lease: str) -> None:
+        """Free a slot taken by ``try_acquire``"""
+        try:
+            self.redis.zrem(f"{LEASES_KEY_PREFIX}{platform}", lease)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to release politeness slot: {e}")
+
+    @contextmanager
+    def slot(
+        self,
+        url: str,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Optional[str]]:
+        """
+        Wait for a token and a slot of the URL's platform, held until exit
+
+        Args:
+            url: URL about to be requested with yt-dlp
+            priority: Priority of the caller
+            timeout: Seconds to wait before proceeding without a slot,
+                defaults to the priority's timeout
+
+        Yields:
+            Lease id, or None if the call proceeds unscheduled
+        """
+        if self._script is None:
+            self.bind(_default_redis())
+        if self._script is None:
+            yield None
+            return
+
+        platform = PlatformDetector.detect_platform(url).value
+        if timeout is None:
+            timeout = (
+                ExtractionConfig.POLITENESS_INTERACTIVE_TIMEOUT
+                if priority is Priority.INTERACTIVE
+                else ExtractionConfig.POLITENESS_BACKGROUND_TIMEOUT
+            )
+
+        started = time.monotonic()
+        deadline = started + timeout
+        lease = None
+        result = "acquired"
+        try:
+            while True:
+                lease, wait = self.try_acquire(platform, priority)
+                if lease is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    result = "timeout"
+                    logger.warning(
+                        f"⏳ No {platform} politeness slot after {timeout:.0f}s, proceeding anyway"
+                    )
+                    break
+                # Jitter spreads out callers woken by the same refill
+                self._sleep(min(wait * random.uniform(1.0, 1.2), remaining))
+        except Exception as e:
+            result = "unavailable"
+            logger.warning(f"⚠️ Politeness scheduler unavailable: {e}")
+
+        waited = time.monotonic() - started
+        politeness_wait_seconds.labels(platform, priority.value, result).observe(waited)
+        if waited >= 1:
+            logger.info(
+                f"⏳ Waited {waited:.1f}s for a {platform} slot ({priority.value})"
+            )
+
+        try:
+            yield lease
+        finally:
+            if lease is not None:
+                self.release(platform, lease)
+
+
+# Process-wide scheduler, shared by every yt-dlp call site of the process
+politeness = PolitenessScheduler()
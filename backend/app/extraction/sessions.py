@@ -0,0 +1,336 @@
+"""
+Pool of cookie sessions per platform with health-scored rotation.
+
+Instagram and Facebook throttle per logged-in session, so a single shared
+cookie file caps throughput for the whole deployment. Sessions are cookie
+files in ``<sessions dir>/<platform>/*.txt`` (one exported browser session
+per file); each extraction borrows one of them.
+
+Session state lives in Redis so API replicas and workers share it:
+
+- Health is the time-decayed success rate of the session, kept with the same
+  forward-decay stats as the config ladders (ladder ``session``).
+- Rate limits and login challenges put a session on a cool-down that doubles
+  with consecutive strikes; a success clears the strikes.
+- Each session may serve a fixed number of extractions per window.
+
+Sessions are picked at random weighted by health among those not cooling down
+and within budget, so load spreads over every healthy session and throughput
+grows with the number of sessions supplied.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ..constants import ExtractionConfig
+from ..metrics import cookie_session_events_total
+from ..utils.redis_values import resolve, to_text
+from .errors import FailureClass, classify_extraction_error
+from .strategy import StrategySelector
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOLDOWN_KEY_PREFIX = "extraction:session_cooldown:"
+SESSION_STRIKES_KEY_PREFIX = "extraction:session_strikes:"
+SESSION_RATE_KEY_PREFIX = "extraction:session_rate:"
+
+# Failures caused by the session itself rather than the config or the content
+SESSION_FAILURES = frozenset({FailureClass.RATE_LIMITED, FailureClass.LOGIN_REQUIRED})
+
+# <project_root>/cookies/sessions unless overridden
+DEFAULT_SESSIONS_DIR = (
+    Path(__file__).resolve().parent.parent.parent.parent / "cookies" / "sessions"
+)
+
+# Discovered sessions per (directory, platform), refreshed on directory mtime
+_discovered: Dict[Tuple[str, str], Tuple[Optional[int], List["CookieSession"]]] = {}
+_discovered_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CookieSession:
+    """One exported browser session for a platform"""
+
+    platform: str
+    session_id: str
+    cookie_file: str
+
+
+def get_sessions_dir() -> Path:
+    """Directory holding per-platform session cookie files"""
+    return Path(os.getenv("COOKIE_SESSIONS_DIR") or DEFAULT_SESSIONS_DIR)
+
+
+def discover_sessions(
+    platform: str, sessions_dir: Optional[Path] = None
+) -> List[CookieSession]:
+    """
+    List the cookie sessions available for a platform
+
+    The directory listing is cached until the directory's mtime changes, so
+    adding or removing a session file is picked up without a restart.
+
+    Args:
+        platform: Platform name (e.g. ``instagram``)
+        sessions_dir: Sessions directory, defaults to ``get_sessions_dir()``
+
+    Returns:
+        Sessions sorted by id, empty if the platform has none
+    """
+    platform_dir = (sessions_dir or get_sessions_dir()) / platform
+    try:
+        mtime = platform_dir.stat().st_mtime_ns
+    except OSError:
+        return []
+
+    cache_key = (str(platform_dir), platform)
+    with _discovered_lock:
+        cached = _discovered.get(cache_key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    sessions = [
+        CookieSession(platform=platform, session_id=path.stem, cookie_file=str(path))
+        for path in sorted(platform_dir.glob("*.txt"))
+        if path.is_file()
+    ]
+    with _discovered_lock:
+        _discovered[cache_key] = (mtime, sessions)
+    if sessions:
+        logger.info(f"🍪 Found {len(sessions)} cookie sessions for {platform}")
+    return sessions
+
+
+class CookieSessionPool:
+    """Health-scored rotation over the cookie sessions of each platform"""
+
+    def __init__(
+        self,
+        redis_client=None,
+        sessions_dir: Optional[Path] = None,
+        rate_budget: int = ExtractionConfig.SESSION_RATE_BUDGET,
+        rate_window: int = ExtractionConfig.SESSION_RATE_WINDOW,
+        rng: Optional[random.Random] = None,
+        clock=time.time,
+    ):
+        """
+        Initialize cookie session pool
+
+        Args:
+            redis_client: Redis client instance (sync or async), None disables
+                health tracking, budgets and cool-downs
+            sessions_dir: Sessions directory, defaults to ``get_sessions_dir()``
+            rate_budget: Extractions each session may serve per window
+            rate_window: Budget window in seconds
+            rng: Random source (injectable for tests)
+            clock: Time source (injectable for tests)
+        """
+        self.redis = redis_client
+        self.sessions_dir = sessions_dir
+        self.rate_budget = rate_budget
+        self.rate_window = rate_window
+        self._rng = rng or random.Random()
+        self._clock = clock
+        self._health = StrategySelector(redis_client, ladder="session", clock=clock)
+
+    def sessions(self, platform: str) -> List[CookieSession]:
+        return discover_sessions(platform, self.sessions_dir)
+
+    def _cooldown_key(self, session: CookieSession) -> str:
+        return f"{SESSION_COOLDOWN_KEY_PREFIX}{session.platform}:{session.session_id}"
+
+    def _strikes_key(self, platform: str) -> str:
+        return f"{SESSION_STRIKES_KEY_PREFIX}{platform}"
+
+    def _rate_key(self, session: CookieSession) -> str:
+        window = int(self._clock() // self.rate_window)
+        return (
+            f"{SESSION_RATE_KEY_PREFIX}{session.platform}:{session.session_id}:{window}"
+        )
+
+    @staticmethod
+    def _health_of(stats: Optional[Dict[str, float]]) -> float:
+        """Posterior mean success rate (0.5 for an unused session)"""
+        stats = stats or {}
+        successes = stats.get("successes", 0.0)
+        failures = stats.get("failures", 0.0)
+        return (successes + 1) / (successes + failures + 2)
+
+    async def _take_budget(self, session: CookieSession) -> bool:
+        """Count one extraction against the session's budget if it has room"""
+        key = self._rate_key(session)
+        used = int(await resolve(self.redis.incr(key)))
+        if used == 1:
+            await resolve(self.redis.expire(key, self.rate_window * 2))
+        if used > self.rate_budget:
+            await resolve(self.redis.decr(key))
+            return False
+        return True
+
+    def _weighted_order(
+        self, candidates: List[Tuple[CookieSession, float]]
+    ) -> List[CookieSession]:
+        """Order sessions by weighted random sampling without replacement"""
+        # Exponential keys (Efraimidis-Spirakis): larger weight, earlier pick
+        keyed = [
+            (
+                self._rng.random()
+                ** (1.0 / max(health, ExtractionConfig.SESSION_MIN_WEIGHT)),
+                session,
+            )
+            for session, health in candidates
+        ]
+        keyed.sort(key=lambda item: item[0], reverse=True)
+        return [session for _, session in keyed]
+
+    async def acquire(self, platform: str) -> Optional[CookieSession]:
+        """
+        Pick a session for one extraction
+
+        Args:
+            platform: Platform the URL belongs to
+
+        Returns:
+            A session, or None if the platform has no sessions or every
+            session is cooling down or out of budget (callers then use the
+            shared cookie file)
+        """
+        sessions = self.sessions(platform)
+        if not sessions:
+            return None
+        if self.redis is None:
+            return self._rng.choice(sessions)
+
+        try:
+            cooling = await resolve(
+                self.redis.mget([self._cooldown_key(s) for s in sessions])
+            )
+            stats = await self._health.get_stats(platform)
+            candidates = [
+                (session, self._health_of(stats.get(session.session_id)))
+                for session, cooldown in zip(sessions, cooling)
+                if cooldown is None
+            ]
+            for session in self._weighted_order(candidates):
+                if await self._take_budget(session):
+                    cookie_session_events_total.labels(platform, "acquired").inc()
+                    return session
+        except Exception as e:
+            logger.warning(f"⚠️ Cookie session state unavailable: {e}")
+            return self._rng.choice(sessions)
+
+        cookie_session_events_total.labels(platform, "exhausted").inc()
+        logger.warning(
+            f"🍪 All {len(sessions)} {platform} sessions are cooling down or out of budget"
+        )
+        return None
+
+    async def report(
+        self,
+        session: Optional[CookieSession],
+        error: Optional[Union[BaseException, str]] = None,
+        latency: float = 0.0,
+    ) -> bool:
+        """
+        Record the outcome of an extraction that used a session
+
+        Args:
+            session: Session that was used (None is ignored)
+            error: Error of the extraction, None on success
+            latency: Seconds the extraction took
+
+        Returns:
+            True if the session was blamed for the failure (rate limited or
+            challenged), i.e. callers should switch to another session
+        """
+        if session is None or self.redis is None:
+            return False
+
+        failure_class = classify_extraction_error(error) if error is not None else None
+        if failure_class is not None and failure_class not in SESSION_FAILURES:
+            # Content or config problems say nothing about the session
+            return False
+
+        try:
+            await self._health.record(
+                session.platform, session.session_id, error is None, latency
+            )
+            strikes_key = self._strikes_key(session.platform)
+            if failure_class is None:
+                await resolve(self.redis.hdel(strikes_key, session.session_id))
+                return False
+
+            strikes = int(
+                await resolve(self.redis.hincrby(strikes_key, session.session_id, 1))
+            )
+            await resolve(
+                self.redis.expire(strikes_key, ExtractionConfig.STRATEGY_STATS_TTL)
+            )
+            base = (
+                ExtractionConfig.SESSION_LOGIN_COOLDOWN
+                if failure_class is FailureClass.LOGIN_REQUIRED
+                else ExtractionConfig.SESSION_RATE_LIMIT_COOLDOWN
+            )
+            cooldown = min(
+                base * 2 ** min(strikes - 1, 16), ExtractionConfig.SESSION_MAX_COOLDOWN
+            )
+            await resolve(
+                self.redis.set(
+                    self._cooldown_key(session), failure_class.value, ex=int(cooldown)
+                )
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to record cookie session outcome: {e}")
+            return True
+
+        cookie_session_events_total.labels(session.platform, failure_class.value).inc()
+        logger.warning(
+            f"🍪 Session '{session.session_id}' ({session.platform}) {failure_class.value}, "
+            f"cooling down for {int(cooldown)}s (strike {strikes})"
+        )
+        return True
+
+    async def get_health(self, platform: str) -> List[Dict[str, Any]]:
+        """
+        Get the state of every session of a platform
+
+        Returns:
+            Per session: health, decayed attempts, remaining cool-down,
+            consecutive strikes and extractions used in the current window
+        """
+        sessions = self.sessions(platform)
+        if not sessions or self.redis is None:
+            return [
+                {"session": s.session_id, "health": self._health_of(None)}
+                for s in sessions
+            ]
+
+        stats = await self._health.get_stats(platform)
+        strikes = await resolve(self.redis.hgetall(self._strikes_key(platform)))
+        strikes = {to_text(k): int(to_text(v)) for k, v in strikes.items()}
+
+        health = []
+        for session in sessions:
+            entry = stats.get(session.session_id) or {}
+            cooldown = int(await resolve(self.redis.ttl(self._cooldown_key(session))))
+            used = await resolve(self.redis.get(self._rate_key(session)))
+            health.append(
+                {
+                    "session": session.session_id,
+                    "health": round(self._health_of(entry), 3),
+                    "attempts": round(
+                        entry.get("successes", 0.0) + entry.get("failures", 0.0), 2
+                    ),
+                    "cooldown_seconds": max(cooldown, 0),
+                    "strikes": strikes.get(session.session_id, 0),
+                    "used_in_window": int(to_text(used)) if used is not None else 0,
+                    "budget": self.rate_budget,
+                }
+            )
+        return health
@@ -0,0 +1,318 @@
+"""
+Adaptive ordering of yt-dlp fallback configs.
+
+Each extraction ladder (the metadata API's configs, the worker's download
+configs) keeps per-``(platform, config)`` outcome stats in a Redis hash:
+time-decayed success and failure counts and the decayed sum of seconds spent
+per attempt. Attempts are then ordered by expected time-to-success
+(mean attempt latency / success probability), which is the order that
+minimises the expected total time of a sequential fallback. Most rankings use
+the posterior mean; a configurable share uses Thompson sampling so configs
+that fell out of favour keep getting occasional traffic and can recover.
+
+Decay uses forward decay against a landmark timestamp stored in the hash:
+each outcome is added with weight ``2 ** ((now - landmark) / half_life)``
+via HINCRBYFLOAT, so concurrent API replicas and workers update the stats
+atomically without a read-modify-write. Reads divide by the current weight.
+The landmark is moved forward (and the stored values rescaled) before the
+weights grow large enough to lose float precision.
+"""
+
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..constants import ExtractionConfig
+from ..utils.redis_values import resolve, to_text
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_KEY_PREFIX = "extraction:strategy:"
+# List of recent successful attempt latencies per ladder/platform
+LATENCY_KEY_PREFIX = "extraction:latency:"
+# Set of "<ladder>:<platform>" members with recorded stats, for administration
+STRATEGY_INDEX_KEY = "extraction:strategy_index"
+LANDMARK_FIELD = "_landmark"
+STAT_FIELDS = ("successes", "failures", "seconds")
+
+
+class StrategySelector:
+    """Orders fallback configs of one extraction ladder by observed performance"""
+
+    def __init__(
+        self,
+        redis_client=None,
+        ladder: str = "metadata",
+        half_life: float = ExtractionConfig.STRATEGY_HALF_LIFE,
+        exploration_rate: float = ExtractionConfig.STRATEGY_EXPLORATION_RATE,
+        prior_latency: float = ExtractionConfig.STRATEGY_PRIOR_LATENCY,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize strategy selector
+
+        Args:
+            redis_client: Redis client instance (sync or async), None disables it
+            ladder: Name of the config ladder the stats belong to
+            half_life: Seconds after which an outcome counts half as much
+            exploration_rate: Probability a ranking is drawn by Thompson sampling
+            prior_latency: Seconds per attempt assumed for configs without data
+            rng: Random source (injectable for tests)
+            clock: Time source (injectable for tests)
+        """
+        self.redis = redis_client
+        self.ladder = ladder
+        self.half_life = half_life
+        self.exploration_rate = exploration_rate
+        self.prior_latency = prior_latency
+        self._rng = rng or random.Random()
+        self._clock = clock
+
+    def _key(self, platform: str) -> str:
+        return f"{STRATEGY_KEY_PREFIX}{self.ladder}:{platform}"
+
+    def _latency_key(self, platform: str) -> str:
+        return f"{LATENCY_KEY_PREFIX}{self.ladder}:{platform}"
+
+    def _weight(self, landmark: float, now: float) -> float:
+        # Capped so a hash left idle for ages reads as ~0 instead of overflowing
+        return 2.0 ** min((now - landmark) / self.half_life, 1000.0)
+
+    async def _landmark(self, key: str, now: float) -> float:
+        """Get the decay landmark of a stats hash, creating it if needed"""
+        if await resolve(self.redis.hsetnx(key, LANDMARK_FIELD, now)):
+            return now
+        return float(to_text(await resolve(self.redis.hget(key, LANDMARK_FIELD))))
+
+    async def _rescale(self, key: str, landmark: float, now: float) -> float:
+        """
+        Move the landmark to now, scaling stored values down accordingly
+
+        Increments racing with the rescale may be lost; this runs once every
+        ``STRATEGY_RESCALE_HALF_LIVES`` half-lives so the loss is negligible.
+        """
+        raw = await resolve(self.redis.hgetall(key))
+        scale = 1.0 / self._weight(landmark, now)
+        mapping = {
+            to_text(field): float(to_text(value)) * scale
+            for field, value in raw.items()
+            if to_text(field) != LANDMARK_FIELD
+        }
+        mapping[LANDMARK_FIELD] = now
+        await resolve(self.redis.hset(key, mapping=mapping))
+        return now
+
+    async def _execute(self, commands: Sequence[Tuple[str, tuple]]) -> None:
+        """Run commands in one round trip when the client supports pipelines"""
+        if hasattr(self.redis, "pipeline"):
+            pipe = self.redis.pipeline(transaction=False)
+            for name, args in commands:
+                getattr(pipe, name)(*args)
+            await resolve(pipe.execute())
+            return
+
+        for name, args in commands:
+            await resolve(getattr(self.redis, name)(*args))
+
+    async def record(
+        self, platform: str, config_name: str, success: bool, latency: float
+    ) -> None:
+        """
+        Record the outcome of one attempt
+
+        Failures must only be recorded when the config is to blame (not for
+        private/removed content), otherwise every config is penalised alike.
+
+        Args:
+            platform: Platform the URL belongs to
+            config_name: Name of the config that was tried
+            success: Whether the attempt succeeded
+            latency: Seconds the attempt took
+        """
+        if self.redis is None:
+            return
+
+        try:
+            key = self._key(platform)
+            now = self._clock()
+            landmark = await self._landmark(key, now)
+            if now - landmark > (
+                ExtractionConfig.STRATEGY_RESCALE_HALF_LIVES * self.half_life
+            ):
+                landmark = await self._rescale(key, landmark, now)
+
+            weight = self._weight(landmark, now)
+            outcome = "successes" if success else "failures"
+            commands = [
+                ("hincrbyfloat", (key, f"{config_name}:{outcome}", weight)),
+                (
+                    "hincrbyfloat",
+                    (key, f"{config_name}:seconds", weight * max(latency, 0.0)),
+                ),
+                ("expire", (key, ExtractionConfig.STRATEGY_STATS_TTL)),
+                ("sadd", (STRATEGY_INDEX_KEY, f"{self.ladder}:{platform}")),
+            ]
+            if success:
+                latency_key = self._latency_key(platform)
+                commands += [
+                    ("lpush", (latency_key, round(latency, 3))),
+                    ("ltrim", (latency_key, 0, ExtractionConfig.LATENCY_SAMPLES - 1)),
+                    ("expire", (latency_key, ExtractionConfig.STRATEGY_STATS_TTL)),
+                ]
+            await self._execute(commands)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to record strategy outcome: {e}")
+
+    async def get_stats(self, platform: str) -> Dict[str, Dict[str, float]]:
+        """
+        Get the decayed stats of every config recorded for a platform
+
+        Returns:
+            Mapping of config name to successes, failures and seconds
+        """
+        if self.redis is None:
+            return {}
+
+        raw = await resolve(self.redis.hgetall(self._key(platform)))
+        fields = {to_text(field): float(to_text(value)) for field, value in raw.items()}
+        landmark = fields.pop(LANDMARK_FIELD, None)
+        if landmark is None:
+            return {}
+
+        scale = 1.0 / self._weight(landmark, self._clock())
+        stats: Dict[str, Dict[str, float]] = {}
+        for field, value in fields.items():
+            config_name, _, stat = field.rpartition(":")
+            if stat in STAT_FIELDS:
+                entry = stats.setdefault(
+                    config_name, {name: 0.0 for name in STAT_FIELDS}
+                )
+                entry[stat] = value * scale
+        return stats
+
+    async def latency_quantile(self, platform: str, quantile: float) -> Optional[float]:
+        """
+        Get a quantile of recent successful attempt latencies
+
+        Args:
+            platform: Platform the URL belongs to
+            quantile: Quantile between 0 and 1
+
+        Returns:
+            Latency in seconds, or None without enough samples (or Redis)
+        """
+        if self.redis is None:
+            return None
+
+        try:
+            raw = await resolve(self.redis.lrange(self._latency_key(platform), 0, -1))
+        except Exception as e:
+            logger.warning(f"⚠️ Latency samples unavailable: {e}")
+            return None
+
+        samples = sorted(float(to_text(value)) for value in raw)
+        if len(samples) < ExtractionConfig.HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(int(quantile * len(samples)), len(samples) - 1)]
+
+    def _expected_seconds(
+        self, stats: Optional[Dict[str, float]], sample: bool = False
+    ) -> float:
+        """
+        Expected seconds until a config succeeds if retried until it does
+
+        Args:
+            stats: Decayed stats of the config, None if never tried
+            sample: Draw the success probability from its Beta posterior
+        """
+        stats = stats or {}
+        successes = stats.get("successes", 0.0)
+        failures = stats.get("failures", 0.0)
+        attempts = successes + failures
+
+        if sample:
+            success_rate = self._rng.betavariate(successes + 1, failures + 1)
+        else:
+            success_rate = (successes + 1) / (attempts + 2)
+
+        mean_latency = (stats.get("seconds", 0.0) + self.prior_latency) / (attempts + 1)
+        return mean_latency / max(success_rate, 1e-6)
+
+    async def rank(self, platform: str, config_names: Sequence[str]) -> List[str]:
+        """
+        Order config names by expected time-to-success
+
+        Configs without data keep their configured relative order, so a cold
+        start behaves exactly like the static ladder. Falls back to the
+        configured order if Redis is unavailable.
+
+        Args:
+            platform: Platform the URL belongs to
+            config_names: Config names in their configured order
+
+        Returns:
+            Config names in the order they should be attempted
+        """
+        names = list(config_names)
+        if self.redis is None or len(names) < 2:
+            return names
+
+        try:
+            stats = await self.get_stats(platform)
+        except Exception as e:
+            logger.warning(f"⚠️ Strategy stats unavailable, using static order: {e}")
+            return names
+
+        explore = self._rng.random() < self.exploration_rate
+        order = sorted(
+            range(len(names)),
+            key=lambda i: (self._expected_seconds(stats.get(names[i]), explore), i),
+        )
+        return [names[i] for i in order]
+
+    async def get_ranking(self, platform: str) -> List[Dict[str, Any]]:
+        """
+        Get the current (exploitation) ranking of a platform's configs
+
+        Returns:
+            Configs ordered best first, with their decayed stats
+        """
+        stats = await self.get_stats(platform)
+        ranking = []
+        for config_name, entry in stats.items():
+            attempts = entry["successes"] + entry["failures"]
+            ranking.append(
+                {
+                    "config": config_name,
+                    "attempts": round(attempts, 2),
+                    "success_rate": round((entry["successes"] + 1) / (attempts + 2), 3),
+                    "mean_latency_seconds": round(
+                        entry["seconds"] / attempts if attempts else 0.0, 2
+                    ),
+                    "expected_seconds": round(self._expected_seconds(entry), 2),
+                }
+            )
+        ranking.sort(key=lambda item: item["expected_seconds"])
+        return ranking
+
+
+async def get_strategy_rankings(redis_client) -> Dict[str, Dict[str, List[Dict]]]:
+    """
+    Get the current ranking of every ladder and platform with recorded stats
+
+    Args:
+        redis_client: Redis client instance (sync or async)
+
+    Returns:
+        Mapping of ladder -> platform -> ranking (see ``get_ranking``)
+    """
+    members = await resolve(redis_client.smembers(STRATEGY_INDEX_KEY))
+    rankings: Dict[str, Dict[str, List[Dict]]] = {}
+    for member in sorted(to_text(m) for m in members):
+        ladder, _, platform = member.partition(":")
+        ranking = await StrategySelector(redis_client, ladder).get_ranking(platform)
+        if ranking:
+            rankings.setdefault(ladder, {})[platform] = ranking
+    return rankings
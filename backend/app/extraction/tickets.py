@@ -0,0 +1,183 @@
+"""
+Extraction tickets for asynchronous metadata extraction.
+
+A ticket is a short-lived Redis hash tracking one background extraction, so
+any API replica can answer polls and event streams for it. While a ticket is
+pending or running, further requests for the same URL are pointed at it
+instead of starting another extraction.
+"""
+
+import hashlib
+import json
+import time
+import uuid
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple
+
+from ..constants import ExtractionConfig
+
+TICKET_KEY_PREFIX = "extraction:ticket:"
+# Pointer from a URL to its in-progress ticket, for de-duplication
+TICKET_URL_KEY_PREFIX = "extraction:ticket_url:"
+
+
+class TicketStatus(str, Enum):
+    """Lifecycle of an extraction ticket"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+IN_PROGRESS_STATUSES = frozenset({TicketStatus.PENDING, TicketStatus.RUNNING})
+
+
+class ExtractionTicketStore:
+    """Redis-backed store of extraction tickets"""
+
+    def __init__(self, redis_client, ttl: int = ExtractionConfig.TICKET_TTL):
+        """
+        Initialize ticket store
+
+        Args:
+            redis_client: Async Redis client instance
+            ttl: Seconds a ticket (and its result) stays available
+        """
+        self.redis = redis_client
+        self.ttl = ttl
+
+    def _key(self, ticket_id: str) -> str:
+        return f"{TICKET_KEY_PREFIX}{ticket_id}"
+
+    def _url_key(self, url: str) -> str:
+        url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        return f"{TICKET_URL_KEY_PREFIX}{url_hash}"
+
+    async def _write(self, ticket_id: str, fields: Dict[str, Any]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(self._key(ticket_id), mapping=fields)
+        pipe.expire(self._key(ticket_id), self.ttl)
+        await pipe.execute()
+
+    async def create(
+        self, url: str, status: TicketStatus = TicketStatus.PENDING
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Create a ticket for a URL, reusing one already in progress
+
+        Args:
+            url: Video URL to extract
+            status: Initial status
+
+        Returns:
+            Tuple of (ticket, created). ``created`` is False when an in-progress
+            ticket for the same URL was returned instead.
+        """
+        ticket_id = uuid.uuid4().hex
+        now = time.time()
+        await self._write(
+            ticket_id,
+            {
+                "url": url,
+                "status": status.value,
+                "created_at": now,
+                "updated_at": now,
+            },
+        )
+        if status not in IN_PROGRESS_STATUSES:
+            return await self.get(ticket_id), True
+
+        url_key = self._url_key(url)
+        if not await self.redis.set(url_key, ticket_id, nx=True, ex=self.ttl):
+            existing_id = await self.redis.get(url_key)
+            existing = await self.get(existing_id) if existing_id else None
+            if existing and existing["status"] in IN_PROGRESS_STATUSES:
+                await self.redis.delete(self._key(ticket_id))
+                return existing, False
+            # The previous ticket finished or expired: take over the pointer
+            await self.redis.set(url_key, ticket_id, ex=self.ttl)
+
+        return await self.get(ticket_id), True
+
+    async def get(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a ticket by id
+
+        Returns:
+            Ticket dict, or None if unknown or expired
+        """
+        raw = await self.redis.hgetall(self._key(ticket_id))
+        if not raw:
+            return None
+
+        error = None
+        if raw.get("error_status"):
+            error = {
+                "status_code": int(raw["error_status"]),
+                "detail": raw.get("error_detail", ""),
+            }
+        return {
+            "ticket_id": ticket_id,
+            "url": raw.get("url", ""),
+            "status": raw.get("status", TicketStatus.PENDING.value),
+            "created_at": float(raw.get("created_at", 0)),
+            "updated_at": float(raw.get("updated_at", 0)),
+            "result": json.loads(raw["result"]) if raw.get("result") else None,
+            "error": error,
+        }
+
+    async def mark_running(self, ticket_id: str) -> None:
+        """Mark a ticket as picked up by the extraction pool"""
+        await self._write(
+            ticket_id,
+            {"status": TicketStatus.RUNNING.value, "updated_at": time.time()},
+        )
+
+    async def complete(self, ticket_id: str, url: str, result: Dict[str, Any]) -> None:
+        """
+        Store the result of a successful extraction
+
+        Args:
+            ticket_id: Ticket id
+            url: Video URL of the ticket
+            result: JSON-serialisable metadata
+        """
+        await self._write(
+            ticket_id,
+            {
+                "status": TicketStatus.DONE.value,
+                "updated_at": time.time(),
+                "result": json.dumps(result, default=str),
+            },
+        )
+        await self._release_url(ticket_id, url)
+
+    async def fail(
+        self, ticket_id: str, url: str, status_code: int, detail: str
+    ) -> None:
+        """
+        Store the error of a failed extraction
+
+        Args:
+            ticket_id: Ticket id
+            url: Video URL of the ticket
+            status_code: HTTP status the synchronous endpoint would return
+            detail: Error detail the synchronous endpoint would return
+        """
+        await self._write(
+            ticket_id,
+            {
+                "status": TicketStatus.FAILED.value,
+                "updated_at": time.time(),
+                "error_status": status_code,
+                "error_detail": detail,
+            },
+        )
+        await self._release_url(ticket_id, url)
+
+    async def _release_url(self, ticket_id: str, url: str) -> None:
+        """Drop the URL pointer so later requests start from the caches again"""
+        url_key = self._url_key(url)
+        if await self.redis.get(url_key) == ticket_id:
+            await self.redis.delete(url_key)
@@ -0,0 +1,398 @@
+"""
+Pool of long-lived ``yt_dlp.YoutubeDL`` instances keyed by options profile.
+
+Building a YoutubeDL loads the cookie jar, compiles the format selector and,
+on first request, sets up the HTTP request director with its connection
+pools. Pooled instances keep all of that between calls, so repeated
+extractions with the same options reuse warm connections and cookies.
+
+A profile is the options dict minus the per-call parameters (``format``,
+``outtmpl``, ``paths`` and ``progress_hooks``); those are applied on checkout
+and reset on return, so e.g. every download with the same headers and cookies
+shares instances regardless of its output path. YoutubeDL is not thread-safe,
+so an instance is only ever used by one caller at a time. Instances are
+recycled after a number of uses, after a maximum age, or after an unexpected
+error, so long-lived sessions and cookie jars do not go stale.
+
+YoutubeDL writes its cookie jar back to ``cookiefile`` when it is closed, so
+each instance loads and saves a private copy of the profile's cookie file;
+the shared (often content-addressed) file is never rewritten.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import yt_dlp
+from yt_dlp.utils import DownloadError
+
+from ..constants import ExtractionConfig
+from ..metrics import ytdlp_construction_seconds_saved_total, ytdlp_pool_checkouts_total
+
+logger = logging.getLogger(__name__)
+
+# Parameters applied per checkout instead of being part of the profile key
+PER_CALL_PARAMS = ("format", "outtmpl", "paths", "progress_hooks")
+
+
+@dataclass
+class _PooledInstance:
+    """A YoutubeDL plus the bookkeeping needed to reuse it safely"""
+
+    ydl: Any
+    created_at: float
+    uses: int = 0
+    # Progress hooks of the current checkout, called by a dispatcher hook
+    hooks: List[Callable[[Dict], None]] = field(default_factory=list)
+    # Private copy of the profile's cookie file, removed once closed
+    cookie_file: Optional[str] = None
+
+
+def _copy_cookie_file(cookie_file: str) -> Optional[str]:
+    """Copy a cookie file for one instance, None if it cannot be read"""
+    fd, copy = tempfile.mkstemp(prefix="ydl_cookies_", suffix=".txt")
+    os.close(fd)
+    try:
+        shutil.copyfile(os.path.expanduser(cookie_file), copy)
+    except OSError as e:
+        logger.debug(f"Failed to copy cookie file {cookie_file}: {e}")
+        _remove_cookie_file(copy)
+        return None
+    return copy
+
+
+def _remove_cookie_file(cookie_file: Optional[str]) -> None:
+    if cookie_file is None:
+        return
+    try:
+        os.unlink(cookie_file)
+    except OSError:
+        pass
+
+
+@dataclass
+class _Profile:
+    """Idle instances and statistics of one options profile"""
+
+    label: str
+    idle: List[_PooledInstance] = field(default_factory=list)
+    hits: int = 0
+    misses: int = 0
+    recycled: int = 0
+    construction_seconds: float = 0.0  # Total spent building instances
+    seconds_saved: float = 0.0  # Estimated construction time avoided
+
+    @property
+    def avg_construction_seconds(self) -> float:
+        return self.construction_seconds / self.misses if self.misses else 0.0
+
+
+class YoutubeDLPool:
+    """Keyed pool of reusable YoutubeDL instances"""
+
+    def __init__(
+        self,
+        max_idle_per_profile: int = ExtractionConfig.POOL_MAX_IDLE_PER_PROFILE,
+        max_profiles: int = ExtractionConfig.POOL_MAX_PROFILES,
+        max_uses: int = ExtractionConfig.POOL_MAX_USES,
+        max_age: float = ExtractionConfig.POOL_MAX_AGE,
+        factory: Optional[Callable[[Dict], Any]] = None,
+    ):
+        """
+        Initialize YoutubeDL pool
+
+        Args:
+            max_idle_per_profile: Idle instances kept per profile
+            max_profiles: Profiles kept before the least recently used is dropped
+            max_uses: Checkouts after which an instance is recycled
+            max_age: Seconds after which an instance is recycled
+            factory: Builds an instance from options (defaults to YoutubeDL)
+        """
+        self.max_idle_per_profile = max_idle_per_profile
+        self.max_profiles = max_profiles
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._factory = factory
+        self._profiles: "OrderedDict[str, _Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def profile_key(opts: Dict) -> str:
+        """Stable hash of the options that define a profile"""
+        profile_opts = {k: v for k, v in opts.items() if k not in PER_CALL_PARAMS}
+        encoded = json.dumps(profile_opts, sort_keys=True, default=repr)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+    def _build(self, profile_opts: Dict) -> _PooledInstance:
+        """Construct a new instance with a dispatcher for per-call hooks"""
+        factory = self._factory or yt_dlp.YoutubeDL
+        opts = dict(profile_opts)
+        cookie_file = None
+        if isinstance(opts.get("cookiefile"), str):
+            # Closing saves the jar; only this instance's copy may be rewritten
+            cookie_file = _copy_cookie_file(opts["cookiefile"])
+            if cookie_file is not None:
+                opts["cookiefile"] = cookie_file
+        try:
+            ydl = factory(opts)
+        except BaseException:
+            _remove_cookie_file(cookie_file)
+            raise
+        instance = _PooledInstance(
+            ydl=ydl, created_at=time.monotonic(), cookie_file=cookie_file
+        )
+
+        def dispatch(status: Dict) -> None:
+            for hook in list(instance.hooks):
+                hook(status)
+
+        instance.ydl.add_progress_hook(dispatch)
+        return instance
+
+    def _acquire(self, key: str, opts: Dict, label: str) -> _PooledInstance:
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = _Profile(label=label)
+                evicted = self._evict_profiles()
+            else:
+                evicted = []
+            self._profiles.move_to_end(key)
+
+            instance = profile.idle.pop() if profile.idle else None
+            saved = profile.avg_construction_seconds
+            if instance is not None:
+                profile.hits += 1
+                profile.seconds_saved += saved
+            else:
+                profile.misses += 1
+
+        for stale in evicted:
+            self._close(stale)
+
+        if instance is not None:
+            ytdlp_pool_checkouts_total.labels(label, "hit").inc()
+            ytdlp_construction_seconds_saved_total.labels(label).inc(saved)
+            return instance
+
+        started = time.perf_counter()
+        instance = self._build(
+            {k: v for k, v in opts.items() if k not in PER_CALL_PARAMS}
+        )
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            profile.construction_seconds += elapsed
+        ytdlp_pool_checkouts_total.labels(label, "miss").inc()
+        logger.debug(f"🧰 Built YoutubeDL for profile '{label}' in {elapsed:.3f}s")
+        return instance
+
+    def _evict_profiles(self) -> List[_PooledInstance]:
+        """Drop least recently used profiles over the limit (lock held)"""
+        evicted: List[_PooledInstance] = []
+        while len(self._profiles) > self.max_profiles:
+            _, profile = self._profiles.popitem(last=False)
+            evicted.extend(profile.idle)
+        return evicted
+
+    def _release(self, key: str, instance: _PooledInstance, healthy: bool) -> None:
+        instance.uses += 1
+        expired = (
+            not healthy
+            or instance.uses >= self.max_uses
+            or time.monotonic() - instance.created_at >= self.max_age
+        )
+
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None and expired:
+                profile.recycled += 1
+            keep = (
+                profile is not None
+                and not expired
+                and len(profile.idle) < self.max_idle_per_profile
+            )
+            if keep:
+                profile.idle.append(instance)
+
+        if not keep:
+            self._close(instance)
+
+    @staticmethod
+    def _close(instance: _PooledInstance) -> None:
+        """Close an instance (saves cookies, closes HTTP connections)"""
+        try:
+            instance.ydl.close()
+        except Exception as e:
+            logger.debug(f"Failed to close pooled YoutubeDL: {e}")
+        _remove_cookie_file(instance.cookie_file)
+
+    @staticmethod
+    def _apply_per_call(instance: _PooledInstance, opts: Dict) -> Dict[str, Any]:
+        """
+        Apply per-call parameters to a checked-out instance
+
+        Returns:
+            Previous parameter values, for ``_reset``
+        """
+        ydl = instance.ydl
+        saved = {
+            "format": ydl.params.get("format"),
+            "outtmpl": ydl.params.get("outtmpl"),
+            "paths": ydl.params.get("paths"),
+            "format_selector": getattr(ydl, "format_selector", None),
+        }
+
+        if opts.get("format") is not None:
+            ydl.params["format"] = opts["format"]
+            ydl.format_selector = ydl.build_format_selector(opts["format"])
+        if opts.get("outtmpl") is not None:
+            # Templates are read at filename time; other types keep defaults
+            outtmpl = opts["outtmpl"]
+            if not isinstance(outtmpl, dict):
+                outtmpl = {"default": outtmpl}
+            ydl.params["outtmpl"] = {**(saved["outtmpl"] or {}), **outtmpl}
+        if opts.get("paths") is not None:
+            ydl.params["paths"] = opts["paths"]
+        instance.hooks[:] = list(opts.get("progress_hooks") or [])
+        return saved
+
+    @staticmethod
+    def _reset(instance: _PooledInstance, saved: Dict[str, Any]) -> None:
+        """Restore the profile's own parameters after a checkout"""
+        ydl = instance.ydl
+        instance.hooks.clear()
+        for name in ("format", "outtmpl", "paths"):
+            if saved[name] is None:
+                ydl.params.pop(name, None)
+            else:
+                ydl.params[name] = saved[name]
+        ydl.format_selector = saved["format_selector"]
+
+    @contextmanager
+    def checkout(self, opts: Dict, label: Optional[str] = None) -> Iterator[Any]:
+        """
+        Borrow an instance for the given options
+
+        Args:
+            opts: Full yt-dlp options, including any per-call parameters
+            label: Human-readable profile name for statistics
+
+        Yields:
+            A YoutubeDL configured with ``opts``, exclusively owned until exit
+        """
+        key = self.profile_key(opts)
+        label = label or key
+        instance = self._acquire(key, opts, label)
+        healthy = True
+        saved = None
+        try:
+            saved = self._apply_per_call(instance, opts)
+            yield instance.ydl
+        except DownloadError:
+            # Ordinary extraction failures leave the instance reusable
+            raise
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            if saved is not None:
+                try:
+                    self._reset(instance, saved)
+                except Exception:
+                    healthy = False
+            else:
+                healthy = False
+            self._release(key, instance, healthy)
+
+    def prewarm(self, opts: Dict, count: int = 1, label: Optional[str] = None) -> int:
+        """
+        Build idle instances for a profile ahead of the first request
+
+        Returns:
+            Number of instances added
+        """
+        key = self.profile_key(opts)
+        profile_opts = {k: v for k, v in opts.items() if k not in PER_CALL_PARAMS}
+        added = 0
+        for _ in range(count):
+            started = time.perf_counter()
+            instance = self._build(profile_opts)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                profile = self._profiles.get(key)
+                if profile is None:
+                    profile = self._profiles[key] = _Profile(label=label or key)
+                # Counted as a miss so the construction average includes it
+                profile.misses += 1
+                profile.construction_seconds += elapsed
+                if len(profile.idle) >= self.max_idle_per_profile:
+                    keep = False
+                else:
+                    profile.idle.append(instance)
+                    keep = True
+            if not keep:
+                self._close(instance)
+                break
+            added += 1
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-profile pool statistics
+
+        Returns:
+            Totals plus, per profile, hits, misses, idle instances, average
+            construction time and the construction time saved per call
+        """
+        with self._lock:
+            profiles = []
+            for key, profile in self._profiles.items():
+                calls = profile.hits + profile.misses
+                profiles.append(
+                    {
+                        "profile": profile.label,
+                        "key": key,
+                        "hits": profile.hits,
+                        "misses": profile.misses,
+                        "idle": len(profile.idle),
+                        "recycled": profile.recycled,
+                        "avg_construction_seconds": round(
+                            profile.avg_construction_seconds, 4
+                        ),
+                        "seconds_saved": round(profile.seconds_saved, 3),
+                        "seconds_saved_per_call": round(
+                            profile.seconds_saved / calls if calls else 0.0, 4
+                        ),
+                    }
+                )
+
+        hits = sum(p["hits"] for p in profiles)
+        calls = hits + sum(p["misses"] for p in profiles)
+        return {
+            "hit_ratio": round(hits / calls, 3) if calls else 0.0,
+            "seconds_saved": round(sum(p["seconds_saved"] for p in profiles), 3),
+            "profiles": profiles,
+        }
+
+    def clear(self) -> None:
+        """Close every idle instance and forget all profiles"""
+        with self._lock:
+            idle = [i for p in self._profiles.values() for i in p.idle]
+            self._profiles.clear()
+        for instance in idle:
+            self._close(instance)
+
+
+# Process-wide pool shared by the API and worker extraction paths
+ydl_pool = YoutubeDLPool()
+atexit.register(ydl_pool.clear)
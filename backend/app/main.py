@@ -1,3 +1,5 @@
+import asyncio
+import functools
 import os
 from pathlib import Path
 
@@ -17,11 +19,14 @@ except ImportError:
 
 from .api import clips, jobs, metadata
 from .api import phase3_endpoints as admin
-from .api import video_proxy
+from .api import preview, video_proxy
 from .config import get_settings
+from .extraction import ydl_pool
 from .middleware.admin_auth import AdminAuthMiddleware
 from .middleware.queue_protection import QueueDosProtectionMiddleware
 from .middleware.security_headers import SecurityHeadersMiddleware
+from .queue import queue_health_sampler
+from .utils.http_client import close_http_client, get_http_client
 
 # Get settings instance
 settings = get_settings()
@@ -118,6 +123,32 @@ async def startup_event():
     print(f"✅ Storage backend: {settings.storage_backend}")
     print("✅ Configuration validated successfully")
 
+    # Pre-warm a YoutubeDL for the default metadata profile off the event loop
+    try:
+        asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                ydl_pool.prewarm,
+                metadata.get_optimized_ydl_opts(),
+                label="metadata:youtube:optimized",
+            ),
+        )
+    except Exception as e:
+        print(f"⚠️ Could not pre-warm yt-dlp pool: {e}")
+
+    # Create the shared HTTP client up front so the first proxy request doesn't
+    get_http_client()
+
+    # Admission control reads queue health sampled in the background
+    queue_health_sampler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release connections held for the lifetime of the app"""
+    await queue_health_sampler.stop()
+    await close_http_client()
+
 
 # Add CORS middleware with explicit configuration for development
 app.add_middleware(
@@ -163,6 +194,7 @@ app.include_router(clips.router, prefix="/api/v1", tags=["clips"])
 app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
 app.include_router(metadata.router, prefix="/api/v1", tags=["metadata"])
 app.include_router(video_proxy.router, prefix="/api/v1/video", tags=["video-proxy"])
+app.include_router(preview.router, prefix="/api/v1", tags=["preview"])
 app.include_router(admin.router, tags=["admin"])  # Admin endpoints with authentication
 
 
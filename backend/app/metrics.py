@@ -21,6 +21,100 @@ try:
         name="clip_jobs_queued_total", documentation="Jobs accepted via POST /jobs"
     )
 
+    # Metadata cache accounting
+    metadata_cache_requests_total = Counter(
+        name="metadata_cache_requests_total",
+        documentation="Metadata cache lookups by result (hit, stale, miss, error)",
+        labelnames=["cache_type", "platform", "result"],
+    )
+
+    metadata_cache_operation_seconds = Histogram(
+        name="metadata_cache_operation_seconds",
+        documentation="Metadata cache get/set latency",
+        labelnames=["cache_type", "platform", "operation"],
+        buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25],
+    )
+
+    metadata_cache_entry_bytes = Histogram(
+        name="metadata_cache_entry_bytes",
+        documentation="Encoded size of metadata cache entries written to Redis",
+        labelnames=["cache_type"],
+        buckets=[256, 1024, 2048, 4096, 8192, 16384, 32768, 65536],
+    )
+
+    metadata_extraction_seconds = Histogram(
+        name="metadata_extraction_seconds",
+        documentation="yt-dlp metadata extraction time (the cost of a cache miss)",
+        labelnames=["platform", "outcome"],
+        buckets=[1, 2.5, 5, 10, 20, 30, 60, 120],
+    )
+
+    metadata_extraction_hedges_total = Counter(
+        name="metadata_extraction_hedges_total",
+        documentation="Hedged yt-dlp attempts, launched and won (first to succeed)",
+        labelnames=["platform", "result"],
+    )
+
+    ytdlp_pool_checkouts_total = Counter(
+        name="ytdlp_pool_checkouts_total",
+        documentation="YoutubeDL pool checkouts by profile, hit (reused) or miss (built)",
+        labelnames=["profile", "result"],
+    )
+
+    ytdlp_construction_seconds_saved_total = Counter(
+        name="ytdlp_construction_seconds_saved_total",
+        documentation="Estimated YoutubeDL construction time avoided by pool reuse",
+        labelnames=["profile"],
+    )
+
+    cookie_session_events_total = Counter(
+        name="cookie_session_events_total",
+        documentation="Cookie session acquisitions, exhausted pools and cool-downs by cause",
+        labelnames=["platform", "event"],
+    )
+
+    politeness_wait_seconds = Histogram(
+        name="politeness_wait_seconds",
+        documentation="Time yt-dlp calls waited for a platform politeness slot",
+        labelnames=["platform", "priority", "result"],
+        buckets=[0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300],
+    )
+
+    extraction_circuit_events_total = Counter(
+        name="extraction_circuit_events_total",
+        documentation="Circuit breaker openings, recoveries and rejected attempts per platform",
+        labelnames=["platform", "event"],
+    )
+
+    video_proxy_bytes_total = Counter(
+        name="video_proxy_bytes_total",
+        documentation="Bytes served by the video proxy, by source (cache or upstream)",
+        labelnames=["source"],
+    )
+
+    rate_limit_checks_total = Counter(
+        name="rate_limit_checks_total",
+        documentation="Rate limit checks by where they were decided and the result",
+        labelnames=["source", "result"],
+    )
+
+    clip_queue_jobs = Gauge(
+        name="clip_queue_jobs",
+        documentation="Clip jobs by status, as last sampled for admission control",
+        labelnames=["status"],
+    )
+
+    clip_workers_alive = Gauge(
+        name="clip_workers_alive",
+        documentation="Workers that sent a heartbeat recently",
+    )
+
+    client_state_evictions_total = Counter(
+        name="client_state_evictions_total",
+        documentation="Per-client rate limit state dropped, by table and reason",
+        labelnames=["table", "reason"],
+    )
+
 except ImportError:
     METRICS_AVAILABLE = False
     print("Warning: prometheus_client not available, metrics disabled")
@@ -36,6 +130,27 @@ except ImportError:
         def set(self, *args, **kwargs):
             pass
 
+        def labels(self, *args, **kwargs):
+            return self
+
+        def collect(self):
+            return []
+
     clip_job_latency_seconds: "Histogram" = DummyMetric()  # type: ignore
     clip_jobs_inflight: "Gauge" = DummyMetric()  # type: ignore
     clip_jobs_queued_total: "Counter" = DummyMetric()  # type: ignore
+    metadata_cache_requests_total: "Counter" = DummyMetric()  # type: ignore
+    metadata_cache_operation_seconds: "Histogram" = DummyMetric()  # type: ignore
+    metadata_cache_entry_bytes: "Histogram" = DummyMetric()  # type: ignore
+    metadata_extraction_seconds: "Histogram" = DummyMetric()  # type: ignore
+    metadata_extraction_hedges_total: "Counter" = DummyMetric()  # type: ignore
+    ytdlp_pool_checkouts_total: "Counter" = DummyMetric()  # type: ignore
+    ytdlp_construction_seconds_saved_total: "Counter" = DummyMetric()  # type: ignore
+    cookie_session_events_total: "Counter" = DummyMetric()  # type: ignore
+    politeness_wait_seconds: "Histogram" = DummyMetric()  # type: ignore
+    extraction_circuit_events_total: "Counter" = DummyMetric()  # type: ignore
+    video_proxy_bytes_total: "Counter" = DummyMetric()  # type: ignore
+    rate_limit_checks_total: "Counter" = DummyMetric()  # type: ignore
+    client_state_evictions_total: "Counter" = DummyMetric()  # type: ignore
+    clip_queue_jobs: "Gauge" = DummyMetric()  # type: ignore
+    clip_workers_alive: "Gauge" = DummyMetric()  # type: ignore
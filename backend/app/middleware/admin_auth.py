@@ -3,6 +3,7 @@ Administrative endpoint authentication middleware.
 Secures /api/v1/admin/* endpoints with API key authentication.
 """
 
+import hmac
 import os
 from typing import Callable
 
@@ -10,11 +11,26 @@ from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from ..config.configuration import get_settings
 from ..logging.config import get_logger
 
 logger = get_logger(__name__)
 
 
+def is_admin_request(request: Request) -> bool:
+    """
+    Check whether a request carries valid admin credentials.
+
+    Public endpoints use this to honour admin-only options (such as
+    bypassing caches) without being mounted under /api/v1/admin/.
+    """
+    admin_api_key = get_settings().admin_api_key or os.getenv("ADMIN_API_KEY")
+    auth_header = request.headers.get("Authorization", "")
+    if not admin_api_key or not auth_header.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(auth_header[7:], admin_api_key)
+
+
 class AdminAuthMiddleware(BaseHTTPMiddleware):
     """
     Middleware to secure administrative endpoints with API key authentication.
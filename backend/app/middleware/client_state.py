@@ -0,0 +1,171 @@
+"""
+Compact, bounded per-client state for the rate limiter and DoS protection.
+
+Client IPs come from request headers, so a spoofed ``X-Forwarded-For``
+flood can mint a new client per request. State tables are therefore capped
+LRU maps: inserting past the cap evicts the least recently seen client.
+
+Entries expire after a fixed idle time, which makes the LRU order the
+expiry order as well: the expired entries are always the oldest ones, so
+expiry pops from the head until it meets a live entry instead of scanning
+every client, and runs in small batches on insertion rather than in one
+long pass.
+"""
+
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Generic, Iterator, Optional, Tuple, TypeVar
+
+from ..metrics import client_state_evictions_total
+
+V = TypeVar("V")
+
+# Idle entries expired per insertion, keeping every request's share small
+EXPIRY_BATCH = 64
+
+
+class BoundedClientMap(Generic[V]):
+    """LRU map of per-client state with a size cap and idle expiry"""
+
+    __slots__ = ("name", "max_size", "idle_ttl", "_last_seen", "_clock", "_entries")
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        idle_ttl: float,
+        last_seen: Callable[[V], float],
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize client map
+
+        Args:
+            name: Table name, for metrics
+            max_size: Clients tracked at most
+            idle_ttl: Seconds after which an entry not seen expires
+            last_seen: Returns when an entry was last seen (on ``clock``)
+            clock: Time source of ``last_seen``
+        """
+        self.name = name
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._last_seen = last_seen
+        self._clock = clock
+        self._entries: "OrderedDict[str, V]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: str) -> V:
+        return self._entries[key]
+
+    def __delitem__(self, key: str) -> None:
+        del self._entries[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def items(self) -> Iterator[Tuple[str, V]]:
+        return iter(self._entries.items())
+
+    def get(self, key: str, default: Optional[V] = None) -> Optional[V]:
+        """Look an entry up without marking it seen"""
+        return self._entries.get(key, default)
+
+    def pop(self, key: str, default: Optional[V] = None) -> Optional[V]:
+        return self._entries.pop(key, default)
+
+    def __setitem__(self, key: str, value: V) -> None:
+        """Store an entry as the most recently seen one"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._make_room()
+
+    def get_or_create(self, key: str, factory: Callable[[], V]) -> V:
+        """
+        Get a client's entry, creating it if needed, and mark it seen
+
+        Callers update the entry's ``last_seen`` time themselves.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        entry = factory()
+        self[key] = entry
+        return entry
+
+    def _make_room(self) -> None:
+        self.expire(limit=EXPIRY_BATCH)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            client_state_evictions_total.labels(self.name, "capacity").inc()
+
+    def expire(self, now: Optional[float] = None, limit: Optional[int] = None) -> int:
+        """
+        Drop entries idle for longer than ``idle_ttl``
+
+        Args:
+            now: Current time on the map's clock
+            limit: Entries dropped at most, None for all expired ones
+
+        Returns:
+            Number of entries dropped
+        """
+        cutoff = (self._clock() if now is None else now) - self.idle_ttl
+        expired = 0
+        while self._entries and (limit is None or expired < limit):
+            key = next(iter(self._entries))
+            if self._last_seen(self._entries[key]) >= cutoff:
+                break
+            del self._entries[key]
+            expired += 1
+        if expired:
+            client_state_evictions_total.labels(self.name, "idle").inc(expired)
+        return expired
+
+
+class TimeRing:
+    """
+    The most recent timestamps of a client, oldest first
+
+    Backed by a ``array('d')`` that grows up to ``maxlen`` and then wraps
+    around: 8 bytes per timestamp instead of a float object and deque slot.
+    """
+
+    __slots__ = ("maxlen", "_times", "_head")
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._times = array("d")
+        self._head = 0  # Index of the oldest timestamp once full
+
+    def append(self, timestamp: float) -> None:
+        if len(self._times) < self.maxlen:
+            self._times.append(timestamp)
+        else:
+            self._times[self._head] = timestamp
+            self._head = (self._head + 1) % self.maxlen
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def __bool__(self) -> bool:
+        return bool(self._times)
+
+    def __getitem__(self, index: int) -> float:
+        """Timestamp by age order; negative indexes count from the newest"""
+        size = len(self._times)
+        if not -size <= index < size:
+            raise IndexError("TimeRing index out of range")
+        return self._times[(self._head + index % size) % size]
+
+    def __iter__(self) -> Iterator[float]:
+        for index in range(len(self._times)):
+            yield self[index]
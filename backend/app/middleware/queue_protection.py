@@ -4,9 +4,7 @@ Comprehensive protection against queue draining and resource exhaustion attacks.
 Implements circuit breaker, queue monitoring, and advanced rate limiting.
 """
 
-import asyncio
 import time
-from collections import deque
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any, Dict, List, Optional, Tuple
@@ -18,6 +16,8 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from ..config.configuration import get_settings
 from ..constants import RateLimits
 from ..logging.config import get_logger
+from ..queue.health import QueueHealthSampler, queue_health_sampler
+from .client_state import BoundedClientMap, TimeRing
 
 logger = get_logger(__name__)
 
@@ -40,20 +40,21 @@ class QueueMetrics:
     average_processing_time: float
     error_rate: float
     timestamp: float
+    workers: int = 0
+    pending_work_seconds: float = 0.0  # Estimated worker time of the queue
+    work_capacity: float = 0.0  # Pending work allowed for the live workers
 
 
-@dataclass
+@dataclass(slots=True)
 class IPBehavior:
     """IP behavior tracking for advanced DoS detection"""
 
-    request_times: deque
-    job_submissions: deque
+    request_times: TimeRing
+    job_submissions: TimeRing
     burst_violations: int
     last_burst_time: float
-    total_jobs_today: int
-    last_daily_reset: float
-    concurrent_jobs: int
     penalty_until: float
+    last_seen: float
 
 
 class CircuitBreaker:
@@ -113,24 +114,37 @@ class CircuitBreaker:
 class QueueDosProtection:
     """Advanced Queue DoS Protection System"""
 
-    def __init__(self, redis_client=None, bypass_protection_for_tests=False):
+    def __init__(
+        self,
+        redis_client=None,
+        bypass_protection_for_tests=False,
+        queue_health: Optional[QueueHealthSampler] = None,
+    ):
         self.redis_client = redis_client
         self.settings = get_settings()
         self.bypass_protection_for_tests = bypass_protection_for_tests
 
+        # Queue depth comes from a snapshot sampled in the background
+        self.queue_health = queue_health or queue_health_sampler
+
         # Circuit breaker
         self.circuit_breaker = CircuitBreaker()
 
-        # IP behavior tracking
-        self.ip_behaviors: Dict[str, IPBehavior] = {}
-
-        # Queue metrics
-        self.queue_metrics_history: List[QueueMetrics] = []
-
         # Cleanup intervals
         self.last_cleanup = time.time()
         self.cleanup_interval = 300  # 5 minutes
 
+        # IP behavior tracking, dropped after the cleanup interval idle
+        self.ip_behaviors: BoundedClientMap[IPBehavior] = BoundedClientMap(
+            "ip_behaviors",
+            max_size=RateLimits.MAX_TRACKED_CLIENTS,
+            idle_ttl=self.cleanup_interval,
+            last_seen=lambda behavior: behavior.last_seen,
+        )
+
+        # Queue metrics
+        self.queue_metrics_history: List[QueueMetrics] = []
+
         # Endpoints that bypass protection
         self.bypass_endpoints = {
             "/health",
@@ -153,64 +167,27 @@ class QueueDosProtection:
 
     def get_or_create_ip_behavior(self, client_ip: str) -> IPBehavior:
         """Get or create IP behavior tracking"""
-        if client_ip not in self.ip_behaviors:
-            now = time.time()
-            self.ip_behaviors[client_ip] = IPBehavior(
-                request_times=deque(maxlen=100),
-                job_submissions=deque(maxlen=50),
+        now = time.time()
+        ip_behavior = self.ip_behaviors.get_or_create(
+            client_ip,
+            lambda: IPBehavior(
+                # Only as many timestamps as the burst and hourly checks look at
+                request_times=TimeRing(RateLimits.MAX_BURST_REQUESTS + 5),
+                job_submissions=TimeRing(RateLimits.JOBS_PER_HOUR),
                 burst_violations=0,
                 last_burst_time=0,
-                total_jobs_today=0,
-                last_daily_reset=now,
-                concurrent_jobs=0,
                 penalty_until=0,
-            )
-
-        return self.ip_behaviors[client_ip]
+                last_seen=now,
+            ),
+        )
+        ip_behavior.last_seen = now
+        return ip_behavior
 
     async def get_queue_metrics(self) -> QueueMetrics:
-        """Get current queue health metrics"""
-        try:
-            if not self.redis_client:
-                # Fallback metrics when Redis unavailable
-                return QueueMetrics(
-                    current_depth=0,
-                    processing_jobs=0,
-                    failed_jobs_last_hour=0,
-                    average_processing_time=0.0,
-                    error_rate=0.0,
-                    timestamp=time.time(),
-                )
-
-            # Get queue depth
-            queue_depth = (
-                await asyncio.to_thread(self.redis_client.llen, "rq:queue:default")
-                if hasattr(self.redis_client, "llen")
-                else 0
-            )
-
-            # Get processing jobs (simplified)
-            processing_jobs = queue_depth  # Simplified metric
-
-            # Calculate basic metrics
-            metrics = QueueMetrics(
-                current_depth=queue_depth,
-                processing_jobs=processing_jobs,
-                failed_jobs_last_hour=0,  # Simplified
-                average_processing_time=30.0,  # Estimated
-                error_rate=self.circuit_breaker.failure_count
-                / max(self.circuit_breaker.request_count, 1),
-                timestamp=time.time(),
-            )
-
-            # Store metrics history
-            self.queue_metrics_history.append(metrics)
-            if len(self.queue_metrics_history) > 100:
-                self.queue_metrics_history.pop(0)
-
-            return metrics
-        except Exception as e:
-            logger.error(f"Error getting queue metrics: {e}")
+        """Get current queue health metrics from the latest sampled snapshot"""
+        snapshot = self.queue_health.current()
+        if snapshot is None:
+            # Fallback metrics when no recent sample (Redis unavailable)
             return QueueMetrics(
                 current_depth=0,
                 processing_jobs=0,
@@ -220,6 +197,26 @@ class QueueDosProtection:
                 timestamp=time.time(),
             )
 
+        metrics = QueueMetrics(
+            current_depth=snapshot.queued,
+            processing_jobs=snapshot.working,
+            failed_jobs_last_hour=snapshot.failed,
+            average_processing_time=30.0,  # Estimated
+            error_rate=self.circuit_breaker.failure_count
+            / max(self.circuit_breaker.request_count, 1),
+            timestamp=time.time(),
+            workers=snapshot.workers,
+            pending_work_seconds=snapshot.pending_work_seconds,
+            work_capacity=snapshot.work_capacity,
+        )
+
+        # Store metrics history
+        self.queue_metrics_history.append(metrics)
+        if len(self.queue_metrics_history) > 100:
+            self.queue_metrics_history.pop(0)
+
+        return metrics
+
     def check_burst_detection(
         self, ip_behavior: IPBehavior, client_ip: str, request_method: str = "GET"
     ) -> Tuple[bool, Optional[str]]:
@@ -272,35 +269,21 @@ class QueueDosProtection:
     def check_job_limits(
         self, ip_behavior: IPBehavior, client_ip: str, is_job_request: bool
     ) -> Tuple[bool, Optional[str]]:
-        """Check job submission limits"""
+        """
+        Check job submission floods
+
+        Clients are admitted by the worker-seconds quota that POST /jobs
+        charges; this hourly count is only a backstop against floods.
+        """
         now = time.time()
 
         # Skip job limits for test client when bypass is enabled
         if self.bypass_protection_for_tests and client_ip == "testclient":
             return True, None
 
-        # Reset daily counters if needed
-        if now - ip_behavior.last_daily_reset >= RateLimits.DAY_WINDOW:
-            ip_behavior.total_jobs_today = 0
-            ip_behavior.last_daily_reset = now
-
         # Only apply limits for job creation requests
         if is_job_request:
-            # Check concurrent job limit
-            if ip_behavior.concurrent_jobs >= RateLimits.CONCURRENT_JOBS_PER_IP:
-                return (
-                    False,
-                    f"Concurrent job limit exceeded: {ip_behavior.concurrent_jobs}/{RateLimits.CONCURRENT_JOBS_PER_IP}",
-                )
-
-            # Check daily job limit
-            if ip_behavior.total_jobs_today >= RateLimits.JOBS_PER_DAY:
-                return (
-                    False,
-                    f"Daily job limit exceeded: {ip_behavior.total_jobs_today}/{RateLimits.JOBS_PER_DAY}",
-                )
-
-            # Check hourly job limit
+            # Check hourly flood backstop
             recent_jobs = [
                 t
                 for t in ip_behavior.job_submissions
@@ -322,9 +305,16 @@ class QueueDosProtection:
         if self.bypass_protection_for_tests:
             return True, None
 
-        # Check queue depth
-        if metrics.current_depth > RateLimits.MAX_QUEUE_DEPTH:
-            return False, f"Queue depth limit exceeded: {metrics.current_depth}"
+        # Check queued work, in estimated worker-seconds rather than jobs
+        if (
+            metrics.work_capacity
+            and metrics.pending_work_seconds > metrics.work_capacity
+        ):
+            return (
+                False,
+                f"Queue work limit exceeded: {metrics.pending_work_seconds:.0f}s "
+                f"of work for {metrics.workers} workers",
+            )
 
         # Check error rate
         if metrics.error_rate > RateLimits.ERROR_RATE_THRESHOLD:
@@ -394,17 +384,12 @@ class QueueDosProtection:
         # Track successful validation
         if is_job_request:
             ip_behavior.job_submissions.append(now)
-            ip_behavior.total_jobs_today += 1
-            ip_behavior.concurrent_jobs += 1
 
         return True, None
 
     def record_job_completion(self, client_ip: str, success: bool):
         """Record job completion for IP"""
         if client_ip in self.ip_behaviors:
-            ip_behavior = self.ip_behaviors[client_ip]
-            ip_behavior.concurrent_jobs = max(0, ip_behavior.concurrent_jobs - 1)
-
             if success:
                 self.circuit_breaker.record_success()
             else:
@@ -413,18 +398,9 @@ class QueueDosProtection:
     async def cleanup_old_data(self):
         """Clean up old tracking data"""
         now = time.time()
-        expired_ips = []
-
-        for ip, behavior in self.ip_behaviors.items():
-            # Remove IPs with no recent activity
-            if (
-                not behavior.request_times
-                or now - behavior.request_times[-1] > self.cleanup_interval
-            ):
-                expired_ips.append(ip)
 
-        for ip in expired_ips:
-            del self.ip_behaviors[ip]
+        # Remove IPs with no recent activity, oldest first
+        self.ip_behaviors.expire(now)
 
         # Trim metrics history
         while (
@@ -479,5 +455,7 @@ async def get_queue_protection_status(protection: QueueDosProtection) -> Dict[st
         "circuit_breaker_state": protection.circuit_breaker.state.value,
         "queue_depth": metrics.current_depth,
         "error_rate": metrics.error_rate,
+        "workers": metrics.workers,
+        "pending_work_seconds": metrics.pending_work_seconds,
         "tracked_ips": len(protection.ip_behaviors),
     }
@@ -1,12 +1,24 @@
 """
 Rate limiting middleware using token bucket algorithm.
 Implements per-IP and per-endpoint rate limiting for API security.
+
+With Redis available, buckets are shared by every API process: each check
+is one atomic Lua call evaluating GCRA (the token bucket expressed as a
+"theoretical arrival time" per key). To keep that to at most one round-trip,
+a process leases a few tokens at once and spends them locally for up to
+``RateLimits.LOCAL_LEASE_SECONDS``; unspent tokens are handed back with the
+next call for the key. Known denials are also answered locally until they
+expire. Without Redis, every process keeps its own in-memory buckets.
+
+All per-client state lives in ``BoundedClientMap`` tables capped at
+``RateLimits.MAX_TRACKED_CLIENTS`` entries each, so spoofed client IPs cannot
+grow it without bound.
 """
 
+import math
 import time
-from collections import defaultdict
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
@@ -15,11 +27,69 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from ..config.configuration import get_settings
 from ..constants import RateLimits
 from ..logging.config import get_logger
+from ..metrics import rate_limit_checks_total
+from .client_state import BoundedClientMap
 
 logger = get_logger(__name__)
 
+RATE_LIMIT_KEY_PREFIX = "ratelimit:"
+
+# KEYS: bucket keys, all checked and charged together
+# ARGV: per key: emission interval (ms), burst, tokens wanted, tokens refunded
+# Returns {1, 0, granted, remaining, granted, remaining, ...} when every key
+# grants at least one token, else {0, retry_after_ms, index of denying key}.
+# Refunds are applied either way; tokens are only charged when all keys grant.
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local tats, available, denied = {}, {}, nil
+for i = 1, #KEYS do
+    local base = (i - 1) * 4
+    local interval = tonumber(ARGV[base + 1])
+    local burst = tonumber(ARGV[base + 2])
+    local refund = tonumber(ARGV[base + 4])
+
+    local tat = tonumber(redis.call('GET', KEYS[i])) or now
+    tats[i] = math.max(tat - refund * interval, now)
+    available[i] = math.floor((now + burst * interval - tats[i]) / interval)
+    if available[i] < 1 and not denied then
+        denied = {0, math.ceil(tats[i] + interval - burst * interval - now), i}
+    end
+end
+
+local result = {1, 0}
+if not denied then
+    for i = 1, #KEYS do
+        local granted = math.min(tonumber(ARGV[(i - 1) * 4 + 3]), available[i])
+        tats[i] = tats[i] + granted * tonumber(ARGV[(i - 1) * 4 + 1])
+        table.insert(result, granted)
+        table.insert(result, available[i] - granted)
+    end
+end
+for i = 1, #KEYS do
+    if not denied or tonumber(ARGV[(i - 1) * 4 + 4]) > 0 then
+        redis.call('SET', KEYS[i], tostring(tats[i]), 'PX', math.ceil(tats[i] - now) + 1000)
+    end
+end
+return denied or result
+"""
+
+
+async def _default_async_redis():
+    """
+    The backend's async Redis client, None until Redis is initialised
+
+    The FakeRedis fallback is private to the process, so in-memory buckets
+    are used with it instead.
+    """
+    from .. import async_redis_pool, get_async_redis_client
+
+    if async_redis_pool is None or async_redis_pool == "fake":
+        return None
+    return await get_async_redis_client()
+
 
-@dataclass
+@dataclass(slots=True)
 class TokenBucket:
     """Token bucket for rate limiting"""
 
@@ -48,20 +118,61 @@ class TokenBucket:
         self.last_refill = now
 
 
+@dataclass(slots=True)
+class _Lease:
+    """Tokens taken from a shared bucket, spendable by this process"""
+
+    tokens: int
+    expires_at: float
+    remaining: int  # Tokens left in the shared bucket when leased
+
+
 class RateLimiter:
     """
     Rate limiter using token bucket algorithm.
     Supports per-IP and per-endpoint rate limiting.
     """
 
-    def __init__(self):
+    def __init__(self, redis_client=None):
+        """
+        Initialize rate limiter
+
+        Args:
+            redis_client: Async Redis client sharing buckets between
+                processes, defaults to the backend's client once initialised
+        """
         self.settings = get_settings()
 
+        # Shared buckets (Redis) and this process's share of them
+        self.redis = None
+        self._script = None
+        # Leases are kept past expiry so the client's next request can hand
+        # their unused tokens back
+        self._leases: BoundedClientMap[_Lease] = BoundedClientMap(
+            "leases",
+            max_size=RateLimits.MAX_TRACKED_CLIENTS,
+            idle_ttl=RateLimits.LEASE_RETENTION_SECONDS,
+            last_seen=lambda lease: lease.expires_at,
+            clock=time.monotonic,
+        )
+        # Denials differ in length, so an expired one may wait behind a
+        # longer one until it reaches the head of the table or is evicted
+        self._denied_until: BoundedClientMap[float] = BoundedClientMap(
+            "denials",
+            max_size=RateLimits.MAX_TRACKED_CLIENTS,
+            idle_ttl=0,
+            last_seen=lambda until: until,
+            clock=time.monotonic,
+        )
+        self._redis_retry_at = 0.0
+        if redis_client is not None:
+            self._bind(redis_client)
+
         # Per-IP rate limiting buckets
-        self.ip_buckets: Dict[str, TokenBucket] = {}
+        self.ip_buckets: BoundedClientMap[TokenBucket] = self._bucket_map("global")
 
-        # Per-endpoint rate limiting buckets
-        self.endpoint_buckets: Dict[str, Dict[str, TokenBucket]] = defaultdict(dict)
+        # Per-endpoint rate limiting buckets, created on first use
+        self.endpoint_buckets: Dict[str, BoundedClientMap[TokenBucket]] = {}
 
         # Rate limit configurations
         self.rate_limits = {
@@ -112,19 +223,43 @@ class RateLimiter:
 
         return path
 
+    @staticmethod
+    def _bucket_map(name: str) -> BoundedClientMap[TokenBucket]:
+        """Bucket table dropping buckets unused for ``BUCKET_IDLE_TTL``"""
+        return BoundedClientMap(
+            f"buckets:{name}",
+            max_size=RateLimits.MAX_TRACKED_CLIENTS,
+            idle_ttl=RateLimits.BUCKET_IDLE_TTL,
+            last_seen=lambda bucket: bucket.last_refill,
+        )
+
     def _get_or_create_bucket(
-        self, bucket_dict: Dict[str, TokenBucket], key: str, config: Dict[str, float]
+        self,
+        bucket_map: BoundedClientMap[TokenBucket],
+        key: str,
+        config: Dict[str, float],
     ) -> TokenBucket:
         """Get existing bucket or create new one"""
-        if key not in bucket_dict:
-            bucket_dict[key] = TokenBucket(
+        return bucket_map.get_or_create(
+            key,
+            lambda: TokenBucket(
                 capacity=int(config["capacity"]),
                 tokens=float(config["capacity"]),
                 refill_rate=config["refill_rate"],
                 last_refill=time.time(),
-            )
+            ),
+        )
+
+    def _bind(self, redis_client) -> None:
+        self.redis = redis_client
+        self._script = redis_client.register_script(GCRA_SCRIPT)
 
-        return bucket_dict[key]
+    async def _get_redis(self):
+        if self.redis is None:
+            redis_client = await _default_async_redis()
+            if redis_client is not None:
+                self._bind(redis_client)
+        return self.redis
 
     async def check_rate_limit(
         self, request: Request
@@ -138,6 +273,22 @@ class RateLimiter:
         client_ip = self.get_client_ip(request)
         endpoint = self.get_endpoint_key(request)
 
+        if await self._get_redis() is None:
+            result = self._check_local(request, client_ip, endpoint)
+        elif time.monotonic() < self._redis_retry_at:
+            result = self._check_without_redis(request, client_ip, endpoint)
+        else:
+            result = await self._check_distributed(request, client_ip, endpoint)
+
+        # Periodic cleanup
+        await self._cleanup_old_buckets()
+
+        return result
+
+    def _check_local(
+        self, request: Request, client_ip: str, endpoint: str
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Check the in-memory buckets of this process"""
         # Check global IP-based rate limit
         global_config = self.rate_limits["global"]
         ip_bucket = self._get_or_create_bucket(
@@ -158,6 +309,8 @@ class RateLimiter:
             endpoint_config = self.rate_limits[endpoint]
             endpoint_key = f"{client_ip}:{endpoint}"
 
+            if endpoint not in self.endpoint_buckets:
+                self.endpoint_buckets[endpoint] = self._bucket_map(endpoint)
             endpoint_bucket = self._get_or_create_bucket(
                 self.endpoint_buckets[endpoint], endpoint_key, endpoint_config
             )
@@ -174,11 +327,168 @@ class RateLimiter:
                     "client_ip": client_ip,
                 }
 
-        # Periodic cleanup
-        await self._cleanup_old_buckets()
+        self._set_request_state(
+            request,
+            global_config,
+            int(ip_bucket.tokens),
+            self._calculate_reset_time(ip_bucket, global_config),
+        )
+        return True, None
 
+    def _limits_for(
+        self, client_ip: str, endpoint: str
+    ) -> List[Tuple[str, str, Dict[str, float]]]:
+        """(limit type, shared bucket key, config) of the limits of a request"""
+        # The hash tag keeps a client's keys in one slot for Redis Cluster
+        prefix = f"{RATE_LIMIT_KEY_PREFIX}{{{client_ip}}}:"
+        limits = [("global", f"{prefix}global", self.rate_limits["global"])]
+        if endpoint in self.rate_limits:
+            limits.append(
+                ("endpoint", f"{prefix}{endpoint}", self.rate_limits[endpoint])
+            )
+        return limits
+
+    def _lease_size(self, config: Dict[str, float]) -> int:
+        """Tokens to lease at once: a small share of the limit, at least one"""
+        share = int(config["capacity"] * RateLimits.LOCAL_LEASE_CAPACITY_SHARE)
+        return max(1, min(RateLimits.LOCAL_LEASE_TOKENS, share))
+
+    def _usable_lease(self, key: str, now: float) -> Optional[_Lease]:
+        """This process's lease of a bucket, if it still has a token to spend"""
+        lease = self._leases.get(key)
+        if lease is None or lease.tokens < 1 or lease.expires_at <= now:
+            return None
+        return lease
+
+    async def _check_distributed(
+        self, request: Request, client_ip: str, endpoint: str
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Check the shared buckets, with at most one Redis round-trip"""
+        now = time.monotonic()
+        limits = self._limits_for(client_ip, endpoint)
+
+        for limit_type, key, config in limits:
+            denied_until = self._denied_until.get(key, 0.0)
+            if denied_until > now:
+                rate_limit_checks_total.labels("local", "denied").inc()
+                return False, self._denied_info(
+                    limit_type, endpoint, config, denied_until - now, client_ip
+                )
+
+        # Limits this process still holds leased tokens for cost nothing. The
+        # leases are held here: storing new ones may evict them from the table
+        leased = {key: self._usable_lease(key, now) for _, key, _ in limits}
+        needed = [limit for limit in limits if leased[limit[1]] is None]
+        held = [lease for lease in leased.values() if lease is not None]
+        _, global_key, global_config = limits[0]
+        if needed:
+            args: List[Any] = []
+            for _, key, config in needed:
+                lease = self._leases.pop(key, None)
+                args += [
+                    1000.0 / config["refill_rate"],
+                    int(config["capacity"]),
+                    self._lease_size(config),
+                    lease.tokens if lease else 0,
+                ]
+            try:
+                reply = await self._script(
+                    keys=[key for _, key, _ in needed], args=args
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Shared rate limits unavailable: {e}")
+                self._redis_retry_at = now + RateLimits.REDIS_RETRY_SECONDS
+                return self._check_without_redis(request, client_ip, endpoint)
+
+            # The script applied the refunds even if it denied the request
+            allowed, retry_after_ms = int(reply[0]), int(reply[1])
+            if not allowed:
+                limit_type, key, config = needed[int(reply[2]) - 1]
+                retry_after = retry_after_ms / 1000.0
+                self._denied_until[key] = now + retry_after
+                rate_limit_checks_total.labels("redis", "denied").inc()
+                return False, self._denied_info(
+                    limit_type, endpoint, config, retry_after, client_ip
+                )
+
+            for index, (_, key, _) in enumerate(needed):
+                granted, remaining = reply[2 + 2 * index : 4 + 2 * index]
+                lease = _Lease(
+                    tokens=int(granted) - 1,
+                    expires_at=now + RateLimits.LOCAL_LEASE_SECONDS,
+                    remaining=int(remaining),
+                )
+                self._leases[key] = lease
+                leased[key] = lease
+
+        # Every limit allowed the request, so only now spend the leased tokens
+        # (one spent concurrently during the round-trip is charged back by
+        # the next refund)
+        for lease in held:
+            lease.tokens -= 1
+
+        rate_limit_checks_total.labels("redis" if needed else "local", "allowed").inc()
+
+        global_lease = leased[global_key]
+        remaining = global_lease.tokens + global_lease.remaining
+        self._set_request_state(
+            request,
+            global_config,
+            remaining,
+            math.ceil(
+                (global_config["capacity"] - remaining) / global_config["refill_rate"]
+            ),
+        )
         return True, None
 
+    def _check_without_redis(
+        self, request: Request, client_ip: str, endpoint: str
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Fail open to this process's own buckets, or closed, per configuration
+        """
+        if self.settings.rate_limit_fail_open:
+            rate_limit_checks_total.labels("fallback", "local").inc()
+            return self._check_local(request, client_ip, endpoint)
+
+        rate_limit_checks_total.labels("fallback", "denied").inc()
+        return False, {
+            "limit_type": "unavailable",
+            "limit": 0,
+            "remaining": 0,
+            "reset_in": RateLimits.REDIS_RETRY_SECONDS,
+            "client_ip": client_ip,
+        }
+
+    def _denied_info(
+        self,
+        limit_type: str,
+        endpoint: str,
+        config: Dict[str, float],
+        retry_after: float,
+        client_ip: str,
+    ) -> Dict[str, Any]:
+        info = {
+            "limit_type": limit_type,
+            "limit": config["capacity"],
+            "remaining": 0,
+            "reset_in": max(1, math.ceil(retry_after)),
+            "client_ip": client_ip,
+        }
+        if limit_type == "endpoint":
+            info["endpoint"] = endpoint
+        return info
+
+    def _set_request_state(
+        self, request: Request, config: Dict[str, float], remaining: int, reset_in: int
+    ) -> None:
+        """Remember the client's global limit status for the response headers"""
+        request.state.rate_limit = {
+            "limit": config["capacity"],
+            "remaining": remaining,
+            "reset_in": reset_in,
+        }
+
     def _calculate_reset_time(
         self, bucket: TokenBucket, config: Dict[str, float]
     ) -> int:
@@ -199,38 +509,18 @@ class RateLimiter:
 
         self._last_cleanup = now
 
-        # Clean up IP buckets older than 1 hour
-        cutoff_time = now - 3600
-
-        old_ip_keys = [
-            key
-            for key, bucket in self.ip_buckets.items()
-            if bucket.last_refill < cutoff_time
-        ]
-
-        for key in old_ip_keys:
-            del self.ip_buckets[key]
-
-        # Clean up endpoint buckets
-        for endpoint, buckets in self.endpoint_buckets.items():
-            old_endpoint_keys = [
-                key
-                for key, bucket in buckets.items()
-                if bucket.last_refill < cutoff_time
-            ]
-
-            for key in old_endpoint_keys:
-                del buckets[key]
-
-        if old_ip_keys or any(
-            old_endpoint_keys
-            for old_endpoint_keys in [
-                buckets for buckets in self.endpoint_buckets.values()
-            ]
-        ):
-            logger.debug(
-                f"Cleaned up {len(old_ip_keys)} IP buckets and endpoint buckets"
-            )
+        # Tables are ordered by last use, so only expired entries are visited
+        expired = self.ip_buckets.expire(now)
+        for buckets in self.endpoint_buckets.values():
+            expired += buckets.expire(now)
+
+        # Expired leases and denials of the shared buckets
+        monotonic_now = time.monotonic()
+        self._leases.expire(monotonic_now)
+        self._denied_until.expire(monotonic_now)
+
+        if expired:
+            logger.debug(f"Cleaned up {expired} IP and endpoint buckets")
 
     def get_rate_limit_info(self, request: Request) -> Dict[str, Any]:
         """Get current rate limit status for client"""
@@ -240,22 +530,21 @@ class RateLimiter:
         info = {
             "client_ip": client_ip,
             "endpoint": endpoint,
+            "backend": "redis" if self.redis is not None else "local",
             "global_limit": self.rate_limits["global"],
             "endpoint_limit": self.rate_limits.get(endpoint, "No specific limit"),
         }
 
         # Add current bucket status
-        if client_ip in self.ip_buckets:
-            bucket = self.ip_buckets[client_ip]
+        bucket = self.ip_buckets.get(client_ip)
+        if bucket is not None:
             info["global_tokens_remaining"] = int(bucket.tokens)
 
         endpoint_key = f"{client_ip}:{endpoint}"
-        if (
-            endpoint in self.endpoint_buckets
-            and endpoint_key in self.endpoint_buckets[endpoint]
-        ):
-            bucket = self.endpoint_buckets[endpoint][endpoint_key]
-            info["endpoint_tokens_remaining"] = int(bucket.tokens)
+        if endpoint in self.endpoint_buckets:
+            bucket = self.endpoint_buckets[endpoint].get(endpoint_key)
+            if bucket is not None:
+                info["endpoint_tokens_remaining"] = int(bucket.tokens)
 
         return info
 
@@ -286,6 +575,17 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         is_allowed, rate_limit_info = await self.rate_limiter.check_rate_limit(request)
 
         if not is_allowed and rate_limit_info is not None:
+            if rate_limit_info["limit_type"] == "unavailable":
+                # Failing closed: the shared limits cannot be checked
+                return JSONResponse(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    content={
+                        "error": "Rate limiter unavailable",
+                        "message": "Please try again shortly.",
+                    },
+                    headers={"Retry-After": str(rate_limit_info["reset_in"])},
+                )
+
             # Log rate limit hit
             logger.warning(
                 f"Rate limit exceeded for {rate_limit_info['client_ip']} "
@@ -322,17 +622,12 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
 
         # Add rate limit headers to successful responses
-        client_ip = self.rate_limiter.get_client_ip(request)
-
-        if client_ip in self.rate_limiter.ip_buckets:
-            bucket = self.rate_limiter.ip_buckets[client_ip]
-            config = self.rate_limiter.rate_limits["global"]
-
-            response.headers["X-RateLimit-Limit"] = str(config["capacity"])
-            response.headers["X-RateLimit-Remaining"] = str(int(bucket.tokens))
+        limit_status = getattr(request.state, "rate_limit", None)
+        if limit_status is not None:
+            response.headers["X-RateLimit-Limit"] = str(limit_status["limit"])
+            response.headers["X-RateLimit-Remaining"] = str(limit_status["remaining"])
             response.headers["X-RateLimit-Reset"] = str(
-                int(time.time())
-                + self.rate_limiter._calculate_reset_time(bucket, config)
+                int(time.time()) + limit_status["reset_in"]
             )
 
         return response
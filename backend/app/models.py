@@ -13,6 +13,7 @@ class JobStatus(str, Enum):
     working = "working"
     done = "done"
     error = "error"
+    cancelled = "cancelled"
 
 
 class Job(BaseModel):
@@ -116,6 +117,9 @@ class JobResponse(BaseModel):
     stage: Optional[str] = None  # Current processing stage description
     format_id: Optional[str] = None  # Selected video format/resolution
     video_title: Optional[str] = None  # Video title for filename
+    estimated_cost_seconds: Optional[float] = None  # Predicted worker time
+    queue_position: Optional[int] = None  # Jobs ahead, while queued
+    estimated_wait_seconds: Optional[float] = None  # Until a worker starts it
 
 
 class MetadataRequest(BaseModel):
@@ -3,6 +3,15 @@ Queue management package.
 Contains queue operations for job processing.
 """
 
+from .health import QueueHealthSampler, QueueHealthSnapshot, queue_health_sampler
+from .lanes import JobLanes, QueuePosition
 from .manager import QueueManager
 
-__all__ = ["QueueManager"]
+__all__ = [
+    "JobLanes",
+    "QueueHealthSampler",
+    "QueueHealthSnapshot",
+    "QueueManager",
+    "QueuePosition",
+    "queue_health_sampler",
+]
@@ -0,0 +1,189 @@
+"""
+Background-sampled queue health for admission control.
+
+Clip jobs are ``job:<id>`` hashes that the worker claims by status (the RQ
+``clips`` queue they are also pushed to is never consumed), so queue depth
+is the number of jobs in the ``queued`` state, read from the job status
+indexes. Rather than reading Redis on every request, a task samples job
+counts per status and live workers every
+``QueueHealthConfig.SAMPLE_INTERVAL`` into a snapshot, and admission checks
+read the snapshot. Jobs carry their estimated worker time, so the snapshot
+also holds the work waiting for the workers.
+"""
+
+import asyncio
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Optional
+
+from ..constants import JobCostConfig, QueueHealthConfig, RedisKeys
+from ..logging.config import get_logger
+from ..metrics import clip_queue_jobs, clip_workers_alive
+from ..models import JobStatus
+from ..repositories.job_repository import status_index_key
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class QueueHealthSnapshot:
+    """Job counts and live workers at one point in time"""
+
+    queued: int
+    working: int
+    failed: int  # Jobs failed within the job TTL
+    workers: int
+    sampled_at: float  # time.monotonic()
+    pending_work_seconds: float = 0.0  # Estimated work of queued/working jobs
+
+    @property
+    def work_capacity(self) -> float:
+        """Worker-seconds of pending work the live workers are allowed"""
+        return JobCostConfig.MAX_PENDING_SECONDS_PER_WORKER * max(self.workers, 1)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was taken"""
+        return time.monotonic() - self.sampled_at
+
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value if isinstance(value, str) else None
+
+
+class QueueHealthSampler:
+    """Periodically refreshes a shared queue health snapshot"""
+
+    def __init__(
+        self, redis_client=None, interval: float = QueueHealthConfig.SAMPLE_INTERVAL
+    ):
+        """
+        Initialize queue health sampler
+
+        Args:
+            redis_client: Sync Redis client, defaults to the backend's client
+                once initialised
+            interval: Seconds between samples
+        """
+        self._redis = redis_client
+        self.interval = interval
+        self.snapshot: Optional[QueueHealthSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        from .. import redis
+
+        return redis
+
+    def read(self, redis_client) -> QueueHealthSnapshot:
+        """
+        Count jobs by status and live workers (blocking)
+
+        Args:
+            redis_client: Sync Redis client
+
+        Returns:
+            Fresh snapshot
+        """
+        now = time.time()
+        since = now - RedisKeys.JOB_TTL
+        counted = (JobStatus.queued, JobStatus.working, JobStatus.error)
+        pending = (JobStatus.queued, JobStatus.working)
+
+        pipe = redis_client.pipeline(transaction=False)
+        for status in counted:
+            pipe.zcount(status_index_key(status.value), since, "+inf")
+        for status in pending:
+            pipe.zrangebyscore(status_index_key(status.value), since, "+inf")
+        pipe.zcount(
+            RedisKeys.WORKER_HEARTBEATS,
+            now - QueueHealthConfig.WORKER_TIMEOUT,
+            "+inf",
+        )
+        results = pipe.execute()
+        queued, working, failed = (int(count) for count in results[:3])
+        pending_ids = [job_id for ids in results[3:5] for job_id in ids]
+        workers = int(results[5])
+
+        pending_work = 0.0
+        if pending_ids:
+            pipe = redis_client.pipeline(transaction=False)
+            for job_id in pending_ids:
+                pipe.hget(f"{RedisKeys.JOB_PREFIX}{_text(job_id)}", "estimated_cost")
+            for cost in pipe.execute():
+                cost = _text(cost)
+                pending_work += (
+                    float(cost) if cost else JobCostConfig.UNKNOWN_JOB_SECONDS
+                )
+
+        return QueueHealthSnapshot(
+            queued=queued,
+            working=working,
+            failed=failed,
+            workers=workers,
+            sampled_at=time.monotonic(),
+            pending_work_seconds=pending_work,
+        )
+
+    async def sample(self) -> Optional[QueueHealthSnapshot]:
+        """
+        Take a new snapshot, keeping the previous one if Redis fails
+
+        Returns:
+            Latest snapshot, None if none was ever taken
+        """
+        redis_client = self._get_redis()
+        if redis_client is None:
+            return self.snapshot
+
+        try:
+            snapshot = await asyncio.to_thread(self.read, redis_client)
+        except Exception as e:
+            logger.warning(f"⚠️ Queue health sample failed: {e}")
+            return self.snapshot
+
+        self.snapshot = snapshot
+        for status, count in (
+            (JobStatus.queued.value, snapshot.queued),
+            (JobStatus.working.value, snapshot.working),
+            (JobStatus.error.value, snapshot.failed),
+        ):
+            clip_queue_jobs.labels(status).set(count)
+        clip_workers_alive.set(snapshot.workers)
+        return snapshot
+
+    def current(self) -> Optional[QueueHealthSnapshot]:
+        """The latest snapshot, None if there is none recent enough to trust"""
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.age > QueueHealthConfig.MAX_SNAPSHOT_AGE:
+            return None
+        return snapshot
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await self.sample()
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self) -> None:
+        """Start sampling in the background on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"📊 Sampling queue health every {self.interval}s")
+
+    async def stop(self) -> None:
+        """Stop background sampling"""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+# Shared by the middleware and endpoints of this process
+queue_health_sampler = QueueHealthSampler()
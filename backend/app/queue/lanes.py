@@ -0,0 +1,245 @@
+"""
+Priority lanes with shortest-job-first ordering for clip jobs.
+
+Jobs are queued in one of ``WorkerConfig.LANE_WEIGHTS``'s lanes by their
+estimated worker time: cheap jobs (the common short meme clip) go to the
+high lane, everything else to the default lane. Each lane is a sorted set
+scored by enqueue time plus ``SJF_COST_FACTOR`` times the job's cost, so
+within a lane shorter jobs go first, but a long job is only overtaken by
+jobs queued at most its cost later: it ages into the head instead of
+starving.
+
+Workers pull from the lanes by smooth weighted round-robin over the
+non-empty lanes. A lane head overdue by more than ``LANE_MAX_WAIT`` is
+served before anything else. Taking a job out of its lane and marking it
+working is one script, so a worker dying in between cannot strand a job
+that is queued but in no lane.
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from ..constants import JobCostConfig, RedisKeys, WorkerConfig
+from ..models import JobStatus
+from ..repositories.job_repository import status_index_key
+
+# KEYS: lanes in pull order
+# ARGV: job key prefix, queued index, working index, now, job TTL,
+#       field, value, ... written to the claimed job
+# Pops lane heads until one is a queued job, marks it working and returns
+# its id; jobs that expired or were cancelled while queued are dropped
+CLAIM_SCRIPT = """
+local prefix, queued, working = ARGV[1], ARGV[2], ARGV[3]
+local now, ttl = tonumber(ARGV[4]), tonumber(ARGV[5])
+for _, lane in ipairs(KEYS) do
+    while true do
+        local popped = redis.call('ZPOPMIN', lane)
+        if #popped == 0 then
+            break
+        end
+        local job_id = popped[1]
+        local job_key = prefix .. job_id
+        if redis.call('HGET', job_key, 'status') == 'queued' then
+            redis.call('HSET', job_key, 'status', 'working', unpack(ARGV, 6))
+            redis.call('EXPIRE', job_key, ttl)
+            redis.call('ZREM', queued, job_id)
+            redis.call('ZADD', working, now, job_id)
+            redis.call('ZREMRANGEBYSCORE', working, '-inf', now - ttl)
+            return job_id
+        end
+    end
+end
+return false
+"""
+
+
+@dataclass(frozen=True)
+class QueuePosition:
+    """Where a queued job stands"""
+
+    lane: str
+    jobs_ahead: int
+    estimated_wait_seconds: float
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class JobLanes:
+    """Queue and claim clip jobs through the scheduling lanes"""
+
+    def __init__(self, redis_client, weights: Optional[Dict[str, int]] = None):
+        """
+        Initialize job lanes
+
+        Args:
+            redis_client: Sync Redis client
+            weights: Pull weight per lane, highest priority first
+        """
+        self.redis = redis_client
+        self.weights = weights or WorkerConfig.LANE_WEIGHTS
+        self._claim = redis_client.register_script(CLAIM_SCRIPT)
+        # Smooth weighted round-robin state of this worker
+        self._credits = {lane: 0 for lane in self.weights}
+
+    @staticmethod
+    def key(lane: str) -> str:
+        return f"{WorkerConfig.LANE_PREFIX}{lane}"
+
+    @staticmethod
+    def lane_for(cost_seconds: float) -> str:
+        """Lane of a job with the given estimated worker time"""
+        if cost_seconds <= WorkerConfig.FAST_LANE_MAX_COST:
+            return WorkerConfig.HIGH_PRIORITY_QUEUE
+        return WorkerConfig.DEFAULT_QUEUE
+
+    def enqueue(
+        self, job_id: str, cost_seconds: float, now: Optional[float] = None
+    ) -> str:
+        """
+        Queue a job in the lane matching its cost
+
+        Returns:
+            Lane the job was queued in
+        """
+        lane = self.lane_for(cost_seconds)
+        score = (now or time.time()) + cost_seconds * WorkerConfig.SJF_COST_FACTOR
+        self.redis.zadd(self.key(lane), {job_id: score})
+        return lane
+
+    def remove(self, job_id: str, lane: str) -> bool:
+        """Take a job out of its lane, False if it was already claimed"""
+        return bool(self.redis.zrem(self.key(lane), job_id))
+
+    def has_work(self) -> bool:
+        """Whether any lane holds a queued job"""
+        pipe = self.redis.pipeline(transaction=False)
+        for lane in self.weights:
+            pipe.zcard(self.key(lane))
+        return any(pipe.execute())
+
+    def _pull_order(self, now: float) -> List[str]:
+        """Lanes to claim from, in order, for this pull"""
+        pipe = self.redis.pipeline(transaction=False)
+        for lane in self.weights:
+            pipe.zrange(self.key(lane), 0, 0, withscores=True)
+        heads = {
+            lane: head[0][1] for lane, head in zip(self.weights, pipe.execute()) if head
+        }
+        if not heads:
+            return []
+
+        # Aging: heads overdue for too long go first, most overdue first
+        overdue = sorted(
+            (score, lane)
+            for lane, score in heads.items()
+            if now - score > WorkerConfig.LANE_MAX_WAIT
+        )
+        if overdue:
+            first = overdue[0][1]
+        else:
+            total = 0
+            for lane in heads:
+                self._credits[lane] += self.weights[lane]
+                total += self.weights[lane]
+            first = max(heads, key=lambda lane: self._credits[lane])
+            self._credits[first] -= total
+
+        return [first] + [lane for lane in heads if lane != first]
+
+    def claim(
+        self, now: Optional[float] = None, fields: Optional[Dict[str, str]] = None
+    ) -> Optional[str]:
+        """
+        Take the next queued job and mark it working, in one step
+
+        Args:
+            now: Current Unix time
+            fields: Job fields to write along with the working status
+
+        Returns:
+            Job id, now owned by the caller
+        """
+        now = now or time.time()
+        order = self._pull_order(now)
+        if not order:
+            return None
+
+        args: List[Any] = [
+            RedisKeys.JOB_PREFIX,
+            status_index_key(JobStatus.queued.value),
+            status_index_key(JobStatus.working.value),
+            now,
+            RedisKeys.JOB_TTL,
+            "progress",
+            "0",
+        ]
+        for field, value in (fields or {}).items():
+            args += [field, value]
+        job_id = self._claim(keys=[self.key(lane) for lane in order], args=args)
+        return _text(job_id) if job_id else None
+
+    def position(
+        self, job_id: str, lane: str, workers: int = 1
+    ) -> Optional[QueuePosition]:
+        """
+        Jobs ahead of a queued job and the estimated wait for them
+
+        Jobs of other lanes are counted for the share of pulls their weight
+        gets while the job's own lane is worked through. Only the costs of
+        the first ``POSITION_COST_SAMPLE`` jobs ahead in each lane are read;
+        the rest are assumed to cost their average, so a poll stays cheap
+        however deep the queue is.
+
+        Returns:
+            Position, None if the job is no longer queued
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrank(self.key(lane), job_id)
+        for other in self.weights:
+            pipe.zcard(self.key(other))
+        rank, *sizes = pipe.execute()
+        if rank is None:
+            return None
+
+        own_weight = self.weights.get(lane, 1)
+        counts = {}
+        for other, size in zip(self.weights, sizes):
+            if other == lane:
+                counts[other] = rank
+            else:
+                share = math.ceil((rank + 1) * self.weights[other] / own_weight)
+                counts[other] = min(share, size)
+
+        ahead = {other: count for other, count in counts.items() if count}
+        wait = 0.0
+        if ahead:
+            pipe = self.redis.pipeline(transaction=False)
+            for other, count in ahead.items():
+                sample = min(count, WorkerConfig.POSITION_COST_SAMPLE)
+                pipe.zrange(self.key(other), 0, sample - 1)
+            samples = dict(zip(ahead, pipe.execute()))
+
+            pipe = self.redis.pipeline(transaction=False)
+            for ids in samples.values():
+                for ahead_id in ids:
+                    pipe.hget(
+                        f"{RedisKeys.JOB_PREFIX}{_text(ahead_id)}", "estimated_cost"
+                    )
+            costs = iter(pipe.execute())
+            for other, ids in samples.items():
+                sampled = [
+                    float(cost) if cost else JobCostConfig.UNKNOWN_JOB_SECONDS
+                    for cost in (next(costs) for _ in ids)
+                ]
+                # Jobs past the sample are assumed to cost the sample's average
+                wait += sum(sampled) * ahead[other] / max(len(sampled), 1)
+
+        return QueuePosition(
+            lane=lane,
+            jobs_ahead=sum(counts.values()),
+            estimated_wait_seconds=round(wait / max(workers, 1), 1),
+        )
@@ -3,6 +3,7 @@ Queue manager for handling job processing queue.
 Simplified version for testing configuration.
 """
 
+from ..constants import RedisKeys
 from ..models import Job
 
 
@@ -21,6 +22,14 @@ class QueueManager:
         """Get current queue size"""
         return len(self._queue)
 
+    async def request_cancellation(self, job_id: str) -> None:
+        """Ask the worker running a job to stop it"""
+        if self.redis is None:
+            return
+        from ..services.job_cancellation import cancel_key
+
+        self.redis.set(cancel_key(job_id), "1", ex=RedisKeys.JOB_TTL)
+
     async def remove_job(self, job_id: str) -> bool:
         """Remove job from queue"""
         try:
@@ -3,6 +3,6 @@ Repository layer package.
 Contains data access logic abstracted from business logic.
 """
 
-from .job_repository import JobRepository
+from .job_repository import JobRepository, delete_job, update_job
 
-__all__ = ["JobRepository"]
+__all__ = ["JobRepository", "delete_job", "update_job"]
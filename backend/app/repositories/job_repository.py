@@ -1,53 +1,278 @@
 """
-Job repository layer for data access operations.
-Simplified version for testing configuration.
+Job repository over the ``job:<id>`` hashes in Redis.
+
+The API and the workers write job hashes, which expire ``RedisKeys.JOB_TTL``
+after their last update. Finding jobs used to take a SCAN of the keyspace,
+so every write now also maintains two kinds of sorted-set index, in the same
+script that writes the hash:
+
+- ``jobs:by_created``: job ids scored by creation time
+- ``jobs:status:<status>``: job ids currently in the status, scored by
+  their last update
+
+A status change moves the job between status sets atomically with the hash
+write, so counts never see a job in two states or in none. Index entries
+outlive expired hashes: status reads only count entries updated within the
+job TTL, and writes trim older ones.
+"""
+
+import json
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional
+
+from pydantic import ValidationError
+
+from ..constants import RedisKeys
+from ..logging.config import get_logger
+from ..models import Job, JobStatus
+from ..utils.redis_values import resolve, to_text
+
+logger = get_logger(__name__)
+
+# Jobs deleted per round trip by cleanup
+CLEANUP_BATCH_SIZE = 500
+
+# KEYS[1]: job hash, KEYS[2]: creation index
+# ARGV: job id, now, job TTL, index retention, status index prefix,
+#       creation time ('' to keep), new status ('' to keep), field, value, ...
+# Returns the status before the update
+UPDATE_SCRIPT = """
+local job_id, now = ARGV[1], tonumber(ARGV[2])
+local ttl, retention = tonumber(ARGV[3]), tonumber(ARGV[4])
+local prefix, created, status = ARGV[5], ARGV[6], ARGV[7]
+local old = redis.call('HGET', KEYS[1], 'status')
+if #ARGV > 7 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 8))
+end
+redis.call('EXPIRE', KEYS[1], ttl)
+if created ~= '' then
+    redis.call('ZADD', KEYS[2], 'NX', created, job_id)
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - retention)
+end
+if status == '' then
+    status = old
+end
+if status then
+    if old and old ~= status then
+        redis.call('ZREM', prefix .. old, job_id)
+    end
+    redis.call('ZADD', prefix .. status, now, job_id)
+    redis.call('ZREMRANGEBYSCORE', prefix .. status, '-inf', now - ttl)
+end
+return old
 """
 
-from datetime import datetime
-from typing import Dict, List, Optional
 
-from ..models import Job
+def _job_key(job_id: str) -> str:
+    return f"{RedisKeys.JOB_PREFIX}{job_id}"
+
+
+def status_index_key(status: str) -> str:
+    """Redis key of the index of jobs in a status"""
+    return f"{RedisKeys.JOBS_BY_STATUS_PREFIX}{status}"
+
+
+def _timestamp(value: datetime) -> float:
+    """Unix time of a datetime, naive ones being UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _encode(value: Any) -> str:
+    if isinstance(value, Enum):
+        return str(value.value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _update_call(
+    job_id: str,
+    fields: Dict[str, Any],
+    created_at: Optional[datetime],
+    now: Optional[float],
+) -> Dict[str, list]:
+    """Keys and args of UPDATE_SCRIPT; None values are not written"""
+    args = [
+        job_id,
+        now if now is not None else datetime.now(timezone.utc).timestamp(),
+        RedisKeys.JOB_TTL,
+        RedisKeys.JOB_INDEX_RETENTION,
+        RedisKeys.JOBS_BY_STATUS_PREFIX,
+        _timestamp(created_at) if created_at is not None else "",
+        _encode(fields["status"]) if fields.get("status") is not None else "",
+    ]
+    for field, value in fields.items():
+        if value is not None:
+            args += [field, _encode(value)]
+    return {"keys": [_job_key(job_id), RedisKeys.JOBS_BY_CREATED], "args": args}
+
+
+def update_job(
+    redis_client,
+    job_id: str,
+    fields: Dict[str, Any],
+    created_at: Optional[datetime] = None,
+    now: Optional[float] = None,
+) -> Optional[str]:
+    """
+    Write fields of a job and keep the job indexes in step
+
+    Every write of a job hash should go through here (or JobRepository):
+    it refreshes the job's TTL and, when ``fields`` has a status, moves the
+    job to that status's index.
+
+    Args:
+        redis_client: Sync Redis client
+        job_id: Unique job identifier
+        fields: Hash fields to set; None values are skipped
+        created_at: Creation time, to index a new job by
+        now: Unix time of the update, defaults to the current time
+
+    Returns:
+        Status of the job before the update, None for a new job
+    """
+    old = redis_client.register_script(UPDATE_SCRIPT)(
+        **_update_call(job_id, fields, created_at, now)
+    )
+    return to_text(old) if old else None
+
+
+def _queue_delete(pipe, job_id: str) -> None:
+    pipe.delete(_job_key(job_id))
+    pipe.zrem(RedisKeys.JOBS_BY_CREATED, job_id)
+    for status in JobStatus:
+        pipe.zrem(status_index_key(status.value), job_id)
+
+
+def delete_job(redis_client, job_id: str) -> bool:
+    """
+    Delete a job and its index entries
+
+    Args:
+        redis_client: Sync Redis client
+        job_id: Unique job identifier
+
+    Returns:
+        True if the job existed
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_delete(pipe, job_id)
+    return bool(pipe.execute()[0])
+
+
+def _parse_job(data: Dict[Any, Any]) -> Optional[Job]:
+    """Job of a hash, None if the hash is empty or not a valid job"""
+    if not data:
+        return None
+    fields: Dict[str, Any] = {
+        to_text(field): to_text(value) for field, value in data.items()
+    }
+    # Empty strings stand for unset fields (e.g. format_id)
+    fields = {
+        field: value for field, value in fields.items() if value not in ("", "None")
+    }
+    if "result" in fields:
+        fields["result"] = json.loads(fields["result"])
+    try:
+        return Job(**fields)
+    except (ValidationError, ValueError) as e:
+        logger.warning(f"⚠️ Skipping unreadable job {fields.get('id')}: {e}")
+        return None
 
 
 class JobRepository:
-    """Simplified repository for testing"""
+    """Jobs in Redis, indexed by creation time and status"""
+
+    def __init__(self, redis_client):
+        """
+        Initialize job repository
 
-    def __init__(self, redis_client=None):
+        Args:
+            redis_client: Redis client (sync or async)
+        """
         self.redis = redis_client
-        self._jobs = {}  # In-memory storage for testing
+        self._update = redis_client.register_script(UPDATE_SCRIPT)
 
     async def save(self, job: Job) -> None:
-        """Save job"""
-        self._jobs[job.id] = job
+        """Create or update a job"""
+        fields = job.model_dump(mode="json", exclude_none=True)
+        await resolve(
+            self._update(**_update_call(job.id, fields, job.created_at, None))
+        )
 
     async def get(self, job_id: str) -> Optional[Job]:
         """Get job by ID"""
-        return self._jobs.get(job_id)
+        return _parse_job(await resolve(self.redis.hgetall(_job_key(job_id))))
+
+    async def get_many(self, job_ids: Iterable[Any]) -> List[Job]:
+        """
+        Get jobs by ID in one round trip
+
+        Returns:
+            Jobs in the order of ``job_ids``, without those that expired
+        """
+        job_ids = [to_text(job_id) for job_id in job_ids]
+        if not job_ids:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hgetall(_job_key(job_id))
+        results = await resolve(pipe.execute())
+        return [job for job in map(_parse_job, results) if job is not None]
 
     async def get_job_counts_by_state(self) -> Dict[str, int]:
-        """Get count of jobs by state"""
-        counts: Dict[str, int] = {}
-        for job in self._jobs.values():
-            state = job.state or "pending"
-            counts[state] = counts.get(state, 0) + 1
-        return counts
+        """Get count of live jobs in each status"""
+        since = datetime.now(timezone.utc).timestamp() - RedisKeys.JOB_TTL
+        pipe = self.redis.pipeline(transaction=False)
+        for status in JobStatus:
+            pipe.zcount(status_index_key(status.value), since, "+inf")
+        counts = await resolve(pipe.execute())
+        return {status.value: int(count) for status, count in zip(JobStatus, counts)}
 
-    async def cleanup_jobs_before(self, cutoff_time: datetime) -> int:
-        """Clean up old jobs"""
-        count = 0
-        to_remove = []
-        for job_id, job in self._jobs.items():
-            if job.created_at < cutoff_time:
-                to_remove.append(job_id)
-                count += 1
+    async def get_job_ids_created_before(
+        self, cutoff_time: datetime, limit: Optional[int] = None
+    ) -> List[str]:
+        """Get IDs of jobs created before a time, oldest first"""
+        job_ids = await resolve(
+            self.redis.zrangebyscore(
+                RedisKeys.JOBS_BY_CREATED,
+                "-inf",
+                f"({_timestamp(cutoff_time)}",
+                start=0 if limit else None,
+                num=limit,
+            )
+        )
+        return [to_text(job_id) for job_id in job_ids]
 
-        for job_id in to_remove:
-            del self._jobs[job_id]
+    async def cleanup_jobs_before(self, cutoff_time: datetime) -> int:
+        """
+        Delete jobs created before a time, with their index entries
 
-        return count
+        Returns:
+            Number of jobs deleted
+        """
+        deleted = 0
+        while True:
+            job_ids = await self.get_job_ids_created_before(
+                cutoff_time, CLEANUP_BATCH_SIZE
+            )
+            if not job_ids:
+                return deleted
+            pipe = self.redis.pipeline(transaction=False)
+            for job_id in job_ids:
+                _queue_delete(pipe, job_id)
+            results = await resolve(pipe.execute())
+            # One DEL per job, followed by its index removals
+            deleted += sum(results[:: 2 + len(JobStatus)])
 
     async def get_recent_jobs(self, limit: int = 10) -> List[Job]:
-        """Get recent jobs"""
-        jobs = list(self._jobs.values())
-        jobs.sort(key=lambda x: x.created_at, reverse=True)
-        return jobs[:limit]
+        """Get the most recently created jobs"""
+        job_ids = await resolve(
+            self.redis.zrevrange(RedisKeys.JOBS_BY_CREATED, 0, limit - 1)
+        )
+        return await self.get_many(job_ids)
@@ -4,5 +4,6 @@ Contains business logic separated from HTTP concerns.
 """
 
 from .job_service import JobService
+from .preview_service import PreviewStatus, PreviewStore
 
-__all__ = ["JobService"]
+__all__ = ["JobService", "PreviewStatus", "PreviewStore"]
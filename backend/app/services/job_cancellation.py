@@ -0,0 +1,85 @@
+"""
+Cancellation of clip jobs.
+
+Cancelling a job sets its ``job:<id>:cancel`` flag. A job still waiting in
+its lane is taken out of it and marked cancelled straight away. A running
+job is stopped by its worker, which checks the flag from yt-dlp's progress
+hooks, between segment downloads and while ffmpeg runs, then kills ffmpeg,
+drops its temporary files and marks the job cancelled itself.
+"""
+
+from typing import Optional
+
+from ..constants import RedisKeys
+from ..logging.config import get_logger
+from ..models import JobStatus
+from ..queue.lanes import JobLanes
+from ..repositories.job_repository import update_job
+
+logger = get_logger(__name__)
+
+# Jobs in these states have nothing left to cancel
+FINISHED_STATUSES = (JobStatus.done, JobStatus.error, JobStatus.cancelled)
+
+
+def _text(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def cancel_key(job_id: str) -> str:
+    """Redis key of a job's cancel flag"""
+    return f"{RedisKeys.JOB_PREFIX}{job_id}{RedisKeys.CANCEL_SUFFIX}"
+
+
+def is_cancel_requested(redis_client, job_id: str) -> bool:
+    """Whether a job's cancellation was requested"""
+    return bool(redis_client.exists(cancel_key(job_id)))
+
+
+def mark_cancelled(redis_client, job_id: str) -> None:
+    """Record a job as cancelled"""
+    update_job(
+        redis_client,
+        job_id,
+        {"status": JobStatus.cancelled.value, "stage": "Cancelled"},
+    )
+
+
+def request_cancellation(redis_client, job_id: str) -> Optional[JobStatus]:
+    """
+    Cancel a queued or running job
+
+    Args:
+        redis_client: Sync Redis client
+        job_id: Job to cancel
+
+    Returns:
+        Status of the job afterwards: cancelled if it never started, still
+        working while its worker stops it, unchanged if it already finished;
+        None if the job does not exist
+    """
+    status, lane = (
+        _text(value)
+        for value in redis_client.hmget(
+            f"{RedisKeys.JOB_PREFIX}{job_id}", "status", "lane"
+        )
+    )
+    if status is None:
+        return None
+    status = JobStatus(status)
+    if status in FINISHED_STATUSES:
+        return status
+
+    redis_client.set(cancel_key(job_id), "1", ex=RedisKeys.JOB_TTL)
+
+    # Only a job still in its lane is sure not to be picked up by a worker;
+    # once claimed, the worker sees the flag and stops the job
+    if status == JobStatus.queued and (
+        not lane or JobLanes(redis_client).remove(job_id, lane)
+    ):
+        mark_cancelled(redis_client, job_id)
+        logger.info(f"🛑 Cancelled queued job {job_id}")
+        return JobStatus.cancelled
+
+    logger.info(f"🛑 Requested cancellation of running job {job_id}")
+    return status
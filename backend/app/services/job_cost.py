@@ -0,0 +1,211 @@
+"""
+Worker-time estimates of clip jobs, for admission control.
+
+Admission and per-client quotas count worker-seconds rather than jobs, so
+a 60s 1080p clip weighs far more than a 3s 360p one. The estimate uses the
+video's cached format metadata, never an extraction on the request path:
+
+- fetching: the bytes the worker downloads, at ``DOWNLOAD_BYTES_PER_SECOND``.
+  HLS/DASH sources fetch only the clip's segments, other sources the whole
+  file.
+- encoding: the worker re-encodes every clip (its rotation correction is a
+  video filter), at ``ENCODE_SECONDS_PER_MEGAPIXEL`` per clip second, scaled
+  by how much slower than H.264 the source codec is to decode.
+- a fixed overhead per job.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..cache.metadata_cache import MetadataCache
+from ..constants import JobCostConfig, RateLimits, RedisKeys
+from ..logging.config import get_logger
+
+logger = get_logger(__name__)
+
+# KEYS[1]: the client's costs, members "<job id>:<cost>" scored by submit time
+# ARGV: now, window, limit, member, cost
+# Returns {1, used} once charged, or {0, used} if the job would exceed the
+# limit; a client with nothing in the window is always admitted
+CHARGE_SCRIPT = """
+local now, window = tonumber(ARGV[1]), tonumber(ARGV[2])
+local limit, cost = tonumber(ARGV[3]), tonumber(ARGV[5])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local used = 0
+for _, member in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    used = used + tonumber(string.match(member, ':([^:]+)$'))
+end
+if used > 0 and used + cost > limit then
+    return {0, tostring(used)}
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('EXPIRE', KEYS[1], math.ceil(window))
+return {1, tostring(used + cost)}
+"""
+
+
+@dataclass(frozen=True)
+class JobCostEstimate:
+    """Predicted worker time of a clip job"""
+
+    seconds: float
+    fetch_seconds: float
+    encode_seconds: float
+    from_metadata: bool  # False when no cached metadata was available
+
+
+def _dimensions(resolution: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(width, height) of a "1920x1080" resolution string"""
+    try:
+        width, height = (int(part) for part in str(resolution).split("x"))
+    except ValueError:
+        return None
+    return (width, height) if width > 0 and height > 0 else None
+
+
+def _select_format(
+    formats: List[Dict[str, Any]], format_id: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    The format the worker will most likely download
+
+    Jobs carry either a yt-dlp format id or a "WxH" resolution, which the
+    worker turns into a height cap; without either it takes the best format.
+    """
+    video = [fmt for fmt in formats if _dimensions(fmt.get("resolution"))]
+    if not video:
+        return None
+
+    for fmt in video:
+        if format_id and format_id in (fmt.get("format_id"), fmt.get("resolution")):
+            return fmt
+
+    cap = _dimensions(format_id)
+    if cap is not None:
+        video = [fmt for fmt in video if _dimensions(fmt["resolution"])[1] <= cap[1]]
+        if not video:
+            return None
+    return max(video, key=lambda fmt: _dimensions(fmt["resolution"])[1])
+
+
+def _is_segmented(fmt: Dict[str, Any]) -> bool:
+    url = fmt.get("url") or ""
+    return ".m3u8" in url or ".mpd" in url
+
+
+def estimate_job_cost(
+    metadata: Optional[Dict[str, Any]],
+    in_ts: float,
+    out_ts: float,
+    format_id: Optional[str] = None,
+) -> JobCostEstimate:
+    """
+    Estimate the worker time of a clip job
+
+    Args:
+        metadata: Cached format metadata of the video, None if unknown
+        in_ts: Clip start in seconds
+        out_ts: Clip end in seconds
+        format_id: Format id or "WxH" resolution requested for the job
+
+    Returns:
+        Estimated worker-seconds, broken down
+    """
+    clip = max(out_ts - in_ts, 0.0)
+    metadata = metadata or {}
+    duration = float(metadata.get("duration") or 0) or out_ts
+    fmt = _select_format(metadata.get("formats") or [], format_id) or {}
+
+    width, height = _dimensions(fmt.get("resolution")) or (
+        JobCostConfig.DEFAULT_RESOLUTION
+    )
+    megapixels = width * height / 1_000_000
+
+    filesize = fmt.get("filesize")
+    if filesize and duration:
+        bytes_per_second = filesize / duration
+    else:
+        bytes_per_second = megapixels * JobCostConfig.BYTES_PER_SECOND_PER_MEGAPIXEL
+
+    if _is_segmented(fmt):
+        fetched = min(clip + JobCostConfig.SEGMENT_PADDING_SECONDS, duration)
+    else:
+        fetched = duration
+    fetch_seconds = fetched * bytes_per_second / JobCostConfig.DOWNLOAD_BYTES_PER_SECOND
+
+    codec = (fmt.get("vcodec") or "").split(".")[0]
+    encode_seconds = (
+        clip
+        * megapixels
+        * JobCostConfig.ENCODE_SECONDS_PER_MEGAPIXEL
+        * JobCostConfig.CODEC_DECODE_FACTORS.get(codec, 1.0)
+    )
+
+    return JobCostEstimate(
+        seconds=round(
+            JobCostConfig.JOB_OVERHEAD_SECONDS + fetch_seconds + encode_seconds, 1
+        ),
+        fetch_seconds=round(fetch_seconds, 1),
+        encode_seconds=round(encode_seconds, 1),
+        from_metadata=bool(fmt),
+    )
+
+
+async def estimate_job_cost_cached(
+    redis_client,
+    url: str,
+    in_ts: float,
+    out_ts: float,
+    format_id: Optional[str] = None,
+) -> JobCostEstimate:
+    """
+    Estimate the worker time of a clip job from the metadata cache
+
+    Args:
+        redis_client: Redis client (sync or async) holding the metadata cache
+        url: Video URL
+        in_ts: Clip start in seconds
+        out_ts: Clip end in seconds
+        format_id: Format id or "WxH" resolution requested for the job
+
+    Returns:
+        Estimated worker-seconds, from defaults on a cache miss
+    """
+    cached = await MetadataCache(redis_client).get_format_metadata(url)
+    metadata = cached.get("metadata") if cached else None
+    return estimate_job_cost(metadata, in_ts, out_ts, format_id)
+
+
+def charge_client_work(
+    redis_client, client_ip: str, job_id: str, seconds: float, now: float
+) -> Tuple[bool, float]:
+    """
+    Charge a job's estimated worker time to its client's hourly quota
+
+    Args:
+        redis_client: Sync Redis client
+        client_ip: Client submitting the job
+        job_id: Job being submitted
+        seconds: Estimated worker-seconds of the job
+        now: Current Unix time
+
+    Returns:
+        Tuple of (charged, worker-seconds used in the window); a job that
+        would exceed ``CLIENT_WORKER_SECONDS_PER_HOUR`` is not charged
+    """
+    try:
+        charged, used = redis_client.register_script(CHARGE_SCRIPT)(
+            keys=[f"{RedisKeys.CLIENT_WORK_PREFIX}{client_ip}"],
+            args=[
+                now,
+                RateLimits.HOUR_WINDOW,
+                JobCostConfig.CLIENT_WORKER_SECONDS_PER_HOUR,
+                f"{job_id}:{seconds}",
+                seconds,
+            ],
+        )
+    except Exception as e:
+        # The global limit still applies; a quota outage must not stop jobs
+        logger.warning(f"⚠️ Could not charge worker time to {client_ip}: {e}")
+        return True, 0.0
+    return bool(int(charged)), float(used)
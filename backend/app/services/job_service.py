@@ -10,7 +10,7 @@ from typing import List, Optional
 from ..config.configuration import get_settings
 from ..constants import ErrorMessages, JobStates, VideoConstraints
 from ..exceptions import QueueFullError, ValidationError
-from ..models import Job, JobCreateRequest
+from ..models import Job, JobCreateRequest, JobStatus
 from ..queue.manager import QueueManager
 from ..repositories.job_repository import JobRepository
 
@@ -120,6 +120,8 @@ class JobService:
         job.progress = progress
         if stage:
             job.stage = stage
+        if job.status == JobStatus.queued:
+            job.status = JobStatus.working
         job.updated_at = datetime.utcnow()
 
         await self.repository.save(job)
@@ -141,6 +143,7 @@ class JobService:
             return False
 
         job.state = JobStates.COMPLETED
+        job.status = JobStatus.done
         job.progress = 100
         job.stage = "Completed"
         job.result = result
@@ -165,6 +168,7 @@ class JobService:
             return False
 
         job.state = JobStates.FAILED
+        job.status = JobStatus.error
         job.stage = "Failed"
         job.error = error
         job.updated_at = datetime.utcnow()
@@ -190,11 +194,14 @@ class JobService:
         if job.state in [JobStates.COMPLETED, JobStates.FAILED, JobStates.CANCELLED]:
             return False
 
-        # Remove from queue if still pending
+        # Remove from queue if still pending, else stop the worker running it
         if job.state == JobStates.PENDING:
             await self.queue.remove_job(job_id)
+        else:
+            await self.queue.request_cancellation(job_id)
 
         job.state = JobStates.CANCELLED
+        job.status = JobStatus.cancelled
         job.stage = "Cancelled"
         job.updated_at = datetime.utcnow()
 
@@ -261,6 +268,7 @@ class JobService:
 
         # Reset job state
         job.state = JobStates.PENDING
+        job.status = JobStatus.queued
         job.progress = 0
         job.stage = "Retrying"
         job.error = None
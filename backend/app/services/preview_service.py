@@ -0,0 +1,283 @@
+"""
+Preview renditions for clip selection.
+
+Picking in/out points does not need the full-resolution source. When
+previews are enabled, the frontend requests one for a video whose metadata
+was extracted; a worker renders a low-bitrate 240p proxy of the video plus a
+sprite sheet of timeline thumbnails with a WebVTT index, and the frontend
+scrubs those instead of streaming the source.
+
+A preview costs worker time like a clip job, so it is only queued for a
+video of known duration and charged to the requesting client's quota. The
+worker renders previews only while no clip job is waiting, and puts a
+preview back in the queue when a clip job arrives mid-render.
+
+Preview state is a Redis hash per video (shared by API replicas and
+workers) that expires with the files; the files live under
+``<clips_dir>/previews/<preview id>/``.
+"""
+
+import hashlib
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..config.configuration import get_settings
+from ..constants import PreviewConfig
+from ..utils.redis_values import resolve, to_text
+from .job_cost import JobCostEstimate, estimate_job_cost
+
+PREVIEW_KEY_PREFIX = "preview:"
+PREVIEW_QUEUE_KEY = "preview:queue"
+
+# Files of a finished preview, as served by the preview endpoint
+PREVIEW_VIDEO = "preview.mp4"
+PREVIEW_SPRITE = "sprite.jpg"
+PREVIEW_VTT = "sprite.vtt"
+PREVIEW_FILES = frozenset({PREVIEW_VIDEO, PREVIEW_SPRITE, PREVIEW_VTT})
+
+_PREVIEW_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewStatus(str, Enum):
+    """Lifecycle of a preview"""
+
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
+def preview_id_for(url: str) -> str:
+    """Stable id of the preview of a video URL"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+
+def is_preview_id(value: str) -> bool:
+    return bool(_PREVIEW_ID_RE.match(value))
+
+
+def get_previews_dir() -> Path:
+    """Directory holding one sub-directory of files per preview"""
+    return Path(get_settings().clips_dir) / "previews"
+
+
+@dataclass(frozen=True)
+class SpritePlan:
+    """Layout of the timeline thumbnails in the sprite sheet"""
+
+    interval: float  # Seconds between thumbnails
+    count: int
+    columns: int
+    rows: int
+    width: int = PreviewConfig.THUMB_WIDTH
+    height: int = PreviewConfig.THUMB_HEIGHT
+
+
+def plan_sprite(duration: float) -> SpritePlan:
+    """
+    Lay out thumbnails for a video: one per second for short videos, spread
+    out to at most ``PreviewConfig.MAX_THUMBNAILS`` for longer ones
+    """
+    interval = round(
+        max(PreviewConfig.MIN_THUMB_INTERVAL, duration / PreviewConfig.MAX_THUMBNAILS),
+        3,
+    )
+    count = max(1, math.ceil(duration / interval))
+    columns = min(count, PreviewConfig.SPRITE_COLUMNS)
+    return SpritePlan(
+        interval=interval,
+        count=count,
+        columns=columns,
+        rows=math.ceil(count / columns),
+    )
+
+
+def _vtt_timestamp(seconds: float) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
+def build_sprite_vtt(plan: SpritePlan, duration: float) -> str:
+    """
+    WebVTT index of a sprite sheet: one cue per thumbnail, whose payload is
+    the sprite's URL (relative to the index) with a ``#xywh`` media fragment
+    """
+    lines = ["WEBVTT", ""]
+    for index in range(plan.count):
+        start = index * plan.interval
+        end = min(start + plan.interval, duration)
+        x = (index % plan.columns) * plan.width
+        y = (index // plan.columns) * plan.height
+        lines += [
+            f"{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}",
+            f"{PREVIEW_SPRITE}#xywh={x},{y},{plan.width},{plan.height}",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def estimate_preview_cost(metadata: Dict[str, Any]) -> JobCostEstimate:
+    """
+    Estimate the worker time of a preview: the whole source, fetched at low
+    resolution and encoded end to end
+
+    Args:
+        metadata: Cached format metadata of the video, with its duration
+    """
+    return estimate_job_cost(
+        metadata,
+        0.0,
+        float(metadata["duration"]),
+        PreviewConfig.SOURCE_RESOLUTION,
+    )
+
+
+class PreviewStore:
+    """Redis-backed preview state and work queue"""
+
+    def __init__(self, redis_client, ttl: int = PreviewConfig.TTL):
+        """
+        Initialize preview store
+
+        Args:
+            redis_client: Redis client instance (sync or async)
+            ttl: Seconds a preview stays available
+        """
+        self.redis = redis_client
+        self.ttl = ttl
+
+    def _key(self, preview_id: str) -> str:
+        return f"{PREVIEW_KEY_PREFIX}{preview_id}"
+
+    async def _update(
+        self, preview_id: str, fields: Dict[str, Any], ttl: Optional[int] = None
+    ) -> None:
+        await resolve(self.redis.hset(self._key(preview_id), mapping=fields))
+        await resolve(self.redis.expire(self._key(preview_id), ttl or self.ttl))
+
+    async def enqueue(self, url: str, duration: Optional[float] = None) -> str:
+        """
+        Queue a preview of a video unless one exists or is in progress
+
+        Args:
+            url: Video URL
+            duration: Video duration in seconds, if known
+
+        Returns:
+            The preview id
+        """
+        preview_id = preview_id_for(url)
+        key = self._key(preview_id)
+        created = await resolve(
+            self.redis.hsetnx(key, "status", PreviewStatus.QUEUED.value)
+        )
+        if not int(created):
+            return preview_id
+
+        await self._update(
+            preview_id,
+            {
+                "url": url,
+                "duration": duration if duration is not None else "",
+                "created_at": time.time(),
+            },
+        )
+        await resolve(self.redis.rpush(PREVIEW_QUEUE_KEY, preview_id))
+        return preview_id
+
+    async def get(self, preview_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the state of a preview
+
+        Returns:
+            The preview's fields with ``id``, or None if unknown or expired
+        """
+        raw = await resolve(self.redis.hgetall(self._key(preview_id)))
+        if not raw:
+            return None
+        preview = {to_text(k): to_text(v) for k, v in raw.items()}
+        preview["id"] = preview_id
+        return preview
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest queued preview for processing
+
+        Returns:
+            The preview, or None if the queue is empty
+        """
+        while True:
+            preview_id = await resolve(self.redis.lpop(PREVIEW_QUEUE_KEY))
+            if preview_id is None:
+                return None
+            preview = await self.get(to_text(preview_id))
+            if preview is None:
+                # Expired while queued
+                continue
+            await self._update(
+                preview["id"],
+                {"status": PreviewStatus.PROCESSING.value, "started_at": time.time()},
+            )
+            return preview
+
+    async def requeue(self, preview_id: str) -> None:
+        """Put a preview whose render was interrupted back at the queue head"""
+        await self._update(preview_id, {"status": PreviewStatus.QUEUED.value})
+        await resolve(self.redis.lpush(PREVIEW_QUEUE_KEY, preview_id))
+
+    async def complete(self, preview_id: str, **fields: Any) -> None:
+        """Mark a preview ready, recording its rendition details"""
+        await self._update(
+            preview_id,
+            {**fields, "status": PreviewStatus.READY.value, "ready_at": time.time()},
+        )
+
+    async def fail(self, preview_id: str, error: str) -> None:
+        """Mark a preview failed; it can be queued again once this expires"""
+        await self._update(
+            preview_id,
+            {"status": PreviewStatus.FAILED.value, "error": str(error)[:500]},
+            ttl=PreviewConfig.FAILED_TTL,
+        )
+
+
+async def queue_preview(redis_client, url: str, duration: float) -> Optional[str]:
+    """
+    Queue a preview of a video, if previews are enabled
+
+    Never raises: a preview is an optimisation.
+
+    Args:
+        redis_client: Redis client instance (sync or async)
+        url: Video URL
+        duration: Video duration in seconds; videos of unknown duration get
+            no preview, as their cost cannot be bounded
+
+    Returns:
+        The preview id, or None if no preview was queued
+    """
+    if not get_settings().preview_enabled or redis_client is None:
+        return None
+    if not duration:
+        logger.info(f"🎞️ No preview for {url}: duration unknown")
+        return None
+    if duration > PreviewConfig.MAX_DURATION:
+        logger.info(f"🎞️ No preview for {url}: {duration:.0f}s is too long")
+        return None
+
+    try:
+        return await PreviewStore(redis_client).enqueue(url, duration)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to queue preview for {url}: {e}")
+        return None
@@ -1,6 +1,7 @@
 import hashlib
 import os
 import re
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Dict, Optional
@@ -15,15 +16,27 @@ except ImportError:
 
 # Import settings from the new configuration module
 from app.config.configuration import get_settings
+from app.constants import StorageConfig
+from app.logging.config import get_logger
 
 settings = get_settings()
+logger = get_logger(__name__)
 
 
 class LocalStorageManager:
     """Local storage manager with ISO-8601 organization and atomic operations"""
 
-    def __init__(self, base_path: str = None):
+    def __init__(self, base_path: str = None, expiry_index=None):
+        """
+        Initialize local storage manager
+
+        Args:
+            base_path: Clips directory, defaults to the clips_dir setting
+            expiry_index: Optional ClipExpiryIndex that saved clips are
+                recorded in, for cleanup to find them by expiry time
+        """
         self.base_path = Path(base_path or settings.clips_dir)
+        self.expiry_index = expiry_index
         self._ensure_base_directory()
 
     def _ensure_base_directory(self) -> None:
@@ -54,7 +67,7 @@ class LocalStorageManager:
 
     def _get_daily_path(self, job_id: str) -> Path:
         """Get ISO-8601 organized path for job"""
-        today = datetime.utcnow().strftime("%Y-%m-%d")
+        today = datetime.utcnow().strftime(StorageConfig.DAY_DIRECTORY_FORMAT)
         return self.base_path / today
 
     async def save(
@@ -100,9 +113,11 @@ class LocalStorageManager:
             # Calculate checksum and size
             file_size = final_path.stat().st_size
             sha256_hash = hashlib.sha256(video_data).hexdigest()
+            relative_path = final_path.relative_to(self.base_path).as_posix()
+            self._record_expiry(relative_path)
 
             return {
-                "file_path": str(final_path.relative_to(self.base_path)),
+                "file_path": relative_path,
                 "full_path": str(final_path),
                 "sha256": sha256_hash,
                 "size": file_size,
@@ -115,6 +130,16 @@ class LocalStorageManager:
                 temp_path.unlink(missing_ok=True)
             raise Exception(f"STORAGE_FAIL: Failed to save clip: {str(e)}")
 
+    def _record_expiry(self, relative_path: str) -> None:
+        """Index a saved clip for cleanup"""
+        if self.expiry_index is None:
+            return
+        try:
+            self.expiry_index.record(relative_path, time.time())
+        except Exception as e:
+            # The clip still goes once its whole day directory expires
+            logger.warning(f"⚠️ Failed to index clip {relative_path} for expiry: {e}")
+
     async def get(self, job_id: str) -> Optional[Path]:
         """Get file path for job_id, checking daily directories"""
         # Look in today's directory first
@@ -130,7 +155,7 @@ class LocalStorageManager:
             check_date = (datetime.utcnow() - timedelta(days=days_ago)).replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
-            date_str = check_date.strftime("%Y-%m-%d")
+            date_str = check_date.strftime(StorageConfig.DAY_DIRECTORY_FORMAT)
             date_path = self.base_path / date_str
 
             if date_path.exists():
@@ -0,0 +1,217 @@
+"""
+Time-indexed expiry of stored clips.
+
+Clips are saved under one directory per UTC day (``<clips_dir>/YYYY-MM-DD``).
+Saving a clip also records its path in the ``clips:expiry`` sorted set, scored
+by the time it expires, so cleanup reads the clips that are due instead of
+walking and stat-ing the whole clips tree. A day directory whose every clip is
+past retention is dropped whole, without looking its clips up one by one.
+"""
+
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config.configuration import get_settings
+from app.constants import RedisKeys, StorageConfig
+from app.logging.config import get_logger
+from app.utils.redis_values import to_text
+
+logger = get_logger(__name__)
+
+DAY_SECONDS = 86400
+
+
+class ClipExpiryIndex:
+    """Stored clips by expiry time, in a Redis sorted set"""
+
+    def __init__(self, redis_client, retention_hours: Optional[int] = None):
+        """
+        Initialize clip expiry index
+
+        Args:
+            redis_client: Sync Redis client
+            retention_hours: Hours a clip is kept, defaults to the
+                ``cleanup_after_hours`` setting
+        """
+        self.redis = redis_client
+        self.retention_hours = (
+            retention_hours
+            if retention_hours is not None
+            else get_settings().cleanup_after_hours
+        )
+
+    def record(self, relative_path: str, saved_at: Optional[float] = None) -> float:
+        """
+        Index a saved clip
+
+        Args:
+            relative_path: Clip path relative to the clips directory
+            saved_at: Unix time the clip was saved, defaults to now
+
+        Returns:
+            Unix time the clip expires
+        """
+        saved_at = time.time() if saved_at is None else saved_at
+        expires_at = saved_at + self.retention_hours * 3600
+        self.redis.zadd(RedisKeys.CLIP_EXPIRY, {relative_path: expires_at})
+        return expires_at
+
+    def due(
+        self, max_age_hours: float, now: float, limit: int, offset: int = 0
+    ) -> List[str]:
+        """Paths of clips older than ``max_age_hours``, earliest first"""
+        # Scores hold the save time plus this index's retention
+        cutoff = now + (self.retention_hours - max_age_hours) * 3600
+        paths = self.redis.zrangebyscore(
+            RedisKeys.CLIP_EXPIRY, "-inf", cutoff, start=offset, num=limit
+        )
+        return [to_text(path) for path in paths]
+
+    def remove(self, paths: Iterable[str]) -> None:
+        """Drop clips from the index"""
+        paths = list(paths)
+        if paths:
+            self.redis.zrem(RedisKeys.CLIP_EXPIRY, *paths)
+
+
+def expired_day_directories(
+    base_path: Path, max_age_hours: float, now: float
+) -> List[Path]:
+    """Day directories whose every clip is older than ``max_age_hours``"""
+    try:
+        entries = list(os.scandir(base_path))
+    except FileNotFoundError:
+        return []
+
+    expired = []
+    for entry in entries:
+        if not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            day = datetime.strptime(entry.name, StorageConfig.DAY_DIRECTORY_FORMAT)
+        except ValueError:
+            continue  # Not a day directory (e.g. temp)
+        # The newest clip of a day was saved before the next midnight
+        day_end = day.replace(tzinfo=timezone.utc).timestamp() + DAY_SECONDS
+        if day_end + max_age_hours * 3600 <= now:
+            expired.append(Path(entry.path))
+    return sorted(expired)
+
+
+def _remove_day_directory(day_dir: Path, dry_run: bool) -> Tuple[int, int]:
+    """Delete a day directory, returning its file count and size"""
+    files_deleted = size_freed = 0
+    with os.scandir(day_dir) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not dry_run:
+                    shutil.rmtree(entry.path)
+                continue
+            try:
+                size = entry.stat(follow_symlinks=False).st_size
+                if not dry_run:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                continue
+            files_deleted += 1
+            size_freed += size
+    if not dry_run:
+        day_dir.rmdir()
+    return files_deleted, size_freed
+
+
+def _delete_clip(file_path: Path, dry_run: bool) -> Optional[int]:
+    """Delete a clip, returning its size; None if it was already gone"""
+    try:
+        size = file_path.stat().st_size
+        if not dry_run:
+            file_path.unlink()
+        return size
+    except FileNotFoundError:
+        return None
+
+
+def expire_clips(
+    base_path: Path,
+    index: Optional[ClipExpiryIndex],
+    max_age_hours: float,
+    now: Optional[float] = None,
+    dry_run: bool = False,
+    batch_size: int = StorageConfig.CLIP_EXPIRY_BATCH_SIZE,
+    pause: float = StorageConfig.CLIP_EXPIRY_BATCH_PAUSE,
+) -> Dict[str, int]:
+    """
+    Delete clips older than ``max_age_hours``
+
+    Whole day directories go first, then the remaining due clips are
+    deleted from the index in batches, pausing between batches so a large
+    backlog does not saturate the disk. Without an index only whole day
+    directories are removed.
+
+    Args:
+        base_path: Clips directory
+        index: Clip expiry index, None to only drop day directories
+        max_age_hours: Age past which clips are deleted
+        now: Unix time of the cleanup, defaults to the current time
+        dry_run: Count what would be deleted without deleting it
+        batch_size: Index entries handled per batch
+        pause: Seconds to wait between batches
+
+    Returns:
+        Dictionary with files_deleted, size_freed (bytes),
+        directories_removed and errors
+    """
+    now = time.time() if now is None else now
+    stats = {"files_deleted": 0, "size_freed": 0, "directories_removed": 0}
+    errors = 0
+
+    dropped = set()
+    for day_dir in expired_day_directories(base_path, max_age_hours, now):
+        try:
+            files_deleted, size_freed = _remove_day_directory(day_dir, dry_run)
+        except OSError as e:
+            # Its clips are still deleted one by one below
+            logger.warning(f"⚠️ Failed to remove day directory {day_dir}: {e}")
+            errors += 1
+            continue
+        dropped.add(day_dir.name)
+        stats["files_deleted"] += files_deleted
+        stats["size_freed"] += size_freed
+        stats["directories_removed"] += 1
+        logger.info(
+            f"🗑️ Removed expired day directory {day_dir} ({files_deleted} files)"
+        )
+        time.sleep(pause)
+
+    offset = 0
+    while index is not None:
+        paths = index.due(max_age_hours, now, batch_size, offset)
+        for path in paths:
+            relative_path = Path(path)
+            if relative_path.parts and relative_path.parts[0] in dropped:
+                continue
+            try:
+                size = _delete_clip(base_path / relative_path, dry_run)
+            except OSError as e:
+                logger.warning(f"⚠️ Failed to delete clip {path}: {e}")
+                errors += 1
+                continue
+            if size is not None:
+                stats["files_deleted"] += 1
+                stats["size_freed"] += size
+
+        # A dry run leaves the entries in place, so page past them instead
+        if dry_run:
+            offset += len(paths)
+        else:
+            index.remove(paths)
+        if len(paths) < batch_size:
+            break
+        time.sleep(pause)
+
+    stats["errors"] = errors
+    return stats
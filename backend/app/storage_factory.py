@@ -1,21 +1,27 @@
 from app.storage import LocalStorageManager
+from app.storage_expiry import ClipExpiryIndex
 
 
-def get_storage_manager() -> LocalStorageManager:
+def get_storage_manager(redis_client=None) -> LocalStorageManager:
     """
     Factory function to get storage manager
     Now only supports local storage - S3 migration complete
+
+    Args:
+        redis_client: Optional sync Redis client; saved clips are then
+            recorded in the clip expiry index
     """
     # Import settings using the new configuration module
     from app.config.configuration import get_settings
 
     settings = get_settings()
+    expiry_index = ClipExpiryIndex(redis_client) if redis_client is not None else None
 
     if settings.storage_backend == "local":
-        return LocalStorageManager()
+        return LocalStorageManager(expiry_index=expiry_index)
     else:
         # Force local storage if invalid backend specified
-        return LocalStorageManager()
+        return LocalStorageManager(expiry_index=expiry_index)
 
 
 # Singleton instance for dependency injection - initialize when first accessed
@@ -6,7 +6,7 @@ Handles cleanup of temporary files, expired jobs, and storage optimization.
 import asyncio
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, Optional, Union
 
 from fastapi import BackgroundTasks
 
@@ -14,6 +14,7 @@ from ..config.configuration import get_settings
 from ..constants import StorageConfig
 from ..logging.config import get_logger
 from ..repositories.job_repository import JobRepository
+from ..storage_expiry import ClipExpiryIndex, expire_clips
 
 logger = get_logger(__name__)
 
@@ -27,7 +28,10 @@ class CleanupManager:
 
     async def cleanup_expired_jobs(self) -> Dict[str, Union[int, str]]:
         """
-        Clean up expired jobs and their associated data
+        Clean up expired job records
+
+        Their clips are removed by cleanup_storage_directory through the clip
+        expiry index, so this only deletes the records, in batches.
 
         Returns:
             Dictionary with cleanup statistics
@@ -39,18 +43,11 @@ class CleanupManager:
 
             logger.info(f"Starting job cleanup for jobs older than {cutoff_time}")
 
-            # Get expired jobs before deletion for file cleanup
-            expired_jobs = await self._get_expired_jobs(cutoff_time)
-
-            # Clean up associated files
-            files_deleted = await self._cleanup_job_files(expired_jobs)
-
             # Delete job records
             jobs_deleted = await self.job_repository.cleanup_jobs_before(cutoff_time)
 
             stats: Dict[str, Union[int, str]] = {
                 "jobs_deleted": jobs_deleted,
-                "files_deleted": files_deleted,
                 "cutoff_time": cutoff_time.isoformat(),
             }
 
@@ -109,6 +106,10 @@ class CleanupManager:
         """
         Clean up the main storage directory using configured retention policy
 
+        Clips are found through the clip expiry index and whole expired day
+        directories, so the cost follows the number of expired clips rather
+        than the size of the storage tree.
+
         Returns:
             Dictionary with cleanup statistics
         """
@@ -119,19 +120,22 @@ class CleanupManager:
                 logger.warning(f"Storage directory does not exist: {storage_path}")
                 return {"files_deleted": 0, "size_freed_mb": 0}
 
-            cutoff_time = datetime.now() - timedelta(
+            cutoff_time = datetime.utcnow() - timedelta(
                 hours=self.settings.cleanup_after_hours
             )
 
-            result = await self._cleanup_directory(storage_path, cutoff_time)
-
-            # Also clean up empty date directories
-            empty_dirs_removed = await self._remove_empty_directories(storage_path)
+            # Deleting files blocks, so keep it off the event loop
+            result = await asyncio.to_thread(
+                expire_clips,
+                storage_path,
+                self._clip_expiry_index(),
+                self.settings.cleanup_after_hours,
+            )
 
             stats = {
                 "files_deleted": result["files_deleted"],
                 "size_freed_mb": round(result["size_freed"] / (1024 * 1024), 2),
-                "empty_dirs_removed": empty_dirs_removed,
+                "directories_removed": result["directories_removed"],
                 "cutoff_time": cutoff_time.isoformat(),
             }
 
@@ -175,36 +179,12 @@ class CleanupManager:
             logger.error(f"Storage optimization failed: {str(e)}", exc_info=True)
             raise
 
-    async def _get_expired_jobs(self, cutoff_time: datetime) -> List[Dict]:
-        """Get list of expired jobs for file cleanup"""
-        try:
-            # This would need to be implemented based on job repository capabilities
-            # For now, return empty list as placeholder
-            return []
-        except Exception as e:
-            logger.error(f"Failed to get expired jobs: {str(e)}")
-            return []
-
-    async def _cleanup_job_files(self, jobs: List[Dict]) -> int:
-        """Clean up files associated with specific jobs"""
-        files_deleted = 0
-
-        for job in jobs:
-            try:
-                # Clean up job-specific files if they exist
-                job_id = job.get("id")
-                if job_id:
-                    job_files = await self._find_job_files(job_id)
-                    for file_path in job_files:
-                        if await self._delete_file_safe(file_path):
-                            files_deleted += 1
-
-            except Exception as e:
-                logger.error(
-                    f"Failed to cleanup files for job {job.get('id')}: {str(e)}"
-                )
-
-        return files_deleted
+    def _clip_expiry_index(self) -> Optional[ClipExpiryIndex]:
+        """Clip expiry index, None without Redis (day directories only)"""
+        redis_client = getattr(self.job_repository, "redis", None)
+        if redis_client is None:
+            return None
+        return ClipExpiryIndex(redis_client, self.settings.cleanup_after_hours)
 
     async def _cleanup_directory(
         self, directory: Path, cutoff_time: datetime
@@ -217,11 +197,12 @@ class CleanupManager:
             for file_path in directory.rglob("*"):
                 if file_path.is_file():
                     try:
-                        # Check file modification time
-                        mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
+                        # One stat gives both the age and the size
+                        file_stat = file_path.stat()
+                        mtime = datetime.fromtimestamp(file_stat.st_mtime)
 
                         if mtime < cutoff_time:
-                            file_size = file_path.stat().st_size
+                            file_size = file_stat.st_size
 
                             if await self._delete_file_safe(file_path):
                                 files_deleted += 1
@@ -236,49 +217,6 @@ class CleanupManager:
 
         return {"files_deleted": files_deleted, "size_freed": size_freed}
 
-    async def _remove_empty_directories(self, root_path: Path) -> int:
-        """Remove empty directories recursively"""
-        removed_count = 0
-
-        try:
-            # Walk directories bottom-up to handle nested empty directories
-            for dir_path in sorted(
-                root_path.rglob("*"), key=lambda p: len(p.parts), reverse=True
-            ):
-                if dir_path.is_dir() and dir_path != root_path:
-                    try:
-                        # Check if directory is empty
-                        if not any(dir_path.iterdir()):
-                            dir_path.rmdir()
-                            removed_count += 1
-                            logger.debug(f"Removed empty directory: {dir_path}")
-                    except Exception as e:
-                        logger.warning(
-                            f"Failed to remove directory {dir_path}: {str(e)}"
-                        )
-
-        except Exception as e:
-            logger.error(f"Failed to remove empty directories: {str(e)}")
-
-        return removed_count
-
-    async def _find_job_files(self, job_id: str) -> List[Path]:
-        """Find all files associated with a specific job"""
-        job_files = []
-
-        try:
-            storage_path = Path(self.settings.clips_dir)
-
-            # Search for files with job_id in name
-            for file_path in storage_path.rglob(f"*{job_id}*"):
-                if file_path.is_file():
-                    job_files.append(file_path)
-
-        except Exception as e:
-            logger.error(f"Failed to find files for job {job_id}: {str(e)}")
-
-        return job_files
-
     async def _delete_file_safe(self, file_path: Path) -> bool:
         """Safely delete a file with error handling"""
         try:
@@ -371,6 +309,7 @@ class PeriodicCleanupScheduler:
                     # Run cleanup tasks
                     await self.cleanup_manager.cleanup_expired_jobs()
                     await self.cleanup_manager.cleanup_temporary_files()
+                    await self.cleanup_manager.cleanup_storage_directory()
 
                     # Wait for next interval
                     await asyncio.sleep(interval_hours * 3600)
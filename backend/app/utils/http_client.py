@@ -0,0 +1,113 @@
+"""
+Shared HTTP client for outbound requests made by the API.
+
+One ``httpx.AsyncClient`` lives for the whole process so connections (TCP,
+TLS and DNS lookups) to the platforms' CDNs are kept alive and reused across
+requests instead of being set up for every proxied video. HTTP/2 is used when
+the ``h2`` package is installed, multiplexing requests to the same CDN host
+over one connection.
+
+The client is created on first use and closed on application shutdown.
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from ..constants import ProxyConfig
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide HTTP client, creating it on first use
+
+    Returns:
+        Shared ``httpx.AsyncClient`` with keep-alive connection limits
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=ProxyConfig.MAX_CONNECTIONS,
+                max_keepalive_connections=ProxyConfig.MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=ProxyConfig.KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                ProxyConfig.READ_TIMEOUT,
+                connect=ProxyConfig.CONNECT_TIMEOUT,
+                pool=ProxyConfig.POOL_TIMEOUT,
+            ),
+        )
+        logger.info(
+            f"🌐 Created shared HTTP client (http2={HTTP2_AVAILABLE}, "
+            f"max_connections={ProxyConfig.MAX_CONNECTIONS})"
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def stream_body(response: httpx.Response) -> AsyncIterator[bytes]:
+    """
+    Relay a streamed response body in adaptively sized chunks
+
+    Chunks start at ``ProxyConfig.MIN_CHUNK_SIZE`` and double while the
+    consumer takes them quickly, up to ``ProxyConfig.MAX_CHUNK_SIZE``; a slow
+    consumer shrinks them again. The next chunk is only read from upstream
+    once the previous one was consumed, so at most one chunk per stream is
+    held in memory however large the video is.
+
+    The upstream response is closed when the body ends, fails or the
+    consumer stops iterating (e.g. the client disconnected).
+
+    Args:
+        response: Response sent with ``stream=True``
+
+    Yields:
+        Body chunks of at most ``ProxyConfig.MAX_CHUNK_SIZE`` bytes
+    """
+    chunk_size = ProxyConfig.MIN_CHUNK_SIZE
+    buffer = bytearray()
+    try:
+        async for data in response.aiter_raw():
+            buffer += data
+            while len(buffer) >= chunk_size:
+                chunk = bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+
+                started = time.monotonic()
+                yield chunk
+                # The consumer resumes us once the chunk was sent to the client
+                if time.monotonic() - started < ProxyConfig.FAST_SEND_SECONDS:
+                    chunk_size = min(chunk_size * 2, ProxyConfig.MAX_CHUNK_SIZE)
+                else:
+                    chunk_size = max(chunk_size // 2, ProxyConfig.MIN_CHUNK_SIZE)
+
+        if buffer:
+            yield bytes(buffer)
+    except asyncio.CancelledError:
+        logger.info("🔌 Client disconnected, closing upstream stream")
+        raise
+    finally:
+        await response.aclose()
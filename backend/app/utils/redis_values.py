@@ -0,0 +1,18 @@
+"""
+Helpers for code shared by sync and async Redis clients.
+"""
+
+import asyncio
+from typing import Any
+
+
+def to_text(value: Any) -> str:
+    """Normalise a Redis reply from decoding or non-decoding clients"""
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+async def resolve(result: Any) -> Any:
+    """Await the result of a Redis call when the client is async"""
+    if asyncio.iscoroutine(result):
+        return await result
+    return result
@@ -4,106 +4,130 @@ Adds:
 1. Optional browser cookies (env var `YTDLP_COOKIE_FILE` or `cookies/youtube_cookies.txt`).
 2. `force_ipv4` flag to avoid IPv6-specific throttling.
 3. `http2` flag to mimic modern browsers.
+
+Options are built once per process and rebuilt only when a cookie source
+changes (an env var's value or a cookie file's mtime), so a call is normally
+just a dict copy. Cookie content passed in env vars is written atomically to
+a content-addressed temp file, so concurrent jobs never read a half-written
+cookie file and a changed cookie never overwrites one still in use.
 """
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import logging
 import os
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Optional, Tuple
 
+logger = logging.getLogger(__name__)
 
-def _detect_cookie_file() -> str | None:
-    """Return path to cookie file if it exists, else *None*."""
-    # 1. Explicit env var wins
-    env_cookie = os.getenv("YTDLP_COOKIE_FILE")
-    if env_cookie and Path(env_cookie).expanduser().is_file():
-        return str(Path(env_cookie).expanduser())
+# (env var, platform, base64-encoded) in order of preference
+COOKIE_ENV_SOURCES = (
+    ("INSTAGRAM_COOKIES_B64", "instagram", True),
+    ("FACEBOOK_COOKIES_B64", "facebook", True),
+    ("INSTAGRAM_COOKIES", "instagram", False),
+    ("FACEBOOK_COOKIES", "facebook", False),
+)
 
-    # NEW: Instagram and Facebook cookie content passed in environment variables
+# Conventional locations under <project_root>/cookies/
+COOKIES_DIR = Path(__file__).resolve().parent.parent.parent.parent / "cookies"
 
-    import base64
-    import logging
-    import tempfile
+# Search order matters – prefer platform-specific cookies when present
+COOKIE_FILE_CANDIDATES = (
+    "facebook_cookies.txt",  # Facebook cookies
+    "instagram_cookies.txt",  # Instagram cookies
+    "youtube_cookies.txt",  # Legacy YouTube cookies fallback
+)
 
-    logger = logging.getLogger(__name__)
+# Seconds between checks of the cookie sources for changes
+SOURCE_CHECK_INTERVAL = 5.0
 
-    # Check for base64 encoded Instagram cookie content in environment variable
-    env_cookie_b64 = os.getenv("INSTAGRAM_COOKIES_B64")
-    if env_cookie_b64:
-        try:
-            cookie_content = base64.b64decode(env_cookie_b64).decode("utf-8")
-            temp_dir = Path(tempfile.gettempdir())
-            temp_cookie_file = temp_dir / "instagram_cookies_temp.txt"
-            temp_cookie_file.write_text(cookie_content)
-            logger.info(
-                f"✅ Created temporary cookie file from INSTAGRAM_COOKIES_B64 env var: {temp_cookie_file}"
-            )
-            return str(temp_cookie_file)
-        except Exception as e:
-            logger.warning(
-                f"⚠️ Failed to decode INSTAGRAM_COOKIES_B64 env var into cookie file: {e}"
-            )
 
-    # Check for base64 encoded Facebook cookie content in environment variable
-    facebook_cookie_b64 = os.getenv("FACEBOOK_COOKIES_B64")
-    if facebook_cookie_b64:
-        try:
-            cookie_content = base64.b64decode(facebook_cookie_b64).decode("utf-8")
-            temp_dir = Path(tempfile.gettempdir())
-            temp_cookie_file = temp_dir / "facebook_cookies_temp.txt"
-            temp_cookie_file.write_text(cookie_content)
-            logger.info(
-                f"✅ Created temporary cookie file from FACEBOOK_COOKIES_B64 env var: {temp_cookie_file}"
-            )
-            return str(temp_cookie_file)
-        except Exception as e:
-            logger.warning(
-                f"⚠️ Failed to decode FACEBOOK_COOKIES_B64 env var into cookie file: {e}"
-            )
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
 
-    # Check for plain text Instagram cookie content in env variable
-    env_cookie_content = os.getenv("INSTAGRAM_COOKIES")
-    if env_cookie_content:
+def _cookie_sources_signature() -> Tuple:
+    """Fingerprint of every cookie source, cheap enough to take per check"""
+    env_hashes = tuple(
+        hashlib.sha256(os.getenv(name, "").encode("utf-8")).hexdigest()
+        for name, _, _ in COOKIE_ENV_SOURCES
+    )
+    env_cookie = os.getenv("YTDLP_COOKIE_FILE")
+    paths = [Path(env_cookie).expanduser()] if env_cookie else []
+    paths += [COOKIES_DIR / candidate for candidate in COOKIE_FILE_CANDIDATES]
+    return env_hashes + (env_cookie,) + tuple(_mtime(path) for path in paths)
+
+
+def _materialize_cookie_file(platform: str, content: str) -> str:
+    """
+    Write cookie content to a temp file named after its hash
+
+    The file is written under a unique name and renamed into place, so readers
+    see either no file or the complete one. Identical content maps to the same
+    path and is only written once; pooled YoutubeDL instances save their
+    cookie jars to private copies, so it is never rewritten.
+
+    Returns:
+        Path of the cookie file
+    """
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+    temp_dir = Path(tempfile.gettempdir())
+    cookie_file = temp_dir / f"{platform}_cookies_{digest}.txt"
+    if cookie_file.is_file():
+        return str(cookie_file)
+
+    fd, partial = tempfile.mkstemp(
+        prefix=f".{platform}_cookies_", suffix=".partial", dir=temp_dir
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(partial, cookie_file)
+    except BaseException:
         try:
-            temp_dir = Path(tempfile.gettempdir())
-            temp_cookie_file = temp_dir / "instagram_cookies_temp.txt"
-            temp_cookie_file.write_text(env_cookie_content)
-            logger.info(
-                f"✅ Created temporary cookie file from INSTAGRAM_COOKIES env var: {temp_cookie_file}"
-            )
-            return str(temp_cookie_file)
-        except Exception as e:
-            logger.warning(
-                f"⚠️ Failed to write INSTAGRAM_COOKIES env var into cookie file: {e}"
-            )
+            os.unlink(partial)
+        except OSError:
+            pass
+        raise
+    return str(cookie_file)
 
-    # Check for plain text Facebook cookie content in env variable
-    facebook_cookie_content = os.getenv("FACEBOOK_COOKIES")
-    if facebook_cookie_content:
+
+def _detect_cookie_file() -> str | None:
+    """Return path to cookie file if it exists, else *None*."""
+    # 1. Explicit env var wins
+    env_cookie = os.getenv("YTDLP_COOKIE_FILE")
+    if env_cookie and Path(env_cookie).expanduser().is_file():
+        return str(Path(env_cookie).expanduser())
+
+    # Instagram and Facebook cookie content passed in environment variables
+    for env_name, platform, encoded in COOKIE_ENV_SOURCES:
+        value = os.getenv(env_name)
+        if not value:
+            continue
         try:
-            temp_dir = Path(tempfile.gettempdir())
-            temp_cookie_file = temp_dir / "facebook_cookies_temp.txt"
-            temp_cookie_file.write_text(facebook_cookie_content)
+            content = base64.b64decode(value).decode("utf-8") if encoded else value
+            cookie_file = _materialize_cookie_file(platform, content)
             logger.info(
-                f"✅ Created temporary cookie file from FACEBOOK_COOKIES env var: {temp_cookie_file}"
+                f"✅ Created temporary cookie file from {env_name} env var: {cookie_file}"
             )
-            return str(temp_cookie_file)
+            return cookie_file
         except Exception as e:
             logger.warning(
-                f"⚠️ Failed to write FACEBOOK_COOKIES env var into cookie file: {e}"
+                f"⚠️ Failed to write {env_name} env var into cookie file: {e}"
             )
 
     # 2. Conventional locations under <project_root>/cookies/
-    cookies_dir = Path(__file__).resolve().parent.parent.parent.parent / "cookies"
-
-    # Search order matters – prefer platform-specific cookies when present
-    for candidate in [
-        "facebook_cookies.txt",  # Facebook cookies
-        "instagram_cookies.txt",  # Instagram cookies
-        "youtube_cookies.txt",  # Legacy YouTube cookies fallback
-    ]:
-        candidate_path = cookies_dir / candidate
+    for candidate in COOKIE_FILE_CANDIDATES:
+        candidate_path = COOKIES_DIR / candidate
         if candidate_path.is_file():
             return str(candidate_path)
 
@@ -111,8 +135,63 @@ def _detect_cookie_file() -> str | None:
     return None
 
 
-def build_common_ydl_opts() -> Dict:
-    """Return a dict of baseline yt-dlp options shared by backend components."""
+class _OptionProfiles:
+    """Option dicts derived from the cookie sources, rebuilt when they change"""
+
+    def __init__(self, check_interval: float = SOURCE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self._checked_at: Optional[float] = None
+        self._cookie_file: Optional[str] = None
+        self._profiles: Dict[str, object] = {}
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if (
+            self._checked_at is not None
+            and now - self._checked_at < self.check_interval
+        ):
+            return
+
+        signature = _cookie_sources_signature()
+        if signature != self._signature:
+            if self._signature is not None:
+                logger.info("🍪 Cookie sources changed, rebuilding yt-dlp options")
+            self._cookie_file = _detect_cookie_file()
+            self._profiles.clear()
+            self._signature = signature
+        self._checked_at = now
+
+    def get(self, name: str, build: Callable[[Optional[str]], object]) -> object:
+        """
+        Get a named profile, building it from the current cookie file if needed
+
+        The returned object is shared: callers must copy it before mutating.
+        """
+        with self._lock:
+            self._refresh()
+            if name not in self._profiles:
+                self._profiles[name] = build(self._cookie_file)
+            return self._profiles[name]
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next call"""
+        with self._lock:
+            self._signature = None
+            self._checked_at = None
+            self._profiles.clear()
+
+
+_option_profiles = _OptionProfiles()
+
+
+def invalidate_ydl_opts() -> None:
+    """Discard cached options, e.g. after replacing cookies in place"""
+    _option_profiles.invalidate()
+
+
+def _build_common_profile(cookie_file: Optional[str]) -> Dict:
     opts: Dict[str, object] = {
         "quiet": True,
         "no_warnings": True,
@@ -122,8 +201,12 @@ def build_common_ydl_opts() -> Dict:
         "http2": True,  # Enable HTTP/2 where supported
     }
 
-    cookie_file = _detect_cookie_file()
     if cookie_file:
         opts["cookiefile"] = cookie_file
 
     return opts
+
+
+def build_common_ydl_opts() -> Dict:
+    """Return a dict of baseline yt-dlp options shared by backend components."""
+    return dict(_option_profiles.get("common", _build_common_profile))
@@ -0,0 +1,135 @@
+"""
+Tests for the bounded per-client state of the rate limiter and DoS protection
+"""
+
+import pytest
+
+from app.constants import RateLimits
+from app.middleware.client_state import BoundedClientMap, TimeRing
+from app.middleware.queue_protection import QueueDosProtection
+from app.middleware.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Seen:
+    def __init__(self, at: float):
+        self.at = at
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_map(clock, max_size=3, idle_ttl=60):
+    return BoundedClientMap(
+        "test",
+        max_size=max_size,
+        idle_ttl=idle_ttl,
+        last_seen=lambda entry: entry.at,
+        clock=clock,
+    )
+
+
+class TestBoundedClientMap:
+    """Test the LRU cap and idle expiry"""
+
+    def test_evicts_least_recently_seen_beyond_cap(self, clock):
+        clients = make_map(clock)
+        for ip in ("a", "b", "c"):
+            clients.get_or_create(ip, lambda: Seen(clock.now))
+
+        # Seeing "a" again makes "b" the least recently seen client
+        clients.get_or_create("a", lambda: Seen(clock.now))
+        clients.get_or_create("d", lambda: Seen(clock.now))
+
+        assert len(clients) == 3
+        assert "b" not in clients
+        assert list(clients) == ["c", "a", "d"]
+
+    def test_expire_stops_at_first_live_entry(self, clock):
+        clients = make_map(clock, max_size=10)
+        for index, ip in enumerate("abcd"):
+            clients[ip] = Seen(clock.now + index * 30)
+
+        assert clients.expire(clock.now + 95) == 2
+        assert list(clients) == ["c", "d"]
+
+    def test_insertion_expires_idle_entries(self, clock):
+        clients = make_map(clock, max_size=10)
+        clients.get_or_create("old", lambda: Seen(clock.now))
+
+        clock.now += 120
+        clients.get_or_create("new", lambda: Seen(clock.now))
+
+        assert list(clients) == ["new"]
+
+    def test_lookups_do_not_touch(self, clock):
+        clients = make_map(clock)
+        for ip in ("a", "b", "c"):
+            clients[ip] = Seen(clock.now)
+
+        assert clients.get("a").at == clock.now
+        assert "a" in clients
+        clients["d"] = Seen(clock.now)
+
+        assert "a" not in clients
+
+
+class TestTimeRing:
+    """Test the fixed-size timestamp ring"""
+
+    def test_keeps_most_recent_in_order(self):
+        ring = TimeRing(3)
+        assert not ring
+
+        for timestamp in (1.0, 2.0, 3.0, 4.0, 5.0):
+            ring.append(timestamp)
+
+        assert len(ring) == 3
+        assert list(ring) == [3.0, 4.0, 5.0]
+        assert ring[-1] == 5.0
+        assert ring[-3] == ring[0] == 3.0
+        with pytest.raises(IndexError):
+            ring[-4]
+
+
+class TestBoundedLimiterState:
+    """Test the rate limiter and DoS protection cannot grow without bound"""
+
+    def test_rate_limiter_tables_are_capped(self, monkeypatch):
+        monkeypatch.setattr(RateLimits, "MAX_TRACKED_CLIENTS", 50)
+        limiter = RateLimiter()
+        config = limiter.rate_limits["global"]
+
+        for index in range(200):
+            bucket = limiter._get_or_create_bucket(
+                limiter.ip_buckets, f"10.0.{index // 256}.{index % 256}", config
+            )
+            bucket.consume()
+
+        assert len(limiter.ip_buckets) == 50
+        assert "10.0.0.199" in limiter.ip_buckets
+
+    def test_burst_detection_with_bounded_history(self, monkeypatch):
+        monkeypatch.setattr(RateLimits, "MAX_TRACKED_CLIENTS", 50)
+        protection = QueueDosProtection()
+
+        for index in range(200):
+            protection.get_or_create_ip_behavior(f"192.0.2.{index}")
+        behavior = protection.get_or_create_ip_behavior("192.0.2.199")
+        results = [
+            protection.check_burst_detection(behavior, "192.0.2.199", "POST")[0]
+            for _ in range(RateLimits.MAX_BURST_REQUESTS)
+        ]
+
+        assert len(protection.ip_behaviors) == 50
+        assert results[-1] is False and all(results[:-1])
+        assert len(behavior.request_times) == RateLimits.MAX_BURST_REQUESTS
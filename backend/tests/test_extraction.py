@@ -0,0 +1,757 @@
+"""
+Tests for the extraction package:
+- Failure classification
+- Negative caching of permanent failures
+- Adaptive strategy ordering
+- Hedged attempts
+- Asynchronous extraction tickets
+- YoutubeDL pooling
+- Cookie session rotation
+- Politeness scheduling
+- Circuit breakers
+"""
+
+from pathlib import Path
+
+import pytest
+
+from app.extraction import (
+    PERMANENT_FAILURES,
+    CircuitOpenError,
+    CookieSessionPool,
+    ExtractionCircuitBreaker,
+    FailureClass,
+    HedgeBudget,
+    PolitenessScheduler,
+    Priority,
+    StrategySelector,
+    YoutubeDLPool,
+    classify_extraction_error,
+    get_circuit_states,
+    get_strategy_rankings,
+    run_hedged,
+)
+
+
+class TestFailureClassification:
+    """Test classification of yt-dlp error messages"""
+
+    @pytest.mark.parametrize(
+        "message,expected",
+        [
+            (
+                "ERROR: [youtube] abc: Sign in to confirm you're not a bot",
+                FailureClass.RATE_LIMITED,
+            ),
+            ("ERROR: HTTP Error 429: Too Many Requests", FailureClass.RATE_LIMITED),
+            (
+                "ERROR: [youtube] abc: Private video. Sign in if you've been granted access",
+                FailureClass.PRIVATE,
+            ),
+            (
+                "ERROR: [youtube] abc: Video unavailable. The uploader has not made "
+                "this video available in your country",
+                FailureClass.GEO_BLOCKED,
+            ),
+            (
+                "ERROR: [youtube] abc: Video unavailable. This video has been removed "
+                "by the uploader",
+                FailureClass.REMOVED,
+            ),
+            (
+                "ERROR: [Instagram] abc: Requested content is not available, "
+                "rate-limit reached or login required",
+                FailureClass.RATE_LIMITED,
+            ),
+            ("ERROR: [Instagram] abc: login required", FailureClass.LOGIN_REQUIRED),
+            ("ERROR: Read timed out", FailureClass.TIMEOUT),
+            ("ERROR: something odd happened", FailureClass.UNKNOWN),
+        ],
+    )
+    def test_classify_extraction_error(self, message, expected):
+        """Test each message maps to the expected failure class"""
+        assert classify_extraction_error(message) is expected
+
+    def test_only_content_failures_are_permanent(self):
+        """Test transient failures are never treated as permanent"""
+        assert FailureClass.RATE_LIMITED not in PERMANENT_FAILURES
+        assert FailureClass.TIMEOUT not in PERMANENT_FAILURES
+        assert FailureClass.PRIVATE in PERMANENT_FAILURES
+
+
+class TestNegativeCache:
+    """Test permanent failures are replayed from the negative cache"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        """Metadata API client backed by fakeredis with a failing extractor"""
+        import fakeredis
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from yt_dlp.utils import DownloadError
+
+        from app.api import metadata
+        from app.dependencies import get_async_redis
+
+        calls = []
+
+        async def failing_extraction(url, redis_client=None):
+            calls.append(url)
+            raise DownloadError("ERROR: [youtube] abc: Private video")
+
+        monkeypatch.setattr(
+            metadata, "extract_metadata_with_fallback", failing_extraction
+        )
+
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        app = FastAPI()
+        app.include_router(metadata.router, prefix="/api/v1")
+        app.dependency_overrides[get_async_redis] = lambda: redis_client
+
+        test_client = TestClient(app)
+        test_client.extraction_calls = calls
+        return test_client
+
+    def test_permanent_failure_replayed_without_extraction(self, client):
+        """Test the second request gets the same error without extracting"""
+        body = {"url": "https://www.youtube.com/watch?v=private1"}
+
+        first = client.post("/api/v1/metadata/extract", json=body)
+        second = client.post("/api/v1/metadata/extract", json=body)
+
+        assert first.status_code == 422
+        assert second.status_code == first.status_code
+        assert second.json() == first.json()
+        assert len(client.extraction_calls) == 1
+
+    def test_bypass_requires_admin(self, client, monkeypatch):
+        """Test only admins can skip the negative cache"""
+        from app.config import get_settings
+
+        monkeypatch.setattr(get_settings(), "admin_api_key", "secret")
+        body = {"url": "https://www.youtube.com/watch?v=private2"}
+        url = "/api/v1/metadata/extract?bypass_negative_cache=true"
+
+        client.post("/api/v1/metadata/extract", json=body)
+        client.post(url, json=body)
+        assert len(client.extraction_calls) == 1
+
+        client.post(url, json=body, headers={"Authorization": "Bearer secret"})
+        assert len(client.extraction_calls) == 2
+
+
+class TestStrategySelector:
+    """Test adaptive ordering of fallback configs"""
+
+    @pytest.fixture
+    def redis_client(self):
+        import fakeredis
+
+        return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    @pytest.fixture
+    def clock(self):
+        """Controllable time source"""
+
+        class Clock:
+            now = 1_700_000_000.0
+
+            def __call__(self):
+                return self.now
+
+        return Clock()
+
+    def _selector(self, redis_client, clock, **kwargs):
+        kwargs.setdefault("exploration_rate", 0.0)
+        return StrategySelector(redis_client, clock=clock, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_cold_start_keeps_static_order(self, redis_client, clock):
+        """Test configs without data are tried in their configured order"""
+        selector = self._selector(redis_client, clock)
+
+        assert await selector.rank("youtube", ["a", "b", "c"]) == ["a", "b", "c"]
+        assert await StrategySelector(None).rank("youtube", ["a", "b"]) == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_reliable_config_promoted(self, redis_client, clock):
+        """Test a config that keeps succeeding overtakes one that keeps failing"""
+        selector = self._selector(redis_client, clock)
+        for _ in range(5):
+            await selector.record("youtube", "a", False, 30.0)
+            await selector.record("youtube", "b", True, 2.0)
+
+        assert await selector.rank("youtube", ["a", "b", "c"]) == ["b", "c", "a"]
+
+        # Stats are kept per platform
+        assert await selector.rank("instagram", ["a", "b"]) == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_old_outcomes_decay(self, redis_client, clock):
+        """Test outcomes lose weight with the configured half-life"""
+        selector = self._selector(redis_client, clock, half_life=3600)
+        await selector.record("youtube", "a", True, 4.0)
+        await selector.record("youtube", "a", False, 4.0)
+
+        clock.now += 3600
+        await selector.record("youtube", "a", True, 2.0)
+        stats = (await selector.get_stats("youtube"))["a"]
+
+        assert stats["successes"] == pytest.approx(1.5)
+        assert stats["failures"] == pytest.approx(0.5)
+        assert stats["seconds"] == pytest.approx(6.0)
+
+    @pytest.mark.asyncio
+    async def test_landmark_rescaled(self, redis_client, clock):
+        """Test stats survive moving the decay landmark forward"""
+        selector = self._selector(redis_client, clock, half_life=60)
+        await selector.record("youtube", "a", True, 1.0)
+
+        clock.now += 60 * 40
+        await selector.record("youtube", "a", True, 1.0)
+        stats = (await selector.get_stats("youtube"))["a"]
+
+        assert stats["successes"] == pytest.approx(1.0)
+        assert float(
+            await redis_client.hget("extraction:strategy:metadata:youtube", "_landmark")
+        ) == pytest.approx(clock.now)
+
+    @pytest.mark.asyncio
+    async def test_rankings_listed_for_admin(self, redis_client):
+        """Test every ladder and platform with stats appears in the ranking"""
+        await StrategySelector(redis_client).record("youtube", "tv", True, 3.0)
+        await StrategySelector(redis_client, ladder="download").record(
+            "instagram", "ios", False, 5.0
+        )
+
+        rankings = await get_strategy_rankings(redis_client)
+
+        assert rankings["metadata"]["youtube"][0]["config"] == "tv"
+        assert rankings["download"]["instagram"][0]["attempts"] == pytest.approx(1.0)
+
+
+class TestHedgedAttempts:
+    """Test hedging of slow extraction attempts"""
+
+    @pytest.fixture
+    def release(self):
+        """Event unblocking hung attempts so no thread outlives the test"""
+        import threading
+
+        event = threading.Event()
+        yield event
+        event.set()
+
+    @pytest.mark.asyncio
+    async def test_slow_attempt_hedged(self, release):
+        """Test a hung primary is hedged and the fast fallback wins"""
+        budget = HedgeBudget(limit=1)
+        attempts = [
+            ("hung", lambda: release.wait(5) and {"id": "hung"}),
+            ("fast", lambda: {"id": "fast"}),
+        ]
+
+        winner = await run_hedged(attempts, 0.05, budget)
+
+        assert winner.name == "fast"
+        assert winner.hedged
+        assert winner.result == {"id": "fast"}
+        # The finished hedge returned its budget slot
+        assert budget.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_hedge_budget_respected(self, release):
+        """Test no hedge is launched while the budget is exhausted"""
+        import threading
+
+        budget = HedgeBudget(limit=0)
+        fallback_called = threading.Event()
+
+        def slow_primary():
+            release.wait(0.2)
+            return {"id": "primary"}
+
+        def fallback():
+            fallback_called.set()
+            return {"id": "fallback"}
+
+        winner = await run_hedged(
+            [("slow", slow_primary), ("fallback", fallback)], 0.01, budget
+        )
+
+        assert winner.name == "slow"
+        assert not fallback_called.is_set()
+
+    @pytest.mark.asyncio
+    async def test_failed_attempt_falls_back(self):
+        """Test a failure starts the next attempt without waiting"""
+
+        def failing():
+            raise RuntimeError("boom")
+
+        winner = await run_hedged(
+            [("failing", failing), ("ok", lambda: {"id": "ok"})], 60, HedgeBudget(1)
+        )
+
+        assert winner.name == "ok"
+        assert not winner.hedged
+
+    @pytest.mark.asyncio
+    async def test_fatal_error_stops_attempts(self):
+        """Test a fatal error is raised without trying further attempts"""
+        calls = []
+
+        def private():
+            calls.append("private")
+            raise RuntimeError("Private video")
+
+        def other():
+            calls.append("other")
+            return {"id": "other"}
+
+        with pytest.raises(RuntimeError, match="Private video"):
+            await run_hedged(
+                [("private", private), ("other", other)],
+                60,
+                HedgeBudget(1),
+                is_fatal=lambda error: "Private" in str(error),
+            )
+        assert calls == ["private"]
+
+
+class TestAsyncExtraction:
+    """Test the 202 + ticket extraction mode"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        """Metadata API client backed by fakeredis with a scripted extractor"""
+        import fakeredis
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from yt_dlp.utils import DownloadError
+
+        from app.api import metadata
+        from app.dependencies import get_async_redis
+
+        calls = []
+
+        async def scripted_extraction(url, redis_client=None):
+            calls.append(url)
+            if "private" in url:
+                raise DownloadError("ERROR: [youtube] abc: Private video")
+            return {
+                "title": "Async video",
+                "duration": 12,
+                "formats": [
+                    {
+                        "format_id": "18",
+                        "ext": "mp4",
+                        "vcodec": "avc1.42001E",
+                        "acodec": "mp4a.40.2",
+                        "width": 640,
+                        "height": 360,
+                        "url": "https://example.com/18.mp4",
+                    }
+                ],
+            }
+
+        monkeypatch.setattr(
+            metadata, "extract_metadata_with_fallback", scripted_extraction
+        )
+
+        app = FastAPI()
+        app.include_router(metadata.router, prefix="/api/v1")
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        app.dependency_overrides[get_async_redis] = lambda: redis_client
+
+        # Keep one event loop alive so background extractions can finish
+        with TestClient(app) as test_client:
+            test_client.extraction_calls = calls
+            yield test_client
+
+    def _wait_for(self, client, ticket):
+        import time
+
+        for _ in range(100):
+            ticket = client.get(ticket["status_url"]).json()
+            if ticket["status"] in ("done", "failed"):
+                return ticket
+            time.sleep(0.02)
+        raise AssertionError(f"Ticket never finished: {ticket}")
+
+    def test_extraction_completes_in_background(self, client):
+        """Test the ticket is returned at once and completes with the result"""
+        body = {"url": "https://www.youtube.com/watch?v=async1"}
+
+        response = client.post("/api/v1/metadata/extract/async", json=body)
+        assert response.status_code == 202
+        ticket = self._wait_for(client, response.json())
+
+        assert ticket["status"] == "done"
+        assert ticket["result"]["title"] == "Async video"
+
+        # The cache was filled: the next request is answered immediately
+        again = client.post("/api/v1/metadata/extract/async", json=body)
+        assert again.status_code == 200
+        assert again.json()["status"] == "done"
+        assert len(client.extraction_calls) == 1
+
+    def test_failure_recorded_on_ticket(self, client):
+        """Test failures carry the status the synchronous endpoint returns"""
+        body = {"url": "https://www.youtube.com/watch?v=private3"}
+
+        response = client.post("/api/v1/metadata/extract/async", json=body)
+        ticket = self._wait_for(client, response.json())
+
+        assert ticket["status"] == "failed"
+        assert ticket["error"]["status_code"] == 422
+
+    def test_event_stream_ends_with_result(self, client):
+        """Test the event stream reports the final status"""
+        body = {"url": "https://www.youtube.com/watch?v=async2"}
+        ticket = client.post("/api/v1/metadata/extract/async", json=body).json()
+
+        stream = client.get(ticket["events_url"])
+
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        assert "event: done" in stream.text
+        assert "Async video" in stream.text
+
+    def test_unknown_ticket(self, client):
+        """Test polling an expired ticket returns 404"""
+        assert client.get("/api/v1/metadata/extract/missing").status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_in_progress_ticket_shared(self):
+        """Test concurrent requests for a URL share one ticket"""
+        import fakeredis
+
+        from app.extraction import ExtractionTicketStore
+
+        store = ExtractionTicketStore(
+            fakeredis.aioredis.FakeRedis(decode_responses=True)
+        )
+        url = "https://www.youtube.com/watch?v=shared"
+
+        first, first_created = await store.create(url)
+        second, second_created = await store.create(url)
+        assert first_created and not second_created
+        assert second["ticket_id"] == first["ticket_id"]
+
+        await store.complete(first["ticket_id"], url, {"title": "x"})
+        third, third_created = await store.create(url)
+        assert third_created
+        assert third["ticket_id"] != first["ticket_id"]
+
+
+class TestYoutubeDLPool:
+    """Test reuse of YoutubeDL instances per options profile"""
+
+    @pytest.fixture
+    def pool(self):
+        import yt_dlp
+
+        built = []
+
+        def factory(opts):
+            built.append(opts)
+            return yt_dlp.YoutubeDL(opts)
+
+        pool = YoutubeDLPool(max_idle_per_profile=2, max_uses=3, factory=factory)
+        pool.built = built
+        yield pool
+        pool.clear()
+
+    def test_profile_reused_across_per_call_params(self, pool):
+        """Test calls differing only in per-call params share an instance"""
+        opts = {"quiet": True, "http_headers": {"User-Agent": "test"}}
+
+        with pool.checkout({**opts, "format": "best"}, label="p") as first:
+            assert first.params["format"] == "best"
+        with pool.checkout(
+            {**opts, "format": "worst", "outtmpl": "/tmp/clip.%(ext)s"}, label="p"
+        ) as second:
+            assert second is first
+            assert second.params["format"] == "worst"
+            assert second.params["outtmpl"]["default"] == "/tmp/clip.%(ext)s"
+
+        # Per-call params are reset once the instance is back in the pool
+        assert "format" not in first.params
+        assert first.params["outtmpl"]["default"] != "/tmp/clip.%(ext)s"
+        assert len(pool.built) == 1
+        assert "format" not in pool.built[0]
+
+        stats = pool.stats()
+        assert stats["hit_ratio"] == 0.5
+        assert stats["profiles"][0]["profile"] == "p"
+        assert stats["profiles"][0]["hits"] == 1
+
+    def test_different_profiles_not_shared(self, pool):
+        """Test options outside the per-call set define separate profiles"""
+        with pool.checkout({"quiet": True}) as first:
+            pass
+        with pool.checkout({"quiet": True, "socket_timeout": 5}) as second:
+            assert second is not first
+        assert len(pool.stats()["profiles"]) == 2
+
+    def test_progress_hooks_per_call(self, pool):
+        """Test progress hooks only see the checkout they were passed to"""
+        seen = []
+
+        with pool.checkout({"progress_hooks": [seen.append]}) as ydl:
+            for hook in ydl._progress_hooks:
+                hook({"status": "downloading"})
+        with pool.checkout({}) as ydl:
+            for hook in ydl._progress_hooks:
+                hook({"status": "finished"})
+
+        assert [status["status"] for status in seen] == ["downloading"]
+
+    def test_recycled_after_max_uses(self, pool):
+        """Test instances are rebuilt after their use limit"""
+        for _ in range(4):
+            with pool.checkout({"quiet": True}):
+                pass
+        assert len(pool.built) == 2
+        assert pool.stats()["profiles"][0]["recycled"] == 1
+
+    def test_unexpected_error_discards_instance(self, pool):
+        """Test an unexpected error recycles the instance but DownloadError does not"""
+        from yt_dlp.utils import DownloadError
+
+        with pytest.raises(DownloadError):
+            with pool.checkout({"quiet": True}):
+                raise DownloadError("ERROR: Video unavailable")
+        with pytest.raises(RuntimeError):
+            with pool.checkout({"quiet": True}):
+                raise RuntimeError("broken state")
+        with pool.checkout({"quiet": True}):
+            pass
+
+        assert len(pool.built) == 2
+
+    def test_shared_cookie_file_not_rewritten(self, pool, tmp_path):
+        """Test each instance saves its cookie jar to a private copy"""
+        cookie_file = tmp_path / "instagram_cookies_0123456789abcdef.txt"
+        content = (
+            "# Netscape HTTP Cookie File\n"
+            ".instagram.com\tTRUE\t/\tTRUE\t2147483647\tsessionid\tabc\n"
+        )
+        cookie_file.write_text(content)
+
+        with pool.checkout({"cookiefile": str(cookie_file)}) as ydl:
+            private = ydl.params["cookiefile"]
+            assert private != str(cookie_file)
+            assert [c.name for c in ydl.cookiejar] == ["sessionid"]
+        pool.clear()
+
+        assert cookie_file.read_text() == content
+        assert not Path(private).exists()
+
+    def test_prewarm(self, pool):
+        """Test pre-warmed instances serve the first call"""
+        assert pool.prewarm({"quiet": True}, count=5, label="warm") == 2
+        with pool.checkout({"quiet": True, "format": "best"}):
+            pass
+        assert pool.stats()["profiles"][0]["hits"] == 1
+
+
+class TestCookieSessionPool:
+    """Test health-scored rotation over cookie sessions"""
+
+    @pytest.fixture
+    def sessions_dir(self, tmp_path):
+        platform_dir = tmp_path / "instagram"
+        platform_dir.mkdir()
+        for name in ("a", "b", "c"):
+            (platform_dir / f"{name}.txt").write_text("# Netscape HTTP Cookie File")
+        return tmp_path
+
+    @pytest.fixture
+    def pool(self, sessions_dir):
+        import random
+
+        import fakeredis
+
+        return CookieSessionPool(
+            fakeredis.aioredis.FakeRedis(decode_responses=True),
+            sessions_dir=sessions_dir,
+            rate_budget=2,
+            rng=random.Random(7),
+        )
+
+    @pytest.mark.asyncio
+    async def test_no_sessions(self, pool):
+        """Test platforms without a sessions directory use the shared cookie"""
+        assert await pool.acquire("facebook") is None
+
+    @pytest.mark.asyncio
+    async def test_rate_budget_spreads_load(self, pool):
+        """Test each session serves at most its budget per window"""
+        acquired = [await pool.acquire("instagram") for _ in range(7)]
+
+        used = [s.session_id for s in acquired if s is not None]
+        assert sorted(used) == ["a", "a", "b", "b", "c", "c"]
+        assert acquired[-1] is None
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_session_cools_down(self, pool):
+        """Test a throttled session is skipped until its cool-down ends"""
+        session = next(s for s in pool.sessions("instagram") if s.session_id == "a")
+
+        blamed = await pool.report(session, "ERROR: HTTP Error 429: Too Many Requests")
+        assert blamed
+
+        picked = {(await pool.acquire("instagram")).session_id for _ in range(4)}
+        assert picked == {"b", "c"}
+
+        health = {h["session"]: h for h in await pool.get_health("instagram")}
+        assert health["a"]["cooldown_seconds"] > 0
+        assert health["a"]["strikes"] == 1
+        assert health["a"]["health"] < health["b"]["health"]
+
+    @pytest.mark.asyncio
+    async def test_content_errors_do_not_blame_session(self, pool):
+        """Test private/removed content does not cool a session down"""
+        session = pool.sessions("instagram")[0]
+
+        assert not await pool.report(session, "ERROR: This video is private")
+        assert not await pool.report(session, None, latency=1.0)
+
+        health = {h["session"]: h for h in await pool.get_health("instagram")}
+        assert health[session.session_id]["cooldown_seconds"] == 0
+        assert health[session.session_id]["health"] > 0.5
+
+
+class TestPolitenessScheduler:
+    """Test the Redis token bucket and semaphore shared by all processes"""
+
+    @pytest.fixture
+    def scheduler(self):
+        pytest.importorskip("lupa")
+        import fakeredis
+
+        from app.extraction.politeness import PlatformLimits
+
+        limits = {
+            "youtube": PlatformLimits(rate=0.01, burst=3, max_concurrent=2),
+            "default": PlatformLimits(rate=100.0, burst=100, max_concurrent=100),
+        }
+        return PolitenessScheduler(
+            fakeredis.FakeRedis(), limits=limits, sleep=lambda seconds: None
+        )
+
+    def test_token_bucket(self, scheduler):
+        """Test calls beyond the burst wait for the bucket to refill"""
+        for _ in range(3):
+            lease, _ = scheduler.try_acquire("youtube")
+            scheduler.release("youtube", lease)
+
+        lease, wait = scheduler.try_acquire("youtube")
+        assert lease is None
+        assert wait > 0
+
+    def test_concurrency_and_priority(self, scheduler):
+        """Test slots are capped and background work leaves one for users"""
+        background, _ = scheduler.try_acquire("youtube", Priority.BACKGROUND)
+        assert background is not None
+        assert scheduler.try_acquire("youtube", Priority.BACKGROUND)[0] is None
+
+        interactive, _ = scheduler.try_acquire("youtube", Priority.INTERACTIVE)
+        assert interactive is not None
+        assert scheduler.try_acquire("youtube", Priority.INTERACTIVE)[0] is None
+
+        scheduler.release("youtube", interactive)
+        assert scheduler.try_acquire("youtube", Priority.INTERACTIVE)[0] is not None
+
+    def test_slot_fails_open(self, scheduler):
+        """Test a caller proceeds without a slot once its wait times out"""
+        url = "https://www.youtube.com/watch?v=abc"
+        with scheduler.slot(url), scheduler.slot(url):
+            with scheduler.slot(url, timeout=0) as lease:
+                assert lease is None
+
+        # Both slots were released on exit
+        with scheduler.slot(url) as lease:
+            assert lease is not None
+
+
+class TestCircuitBreaker:
+    """Test the per-platform and per-config breakers shared through Redis"""
+
+    RATE_LIMITED = "ERROR: HTTP Error 429: Too Many Requests"
+
+    @pytest.fixture
+    def breaker(self):
+        pytest.importorskip("lupa")
+        import fakeredis
+
+        return ExtractionCircuitBreaker(fakeredis.FakeRedis(), ladder="metadata")
+
+    async def _trip(self, breaker, config_name=None):
+        for _ in range(5):
+            await breaker.record("youtube", self.RATE_LIMITED, config_name)
+
+    @pytest.mark.asyncio
+    async def test_opens_on_rate_limit_spike(self, breaker):
+        """Test rate-limit failures open the breaker and later attempts fail fast"""
+        for _ in range(10):
+            await breaker.record("youtube", "ERROR: Private video")
+        await breaker.check("youtube")
+
+        await self._trip(breaker)
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await breaker.check("youtube")
+        assert 0 < exc_info.value.retry_after <= 60
+        # Other platforms are unaffected
+        await breaker.check("instagram")
+
+        states = await get_circuit_states(breaker.redis)
+        assert [(s["scope"], s["state"], s["trips"]) for s in states] == [
+            ("youtube", "open", 1)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe(self, breaker):
+        """Test one probe is let through after the open period"""
+        key = "extraction:breaker:youtube"
+        await self._trip(breaker)
+
+        # Open period over: one probe, everyone else keeps failing fast
+        breaker.redis.hset(key, "open_until", 0)
+        await breaker.check("youtube")
+        with pytest.raises(CircuitOpenError):
+            await breaker.check("youtube")
+
+        # A failed probe re-opens for twice as long
+        await breaker.record("youtube", self.RATE_LIMITED)
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await breaker.check("youtube")
+        assert exc_info.value.retry_after > 60
+
+        # A successful probe closes it
+        breaker.redis.hset(key, "open_until", 0)
+        await breaker.check("youtube")
+        await breaker.record("youtube")
+        await breaker.check("youtube")
+        await breaker.check("youtube")
+
+    @pytest.mark.asyncio
+    async def test_config_breaker_skips_config(self, breaker):
+        """Test a challenged config is skipped while the platform stays closed"""
+        for _ in range(6):
+            await breaker.record("youtube", None, "web")
+        await self._trip(breaker, "android")
+
+        await breaker.check("youtube")
+        assert await breaker.allowed_configs("youtube", ["android", "web"]) == ["web"]
+        with pytest.raises(CircuitOpenError):
+            await breaker.allowed_configs("youtube", ["android"])
+
+    @pytest.mark.asyncio
+    async def test_without_redis_stays_closed(self):
+        """Test breakers never reject when Redis is unavailable"""
+        breaker = ExtractionCircuitBreaker(None)
+        await self._trip(breaker)
+        await breaker.check("youtube")
+        assert await breaker.allowed_configs("youtube", ["web"]) == ["web"]
@@ -0,0 +1,167 @@
+"""
+Tests for job cancellation and the job progress event stream
+"""
+
+import asyncio
+import json
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import jobs
+from app.constants import APIConfig
+from app.dependencies import get_redis
+from app.models import JobStatus
+from app.queue import JobLanes
+from app.services.job_cancellation import (
+    cancel_key,
+    is_cancel_requested,
+    request_cancellation,
+)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def _add_job(redis_client, job_id: str, status: str, lane: str = None) -> None:
+    job = {
+        "id": job_id,
+        "status": status,
+        "created_at": "2026-01-01T00:00:00",
+        "progress": "0",
+    }
+    if lane:
+        job["lane"] = lane
+        JobLanes(redis_client).enqueue(job_id, 5)
+    redis_client.hset(f"job:{job_id}", mapping=job)
+
+
+def _status(redis_client, job_id: str) -> str:
+    return redis_client.hget(f"job:{job_id}", "status").decode()
+
+
+class TestRequestCancellation:
+    """Test cancellation of queued, running and finished jobs"""
+
+    def test_queued_job_is_cancelled_right_away(self, redis_client):
+        lane = JobLanes.lane_for(5)
+        _add_job(redis_client, "queued", "queued", lane)
+
+        assert request_cancellation(redis_client, "queued") == JobStatus.cancelled
+
+        assert _status(redis_client, "queued") == "cancelled"
+        assert JobLanes(redis_client).claim() is None
+
+    def test_running_job_is_flagged_for_its_worker(self, redis_client):
+        _add_job(redis_client, "running", "working")
+
+        assert request_cancellation(redis_client, "running") == JobStatus.working
+
+        assert is_cancel_requested(redis_client, "running")
+        assert redis_client.ttl(cancel_key("running")) > 0
+        assert _status(redis_client, "running") == "working"
+
+    def test_claimed_job_is_left_to_the_worker(self, redis_client):
+        _add_job(redis_client, "claimed", "queued", JobLanes.lane_for(5))
+        JobLanes(redis_client).claim()
+
+        assert request_cancellation(redis_client, "claimed") == JobStatus.working
+        assert is_cancel_requested(redis_client, "claimed")
+
+    def test_finished_and_missing_jobs(self, redis_client):
+        _add_job(redis_client, "done", "done")
+
+        assert request_cancellation(redis_client, "done") == JobStatus.done
+        assert not is_cancel_requested(redis_client, "done")
+        assert request_cancellation(redis_client, "missing") is None
+
+
+class _Request:
+    """Stands in for the Starlette request of a stream"""
+
+    def __init__(self, disconnect_after: int = 1000):
+        self.polls = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        self.polls += 1
+        return self.polls > self.disconnect_after
+
+
+class TestJobEvents:
+    """Test job progress streaming and cancellation on disconnect"""
+
+    @pytest.fixture
+    def client(self, redis_client):
+        app = FastAPI()
+        app.include_router(jobs.router, prefix="/api/v1")
+        app.dependency_overrides[get_redis] = lambda: redis_client
+        return TestClient(app)
+
+    def test_cancel_endpoint(self, client, redis_client):
+        _add_job(redis_client, "queued", "queued", JobLanes.lane_for(5))
+        _add_job(redis_client, "done", "done")
+
+        response = client.post("/api/v1/jobs/queued/cancel")
+
+        assert response.status_code == 202
+        assert response.json()["status"] == "cancelled"
+        assert client.post("/api/v1/jobs/done/cancel").status_code == 409
+        assert client.post("/api/v1/jobs/queued/cancel").status_code == 409
+        assert client.post("/api/v1/jobs/missing/cancel").status_code == 404
+
+    def test_stream_ends_with_the_job(self, client, redis_client):
+        _add_job(redis_client, "done", "done")
+
+        response = client.get("/api/v1/jobs/done/events")
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event = json.loads(response.text.split("data: ")[1])
+        assert event["status"] == "done"
+        assert not is_cancel_requested(redis_client, "done")
+        assert client.get("/api/v1/jobs/missing/events").status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_closed_stream_cancels_the_job(self, redis_client, monkeypatch):
+        monkeypatch.setattr(APIConfig, "JOB_EVENTS_RECONNECT_GRACE", 0)
+        _add_job(redis_client, "running", "working")
+        events = jobs._job_events(redis_client, "running", _Request(), True)
+
+        assert '"working"' in await events.__anext__()
+        # What Starlette does when the client goes away mid-stream
+        await events.aclose()
+        await asyncio.gather(*jobs._abandoned_streams)
+
+        assert is_cancel_requested(redis_client, "running")
+
+    @pytest.mark.asyncio
+    async def test_reconnected_stream_keeps_the_job(self, redis_client, monkeypatch):
+        monkeypatch.setattr(APIConfig, "JOB_EVENTS_RECONNECT_GRACE", 0.05)
+        _add_job(redis_client, "running", "working")
+        first = jobs._job_events(redis_client, "running", _Request(), True)
+        await first.__anext__()
+        await first.aclose()
+
+        # EventSource reconnects, possibly through another API process
+        second = jobs._job_events(redis_client, "running", _Request(), True)
+        await second.__anext__()
+        await asyncio.gather(*jobs._abandoned_streams)
+
+        assert not is_cancel_requested(redis_client, "running")
+        await second.aclose()
+        await asyncio.gather(*jobs._abandoned_streams)
+
+    @pytest.mark.asyncio
+    async def test_disconnect_without_cancel(self, redis_client):
+        _add_job(redis_client, "running", "working")
+        events = jobs._job_events(
+            redis_client, "running", _Request(disconnect_after=1), False
+        )
+
+        assert [event async for event in events]
+
+        assert not is_cancel_requested(redis_client, "running")
@@ -0,0 +1,138 @@
+"""
+Tests for job cost estimates and worker-time admission
+"""
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from rq import Queue
+
+from app.api import jobs
+from app.constants import JobCostConfig
+from app.dependencies import get_clips_queue, get_redis
+from app.services.job_cost import charge_client_work, estimate_job_cost
+
+METADATA = {
+    "duration": 600,
+    "formats": [
+        {
+            "format_id": "137",
+            "resolution": "1920x1080",
+            "url": "https://cdn.example.com/1080.mp4",
+            "filesize": 300 * 1024 * 1024,
+            "vcodec": "avc1.640028",
+        },
+        {
+            "format_id": "hls-360",
+            "resolution": "640x360",
+            "url": "https://cdn.example.com/360/index.m3u8",
+            "filesize": None,
+            "vcodec": "avc1.4d401e",
+        },
+        {
+            "format_id": "251",
+            "resolution": "audio only",
+            "url": "https://cdn.example.com/audio.webm",
+        },
+    ],
+}
+
+
+class TestEstimateJobCost:
+    """Test worker time follows clip length, resolution and source"""
+
+    def test_long_hd_clip_costs_far_more_than_short_sd_clip(self):
+        expensive = estimate_job_cost(METADATA, 0, 60, "137")
+        cheap = estimate_job_cost(METADATA, 100, 103, "hls-360")
+
+        assert expensive.from_metadata and cheap.from_metadata
+        assert expensive.seconds > 10 * cheap.seconds
+
+    def test_segmented_sources_fetch_only_the_clip(self):
+        hls = estimate_job_cost(METADATA, 100, 103, "hls-360")
+
+        # 3s clip plus padding of 360p, instead of the whole 10 minutes
+        assert hls.fetch_seconds < 0.5
+
+    def test_resolution_cap_and_default_format(self):
+        capped = estimate_job_cost(METADATA, 0, 10, "854x480")
+        best = estimate_job_cost(METADATA, 0, 10)
+
+        assert capped.encode_seconds == round(10 * 0.2304 * 0.3, 1)
+        assert best.encode_seconds == round(10 * 2.0736 * 0.3, 1)
+
+    def test_unknown_video_uses_defaults(self):
+        estimate = estimate_job_cost(None, 10, 40)
+
+        assert not estimate.from_metadata
+        assert estimate.seconds > JobCostConfig.JOB_OVERHEAD_SECONDS
+
+
+class TestClientWorkQuota:
+    """Test per-client quotas count worker-seconds"""
+
+    @pytest.fixture(autouse=True)
+    def _lua(self):
+        pytest.importorskip("lupa")
+
+    def test_charges_until_quota_used(self):
+        redis_client = fakeredis.FakeRedis()
+        limit = JobCostConfig.CLIENT_WORKER_SECONDS_PER_HOUR
+
+        assert charge_client_work(redis_client, "10.0.0.1", "a", limit - 10, 1000.0)[0]
+        charged, used = charge_client_work(redis_client, "10.0.0.1", "b", 20, 1001.0)
+        assert (charged, used) == (False, limit - 10)
+
+        # Cheap jobs still fit, and the window slides
+        assert charge_client_work(redis_client, "10.0.0.1", "c", 5, 1002.0)[0]
+        assert charge_client_work(redis_client, "10.0.0.1", "d", 20, 4700.0)[0]
+
+    def test_first_job_always_admitted(self):
+        redis_client = fakeredis.FakeRedis()
+        limit = JobCostConfig.CLIENT_WORKER_SECONDS_PER_HOUR
+
+        assert charge_client_work(redis_client, "10.0.0.2", "a", limit * 2, 1000.0)[0]
+
+
+class TestJobAdmission:
+    """Test jobs are admitted and reported in worker-seconds"""
+
+    @pytest.fixture
+    def client(self):
+        pytest.importorskip("lupa")
+        redis_client = fakeredis.FakeRedis()
+        app = FastAPI()
+        app.include_router(jobs.router, prefix="/api/v1")
+        app.dependency_overrides[get_redis] = lambda: redis_client
+        app.dependency_overrides[get_clips_queue] = lambda: Queue(
+            "clips", connection=redis_client
+        )
+        return TestClient(app), redis_client
+
+    def test_estimate_is_returned_and_stored(self, client):
+        client, redis_client = client
+        job = {"url": "https://www.youtube.com/watch?v=cost", "in_ts": 0, "out_ts": 30}
+
+        response = client.post("/api/v1/jobs", json=job)
+
+        assert response.status_code == 201
+        cost = response.json()["estimated_cost_seconds"]
+        assert cost > 0
+        job_id = response.json()["id"]
+        assert float(redis_client.hget(f"job:{job_id}", "estimated_cost")) == cost
+        assert (
+            client.get(f"/api/v1/jobs/{job_id}").json()["estimated_cost_seconds"]
+            == cost
+        )
+
+    def test_quota_exceeded(self, client, monkeypatch):
+        client, _ = client
+        monkeypatch.setattr(JobCostConfig, "CLIENT_WORKER_SECONDS_PER_HOUR", 1)
+        job = {"url": "https://www.youtube.com/watch?v=cost", "in_ts": 0, "out_ts": 30}
+
+        assert client.post("/api/v1/jobs", json=job).status_code == 201
+        response = client.post("/api/v1/jobs", json=job)
+
+        assert response.status_code == 429
+        assert "quota" in response.json()["detail"]
@@ -0,0 +1,174 @@
+"""
+Tests for priority lanes and shortest-job-first scheduling
+"""
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from rq import Queue
+
+from app.api import jobs
+from app.constants import JobCostConfig, WorkerConfig
+from app.dependencies import get_clips_queue, get_redis
+from app.queue import JobLanes
+from app.repositories import update_job
+from app.repositories.job_repository import status_index_key
+
+pytest.importorskip("lupa")
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def lanes(redis_client):
+    return JobLanes(redis_client)
+
+
+def _queue(lanes: JobLanes, job_id: str, cost: float, now: float = NOW) -> str:
+    """Queue a job in its lane, as the API does"""
+    update_job(lanes.redis, job_id, {"status": "queued"}, now=now)
+    return lanes.enqueue(job_id, cost, now)
+
+
+def _claim_all(lanes: JobLanes, now: float = NOW):
+    claimed = []
+    while (job_id := lanes.claim(now)) is not None:
+        claimed.append(job_id)
+    return claimed
+
+
+class TestJobLanes:
+    """Test lane selection, ordering and aging"""
+
+    def test_cheap_jobs_go_to_the_high_lane(self, lanes):
+        assert _queue(lanes, "short", 5, NOW) == WorkerConfig.HIGH_PRIORITY_QUEUE
+        assert _queue(lanes, "long", 200, NOW) == WorkerConfig.DEFAULT_QUEUE
+
+    def test_shorter_jobs_first_within_a_lane(self, lanes):
+        _queue(lanes, "slow", 18, NOW)
+        _queue(lanes, "quick", 3, NOW + 5)
+
+        assert _claim_all(lanes) == ["quick", "slow"]
+
+    def test_lanes_are_pulled_by_weight(self, lanes):
+        for index in range(10):
+            _queue(lanes, f"high-{index}", 5, NOW)
+            _queue(lanes, f"default-{index}", 100, NOW)
+
+        first = [lanes.claim(NOW) for _ in range(5)]
+
+        assert sum(job_id.startswith("high") for job_id in first) == 4
+        assert sum(job_id.startswith("default") for job_id in first) == 1
+
+    def test_overdue_lane_head_is_served_first(self, lanes):
+        _queue(lanes, "old-long", 100, NOW - WorkerConfig.LANE_MAX_WAIT - 200)
+        for index in range(3):
+            _queue(lanes, f"high-{index}", 5, NOW)
+
+        assert lanes.claim(NOW) == "old-long"
+
+    def test_claimed_job_is_gone(self, lanes):
+        _queue(lanes, "only", 5, NOW)
+
+        assert lanes.has_work()
+        assert lanes.claim(NOW) == "only"
+        assert lanes.claim(NOW) is None
+        assert not lanes.has_work()
+        assert lanes.position("only", WorkerConfig.HIGH_PRIORITY_QUEUE) is None
+
+    def test_claim_marks_the_job_working(self, redis_client, lanes):
+        _queue(lanes, "job", 5)
+
+        assert lanes.claim(NOW + 1, fields={"started_at": "now"}) == "job"
+
+        job = redis_client.hgetall("job:job")
+        assert job[b"status"] == b"working"
+        assert job[b"started_at"] == b"now"
+        assert redis_client.zscore(status_index_key("queued"), "job") is None
+        assert redis_client.zscore(status_index_key("working"), "job") == NOW + 1
+
+    def test_jobs_no_longer_queued_are_dropped(self, redis_client, lanes):
+        _queue(lanes, "cancelled", 5)
+        update_job(redis_client, "cancelled", {"status": "cancelled"}, now=NOW)
+        lanes.enqueue("expired", 5, NOW)
+        _queue(lanes, "next", 5, NOW + 1)
+
+        assert lanes.claim(NOW + 2) == "next"
+        assert not lanes.has_work()
+
+
+class TestQueuePosition:
+    """Test jobs ahead and estimated wait"""
+
+    def test_position_counts_both_lanes(self, redis_client, lanes):
+        for index, cost in enumerate([4, 6, 8]):
+            lanes.enqueue(f"high-{index}", cost, NOW + index)
+            redis_client.hset(f"job:high-{index}", "estimated_cost", cost)
+        lanes.enqueue("default-0", 100, NOW)
+        redis_client.hset("job:default-0", "estimated_cost", 100)
+        lanes.enqueue("default-1", 200, NOW + 1)
+
+        high = lanes.position("high-1", WorkerConfig.HIGH_PRIORITY_QUEUE, workers=2)
+        default = lanes.position("default-0", WorkerConfig.DEFAULT_QUEUE)
+
+        # One high job ahead, plus the default head's share of the pulls
+        assert high.jobs_ahead == 2
+        assert high.estimated_wait_seconds == (4 + 100) / 2
+        # The high lane gets four pulls for each default one
+        assert default.jobs_ahead == 3
+        assert default.estimated_wait_seconds == 4 + 6 + 8
+
+    def test_unknown_costs_use_default(self, lanes):
+        lanes.enqueue("a", 5, NOW)
+        lanes.enqueue("b", 5, NOW + 1)
+
+        position = lanes.position("b", WorkerConfig.HIGH_PRIORITY_QUEUE)
+
+        assert position.estimated_wait_seconds == JobCostConfig.UNKNOWN_JOB_SECONDS
+
+    def test_deep_queues_are_sampled(self, redis_client, lanes, monkeypatch):
+        monkeypatch.setattr(WorkerConfig, "POSITION_COST_SAMPLE", 3)
+        for index in range(10):
+            lanes.enqueue(f"job-{index}", 5, NOW + index)
+            redis_client.hset(f"job:job-{index}", "estimated_cost", 5)
+
+        position = lanes.position("job-9", WorkerConfig.HIGH_PRIORITY_QUEUE)
+
+        assert position.jobs_ahead == 9
+        assert position.estimated_wait_seconds == 45
+
+
+class TestJobQueueReporting:
+    """Test the API queues jobs in lanes and reports their position"""
+
+    @pytest.fixture
+    def client(self, redis_client):
+        pytest.importorskip("lupa")
+        app = FastAPI()
+        app.include_router(jobs.router, prefix="/api/v1")
+        app.dependency_overrides[get_redis] = lambda: redis_client
+        app.dependency_overrides[get_clips_queue] = lambda: Queue(
+            "clips", connection=redis_client
+        )
+        return TestClient(app)
+
+    def test_jobs_report_position_while_queued(self, client, redis_client):
+        job = {"url": "https://www.youtube.com/watch?v=lane", "in_ts": 0, "out_ts": 5}
+
+        first = client.post("/api/v1/jobs", json=job).json()
+        second = client.post("/api/v1/jobs", json=job).json()
+
+        assert first["queue_position"] == 0
+        assert second["queue_position"] == 1
+        assert second["estimated_wait_seconds"] == first["estimated_cost_seconds"]
+        lane = redis_client.hget(f"job:{second['id']}", "lane").decode()
+        assert lane == JobLanes.lane_for(second["estimated_cost_seconds"])
+
+        assert JobLanes(redis_client).claim() == first["id"]
+        assert client.get(f"/api/v1/jobs/{second['id']}").json()["queue_position"] == 0
@@ -0,0 +1,134 @@
+"""
+Tests for the Redis job repository and its indexes
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+import pytest
+
+from app.constants import RedisKeys
+from app.models import Job, JobStatus
+from app.repositories import JobRepository, delete_job, update_job
+from app.repositories.job_repository import status_index_key
+
+pytest.importorskip("lupa")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def repository(redis_client):
+    return JobRepository(redis_client)
+
+
+def _job(job_id: str, minutes_ago: int = 0, **fields) -> Job:
+    created_at = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return Job(
+        id=job_id,
+        url="https://example.com/video",
+        in_ts=1.0,
+        out_ts=5.0,
+        created_at=created_at,
+        **fields,
+    )
+
+
+def _indexed_statuses(redis_client, job_id: str) -> list:
+    return [
+        status.value
+        for status in JobStatus
+        if redis_client.zscore(status_index_key(status.value), job_id) is not None
+    ]
+
+
+class TestJobRepository:
+    """Test jobs round-trip and are found through the indexes"""
+
+    @pytest.mark.asyncio
+    async def test_save_and_get(self, repository, redis_client):
+        job = _job("job-1", status=JobStatus.queued)
+
+        await repository.save(job)
+        loaded = await repository.get("job-1")
+
+        assert loaded.id == "job-1"
+        assert loaded.status == JobStatus.queued
+        assert loaded.out_ts == 5.0
+        assert redis_client.ttl("job:job-1") > 0
+        assert redis_client.zscore(RedisKeys.JOBS_BY_CREATED, "job-1") is not None
+        assert await repository.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_status_changes_move_the_job_between_indexes(
+        self, repository, redis_client
+    ):
+        await repository.save(_job("job-1", status=JobStatus.queued))
+        await repository.save(_job("job-2", status=JobStatus.queued))
+
+        assert update_job(redis_client, "job-1", {"status": "working"}) == "queued"
+        update_job(redis_client, "job-1", {"status": "done"})
+
+        counts = await repository.get_job_counts_by_state()
+        assert counts["queued"] == 1
+        assert counts["working"] == 0
+        assert counts["done"] == 1
+        assert _indexed_statuses(redis_client, "job-1") == ["done"]
+
+    def test_update_without_status_keeps_the_job_indexed(self, redis_client):
+        update_job(redis_client, "job-1", {"status": "working"}, now=100)
+
+        update_job(redis_client, "job-1", {"progress": "50"}, now=200)
+
+        assert redis_client.hget("job:job-1", "progress") == b"50"
+        assert redis_client.zscore(status_index_key("working"), "job-1") == 200
+
+    @pytest.mark.asyncio
+    async def test_stale_index_entries_are_not_counted(self, repository, redis_client):
+        stale = time.time() - RedisKeys.JOB_TTL - 60
+        update_job(redis_client, "old", {"status": "queued"}, now=stale)
+        update_job(redis_client, "new", {"status": "queued"})
+
+        counts = await repository.get_job_counts_by_state()
+
+        assert counts["queued"] == 1
+        # Writes trim entries older than the job TTL
+        assert redis_client.zscore(status_index_key("queued"), "old") is None
+
+    @pytest.mark.asyncio
+    async def test_recent_jobs_newest_first(self, repository, redis_client):
+        for minutes_ago, job_id in enumerate(["c", "b", "a"]):
+            await repository.save(_job(job_id, minutes_ago=minutes_ago))
+        # A job whose hash expired is left out
+        redis_client.delete("job:b")
+
+        recent = await repository.get_recent_jobs(limit=3)
+
+        assert [job.id for job in recent] == ["c", "a"]
+
+    @pytest.mark.asyncio
+    async def test_cleanup_removes_jobs_and_index_entries(
+        self, repository, redis_client
+    ):
+        await repository.save(_job("old", minutes_ago=120, status=JobStatus.done))
+        await repository.save(_job("new", status=JobStatus.done))
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=60)
+
+        assert await repository.get_job_ids_created_before(cutoff) == ["old"]
+        assert await repository.cleanup_jobs_before(cutoff) == 1
+
+        assert not redis_client.exists("job:old")
+        assert redis_client.zscore(RedisKeys.JOBS_BY_CREATED, "old") is None
+        assert _indexed_statuses(redis_client, "old") == []
+        assert await repository.get("new") is not None
+
+    def test_delete_job(self, redis_client):
+        update_job(redis_client, "job-1", {"status": "error"})
+
+        assert delete_job(redis_client, "job-1")
+        assert not delete_job(redis_client, "job-1")
+        assert _indexed_statuses(redis_client, "job-1") == []
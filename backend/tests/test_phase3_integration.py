@@ -84,29 +84,201 @@ class TestMetadataCache:
         mock_redis.setex.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_invalidate_url(self, cache, mock_redis):
-        """Test cache invalidation"""
-        url = "https://example.com/video.mp4"
+    async def test_invalidate_url(self):
+        """Test cache invalidation through the per-URL key index"""
+        import fakeredis
 
-        # Mock keys and delete operations - each pattern returns specific keys
-        def mock_keys_side_effect(pattern):
-            if "metadata" in pattern:
-                return [b"cache:metadata:abc123"]
-            elif "format" in pattern:
-                return [b"cache:format:abc123"]
-            else:  # thumbnail
-                return []
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        cache = MetadataCache(redis_client)
+        url = "https://example.com/video.mp4"
 
-        mock_redis.keys.side_effect = mock_keys_side_effect
-        mock_redis.delete.return_value = 1  # Each delete call removes 1 key
+        await cache.set_metadata(url, {"title": "Test Video"})
+        await cache.set_format_metadata(url, {"title": "Test Video", "formats": []})
+        await cache.set_metadata("https://example.com/other.mp4", {"title": "Other"})
 
         result = await cache.invalidate_url(url)
 
         assert result == 2  # 2 total keys deleted (1 metadata + 1 format)
-        assert mock_redis.keys.call_count == 3  # One for each prefix
+        assert await cache.get_metadata(url) is None
+        assert await cache.get_format_metadata(url) is None
+        assert await cache.get_metadata("https://example.com/other.mp4") is not None
+
+        stats = await cache.get_cache_stats()
+        assert stats["metadata_count"] == 1
+        assert stats["format_count"] == 0
+
+    @pytest.mark.asyncio
+    async def test_clear_cache_by_type(self):
+        """Test bulk clearing uses the type index and catches unindexed keys"""
+        import fakeredis
+
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        cache = MetadataCache(redis_client)
+
+        for i in range(5):
+            await cache.set_format_metadata(f"https://example.com/{i}.mp4", {"i": i})
+        await cache.set_metadata("https://example.com/0.mp4", {"title": "kept"})
+        # Entry written before the index existed
+        await redis_client.setex("format_metadatalegacy", 60, "{}")
+
+        cleared = await cache.clear_cache(["format"])
+
+        assert cleared == {"format": 6}
+        assert await redis_client.exists("format_metadatalegacy") == 0
+        assert await cache.get_metadata("https://example.com/0.mp4") is not None
+
+    @pytest.mark.asyncio
+    async def test_format_metadata_served_stale_after_soft_ttl(self, cache, mock_redis):
+        """Test entries past the soft TTL are returned flagged as stale"""
+        import json
+        import time
+
+        url = "https://www.youtube.com/watch?v=test"
+        now = time.time()
+        cached_data = {
+            "url": url,
+            "metadata": {"title": "Test Video", "formats": []},
+            "cached_at": datetime.utcnow().isoformat(),
+            "soft_expires_at": now - 10,
+            "hard_expires_at": now + 600,
+            "cache_version": "1.1",
+        }
+        mock_redis.get.return_value = json.dumps(cached_data)
+
+        result = await cache.get_format_metadata(url)
+        assert result is not None
+        assert result["stale"] is True
+
+        # Past the hard TTL the entry is no longer served
+        cached_data["hard_expires_at"] = now - 1
+        mock_redis.get.return_value = json.dumps(cached_data)
+        assert await cache.get_format_metadata(url) is None
+
+    @pytest.mark.asyncio
+    async def test_compact_encoding_round_trip(self):
+        """Test compact entries round-trip through a decoding Redis client"""
+        import fakeredis
+
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        cache = MetadataCache(redis_client)
+        url = "https://www.youtube.com/watch?v=test"
+        metadata = {
+            "title": "Test Video",
+            "duration": 120.0,
+            "formats": [
+                {
+                    "format_id": "22",
+                    "ext": "mp4",
+                    "resolution": "1280x720",
+                    "url": "https://rr1---sn-abc.googlevideo.com/videoplayback?itag=22",
+                }
+            ],
+        }
+
+        assert await cache.set_format_metadata(url, metadata) is True
+
+        entry = await cache.get_format_metadata(url)
+        assert entry["metadata"] == metadata
+        assert entry["stale"] is False
         assert (
-            mock_redis.delete.call_count == 2
-        )  # Two delete calls for non-empty patterns
+            await redis_client.ttl(cache._generate_cache_key("format_metadata", url))
+            > 0
+        )
+
+        stats = await cache.get_cache_stats()
+        encoding = stats["encoding"]["format"]
+        assert encoding["entries_written"] == 1
+        assert encoding["encoded_bytes_per_entry"] == await redis_client.strlen(
+            cache._generate_cache_key("format_metadata", url)
+        )
+        assert encoding["encoded_bytes_per_entry"] < encoding["legacy_bytes_per_entry"]
+        assert encoding["compression_ratio"] == round(
+            encoding["legacy_bytes_per_entry"] / encoding["encoded_bytes_per_entry"], 2
+        )
+
+    @pytest.mark.asyncio
+    async def test_lookups_recorded_in_metrics(self):
+        """Test hits, misses and stale hits are counted per cache type"""
+        import fakeredis
+
+        cache = MetadataCache(fakeredis.aioredis.FakeRedis(decode_responses=True))
+        url = "https://www.youtube.com/watch?v=metrics"
+        before = cache._get_cache_metrics()
+
+        await cache.get_format_metadata(url)  # miss
+        await cache.set_format_metadata(url, {"title": "Test Video"})
+        await cache.get_format_metadata(url)  # hit
+
+        after = cache._get_cache_metrics()
+        assert after["format_miss"] - before.get("format_miss", 0) == 1
+        assert after["format_hit"] - before.get("format_hit", 0) == 1
+        assert 0 < after["format_hit_ratio"] <= 1
+
+    @pytest.mark.asyncio
+    async def test_writes_prune_expired_type_index_entries(self):
+        """Test the type index only keeps live keys without a separate prune"""
+        import time
+
+        import fakeredis
+
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        cache = MetadataCache(redis_client)
+        index_key = f"{cache.type_index_prefix}format"
+        await redis_client.zadd(index_key, {"format_metadata:gone": time.time() - 1})
+
+        await cache.set_format_metadata(
+            "https://www.youtube.com/watch?v=live", {"title": "Test Video"}
+        )
+
+        assert await redis_client.zscore(index_key, "format_metadata:gone") is None
+        assert await redis_client.zcard(index_key) == 1
+
+    def test_format_ttls_capped_by_signed_url_expiry(self, cache):
+        """Test hard TTL never outlives the signed CDN format URLs"""
+        import time
+
+        url = "https://www.instagram.com/reel/abc123/"
+        expires_at = int(time.time()) + 1200
+        metadata = {
+            "formats": [
+                {"url": f"https://scontent.cdninstagram.com/v.mp4?oe={expires_at:X}"}
+            ]
+        }
+
+        soft_ttl, hard_ttl = cache.get_format_ttls(url, metadata)
+
+        # 1200s until expiry minus the 300s safety margin
+        assert 890 <= hard_ttl <= 900
+        assert soft_ttl <= hard_ttl // 2
+
+    @pytest.mark.asyncio
+    async def test_expiring_signed_urls_not_cached_past_expiry(self):
+        """Test URLs near or past expiry do not get the minimum TTL"""
+        import time
+
+        import fakeredis
+
+        cache = MetadataCache(fakeredis.aioredis.FakeRedis(decode_responses=True))
+        url = "https://www.instagram.com/reel/abc123/"
+
+        def signed(expires_in: int) -> dict:
+            expires_at = int(time.time()) + expires_in
+            return {
+                "formats": [
+                    {
+                        "url": f"https://scontent.cdninstagram.com/v.mp4?oe={expires_at:X}"
+                    }
+                ]
+            }
+
+        # 330s until expiry minus the 300s margin is under the 60s minimum
+        soft_ttl, hard_ttl = cache.get_format_ttls(url, signed(330))
+        assert 20 <= hard_ttl <= 30
+        assert soft_ttl <= hard_ttl // 2
+
+        assert cache.get_format_ttls(url, signed(-10))[1] == 0
+        assert await cache.set_format_metadata(url, signed(-10)) is False
+        assert await cache.get_format_metadata(url) is None
 
 
 class TestCleanupManager:
@@ -126,14 +298,14 @@ class TestCleanupManager:
 
     @pytest.mark.asyncio
     async def test_cleanup_expired_jobs(self, cleanup_manager):
-        """Test expired job cleanup"""
-        with patch.object(cleanup_manager, "_get_expired_jobs", return_value=[]):
-            with patch.object(cleanup_manager, "_cleanup_job_files", return_value=3):
-                result = await cleanup_manager.cleanup_expired_jobs()
+        """Test expired job cleanup deletes records without scanning storage"""
+        with patch("pathlib.Path.rglob") as mock_rglob:
+            result = await cleanup_manager.cleanup_expired_jobs()
 
-                assert result["jobs_deleted"] == 5
-                assert result["files_deleted"] == 3
-                assert "cutoff_time" in result
+        assert result["jobs_deleted"] == 5
+        assert "cutoff_time" in result
+        mock_rglob.assert_not_called()
+        cleanup_manager.job_repository.cleanup_jobs_before.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_cleanup_temporary_files(self, cleanup_manager):
@@ -238,6 +410,153 @@ class TestRateLimiter:
         assert info["limit_type"] == "global"
 
 
+class TestDistributedRateLimiter:
+    """Test rate limits shared between processes through Redis"""
+
+    @pytest.fixture
+    def redis_client(self):
+        pytest.importorskip("lupa")
+        import fakeredis
+
+        return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    @staticmethod
+    def _request(path="/api/test", ip="10.0.0.1"):
+        request = Mock()
+        request.client.host = ip
+        request.url.path = path
+        request.headers = {}
+        return request
+
+    @staticmethod
+    def _count_round_trips(rate_limiter):
+        calls = []
+        script = rate_limiter._script
+
+        async def counting_script(**kwargs):
+            calls.append(kwargs["keys"])
+            return await script(**kwargs)
+
+        rate_limiter._script = counting_script
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_processes_share_one_limit(self, redis_client):
+        """Test the limit holds across processes instead of multiplying"""
+        from app.constants import RateLimits
+
+        processes = [RateLimiter(redis_client), RateLimiter(redis_client)]
+
+        results = [
+            await processes[attempt % 2].check_rate_limit(self._request())
+            for attempt in range(RateLimits.REQUESTS_PER_MINUTE + 10)
+        ]
+
+        allowed = [is_allowed for is_allowed, _ in results]
+        assert allowed.count(True) == RateLimits.REQUESTS_PER_MINUTE
+        assert results[-1][1]["limit_type"] == "global"
+        assert results[-1][1]["reset_in"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_leased_tokens_skip_round_trips(self, redis_client):
+        """Test leased tokens and known denials are decided locally"""
+        rate_limiter = RateLimiter(redis_client)
+        calls = self._count_round_trips(rate_limiter)
+
+        for _ in range(8):
+            await rate_limiter.check_rate_limit(self._request())
+        assert len(calls) == 2  # Leases of 5 tokens
+
+        # Endpoint limits are checked in the same round-trip
+        request = self._request("/api/v1/metadata/extract")
+        await rate_limiter.check_rate_limit(request)
+        assert len(calls[-1]) == 1  # Global token still leased
+        assert request.state.rate_limit["limit"] == 50
+
+        for _ in range(20):
+            await rate_limiter.check_rate_limit(request)
+        round_trips = len(calls)
+        is_allowed, info = await rate_limiter.check_rate_limit(request)
+        assert not is_allowed and info["limit_type"] == "endpoint"
+        assert len(calls) == round_trips
+
+    @pytest.mark.asyncio
+    async def test_unused_leases_are_refunded(self, redis_client, monkeypatch):
+        """Test expired leases do not eat into the client's limit"""
+        from app.constants import RateLimits
+
+        monkeypatch.setattr(RateLimits, "LOCAL_LEASE_SECONDS", 0)
+        rate_limiter = RateLimiter(redis_client)
+
+        allowed = [
+            (await rate_limiter.check_rate_limit(self._request()))[0]
+            for _ in range(RateLimits.REQUESTS_PER_MINUTE + 1)
+        ]
+
+        assert allowed.count(True) == RateLimits.REQUESTS_PER_MINUTE
+
+    @pytest.mark.asyncio
+    async def test_denied_requests_spend_no_tokens(self, redis_client, monkeypatch):
+        """Test a request denied by one limit costs nothing against the other"""
+        from app.constants import RateLimits
+
+        monkeypatch.setattr(RateLimits, "LOCAL_LEASE_SECONDS", 0)
+        rate_limiter = RateLimiter(redis_client)
+        extract = self._request("/api/v1/metadata/extract")
+
+        results = [
+            (await rate_limiter.check_rate_limit(extract))[0]
+            for _ in range(RateLimits.METADATA_REQUESTS_PER_MINUTE + 1)
+        ]
+        # The denial carried the refund of the last global lease
+        assert results[-1] is False
+        allowed = [
+            (await rate_limiter.check_rate_limit(self._request()))[0]
+            for _ in range(RateLimits.REQUESTS_PER_MINUTE)
+        ]
+
+        assert allowed.count(True) == (
+            RateLimits.REQUESTS_PER_MINUTE - RateLimits.METADATA_REQUESTS_PER_MINUTE
+        )
+
+    @pytest.mark.asyncio
+    async def test_denial_keeps_leased_tokens(self, redis_client):
+        """Test leased tokens are only spent once every limit allowed"""
+        from app.constants import RateLimits
+
+        rate_limiter = RateLimiter(redis_client)
+        extract = self._request("/api/v1/metadata/extract")
+        endpoint_key = "ratelimit:{10.0.0.1}:/api/v1/metadata"
+        await rate_limiter.check_rate_limit(extract)
+        # Another process drained the endpoint limit
+        await redis_client.set(endpoint_key, 10**15)
+        rate_limiter._leases.pop(endpoint_key)
+        global_lease = rate_limiter._leases["ratelimit:{10.0.0.1}:global"]
+        tokens = global_lease.tokens
+
+        is_allowed, info = await rate_limiter.check_rate_limit(extract)
+
+        assert not is_allowed and info["limit_type"] == "endpoint"
+        assert global_lease.tokens == tokens
+
+    @pytest.mark.parametrize("fail_open", [True, False])
+    @pytest.mark.asyncio
+    async def test_redis_unavailable(self, monkeypatch, fail_open):
+        """Test the configured failure mode applies when Redis is down"""
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+        server.connected = False
+        rate_limiter = RateLimiter(fakeredis.aioredis.FakeRedis(server=server))
+        monkeypatch.setattr(rate_limiter.settings, "rate_limit_fail_open", fail_open)
+
+        is_allowed, info = await rate_limiter.check_rate_limit(self._request())
+
+        assert is_allowed is fail_open
+        if not fail_open:
+            assert info["limit_type"] == "unavailable"
+
+
 class TestStorageFactory:
     """Test storage factory pattern"""
 
@@ -0,0 +1,228 @@
+"""
+Tests for preview renditions: queueing, sprite layout and the preview API
+"""
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import preview
+from app.cache.metadata_cache import MetadataCache
+from app.config.configuration import get_settings
+from app.constants import JobCostConfig
+from app.dependencies import get_async_redis, get_redis
+from app.services.job_cost import charge_client_work
+from app.services.preview_service import (
+    PREVIEW_QUEUE_KEY,
+    PreviewStatus,
+    PreviewStore,
+    build_sprite_vtt,
+    plan_sprite,
+    preview_id_for,
+    queue_preview,
+)
+
+VIDEO_URL = "https://www.youtube.com/watch?v=preview1"
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def settings(monkeypatch, tmp_path):
+    """Enable previews and keep their files in a temporary directory"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "preview_enabled", True)
+    monkeypatch.setattr(settings, "clips_dir", str(tmp_path))
+    return settings
+
+
+@pytest.fixture
+def sync_redis():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def client(settings, redis_client, sync_redis):
+    app = FastAPI()
+    app.include_router(preview.router, prefix="/api/v1")
+    app.dependency_overrides[get_async_redis] = lambda: redis_client
+    app.dependency_overrides[get_redis] = lambda: sync_redis
+    return TestClient(app)
+
+
+def _cache_metadata(redis_client, duration):
+    """Cache the video's metadata, as a metadata extraction does"""
+    asyncio.run(
+        MetadataCache(redis_client).set_format_metadata(
+            VIDEO_URL, {"title": "Video", "duration": duration, "formats": []}
+        )
+    )
+
+
+class TestPreviewStore:
+    """Test the preview queue and its state"""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_is_deduplicated(self, settings, redis_client):
+        """Test a video is only queued once while its preview exists"""
+        first = await queue_preview(redis_client, VIDEO_URL, 42.0)
+        second = await queue_preview(redis_client, VIDEO_URL, 42.0)
+
+        assert first == second == preview_id_for(VIDEO_URL)
+        assert await redis_client.lrange(PREVIEW_QUEUE_KEY, 0, -1) == [first]
+
+    @pytest.mark.asyncio
+    async def test_not_queued_when_disabled_or_too_long(
+        self, settings, monkeypatch, redis_client
+    ):
+        """Test previews are skipped for long videos and when disabled"""
+        assert await queue_preview(redis_client, VIDEO_URL, 10_000.0) is None
+        assert await queue_preview(redis_client, VIDEO_URL, None) is None
+
+        monkeypatch.setattr(settings, "preview_enabled", False)
+        assert await queue_preview(redis_client, VIDEO_URL, 42.0) is None
+        assert await redis_client.llen(PREVIEW_QUEUE_KEY) == 0
+
+    @pytest.mark.asyncio
+    async def test_claim_and_complete(self, redis_client):
+        """Test a claimed preview moves through processing to ready"""
+        store = PreviewStore(redis_client)
+        preview_id = await store.enqueue(VIDEO_URL, 42.0)
+
+        claimed = await store.claim()
+        assert claimed["id"] == preview_id
+        assert claimed["url"] == VIDEO_URL
+        assert (await store.get(preview_id))["status"] == "processing"
+        assert await store.claim() is None
+
+        await store.complete(preview_id, thumbnail_interval=1.0)
+        assert (await store.get(preview_id))["status"] == "ready"
+
+    @pytest.mark.asyncio
+    async def test_requeued_preview_is_claimed_first(self, redis_client):
+        """Test a preview interrupted by a clip job goes back to the queue head"""
+        store = PreviewStore(redis_client)
+        first = await store.enqueue(VIDEO_URL, 42.0)
+        await store.enqueue("https://www.youtube.com/watch?v=preview2", 42.0)
+
+        await store.claim()
+        await store.requeue(first)
+
+        assert (await store.get(first))["status"] == "queued"
+        assert (await store.claim())["id"] == first
+
+    @pytest.mark.asyncio
+    async def test_failed_preview_expires_sooner(self, redis_client):
+        """Test a failed preview can be queued again once its state expires"""
+        store = PreviewStore(redis_client)
+        preview_id = await store.enqueue(VIDEO_URL)
+        await store.claim()
+        await store.fail(preview_id, "ffmpeg failed")
+
+        assert await redis_client.ttl(f"preview:{preview_id}") <= 600
+
+
+class TestSpriteSheet:
+    """Test the sprite layout and its WebVTT index"""
+
+    def test_short_video_has_one_thumbnail_per_second(self):
+        plan = plan_sprite(35.2)
+
+        assert (plan.interval, plan.count, plan.columns, plan.rows) == (
+            1.0,
+            36,
+            10,
+            4,
+        )
+
+    def test_long_video_is_capped(self):
+        plan = plan_sprite(1500)
+
+        assert plan.interval == 15
+        assert plan.count == 100
+
+    def test_vtt_cues_address_sprite_tiles(self):
+        plan = plan_sprite(12.5)
+        lines = build_sprite_vtt(plan, 12.5).splitlines()
+
+        assert lines[0] == "WEBVTT"
+        assert lines[2:4] == [
+            "00:00:00.000 --> 00:00:01.000",
+            "sprite.jpg#xywh=0,0,160,90",
+        ]
+        # 11th thumbnail wraps to the second row; the last cue ends with the video
+        assert "sprite.jpg#xywh=0,90,160,90" in lines
+        assert lines[-2:] == [
+            "00:00:12.000 --> 00:00:12.500",
+            "sprite.jpg#xywh=320,90,160,90",
+        ]
+
+
+class TestPreviewAPI:
+    """Test the preview endpoints"""
+
+    def test_disabled(self, client, settings, monkeypatch):
+        """Test the endpoint is hidden when previews are disabled"""
+        monkeypatch.setattr(settings, "preview_enabled", False)
+        response = client.get("/api/v1/preview", params={"url": VIDEO_URL})
+        assert response.status_code == 404
+
+    def test_queues_then_serves_ready_preview(self, client, settings, redis_client):
+        """Test a preview is queued on first request and linked once ready"""
+        _cache_metadata(redis_client, 42.0)
+        response = client.get("/api/v1/preview", params={"url": VIDEO_URL})
+        assert response.status_code == 202
+        assert response.json()["status"] == PreviewStatus.QUEUED.value
+
+        preview_id = response.json()["preview_id"]
+        preview_dir = preview.get_previews_dir() / preview_id
+        preview_dir.mkdir(parents=True)
+        (preview_dir / "sprite.vtt").write_text("WEBVTT\n")
+        asyncio.run(
+            PreviewStore(redis_client).complete(preview_id, thumbnail_interval=1.0)
+        )
+
+        response = client.get("/api/v1/preview", params={"url": VIDEO_URL})
+        body = response.json()
+        assert response.status_code == 200
+        assert body["status"] == "ready"
+        assert body["vtt_url"] == f"/api/v1/preview/{preview_id}/sprite.vtt"
+
+        response = client.get(body["vtt_url"])
+        assert response.status_code == 200
+        assert response.text == "WEBVTT\n"
+        assert response.headers["content-type"].startswith("text/vtt")
+
+    def test_requires_metadata_of_bounded_duration(self, client, redis_client):
+        """Test no preview is queued for a video of unknown or excessive length"""
+        response = client.get("/api/v1/preview", params={"url": VIDEO_URL})
+        assert response.status_code == 409
+
+        _cache_metadata(redis_client, 10_000.0)
+        response = client.get("/api/v1/preview", params={"url": VIDEO_URL})
+        assert response.status_code == 422
+
+        assert asyncio.run(redis_client.llen(PREVIEW_QUEUE_KEY)) == 0
+
+    def test_charged_to_client_quota(self, client, redis_client, sync_redis):
+        """Test a preview counts against the client's worker-time quota"""
+        _cache_metadata(redis_client, 600.0)
+        limit = JobCostConfig.CLIENT_WORKER_SECONDS_PER_HOUR
+        charge_client_work(sync_redis, "testclient", "clip", limit - 1, time.time())
+
+        response = client.get("/api/v1/preview", params={"url": VIDEO_URL})
+
+        assert response.status_code == 429
+        assert asyncio.run(redis_client.llen(PREVIEW_QUEUE_KEY)) == 0
+
+    def test_file_names_are_whitelisted(self, client):
+        """Test only the known files of well-formed ids can be served"""
+        assert client.get("/api/v1/preview/0123456789abcdef/.env").status_code == 404
+        assert client.get("/api/v1/preview/..%2F..%2Fetc/sprite.vtt").status_code == 404
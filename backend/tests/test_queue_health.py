@@ -0,0 +1,155 @@
+"""
+Tests for background-sampled queue health and admission control
+"""
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from app.constants import JobCostConfig, QueueHealthConfig, RateLimits, RedisKeys
+from app.middleware.queue_protection import QueueDosProtection
+from app.queue.health import QueueHealthSampler, QueueHealthSnapshot
+from app.repositories.job_repository import update_job
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_client(server):
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeRedis(server=server)
+    statuses = ["queued"] * 3 + ["working"] * 2 + ["error", "done"]
+    for index, status in enumerate(statuses):
+        update_job(
+            client,
+            str(index),
+            {"id": str(index), "status": status, "estimated_cost": "10.5"},
+        )
+    # Not a job hash, must not break the count
+    client.set("job:0:cancel", "1")
+
+    now = time.time()
+    client.zadd(
+        RedisKeys.WORKER_HEARTBEATS,
+        {"worker-a": now, "worker-b": now - QueueHealthConfig.WORKER_TIMEOUT - 1},
+    )
+    return client
+
+
+class TestQueueHealthSampler:
+    """Test job counts are sampled into a snapshot"""
+
+    @pytest.mark.asyncio
+    async def test_sample_counts_jobs_and_live_workers(self, redis_client):
+        sampler = QueueHealthSampler(redis_client)
+
+        snapshot = await sampler.sample()
+
+        assert (snapshot.queued, snapshot.working, snapshot.failed) == (3, 2, 1)
+        assert snapshot.workers == 1
+        assert snapshot.pending_work_seconds == 5 * 10.5
+        assert sampler.current() is snapshot
+
+    @pytest.mark.asyncio
+    async def test_keeps_last_snapshot_when_redis_fails(self, server, redis_client):
+        sampler = QueueHealthSampler(redis_client)
+        snapshot = await sampler.sample()
+
+        server.connected = False
+        assert await sampler.sample() is snapshot
+
+    def test_stale_snapshot_is_not_trusted(self):
+        sampler = QueueHealthSampler()
+        sampler.snapshot = QueueHealthSnapshot(
+            queued=50,
+            working=0,
+            failed=0,
+            workers=1,
+            sampled_at=time.monotonic() - QueueHealthConfig.MAX_SNAPSHOT_AGE - 1,
+        )
+
+        assert sampler.current() is None
+
+    @pytest.mark.asyncio
+    async def test_background_sampling(self, redis_client):
+        sampler = QueueHealthSampler(redis_client, interval=0.01)
+
+        sampler.start()
+        await asyncio.sleep(0.05)
+        update_job(redis_client, "new", {"status": "queued"})
+        await asyncio.sleep(0.05)
+        await sampler.stop()
+
+        assert sampler.current().queued == 4
+
+
+class TestQueueAdmission:
+    """Test admission decisions read the snapshot, not Redis"""
+
+    def _protection(
+        self, queued: int, pending_work_seconds: float = 0.0
+    ) -> QueueDosProtection:
+        sampler = QueueHealthSampler()
+        sampler.snapshot = QueueHealthSnapshot(
+            queued=queued,
+            working=2,
+            failed=0,
+            workers=1,
+            sampled_at=time.monotonic(),
+            pending_work_seconds=pending_work_seconds,
+        )
+        return QueueDosProtection(queue_health=sampler)
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queued_work_exceeds_capacity(self):
+        protection = self._protection(
+            3, JobCostConfig.MAX_PENDING_SECONDS_PER_WORKER + 1
+        )
+
+        healthy, error = await protection.check_queue_health()
+
+        assert not healthy
+        assert "Queue work limit" in error
+
+    @pytest.mark.asyncio
+    async def test_many_cheap_jobs_are_admitted(self):
+        protection = self._protection(RateLimits.MAX_QUEUE_DEPTH * 2, 200.0)
+
+        healthy, _ = await protection.check_queue_health()
+
+        assert healthy
+
+    @pytest.mark.asyncio
+    async def test_admits_healthy_queue(self):
+        protection = self._protection(1)
+
+        healthy, _ = await protection.check_queue_health()
+        metrics = await protection.get_queue_metrics()
+
+        assert healthy
+        assert (metrics.current_depth, metrics.processing_jobs) == (1, 2)
+        assert metrics.workers == 1
+
+    def test_job_counts_only_stop_floods(self):
+        protection = self._protection(0)
+        behavior = protection.get_or_create_ip_behavior("192.0.2.1")
+        # The most of the cheapest jobs the worker-seconds quota admits
+        quota_jobs = int(
+            JobCostConfig.CLIENT_WORKER_SECONDS_PER_HOUR
+            / JobCostConfig.JOB_OVERHEAD_SECONDS
+        )
+
+        for _ in range(quota_jobs):
+            assert protection.check_job_limits(behavior, "192.0.2.1", True)[0]
+            behavior.job_submissions.append(time.time())
+        for _ in range(RateLimits.JOBS_PER_HOUR - quota_jobs):
+            behavior.job_submissions.append(time.time())
+
+        allowed, error = protection.check_job_limits(behavior, "192.0.2.1", True)
+        assert not allowed
+        assert "Hourly job limit" in error
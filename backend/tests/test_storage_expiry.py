@@ -0,0 +1,156 @@
+"""
+Tests for time-indexed expiry of stored clips
+"""
+
+import time
+from datetime import datetime, timezone
+
+import fakeredis
+import pytest
+
+from app.constants import RedisKeys
+from app.storage import LocalStorageManager
+from app.storage_expiry import ClipExpiryIndex, expire_clips, expired_day_directories
+
+HOUR = 3600
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def index(redis_client):
+    return ClipExpiryIndex(redis_client, retention_hours=24)
+
+
+def _day(days_ago: int, now: float) -> str:
+    return datetime.fromtimestamp(now - days_ago * 86400, timezone.utc).strftime(
+        "%Y-%m-%d"
+    )
+
+
+def _clip(base_path, relative_path: str, size: int = 10):
+    path = base_path / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+class TestClipExpiryIndex:
+    """Test clips are indexed at save time and found by expiry"""
+
+    @pytest.mark.asyncio
+    async def test_save_records_expiry(self, tmp_path, index, redis_client):
+        storage = LocalStorageManager(str(tmp_path), expiry_index=index)
+
+        before = time.time()
+        result = await storage.save("job-1", b"video", "Clip")
+
+        score = redis_client.zscore(RedisKeys.CLIP_EXPIRY, result["file_path"])
+        assert before + 24 * HOUR <= score <= time.time() + 24 * HOUR
+
+    @pytest.mark.asyncio
+    async def test_save_survives_index_errors(self, tmp_path):
+        broken = ClipExpiryIndex(None, retention_hours=24)
+        storage = LocalStorageManager(str(tmp_path), expiry_index=broken)
+
+        result = await storage.save("job-1", b"video", "Clip")
+
+        assert (tmp_path / result["file_path"]).exists()
+
+    def test_due_honours_a_shorter_max_age(self, index):
+        now = time.time()
+        index.record("a/old.mp4", saved_at=now - 10 * HOUR)
+        index.record("a/new.mp4", saved_at=now - 2 * HOUR)
+
+        assert index.due(24, now, limit=10) == []
+        assert index.due(6, now, limit=10) == ["a/old.mp4"]
+
+
+class TestExpireClips:
+    """Test cleanup deletes only what is due without walking the tree"""
+
+    def test_deletes_due_clips_and_their_entries(self, tmp_path, index, redis_client):
+        now = time.time()
+        today = _day(0, now)
+        old = _clip(tmp_path, f"{today}/old.mp4", size=100)
+        new = _clip(tmp_path, f"{today}/new.mp4")
+        index.record(f"{today}/old.mp4", saved_at=now - 25 * HOUR)
+        index.record(f"{today}/new.mp4", saved_at=now - HOUR)
+
+        stats = expire_clips(tmp_path, index, 24, now=now, pause=0)
+
+        assert stats["files_deleted"] == 1
+        assert stats["size_freed"] == 100
+        assert not old.exists()
+        assert new.exists()
+        assert redis_client.zcard(RedisKeys.CLIP_EXPIRY) == 1
+
+    def test_drops_whole_expired_day_directories(self, tmp_path, index, redis_client):
+        now = time.time()
+        old_day = _day(3, now)
+        _clip(tmp_path, f"{old_day}/indexed.mp4")
+        # Left behind by an interrupted save, never indexed
+        _clip(tmp_path, f"{old_day}/partial.mp4.tmp")
+        index.record(f"{old_day}/indexed.mp4", saved_at=now - 72 * HOUR)
+        (tmp_path / "temp").mkdir()
+
+        stats = expire_clips(tmp_path, index, 24, now=now, pause=0)
+
+        assert stats["directories_removed"] == 1
+        assert stats["files_deleted"] == 2
+        assert not (tmp_path / old_day).exists()
+        assert (tmp_path / "temp").exists()
+        assert redis_client.zcard(RedisKeys.CLIP_EXPIRY) == 0
+
+    def test_yesterday_is_kept_while_it_has_fresh_clips(self, tmp_path):
+        now = datetime(2026, 1, 2, 12, tzinfo=timezone.utc).timestamp()
+        _clip(tmp_path, "2026-01-01/clip.mp4")
+
+        # Clips saved late on Jan 1st are only 12 hours old
+        assert expired_day_directories(tmp_path, 24, now) == []
+        assert expired_day_directories(tmp_path, 12, now) == [tmp_path / "2026-01-01"]
+
+    def test_batches_and_missing_files(self, tmp_path, index, redis_client):
+        now = time.time()
+        today = _day(0, now)
+        for i in range(5):
+            _clip(tmp_path, f"{today}/clip{i}.mp4")
+            index.record(f"{today}/clip{i}.mp4", saved_at=now - 30 * HOUR)
+        index.record(f"{today}/gone.mp4", saved_at=now - 30 * HOUR)
+
+        stats = expire_clips(tmp_path, index, 24, now=now, batch_size=2, pause=0)
+
+        assert stats["files_deleted"] == 5
+        assert stats["errors"] == 0
+        assert redis_client.zcard(RedisKeys.CLIP_EXPIRY) == 0
+
+    def test_dry_run_deletes_nothing(self, tmp_path, index, redis_client):
+        now = time.time()
+        old_day, today = _day(3, now), _day(0, now)
+        _clip(tmp_path, f"{old_day}/a.mp4")
+        for i in range(3):
+            _clip(tmp_path, f"{today}/clip{i}.mp4")
+            index.record(f"{today}/clip{i}.mp4", saved_at=now - 30 * HOUR)
+
+        stats = expire_clips(
+            tmp_path, index, 24, now=now, dry_run=True, batch_size=2, pause=0
+        )
+
+        assert stats["files_deleted"] == 4
+        assert (tmp_path / old_day / "a.mp4").exists()
+        assert len(list((tmp_path / today).iterdir())) == 3
+        assert redis_client.zcard(RedisKeys.CLIP_EXPIRY) == 3
+
+    def test_without_index_only_day_directories_go(self, tmp_path):
+        now = time.time()
+        old_day, today = _day(3, now), _day(0, now)
+        _clip(tmp_path, f"{old_day}/a.mp4")
+        _clip(tmp_path, f"{today}/b.mp4")
+
+        stats = expire_clips(tmp_path, None, 24, now=now, pause=0)
+
+        assert stats["files_deleted"] == 1
+        assert (tmp_path / today / "b.mp4").exists()
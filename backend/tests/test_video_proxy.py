@@ -0,0 +1,268 @@
+"""
+Tests for the video proxy, the shared HTTP client and the range cache
+"""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import video_proxy
+from app.cache.range_cache import RangeCache, normalize_cdn_url
+from app.constants import ProxyConfig
+from app.utils.http_client import stream_body
+
+VIDEO_URL = "https://scontent-lax3-1.cdninstagram.com/v/video.mp4"
+VIDEO = bytes(range(256)) * 12 * 1024  # 3 MiB
+
+
+async def _network_body(content: bytes):
+    """Deliver content in network-sized reads like a real connection"""
+    for offset in range(0, len(content), 16384):
+        yield content[offset : offset + 16384]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Serve a fake CDN through the shared client and record its requests"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("missing.mp4"):
+            return httpx.Response(404)
+        if "range" in request.headers:
+            first, last = request.headers["range"][len("bytes=") :].split("-")
+            first, last = int(first), int(last) if last else len(VIDEO) - 1
+            return httpx.Response(
+                206,
+                content=_network_body(VIDEO[first : last + 1]),
+                headers={
+                    "content-type": "video/mp4",
+                    "content-range": f"bytes {first}-{last}/{len(VIDEO)}",
+                },
+            )
+        return httpx.Response(
+            200, content=_network_body(VIDEO), headers={"content-type": "video/mp4"}
+        )
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(video_proxy, "get_http_client", lambda: client)
+    return requests
+
+
+@pytest.fixture(autouse=True)
+def range_cache(monkeypatch, tmp_path):
+    """Give every test an empty range cache"""
+    cache = RangeCache(tmp_path / "range_cache", 64 * 1024 * 1024)
+    monkeypatch.setattr(video_proxy, "get_range_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(video_proxy.router, prefix="/api/v1/video")
+    return TestClient(app)
+
+
+class TestVideoProxy:
+    """Test videos are streamed through the shared client"""
+
+    def test_streams_video(self, client, upstream):
+        """Test the full body and headers are relayed"""
+        response = client.get("/api/v1/video/proxy", params={"url": VIDEO_URL})
+
+        assert response.status_code == 200
+        assert response.content == VIDEO
+        assert response.headers["content-type"] == "video/mp4"
+        assert upstream[0].headers["accept-encoding"] == "identity"
+
+    def test_range_request(self, client, upstream):
+        """Test range requests are forwarded for seeking"""
+        response = client.get(
+            "/api/v1/video/proxy",
+            params={"url": VIDEO_URL},
+            headers={"Range": "bytes=0-1023"},
+        )
+
+        assert response.status_code == 206
+        assert response.content == VIDEO[:1024]
+        assert response.headers["content-range"] == f"bytes 0-1023/{len(VIDEO)}"
+        assert upstream[0].headers["range"] == "bytes=0-1023"
+
+    def test_upstream_error(self, client, upstream):
+        """Test upstream failures are reported with their status"""
+        response = client.get(
+            "/api/v1/video/proxy",
+            params={"url": VIDEO_URL.replace("video.mp4", "missing.mp4")},
+        )
+        assert response.status_code == 404
+
+
+class TestStreamBody:
+    """Test adaptive chunking of streamed bodies"""
+
+    @pytest.mark.asyncio
+    async def test_chunks_bounded_and_response_closed(self):
+        """Test chunks grow for a fast consumer but never exceed the maximum"""
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content=_network_body(VIDEO))
+            )
+        )
+        response = await client.send(
+            client.build_request("GET", VIDEO_URL), stream=True
+        )
+
+        chunks = [chunk async for chunk in stream_body(response)]
+
+        assert b"".join(chunks) == VIDEO
+        assert len(chunks[0]) == ProxyConfig.MIN_CHUNK_SIZE
+        assert max(len(chunk) for chunk in chunks) == ProxyConfig.MAX_CHUNK_SIZE
+        assert response.is_closed
+
+    @pytest.mark.asyncio
+    async def test_closed_when_consumer_stops(self):
+        """Test the upstream response is closed if the client goes away"""
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content=_network_body(VIDEO))
+            )
+        )
+        response = await client.send(
+            client.build_request("GET", VIDEO_URL), stream=True
+        )
+
+        body = stream_body(response)
+        await body.__anext__()
+        await body.aclose()
+
+        assert response.is_closed
+
+
+class TestRangeCache:
+    """Test seeks over fetched ranges are served from disk"""
+
+    MiB = 1024 * 1024
+
+    def _get(self, client, url, first, last):
+        return client.get(
+            "/api/v1/video/proxy",
+            params={"url": url},
+            headers={"Range": f"bytes={first}-{last}"},
+        )
+
+    def test_signed_urls_share_entry(self):
+        """Test signature params and edge hosts do not split entries"""
+        first = normalize_cdn_url(
+            "https://scontent-lax3-1.cdninstagram.com/v/t50/clip.mp4"
+            "?_nc_ht=scontent-lax3-1&oh=00_abc&oe=6650A1B2&vs=42"
+        )
+        second = normalize_cdn_url(
+            "https://scontent-sjc3-1.cdninstagram.com/v/t50/clip.mp4"
+            "?vs=42&oe=6650FFFF&oh=00_def&_nc_cat=1"
+        )
+        assert first == second == "cdninstagram.com/v/t50/clip.mp4?vs=42"
+        assert normalize_cdn_url(
+            "https://video.xx.fbcdn.net/v/clip.mp4?vs=1"
+        ) != normalize_cdn_url("https://video.xx.fbcdn.net/v/clip.mp4?vs=2")
+
+    def test_partial_hit_fetches_only_gap(self, client, upstream):
+        """Test an overlapping seek only fetches the bytes not cached yet"""
+        response = self._get(client, VIDEO_URL, 0, self.MiB - 1)
+        assert response.content == VIDEO[: self.MiB]
+
+        # Freshly signed URL for the same video, overlapping the cached range
+        resigned = VIDEO_URL + "?oh=00_new&oe=6650FFFF"
+        response = self._get(client, resigned, self.MiB // 2, 2 * self.MiB - 1)
+
+        assert response.status_code == 206
+        assert response.content == VIDEO[self.MiB // 2 : 2 * self.MiB]
+        assert response.headers["content-range"] == (
+            f"bytes {self.MiB // 2}-{2 * self.MiB - 1}/{len(VIDEO)}"
+        )
+        assert [r.headers["range"] for r in upstream] == [
+            f"bytes=0-{self.MiB - 1}",
+            f"bytes={self.MiB}-{2 * self.MiB - 1}",
+        ]
+
+        # Scrubbing back over both ranges is a local read
+        response = self._get(client, VIDEO_URL, 1000, 2 * self.MiB - 1)
+        assert response.content == VIDEO[1000 : 2 * self.MiB]
+        assert len(upstream) == 2
+
+    def test_unsatisfiable_range(self, client, upstream):
+        """Test ranges past the end of a cached video are rejected"""
+        self._get(client, VIDEO_URL, 0, 1023)
+        response = self._get(client, VIDEO_URL, len(VIDEO), len(VIDEO) + 10)
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(VIDEO)}"
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, tmp_path):
+        """Test the least recently used entries go once over budget"""
+        cache = RangeCache(tmp_path, max_bytes=2 * self.MiB)
+
+        await self._fill(cache, "https://video.fbcdn.net/a.mp4")
+        await self._fill(cache, "https://video.fbcdn.net/b.mp4")
+        await cache.get("https://video.fbcdn.net/a.mp4")
+        await self._fill(cache, "https://video.fbcdn.net/c.mp4")
+
+        assert await cache.get("https://video.fbcdn.net/b.mp4") is None
+        assert await cache.get("https://video.fbcdn.net/a.mp4") is not None
+        assert cache.stored_bytes == 2 * self.MiB
+        assert len(list(tmp_path.glob("*.data"))) == 2
+
+        # Entries on disk are picked up by a new process
+        reloaded = RangeCache(tmp_path, max_bytes=2 * self.MiB)
+        entry = await reloaded.get("https://video.fbcdn.net/c.mp4")
+        assert entry.ranges == [(0, self.MiB)]
+
+    async def _fill(self, cache, url, start=0, end=None):
+        end = self.MiB if end is None else end
+        entry = await cache.open(url, len(VIDEO), "video/mp4")
+        async for _ in cache.write_through(
+            entry, start, _network_body(VIDEO[start:end])
+        ):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_budget_is_shared_by_processes(self, tmp_path):
+        """Test eviction counts the entries other processes wrote"""
+        first = RangeCache(tmp_path, max_bytes=int(1.5 * self.MiB))
+        second = RangeCache(tmp_path, max_bytes=int(1.5 * self.MiB))
+
+        await self._fill(first, "https://video.fbcdn.net/a.mp4")
+        await self._fill(second, "https://video.fbcdn.net/b.mp4")
+
+        assert first.stored_bytes == self.MiB
+        assert await second.get("https://video.fbcdn.net/a.mp4") is None
+
+    @pytest.mark.asyncio
+    async def test_entry_recreated_by_another_process_is_refetched(self, tmp_path):
+        """Test ranges another process no longer holds are not read as zeros"""
+        url = "https://video.fbcdn.net/a.mp4"
+        first = RangeCache(tmp_path, max_bytes=64 * self.MiB)
+        second = RangeCache(tmp_path, max_bytes=64 * self.MiB)
+        await self._fill(first, url)
+        stale = await second.get(url)
+
+        # The first process drops the entry and caches another range anew
+        first._remove_files(first._digest(stale.key))
+        await self._fill(first, url, start=2 * self.MiB, end=3 * self.MiB)
+
+        fetched = []
+
+        async def fetch(start, end):
+            fetched.append((start, end))
+            async for chunk in _network_body(VIDEO[start:end]):
+                yield chunk
+
+        body = b"".join(
+            [chunk async for chunk in second.stream(stale, 0, self.MiB, fetch)]
+        )
+
+        assert body == VIDEO[: self.MiB]
+        assert fetched == [(0, self.MiB)]
@@ -0,0 +1,77 @@
+"""
+Tests for the cached yt-dlp option builder
+"""
+
+import base64
+import os
+
+import pytest
+
+from app.utils import ytdlp_options
+
+
+@pytest.fixture
+def cookie_env(monkeypatch, tmp_path):
+    """Isolate cookie sources and the option cache"""
+    for name, _, _ in ytdlp_options.COOKIE_ENV_SOURCES:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.delenv("YTDLP_COOKIE_FILE", raising=False)
+    monkeypatch.setattr(ytdlp_options, "COOKIES_DIR", tmp_path / "cookies")
+    monkeypatch.setattr(ytdlp_options.tempfile, "tempdir", str(tmp_path))
+    # Check the sources on every call so changes are seen immediately
+    monkeypatch.setattr(ytdlp_options._option_profiles, "check_interval", 0)
+    ytdlp_options.invalidate_ydl_opts()
+    yield tmp_path
+    ytdlp_options.invalidate_ydl_opts()
+
+
+class TestYdlOptionProfiles:
+    """Test option profiles are built once and rebuilt on cookie changes"""
+
+    def test_options_built_once(self, cookie_env, monkeypatch):
+        """Test repeated calls copy the cached options"""
+        calls = []
+        detect = ytdlp_options._detect_cookie_file
+        monkeypatch.setattr(
+            ytdlp_options,
+            "_detect_cookie_file",
+            lambda: calls.append(1) or detect(),
+        )
+
+        first = ytdlp_options.build_common_ydl_opts()
+        first["format"] = "best"
+        second = ytdlp_options.build_common_ydl_opts()
+
+        assert len(calls) == 1
+        assert "format" not in second
+        assert "cookiefile" not in second
+
+    def test_env_cookie_written_atomically(self, cookie_env, monkeypatch):
+        """Test env cookie content goes to a content-addressed file"""
+        monkeypatch.setenv(
+            "INSTAGRAM_COOKIES_B64", base64.b64encode(b"# cookies v1").decode()
+        )
+        first = ytdlp_options.build_common_ydl_opts()["cookiefile"]
+        assert open(first).read() == "# cookies v1"
+        assert os.path.dirname(first) == str(cookie_env)
+
+        # New content gets a new file; the old one stays intact for readers
+        monkeypatch.setenv(
+            "INSTAGRAM_COOKIES_B64", base64.b64encode(b"# cookies v2").decode()
+        )
+        second = ytdlp_options.build_common_ydl_opts()["cookiefile"]
+        assert second != first
+        assert open(first).read() == "# cookies v1"
+        assert open(second).read() == "# cookies v2"
+        assert not list(cookie_env.glob("*.partial"))
+
+    def test_cookie_file_change_rebuilds(self, cookie_env):
+        """Test adding a cookie file to the cookies directory is picked up"""
+        assert "cookiefile" not in ytdlp_options.build_common_ydl_opts()
+
+        cookies_dir = cookie_env / "cookies"
+        cookies_dir.mkdir()
+        (cookies_dir / "youtube_cookies.txt").write_text("# cookies")
+
+        opts = ytdlp_options.build_common_ydl_opts()
+        assert opts["cookiefile"] == str(cookies_dir / "youtube_cookies.txt")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the per-client state of the rate limiter and DoS protection.
+Compares the previous representation (dataclasses holding deques, in plain
+dicts) with the bounded tables, for the same number of client IPs.
+
+Usage: python scripts/benchmark_client_state_memory.py --clients 100000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+# Add backend path for imports
+sys.path.append("/app/backend")
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.constants import RateLimits
+from app.middleware.queue_protection import QueueDosProtection
+from app.middleware.rate_limiter import RateLimiter
+
+
+@dataclass
+class LegacyIPBehavior:
+    """IP behavior as tracked before the bounded tables"""
+
+    request_times: deque
+    job_submissions: deque
+    burst_violations: int
+    last_burst_time: float
+    total_jobs_today: int
+    last_daily_reset: float
+    concurrent_jobs: int
+    penalty_until: float
+
+
+@dataclass
+class LegacyTokenBucket:
+    """Token bucket as tracked before the bounded tables"""
+
+    capacity: int
+    tokens: float
+    refill_rate: float
+    last_refill: float
+
+
+def client_ips(count: int):
+    for index in range(count):
+        yield f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+
+
+def populate_legacy(count: int, requests: int) -> tuple:
+    behaviors, buckets = {}, {}
+    for ip in client_ips(count):
+        now = time.time()
+        behavior = LegacyIPBehavior(
+            deque(maxlen=100), deque(maxlen=50), 0, 0, 0, now, 0, 0
+        )
+        for _ in range(requests):
+            behavior.request_times.append(time.time())
+        behaviors[ip] = behavior
+        buckets[ip] = LegacyTokenBucket(50, 49.0, 50 / 60.0, now)
+    return behaviors, buckets
+
+
+def populate_bounded(count: int, requests: int) -> tuple:
+    protection = QueueDosProtection()
+    limiter = RateLimiter()
+    config = limiter.rate_limits["global"]
+    for ip in client_ips(count):
+        behavior = protection.get_or_create_ip_behavior(ip)
+        for _ in range(requests):
+            behavior.request_times.append(time.time())
+        limiter._get_or_create_bucket(limiter.ip_buckets, ip, config).consume()
+    return protection.ip_behaviors, limiter.ip_buckets
+
+
+def measure(populate, count: int, requests: int) -> tuple:
+    """Bytes allocated by a populated state and the time taken to build it"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    state = populate(count, requests)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del state
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-client state memory benchmark")
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=100_000,
+        help="Client IPs to track (default: 100000)",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=5,
+        help="Requests recorded per client (default: 5)",
+    )
+    args = parser.parse_args()
+
+    # Measure the representation, not the cap
+    RateLimits.MAX_TRACKED_CLIENTS = max(RateLimits.MAX_TRACKED_CLIENTS, args.clients)
+
+    print(
+        f"📊 Per-client state for {args.clients:,} IPs, {args.requests} requests each"
+    )
+    results = {}
+    for name, populate in (("legacy", populate_legacy), ("bounded", populate_bounded)):
+        size, elapsed = measure(populate, args.clients, args.requests)
+        results[name] = size
+        print(
+            f"  {name:8} {size / 2**20:8.1f} MiB  "
+            f"{size / args.clients:6.0f} B/IP  built in {elapsed:.2f}s"
+        )
+
+    print(
+        f"✅ Bounded state uses {results['bounded'] / results['legacy']:.0%} "
+        f"of the legacy memory"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -16,9 +16,12 @@ import shutil
 
 # Add backend path for imports
 sys.path.append('/app/backend')
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
 
 try:
-    from app.config import settings
+    from app.config.configuration import get_settings
+    from app.storage_expiry import ClipExpiryIndex, expire_clips
+    settings = get_settings()
     BACKEND_AVAILABLE = True
 except ImportError:
     BACKEND_AVAILABLE = False
@@ -45,6 +48,20 @@ def get_clips_directory() -> Path:
         return Path(CLIPS_DIR)
 
 
+def get_expiry_index():
+    """Get the clip expiry index, None if Redis is unreachable"""
+    try:
+        import redis
+        client = redis.Redis.from_url(
+            os.getenv('REDIS_URL', settings.redis_url), decode_responses=True
+        )
+        client.ping()
+        return ClipExpiryIndex(client)
+    except Exception as e:
+        logger.warning(f"Clip expiry index unavailable, removing whole day directories only: {e}")
+        return None
+
+
 def get_directory_size(path: Path) -> int:
     """Calculate total size of directory in bytes"""
     total_size = 0
@@ -95,8 +112,6 @@ def cleanup_old_files(
         logger.warning(f"Clips directory does not exist: {clips_dir}")
         return {"error": "Directory not found"}
     
-    cutoff_time = time.time() - (max_age_hours * 3600)
-    
     stats = {
         "files_processed": 0,
         "files_deleted": 0,
@@ -107,31 +122,52 @@ def cleanup_old_files(
         "max_age_hours": max_age_hours
     }
     
-    # Get current storage size
-    current_size_bytes = get_directory_size(clips_dir)
-    current_size_gb = current_size_bytes / (1024**3)
+    # Sizing the storage walks the whole tree, so only do it for a threshold
+    if size_threshold_gb:
+        current_size_gb = get_directory_size(clips_dir) / (1024**3)
+        logger.info(f"Starting cleanup - Current storage: {current_size_gb:.2f} GB")
+        
+        # Force cleanup if size threshold exceeded
+        if current_size_gb > size_threshold_gb:
+            logger.warning(f"Storage size ({current_size_gb:.2f} GB) exceeds threshold ({size_threshold_gb} GB). Forcing cleanup.")
+            # Reduce max_age_hours for aggressive cleanup
+            max_age_hours = max(1, max_age_hours // 2)
     
-    logger.info(f"Starting cleanup - Current storage: {current_size_gb:.2f} GB")
+    if BACKEND_AVAILABLE:
+        # Expired clips come from the expiry index and expired day directories
+        result = expire_clips(clips_dir, get_expiry_index(), max_age_hours, dry_run=dry_run)
+        stats["files_processed"] = result["files_deleted"] + result["errors"]
+        stats["files_deleted"] = result["files_deleted"]
+        stats["bytes_deleted"] = result["size_freed"]
+        stats["directories_cleaned"] = result["directories_removed"]
+        stats["errors"] = result["errors"]
+    else:
+        logger.warning("Backend unavailable, scanning the whole clips directory")
+        scan_old_files(clips_dir, time.time() - (max_age_hours * 3600), dry_run, stats)
+    
+    # Log cleanup summary
+    deleted_mb = stats["bytes_deleted"] / (1024**2)
+    logger.info(f"Cleanup completed: {stats['files_deleted']} files deleted, "
+                f"{deleted_mb:.2f} MB freed, {stats['directories_cleaned']} directories removed")
     
-    # Force cleanup if size threshold exceeded
-    force_cleanup = size_threshold_gb and current_size_gb > size_threshold_gb
-    if force_cleanup:
-        logger.warning(f"Storage size ({current_size_gb:.2f} GB) exceeds threshold ({size_threshold_gb} GB). Forcing cleanup.")
-        # Reduce max_age_hours for aggressive cleanup
-        max_age_hours = max(1, max_age_hours // 2)
-        cutoff_time = time.time() - (max_age_hours * 3600)
+    if stats["errors"] > 0:
+        logger.warning(f"Cleanup completed with {stats['errors']} errors")
     
-    # Process all files recursively
+    return stats
+
+
+def scan_old_files(clips_dir: Path, cutoff_time: float, dry_run: bool, stats: Dict[str, Any]) -> None:
+    """Delete files older than cutoff_time by walking the clips directory"""
     for file_path in clips_dir.rglob('*'):
         if file_path.is_file():
             stats["files_processed"] += 1
             
             try:
-                file_mtime = file_path.stat().st_mtime
-                file_size = file_path.stat().st_size
+                file_stat = file_path.stat()
+                file_size = file_stat.st_size
                 
                 # Check if file is old enough to delete
-                if file_mtime < cutoff_time:
+                if file_stat.st_mtime < cutoff_time:
                     if dry_run:
                         logger.info(f"[DRY RUN] Would delete: {file_path} ({file_size} bytes)")
                     else:
@@ -160,16 +196,6 @@ def cleanup_old_files(
             except (OSError, PermissionError) as e:
                 logger.error(f"Error removing directory {dir_path}: {e}")
                 stats["errors"] += 1
-    
-    # Log cleanup summary
-    deleted_mb = stats["bytes_deleted"] / (1024**2)
-    logger.info(f"Cleanup completed: {stats['files_deleted']} files deleted, "
-                f"{deleted_mb:.2f} MB freed, {stats['directories_cleaned']} empty dirs removed")
-    
-    if stats["errors"] > 0:
-        logger.warning(f"Cleanup completed with {stats['errors']} errors")
-    
-    return stats
 
 
 def get_storage_report(clips_dir: Path) -> Dict[str, Any]:
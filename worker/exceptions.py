@@ -71,6 +71,12 @@ class FormatNotAvailableError(DownloadError):
     pass
 
 
+class SegmentFetchError(DownloadError):
+    """Raised when a clip cannot be fetched from its manifest's segments"""
+
+    pass
+
+
 class VideoAnalysisError(VideoProcessingError):
     """Raised when video analysis/metadata extraction fails"""
 
@@ -81,3 +87,9 @@ class FFmpegError(TrimError):
     """Raised when FFmpeg processing fails"""
 
     pass
+
+
+class JobCancelled(VideoProcessingError):
+    """Raised when a job's cancellation is requested while it runs"""
+
+    pass
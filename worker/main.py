@@ -7,6 +7,7 @@ Continuously polls Redis for queued jobs and processes them
 import sys
 import time
 import logging
+import socket
 import traceback
 import os
 from datetime import datetime, timezone
@@ -25,7 +26,10 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "..", "backend"))
 # Import settings and models from the backend app
 try:
     from app.config.configuration import get_settings
+    from app.constants import QueueHealthConfig, RedisKeys
     from app.models import JobStatus
+    from app.queue.lanes import JobLanes
+    from app.repositories.job_repository import status_index_key, update_job
 
     # Get settings from the centralized configuration
     worker_settings = get_settings()
@@ -47,6 +51,9 @@ except ImportError as e:
 # Redis connection (will be initialized later)
 redis = None
 
+# Identifies this worker in the heartbeat set
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
 # --- ensure project root on sys.path -----------------------------------------
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
@@ -107,34 +114,86 @@ def init_worker_redis():
             return None
 
 
+def record_heartbeat():
+    """Mark this worker alive for the API's queue health sampling"""
+    if not redis:
+        return
+
+    try:
+        now = time.time()
+        pipe = redis.pipeline(transaction=False)
+        pipe.zadd(RedisKeys.WORKER_HEARTBEATS, {WORKER_ID: now})
+        pipe.zremrangebyscore(
+            RedisKeys.WORKER_HEARTBEATS, "-inf", now - QueueHealthConfig.WORKER_TIMEOUT
+        )
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to record worker heartbeat: {e}")
+
+
+def job_from_hash(job_data):
+    """Job to process from its Redis hash"""
+    # Data is already decoded due to decode_responses=True
+    return {
+        "id": job_data["id"],
+        "url": job_data["url"],
+        "in_ts": float(job_data["in_ts"]),
+        "out_ts": float(job_data["out_ts"]),
+        "created_at": job_data["created_at"],
+        "resolution": job_data.get("resolution"),
+    }
+
+
+def _utc_now_iso():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def claim_next_job(lanes):
+    """
+    Claim the next job from the scheduling lanes, None if they are empty
+
+    The job leaves its lane already marked as working (jobs that expired or
+    were cancelled while queued are dropped on the way).
+    """
+    if not redis:
+        return None
+
+    try:
+        job_id = lanes.claim(fields={"started_at": _utc_now_iso()})
+        if job_id is None:
+            return None
+        return job_from_hash(redis.hgetall(f"job:{job_id}"))
+
+    except Exception as e:
+        logger.error(f"Error claiming job from lanes: {e}")
+        return None
+
+
 def get_queued_jobs():
-    """Get all jobs with 'queued' status from Redis"""
+    """Get all jobs with 'queued' status that are not in a lane from Redis"""
     if not redis:
         logger.warning("⚠️ Redis not available, returning empty job list")
         return []
 
     try:
-        # Scan for all job keys
-        cursor = 0
+        # Queued jobs come from the status index rather than a keyspace scan
+        since = time.time() - RedisKeys.JOB_TTL
+        job_ids = redis.zrangebyscore(
+            status_index_key(JobStatus.queued.value), since, "+inf"
+        )
+        pipe = redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hgetall(f"job:{job_id}")
+
         jobs = []
-        while True:
-            cursor, keys = redis.scan(cursor, match="job:*", count=100)
-            for key in keys:
-                job_data = redis.hgetall(key)
-                if job_data and job_data.get("status", "") == "queued":
-                    # Data is already decoded due to decode_responses=True
-                    jobs.append(
-                        {
-                            "id": job_data["id"],
-                            "url": job_data["url"],
-                            "in_ts": float(job_data["in_ts"]),
-                            "out_ts": float(job_data["out_ts"]),
-                            "created_at": job_data["created_at"],
-                            "resolution": job_data.get("resolution"),
-                        }
-                    )
-            if cursor == 0:
-                break
+        for job_data in pipe.execute() if job_ids else []:
+            # Laned jobs are claimed through claim_next_job
+            if (
+                job_data
+                and job_data.get("status", "") == "queued"
+                and not job_data.get("lane")
+            ):
+                jobs.append(job_from_hash(job_data))
 
         # Sort by created_at (oldest first)
         jobs.sort(key=lambda x: x["created_at"])
@@ -152,18 +211,15 @@ def mark_job_as_working(job_id: str):
         return False
 
     try:
-        job_key = f"job:{job_id}"
-        redis.hset(
-            job_key,
-            mapping={
-                "status": JobStatus.working,
-                "progress": 0,
-                "started_at": datetime.now(timezone.utc)
-                .isoformat()
-                .replace("+00:00", "Z"),
+        update_job(
+            redis,
+            job_id,
+            {
+                "status": JobStatus.working.value,
+                "progress": "0",
+                "started_at": _utc_now_iso(),
             },
         )
-        redis.expire(job_key, 3600)  # 1 hour expiry
         return True
     except Exception as e:
         logger.error(f"Failed to mark job {job_id} as working: {e}")
@@ -177,17 +233,16 @@ def mark_job_as_error(job_id: str, error_message: str):
         return False
 
     try:
-        job_key = f"job:{job_id}"
-        redis.hset(
-            job_key,
-            mapping={
-                "status": JobStatus.error,
+        update_job(
+            redis,
+            job_id,
+            {
+                "status": JobStatus.error.value,
                 "error_code": "PROCESSING_FAILED",
                 "error_message": str(error_message)[:500],
-                "progress": None,
+                "progress": "0",
             },
         )
-        redis.expire(job_key, 3600)
         return True
     except Exception as e:
         logger.error(f"Failed to mark job {job_id} as error: {e}")
@@ -220,13 +275,27 @@ def main():
         logger.error(f"📍 Traceback: {traceback.format_exc()}")
         sys.exit(1)
 
+    # Previews are optional: without them the worker only processes clips
+    process_next_preview = None
+    if worker_settings.preview_enabled:
+        try:
+            from worker.process_preview import process_next_preview
+
+            logger.info("🎞️ Preview rendering enabled")
+        except Exception as e:
+            logger.error(f"❌ Failed to import process_preview, previews disabled: {e}")
+
+    lanes = JobLanes(redis)
     poll_interval = 2  # seconds
     logger.info(f"⏰ Starting job polling (interval: {poll_interval}s)")
 
     while True:
         try:
-            # Get queued jobs
-            queued_jobs = get_queued_jobs()
+            record_heartbeat()
+
+            # Claim one job by lane priority, else any job queued without a lane
+            claimed_job = claim_next_job(lanes)
+            queued_jobs = [claimed_job] if claimed_job else get_queued_jobs()
 
             if queued_jobs:
                 logger.info(f"📋 Found {len(queued_jobs)} queued job(s)")
@@ -237,8 +306,8 @@ def main():
                         f"🎬 Processing job {job_id}: {job['url']} [{job['in_ts']}s - {job['out_ts']}s]"
                     )
 
-                    # Mark job as working
-                    if mark_job_as_working(job_id):
+                    # Mark job as working (claimed jobs already are)
+                    if job is claimed_job or mark_job_as_working(job_id):
                         try:
                             # Process the job
                             process_clip(
@@ -262,11 +331,28 @@ def main():
                             f"❌ Failed to mark job {job_id} as working, skipping..."
                         )
 
+                if claimed_job:
+                    # Claim the next one straight away, lane order may have changed
+                    continue
+
+            elif process_next_preview is not None:
+                # Render previews only while no clip is waiting
+                try:
+                    if process_next_preview(redis):
+                        continue
+                except Exception as e:
+                    logger.error(f"❌ Preview rendering failed: {e}")
+
             # Wait before next poll
             time.sleep(poll_interval)
 
         except KeyboardInterrupt:
             logger.info("🛑 Worker shutdown requested")
+            try:
+                if redis:
+                    redis.zrem(RedisKeys.WORKER_HEARTBEATS, WORKER_ID)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to remove worker heartbeat: {e}")
             break
         except Exception as e:
             logger.error(f"❌ Unexpected error in main loop: {e}")
@@ -21,10 +21,27 @@ sys.path.append("/app/backend")
 from app import settings
 from app.models import JobStatus
 from app.storage_factory import get_storage_manager
+from app.extraction import (
+    PERMANENT_FAILURES,
+    CircuitOpenError,
+    CookieSessionPool,
+    ExtractionCircuitBreaker,
+    Priority,
+    StrategySelector,
+    classify_extraction_error,
+    politeness,
+    ydl_pool,
+)
+from app.utils.platform_detection import PlatformDetector
+from app.services.job_cancellation import mark_cancelled
+from app.repositories.job_repository import update_job
 
 # Import video processing components
 from worker.video.trimmer import VideoTrimmer
+from worker.video.segment_fetcher import fetch_clip_segments
 from worker.progress.tracker import ProgressTracker
+from worker.progress.cancellation import CancellationToken
+from worker.exceptions import JobCancelled
 
 # Import Instagram-specific yt-dlp configuration
 from worker.utils.ytdlp_options import (
@@ -55,14 +72,12 @@ def update_job_progress(
             )
             return
 
-        job_key = f"job:{job_id}"
         update_data = {"progress": str(progress)}  # Convert to string
         if status:
             update_data["status"] = str(status)  # Convert to string
         if stage:
             update_data["stage"] = str(stage)  # Add processing stage
-        worker_redis.hset(job_key, mapping=update_data)
-        worker_redis.expire(job_key, 3600)  # 1 hour expiry
+        update_job(worker_redis, job_id, update_data)
         stage_msg = f" - {stage}" if stage else ""
         logger.info(
             f"📊 Job {job_id} progress: {progress}% {f'({status})' if status else ''}{stage_msg}"
@@ -78,7 +93,6 @@ def update_job_error(job_id: str, error_code: str, error_message: str):
             logger.warning(f"⚠️ Redis not available, cannot update job {job_id} error")
             return
 
-        job_key = f"job:{job_id}"
         # Convert all values to strings to avoid Redis type errors
         mapping_data = {
             "status": str(JobStatus.error.value),
@@ -86,8 +100,7 @@ def update_job_error(job_id: str, error_code: str, error_message: str):
             "error_message": str(error_message[:500]),  # Truncate long error messages
             "progress": "0",  # Use "0" instead of null for error state
         }
-        worker_redis.hset(job_key, mapping=mapping_data)
-        worker_redis.expire(job_key, 3600)
+        update_job(worker_redis, job_id, mapping_data)
         logger.info(f"✅ Updated job {job_id} with error status: {error_code}")
     except Exception as e:
         logger.error(f"❌ Failed to update job error for {job_id}: {e}")
@@ -277,7 +290,9 @@ def extract_video_title(url: str) -> str:
                     ydl_opts["extract_flat"] = False
                     ydl_opts["skip_download"] = True
 
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    with politeness.slot(url, Priority.BACKGROUND), ydl_pool.checkout(
+                        ydl_opts, label=f"title:instagram:{config_idx}"
+                    ) as ydl:
                         info = ydl.extract_info(url, download=False)
 
                         # Handle playlist URLs - take first video
@@ -311,7 +326,9 @@ def extract_video_title(url: str) -> str:
             ydl_opts = build_common_ydl_opts()
             ydl_opts["extract_flat"] = False
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with politeness.slot(url, Priority.BACKGROUND), ydl_pool.checkout(
+                ydl_opts, label="title:common"
+            ) as ydl:
                 info = ydl.extract_info(url, download=False)
 
                 # Handle playlist URLs - take first video
@@ -345,8 +362,13 @@ def process_clip(
     """
     global worker_redis
     worker_redis = redis_connection
+    # Share the platforms' politeness budgets with the API and other workers
+    if redis_connection is not None:
+        politeness.bind(redis_connection)
 
     job_start_time = time.time()
+    # Stops the job once the API sets its cancel flag
+    cancellation = CancellationToken(job_id, redis_connection)
 
     # Log initial job parameters
     logger.info(
@@ -367,6 +389,9 @@ def process_clip(
         temp_dir = Path(temp_dir_str)
 
         try:
+            # Cancelled between being claimed and starting
+            cancellation.raise_if_cancelled()
+
             # Step 1: Download Video
             # ---------------------
             update_job_progress(
@@ -419,6 +444,14 @@ def process_clip(
 
             # Prepare variable to hold extraction info so it can be re-used later
             info: Optional[dict] = None  # <-- NEW
+            # Source time at which the downloaded file starts (segment fetches)
+            source_offset = 0.0
+
+            # Fail fast while the platform is rate limiting or blocking us
+            platform = PlatformDetector.detect_platform(url).value
+            breaker = ExtractionCircuitBreaker(worker_redis, ladder="download")
+            if not cache_used:
+                asyncio.run(breaker.check(platform))
 
             # Use Instagram-specific configuration with fallback strategies
             if is_instagram_url(url):
@@ -437,7 +470,27 @@ def process_clip(
                     downloaded_file = None
                     last_error = None
 
-                    for config_idx, base_config in enumerate(instagram_configs, 1):
+                    # Rotate over Instagram cookie sessions when any are configured
+                    cookie_sessions = CookieSessionPool(worker_redis)
+                    session = asyncio.run(cookie_sessions.acquire("instagram"))
+
+                    # Try the configs that have recently been fastest to succeed
+                    # first, skipping those whose own circuit is open
+                    configs_by_name = {
+                        f"instagram_{idx}": (idx, config)
+                        for idx, config in enumerate(instagram_configs, 1)
+                    }
+                    selector = StrategySelector(worker_redis, ladder="download")
+                    config_order = asyncio.run(
+                        selector.rank(platform, list(configs_by_name))
+                    )
+                    config_order = asyncio.run(
+                        breaker.allowed_configs(platform, config_order)
+                    )
+
+                    for attempt_idx, config_name in enumerate(config_order, 1):
+                        config_idx, base_config = configs_by_name[config_name]
+                        attempt_start = time.time()
                         try:
                             logger.info(
                                 f"🎬 Worker: Trying Instagram config {config_idx}/{len(instagram_configs)}"
@@ -461,9 +514,17 @@ def process_clip(
                                 "http_chunk_size": 20971520,  # 20MB in bytes
                                 "noprogress": True,
                             }
+                            if session is not None:
+                                ydl_opts["cookiefile"] = session.cookie_file
+                                logger.info(
+                                    f"🍪 Config {config_idx}: using cookie session '{session.session_id}'"
+                                )
 
                             def progress_hook(d):
                                 """Robust progress hook that handles missing 'progress' key"""
+                                # yt-dlp aborts the download on DownloadCancelled
+                                if cancellation.is_cancelled():
+                                    raise yt_dlp.utils.DownloadCancelled("Job cancelled")
                                 try:
                                     if "downloaded_bytes" in d and "total_bytes" in d:
                                         progress = d["downloaded_bytes"] / d["total_bytes"]
@@ -483,11 +544,32 @@ def process_clip(
                                 except (KeyError, TypeError, ZeroDivisionError):
                                     pass
 
-                            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                                ydl.add_progress_hook(progress_hook)
+                            # Hooks are per call: pooled instances are shared
+                            ydl_opts["progress_hooks"] = [progress_hook]
+                            with politeness.slot(
+                                url, Priority.BACKGROUND
+                            ), ydl_pool.checkout(
+                                ydl_opts, label=f"download:instagram:{config_idx}"
+                            ) as ydl:
                                 info = ydl.extract_info(url, download=True)
                                 downloaded_file = ydl.prepare_filename(info)
                                 download_successful = True
+                                asyncio.run(
+                                    cookie_sessions.report(
+                                        session, None, time.time() - attempt_start
+                                    )
+                                )
+                                asyncio.run(
+                                    breaker.record(platform, None, config_name)
+                                )
+                                asyncio.run(
+                                    selector.record(
+                                        platform,
+                                        config_name,
+                                        True,
+                                        time.time() - attempt_start,
+                                    )
+                                )
                                 logger.info(
                                     f"🎬 Worker: Instagram download successful with config {config_idx}"
                                 )
@@ -508,6 +590,8 @@ def process_clip(
                                         )
                                 break
 
+                        except (JobCancelled, yt_dlp.utils.DownloadCancelled):
+                            raise
                         except Exception as e:
                             error_msg = str(e).lower()
                             last_error = e
@@ -515,8 +599,35 @@ def process_clip(
                                 f"🎬 Worker: Instagram config {config_idx} failed: {e}"
                             )
 
+                            asyncio.run(breaker.record(platform, e, config_name))
+                            # Only failures the config itself could avoid count
+                            # against it in the ranking
+                            if (
+                                "requested format is not available" not in error_msg
+                                and classify_extraction_error(e)
+                                not in PERMANENT_FAILURES
+                            ):
+                                asyncio.run(
+                                    selector.record(
+                                        platform,
+                                        config_name,
+                                        False,
+                                        time.time() - attempt_start,
+                                    )
+                                )
+
+                            # A throttled/challenged session cools down: switch sessions
+                            if asyncio.run(
+                                cookie_sessions.report(
+                                    session, e, time.time() - attempt_start
+                                )
+                            ):
+                                session = asyncio.run(
+                                    cookie_sessions.acquire("instagram")
+                                )
+
                             # Continue to next config for any error, log details for last attempt
-                            if config_idx < len(instagram_configs):
+                            if attempt_idx < len(config_order):
                                 continue
 
                             # If this is the last config, provide comprehensive error message
@@ -569,6 +680,9 @@ def process_clip(
 
                 def progress_hook(d):
                     """Robust progress hook that handles missing 'progress' key"""
+                    # yt-dlp aborts the download on DownloadCancelled
+                    if cancellation.is_cancelled():
+                        raise yt_dlp.utils.DownloadCancelled("Job cancelled")
                     try:
                         if "downloaded_bytes" in d and "total_bytes" in d:
                             progress = d["downloaded_bytes"] / d["total_bytes"]
@@ -588,10 +702,40 @@ def process_clip(
                         # Silently continue if progress calculation fails
                         pass
 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.add_progress_hook(progress_hook)
-                    info = ydl.extract_info(url, download=True)  # <-- store info
-                    downloaded_file = ydl.prepare_filename(info)
+                def segment_progress(done, total):
+                    update_job_progress(
+                        job_id, int(done / total * 25) + 5, stage="Downloading"
+                    )
+
+                # Hooks are per call: pooled instances are shared
+                ydl_opts["progress_hooks"] = [progress_hook]
+                try:
+                    with politeness.slot(url, Priority.BACKGROUND), ydl_pool.checkout(
+                        ydl_opts, label="download:common"
+                    ) as ydl:
+                        info = ydl.extract_info(url, download=False)  # <-- store info
+
+                        # HLS/DASH sources: only fetch the segments of the clip
+                        fetched = fetch_clip_segments(
+                            info,
+                            in_ts,
+                            out_ts,
+                            temp_dir,
+                            segment_progress,
+                            cancel_check=cancellation.raise_if_cancelled,
+                        )
+                        if fetched is not None:
+                            downloaded_file, source_offset = fetched
+                            downloaded_file = str(downloaded_file)
+                        else:
+                            info = ydl.process_ie_result(info, download=True)
+                            downloaded_file = ydl.prepare_filename(info)
+                except (JobCancelled, yt_dlp.utils.DownloadCancelled):
+                    raise
+                except Exception as e:
+                    asyncio.run(breaker.record(platform, e, "common"))
+                    raise
+                asyncio.run(breaker.record(platform, None, "common"))
 
             if not downloaded_file or not os.path.exists(downloaded_file):
                 raise Exception("yt-dlp failed to download the file.")
@@ -599,18 +743,23 @@ def process_clip(
             logger.info(f"🎬 Worker: Downloaded to: {downloaded_file}")
 
             # 2. Trim the video
+            cancellation.raise_if_cancelled()
             update_job_progress(job_id, 30, stage="Trimming video...")
 
             # Create progress tracker for trimming
             progress_tracker = ProgressTracker(job_id, worker_redis)
 
             # Initialize video trimmer
-            trimmer = VideoTrimmer(progress_tracker)
+            trimmer = VideoTrimmer(progress_tracker, cancellation)
 
-            # Trim the video
+            # Trim the video (segment fetches start at source_offset, not zero)
             logger.info(f"🎬 Worker: Starting video trim from {in_ts}s to {out_ts}s")
             trimmed_file = asyncio.run(
-                trimmer.trim(Path(downloaded_file), in_ts, out_ts)
+                trimmer.trim(
+                    Path(downloaded_file),
+                    in_ts - source_offset,
+                    out_ts - source_offset,
+                )
             )
 
             if not trimmed_file.exists():
@@ -619,6 +768,7 @@ def process_clip(
             logger.info(f"🎬 Worker: Video trimmed successfully: {trimmed_file}")
 
             # 3. Upload to storage
+            cancellation.raise_if_cancelled()
             update_job_progress(job_id, 80, stage="Uploading...")
 
             # ---- Filename generation -------------------------------------------------
@@ -635,7 +785,7 @@ def process_clip(
             final_filename = f"{video_title}_{job_id[:8]}.mp4"
 
             # Upload to storage
-            storage_manager = get_storage_manager()
+            storage_manager = get_storage_manager(worker_redis)
             try:
                 with open(trimmed_file, "rb") as f:
                     file_content = f.read()
@@ -662,10 +812,10 @@ def process_clip(
                 )
 
                 # Update job with download URL
-                job_key = f"job:{job_id}"
-                worker_redis.hset(
-                    job_key,
-                    mapping={
+                update_job(
+                    worker_redis,
+                    job_id,
+                    {
                         "download_url": download_url,
                         "file_size": str(storage_result["size"]),
                         "video_title": video_title,
@@ -678,6 +828,16 @@ def process_clip(
                 logger.error(f"❌ Upload failed for job {job_id}: {upload_error}")
                 raise Exception(f"Upload failed: {upload_error}")
 
+        except CircuitOpenError as e:
+            logger.warning(f"🔌 Job {job_id} rejected: {e}")
+            update_job_error(job_id, "PLATFORM_UNAVAILABLE", str(e))
+
+        except (JobCancelled, yt_dlp.utils.DownloadCancelled):
+            # Leaving the with block removes the partial files
+            logger.info(f"🛑 Job {job_id} cancelled")
+            if worker_redis:
+                mark_cancelled(worker_redis, job_id)
+
         except Exception as e:
             logger.error(f"❌ Job {job_id} failed during processing: {e}")
             logger.error(traceback.format_exc())
@@ -22,7 +22,12 @@ def should_use_refactored_processor() -> bool:
 
 
 def process_clip_refactored(
-    job_id: str, url: str, in_ts: float, out_ts: float, format_id: Optional[str] = None
+    job_id: str,
+    url: str,
+    in_ts: float,
+    out_ts: float,
+    format_id: Optional[str] = None,
+    redis_connection=None,
 ) -> None:
     """
     Refactored video clipping job processor using modular architecture
@@ -33,6 +38,7 @@ def process_clip_refactored(
         in_ts: Start timestamp in seconds
         out_ts: End timestamp in seconds
         format_id: Optional video format ID
+        redis_connection: Worker Redis connection for progress and ladder stats
 
     Raises:
         VideoProcessingError: If processing fails
@@ -46,7 +52,7 @@ def process_clip_refactored(
         )
 
         # Create processor and run
-        processor = VideoProcessor(job_id)
+        processor = VideoProcessor(job_id, redis_connection)
 
         # Run async processing in sync context (for RQ compatibility)
         loop = asyncio.new_event_loop()
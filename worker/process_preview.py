@@ -0,0 +1,295 @@
+"""
+Render previews queued after metadata extraction.
+
+A preview is a low-bitrate 240p proxy rendition of the video with a
+keyframe every second (so seeking in it is instant), plus a sprite sheet of
+timeline thumbnails and its WebVTT index. Files are written under
+``<clips_dir>/previews/<preview id>/``, which the API serves.
+
+Clip jobs come first: a render is abandoned as soon as a clip job is queued
+in a lane, and its preview goes back to the head of the preview queue.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import yt_dlp
+
+# Import from backend app
+sys.path.append("/app/backend")
+from app.config.configuration import get_settings
+from app.constants import PreviewConfig
+from app.extraction import Priority, politeness, ydl_pool
+from app.queue.lanes import JobLanes
+from app.services.preview_service import (
+    PREVIEW_SPRITE,
+    PREVIEW_VIDEO,
+    PREVIEW_VTT,
+    PreviewStore,
+    SpritePlan,
+    build_sprite_vtt,
+    get_previews_dir,
+    plan_sprite,
+)
+
+from worker.exceptions import JobCancelled
+from worker.progress.cancellation import CancellationToken, run_cancellable
+from worker.utils.ytdlp_options import build_common_ydl_opts
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class ClipWorkQueued(CancellationToken):
+    """Trips as soon as a clip job is queued, so a preview yields to it"""
+
+    def __init__(self, preview_id: str, lanes: JobLanes):
+        """
+        Initialize preemption token
+
+        Args:
+            preview_id: Preview being rendered
+            lanes: Scheduling lanes of the clip jobs
+        """
+        super().__init__(f"preview-{preview_id}")
+        self.lanes = lanes
+
+    def is_cancelled(self) -> bool:
+        if self._cancelled:
+            return True
+
+        now = time.monotonic()
+        if now - self._checked_at >= self.interval:
+            self._checked_at = now
+            try:
+                self._cancelled = self.lanes.has_work()
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to check the clip lanes: {e}")
+        return self._cancelled
+
+
+def _run_ffmpeg(args: list, preemption: CancellationToken) -> None:
+    """Run ffmpeg, raising with its error output on failure"""
+    cmd = [settings.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y", *args]
+    result = run_cancellable(cmd, preemption, timeout=PreviewConfig.FFMPEG_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+
+
+def _source_opts() -> dict:
+    return {**build_common_ydl_opts(), "format": PreviewConfig.SOURCE_FORMAT}
+
+
+def extract_duration(url: str) -> Optional[float]:
+    """Duration of a video, from an extraction without download"""
+    with politeness.slot(url, Priority.BACKGROUND), ydl_pool.checkout(
+        _source_opts(), label="preview"
+    ) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return info.get("duration")
+
+
+def download_source(url: str, temp_dir: Path, preemption: CancellationToken) -> Path:
+    """
+    Download a low-resolution source for the preview
+
+    Raises:
+        JobCancelled: If a clip job was queued during the download
+    """
+
+    def progress_hook(d):
+        # yt-dlp aborts the download on DownloadCancelled
+        if preemption.is_cancelled():
+            raise yt_dlp.utils.DownloadCancelled("Clip job queued")
+
+    ydl_opts = {
+        **_source_opts(),
+        "outtmpl": str(temp_dir / "source.%(ext)s"),
+        "noprogress": True,
+        "progress_hooks": [progress_hook],
+    }
+    try:
+        with politeness.slot(url, Priority.BACKGROUND), ydl_pool.checkout(
+            ydl_opts, label="preview"
+        ) as ydl:
+            ydl.extract_info(url, download=True)
+    except yt_dlp.utils.DownloadCancelled:
+        preemption.raise_if_cancelled()
+        raise
+
+    # Merged formats may end up with another extension than the first guess
+    downloaded = sorted(temp_dir.glob("source.*"))
+    if not downloaded:
+        raise RuntimeError("yt-dlp did not produce a preview source")
+    return downloaded[0]
+
+
+def render_preview(
+    source: Path, output_dir: Path, duration: float, preemption: CancellationToken
+) -> SpritePlan:
+    """
+    Render the proxy rendition, sprite sheet and WebVTT index of a source
+
+    Files are written under temporary names and renamed into place, so the
+    API never serves a partial file.
+
+    Returns:
+        Layout of the sprite sheet
+
+    Raises:
+        JobCancelled: If a clip job was queued during the render
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    video_partial = output_dir / f"partial.{PREVIEW_VIDEO}"
+    _run_ffmpeg(
+        [
+            "-i",
+            str(source),
+            "-vf",
+            f"scale=-2:{PreviewConfig.HEIGHT}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-crf",
+            str(PreviewConfig.VIDEO_CRF),
+            "-maxrate",
+            PreviewConfig.VIDEO_MAXRATE,
+            "-bufsize",
+            PreviewConfig.VIDEO_BUFSIZE,
+            "-force_key_frames",
+            f"expr:gte(t,n_forced*{PreviewConfig.KEYFRAME_INTERVAL})",
+            "-c:a",
+            "aac",
+            "-b:a",
+            PreviewConfig.AUDIO_BITRATE,
+            "-ac",
+            "1",
+            "-movflags",
+            "+faststart",
+            str(video_partial),
+        ],
+        preemption,
+    )
+
+    # Thumbnails come from the small rendition: far less to decode
+    plan = plan_sprite(duration)
+    width, height = plan.width, plan.height
+    sprite_partial = output_dir / f"partial.{PREVIEW_SPRITE}"
+    _run_ffmpeg(
+        [
+            "-i",
+            str(video_partial),
+            "-vf",
+            (
+                f"fps=1/{plan.interval},"
+                f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
+                f"tile={plan.columns}x{plan.rows}"
+            ),
+            "-frames:v",
+            "1",
+            "-q:v",
+            "5",
+            str(sprite_partial),
+        ],
+        preemption,
+    )
+
+    vtt_partial = output_dir / f"partial.{PREVIEW_VTT}"
+    vtt_partial.write_text(build_sprite_vtt(plan, duration))
+
+    for partial, name in (
+        (video_partial, PREVIEW_VIDEO),
+        (sprite_partial, PREVIEW_SPRITE),
+        (vtt_partial, PREVIEW_VTT),
+    ):
+        os.replace(partial, output_dir / name)
+    return plan
+
+
+def prune_expired_previews(previews_dir: Path) -> int:
+    """Remove preview files older than the preview TTL"""
+    if not previews_dir.is_dir():
+        return 0
+
+    cutoff = time.time() - PreviewConfig.TTL
+    removed = 0
+    for preview_dir in previews_dir.iterdir():
+        try:
+            if preview_dir.is_dir() and preview_dir.stat().st_mtime < cutoff:
+                shutil.rmtree(preview_dir)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to remove expired preview {preview_dir}: {e}")
+    if removed:
+        logger.info(f"🧹 Removed {removed} expired previews")
+    return removed
+
+
+def process_next_preview(redis_connection) -> bool:
+    """
+    Render the oldest queued preview, if any
+
+    Args:
+        redis_connection: Worker's Redis connection
+
+    Returns:
+        True if a preview was taken from the queue (rendered or failed)
+    """
+    store = PreviewStore(redis_connection)
+    preview = asyncio.run(store.claim())
+    if preview is None:
+        return False
+
+    previews_dir = get_previews_dir()
+    prune_expired_previews(previews_dir)
+
+    preview_id, url = preview["id"], preview["url"]
+    output_dir = previews_dir / preview_id
+    started = time.time()
+    logger.info(f"🎞️ Rendering preview {preview_id} for {url}")
+
+    preemption = ClipWorkQueued(preview_id, JobLanes(redis_connection))
+
+    with tempfile.TemporaryDirectory(prefix=f"preview_{preview_id}_") as temp_dir:
+        try:
+            # Never download a source before its length is known to be bounded
+            duration = float(preview.get("duration") or 0) or extract_duration(url)
+            if not duration:
+                raise RuntimeError("Could not determine the video duration")
+            if duration > PreviewConfig.MAX_DURATION:
+                raise RuntimeError(f"Video too long for a preview ({duration:.0f}s)")
+
+            source = download_source(url, Path(temp_dir), preemption)
+            plan = render_preview(source, output_dir, duration, preemption)
+            asyncio.run(
+                store.complete(
+                    preview_id, duration=duration, thumbnail_interval=plan.interval
+                )
+            )
+            logger.info(
+                f"✅ Preview {preview_id} ready in {time.time() - started:.1f}s "
+                f"({plan.count} thumbnails)"
+            )
+
+        except JobCancelled:
+            logger.info(f"⏸️ Preview {preview_id} interrupted by a clip job, requeued")
+            shutil.rmtree(output_dir, ignore_errors=True)
+            asyncio.run(store.requeue(preview_id))
+
+        except Exception as e:
+            logger.error(f"❌ Preview {preview_id} failed: {e}")
+            shutil.rmtree(output_dir, ignore_errors=True)
+            asyncio.run(store.fail(preview_id, str(e)))
+
+    return True
@@ -1,5 +1,6 @@
 """Progress tracking module for video processing jobs"""
 
+from .cancellation import CancellationToken, run_cancellable
 from .tracker import ProgressTracker
 
-__all__ = ["ProgressTracker"]
+__all__ = ["CancellationToken", "ProgressTracker", "run_cancellable"]
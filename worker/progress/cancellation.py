@@ -0,0 +1,160 @@
+"""
+Cancellation of Running Jobs
+
+The API cancels a job by setting its cancel flag in Redis. The worker polls
+the flag through a CancellationToken from its download hooks and between
+stages, and runs ffmpeg through run_cancellable, which kills ffmpeg's whole
+process group as soon as the flag is seen.
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import time
+from contextlib import suppress
+from typing import List, Optional
+
+# Try imports with fallback for testing
+try:
+    from ..exceptions import JobCancelled
+except ImportError:
+    from exceptions import JobCancelled
+
+# Try to import from backend app, but handle gracefully for testing
+try:
+    from app.constants import WorkerConfig
+    from app.services.job_cancellation import cancel_key
+except ImportError:
+
+    class WorkerConfig:
+        CANCEL_CHECK_INTERVAL = 0.25
+        CANCEL_KILL_GRACE = 0.5
+
+    def cancel_key(job_id: str) -> str:
+        return f"job:{job_id}:cancel"
+
+
+logger = logging.getLogger(__name__)
+
+
+class CancellationToken:
+    """Checks a job's cancel flag, reading Redis at most once per interval"""
+
+    def __init__(
+        self,
+        job_id: str,
+        redis_client=None,
+        interval: float = WorkerConfig.CANCEL_CHECK_INTERVAL,
+    ):
+        """
+        Initialize cancellation token
+
+        Args:
+            job_id: Unique job identifier
+            redis_client: Redis client holding the cancel flag; without one
+                the job can never be cancelled
+            interval: Minimum seconds between reads of the flag
+        """
+        self.job_id = job_id
+        self.redis = redis_client
+        self.interval = interval
+        self._cancelled = False
+        self._checked_at = float("-inf")
+
+    def is_cancelled(self) -> bool:
+        """Whether the job's cancellation was requested"""
+        if self._cancelled or self.redis is None:
+            return self._cancelled
+
+        now = time.monotonic()
+        if now - self._checked_at >= self.interval:
+            self._checked_at = now
+            try:
+                self._cancelled = bool(self.redis.exists(cancel_key(self.job_id)))
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to check cancellation of {self.job_id}: {e}")
+        return self._cancelled
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Stop the job if its cancellation was requested
+
+        Raises:
+            JobCancelled: If the job was cancelled
+        """
+        if self.is_cancelled():
+            raise JobCancelled(f"Job {self.job_id} was cancelled", job_id=self.job_id)
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    """Terminate a process and its children, killing them after a grace period"""
+    if not hasattr(os, "killpg"):
+        process.kill()
+        process.communicate()
+        return
+
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.communicate(timeout=WorkerConfig.CANCEL_KILL_GRACE)
+    except ProcessLookupError:
+        process.communicate()
+    except subprocess.TimeoutExpired:
+        with suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+
+
+def run_cancellable(
+    cmd: List[str],
+    cancellation: Optional[CancellationToken] = None,
+    timeout: Optional[float] = None,
+) -> subprocess.CompletedProcess:
+    """
+    Run a command with captured text output, stopping it on cancellation
+
+    The command runs in its own process group, so cancelling also kills
+    anything it started.
+
+    Args:
+        cmd: Command as list
+        cancellation: Token of the job the command works for
+        timeout: Seconds the command may run
+
+    Returns:
+        Completed process, as from subprocess.run
+
+    Raises:
+        JobCancelled: If the job was cancelled while the command ran
+        subprocess.TimeoutExpired: If the command ran longer than timeout
+    """
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    while True:
+        wait = cancellation.interval if cancellation is not None else None
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0.0)
+            wait = remaining if wait is None else min(wait, remaining)
+
+        try:
+            stdout, stderr = process.communicate(timeout=wait)
+            return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+        except subprocess.TimeoutExpired:
+            if deadline is not None and time.monotonic() >= deadline:
+                _kill_process_group(process)
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            if cancellation is not None and cancellation.is_cancelled():
+                logger.info(f"🛑 Job {cancellation.job_id} cancelled, killing {cmd[0]}")
+                _kill_process_group(process)
+                cancellation.raise_if_cancelled()
+        except BaseException:
+            # Never leave the process running behind an error or interrupt
+            _kill_process_group(process)
+            raise
@@ -14,9 +14,11 @@ try:
     sys.path.append("/app/backend")
     from app import redis
     from app.models import JobStatus
+    from app.repositories.job_repository import update_job
 except ImportError:
     # For testing or standalone usage, use mock imports
     redis = None
+    update_job = None
 
     class JobStatus:
         class error:
@@ -55,11 +57,10 @@ class ProgressTracker:
         """
         try:
             # Check if Redis is available (but allow mocked Redis)
-            if self.redis is None:
+            if self.redis is None or update_job is None:
                 logger.warning(f"No Redis client available for job {self.job_id}")
                 return
 
-            job_key = f"job:{self.job_id}"
             update_data = {"progress": str(progress)}  # Convert to string for Redis
 
             if status:
@@ -67,8 +68,8 @@ class ProgressTracker:
             if stage:
                 update_data["stage"] = str(stage)
 
-            self.redis.hset(job_key, mapping=update_data)
-            self.redis.expire(job_key, 3600)  # 1 hour expiry
+            # Refreshes the job's TTL and keeps the status indexes in step
+            update_job(self.redis, self.job_id, update_data)
 
             # Structured logging with correlation ID
             stage_msg = f" - {stage}" if stage else ""
@@ -98,11 +99,10 @@ class ProgressTracker:
         """
         try:
             # Check if Redis is available (but allow mocked Redis)
-            if self.redis is None:
+            if self.redis is None or update_job is None:
                 logger.warning(f"No Redis client available for job {self.job_id}")
                 return
 
-            job_key = f"job:{self.job_id}"
             # Convert all values to strings to avoid Redis type errors
             mapping_data = {
                 "status": str(JobStatus.error.value),
@@ -113,8 +113,7 @@ class ProgressTracker:
                 "progress": "0",  # Use "0" instead of null for error state
             }
 
-            self.redis.hset(job_key, mapping=mapping_data)
-            self.redis.expire(job_key, 3600)
+            update_job(self.redis, self.job_id, mapping_data)
 
             logger.info(
                 f"✅ Updated job {self.job_id} with error status: {error_code}",
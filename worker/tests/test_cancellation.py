@@ -0,0 +1,86 @@
+"""
+Unit tests for cancellation of running jobs
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add worker directory to path for imports
+worker_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(worker_dir))
+
+from exceptions import JobCancelled
+from progress.cancellation import CancellationToken, run_cancellable
+
+
+class TestCancellationToken:
+    """Test the cancel flag is polled, not read on every check"""
+
+    def test_reads_flag_at_most_once_per_interval(self):
+        redis = Mock()
+        redis.exists.return_value = 0
+        token = CancellationToken("job-1", redis, interval=60)
+
+        assert not token.is_cancelled()
+        assert not token.is_cancelled()
+        assert redis.exists.call_count == 1
+        redis.exists.assert_called_with("job:job-1:cancel")
+
+    def test_cancellation_sticks(self):
+        redis = Mock()
+        redis.exists.return_value = 1
+        token = CancellationToken("job-1", redis, interval=0)
+
+        with pytest.raises(JobCancelled):
+            token.raise_if_cancelled()
+        redis.exists.return_value = 0
+        assert token.is_cancelled()
+
+    def test_redis_errors_do_not_cancel(self):
+        redis = Mock()
+        redis.exists.side_effect = ConnectionError("down")
+
+        assert not CancellationToken("job-1", redis, interval=0).is_cancelled()
+        assert not CancellationToken("job-1", None).is_cancelled()
+
+
+class TestRunCancellable:
+    """Test commands are killed with their children once cancelled"""
+
+    def test_returns_like_subprocess_run(self):
+        result = run_cancellable(
+            [sys.executable, "-c", "import sys; print('out'); sys.exit(3)"]
+        )
+
+        assert result.returncode == 3
+        assert result.stdout.strip() == "out"
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs process groups")
+    def test_cancel_kills_process_group_within_a_second(self):
+        redis = Mock()
+        cancelled_at = time.monotonic() + 0.3
+        redis.exists.side_effect = lambda key: time.monotonic() >= cancelled_at
+        token = CancellationToken("job-1", redis, interval=0.05)
+        # The shell's child sleep must die with it
+        cmd = ["sh", "-c", "sleep 30 & sleep 30; wait"]
+
+        started = time.monotonic()
+        with pytest.raises(JobCancelled):
+            run_cancellable(cmd, token)
+
+        assert time.monotonic() - started < 1.5
+        leftover = subprocess.run(
+            ["pgrep", "-f", "sleep 30"], capture_output=True, text=True
+        )
+        assert leftover.stdout.strip() == ""
+
+    def test_timeout(self):
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_cancellable(
+                [sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.2
+            )
@@ -26,8 +26,9 @@ class TestProgressTracker:
         assert tracker.redis == mock_redis
 
     @patch("progress.tracker.logger")
+    @patch("progress.tracker.update_job")
     @patch("progress.tracker.redis")
-    def test_update_progress_success(self, mock_redis, mock_logger):
+    def test_update_progress_success(self, mock_redis, mock_update_job, mock_logger):
         """Test successful progress update"""
         from progress.tracker import ProgressTracker
 
@@ -36,11 +37,10 @@ class TestProgressTracker:
         # Test basic progress update
         tracker.update(50)
 
-        # Verify Redis calls
-        mock_redis.hset.assert_called_once_with(
-            "job:test_job_123", mapping={"progress": "50"}
+        # Verify the write goes through the job repository
+        mock_update_job.assert_called_once_with(
+            mock_redis, "test_job_123", {"progress": "50"}
         )
-        mock_redis.expire.assert_called_once_with("job:test_job_123", 3600)
 
         # Verify logging
         mock_logger.info.assert_called_once()
@@ -49,8 +49,11 @@ class TestProgressTracker:
         assert "50%" in log_call_args
 
     @patch("progress.tracker.logger")
+    @patch("progress.tracker.update_job")
     @patch("progress.tracker.redis")
-    def test_update_progress_with_status_and_stage(self, mock_redis, mock_logger):
+    def test_update_progress_with_status_and_stage(
+        self, mock_redis, mock_update_job, mock_logger
+    ):
         """Test progress update with status and stage"""
         from progress.tracker import ProgressTracker
 
@@ -59,25 +62,28 @@ class TestProgressTracker:
         # Test progress update with status and stage
         tracker.update(75, status="working", stage="Processing video")
 
-        # Verify Redis calls
-        mock_redis.hset.assert_called_once_with(
-            "job:test_job_123",
-            mapping={
+        # Verify the write goes through the job repository
+        mock_update_job.assert_called_once_with(
+            mock_redis,
+            "test_job_123",
+            {
                 "progress": "75",
                 "status": "working",
                 "stage": "Processing video",
             },
         )
-        mock_redis.expire.assert_called_once_with("job:test_job_123", 3600)
 
     @patch("progress.tracker.logger")
+    @patch("progress.tracker.update_job")
     @patch("progress.tracker.redis")
-    def test_update_progress_redis_failure(self, mock_redis, mock_logger):
+    def test_update_progress_redis_failure(
+        self, mock_redis, mock_update_job, mock_logger
+    ):
         """Test handling Redis failure during progress update"""
         from progress.tracker import ProgressTracker
 
         # Make Redis fail
-        mock_redis.hset.side_effect = Exception("Redis connection failed")
+        mock_update_job.side_effect = Exception("Redis connection failed")
 
         tracker = ProgressTracker("test_job_123")
 
@@ -91,9 +97,12 @@ class TestProgressTracker:
         assert "Failed to update job progress" in error_log
 
     @patch("progress.tracker.logger")
+    @patch("progress.tracker.update_job")
     @patch("progress.tracker.JobStatus")
     @patch("progress.tracker.redis")
-    def test_update_error_success(self, mock_redis, mock_job_status, mock_logger):
+    def test_update_error_success(
+        self, mock_redis, mock_job_status, mock_update_job, mock_logger
+    ):
         """Test successful error update"""
         from progress.tracker import ProgressTracker
 
@@ -112,10 +121,9 @@ class TestProgressTracker:
             "error_message": "Could not download video",
             "progress": "0",
         }
-        mock_redis.hset.assert_called_once_with(
-            "job:test_job_123", mapping=expected_mapping
+        mock_update_job.assert_called_once_with(
+            mock_redis, "test_job_123", expected_mapping
         )
-        mock_redis.expire.assert_called_once_with("job:test_job_123", 3600)
 
         # Verify logging
         mock_logger.info.assert_called_once()
@@ -124,10 +132,11 @@ class TestProgressTracker:
         assert "DOWNLOAD_FAILED" in log_call_args
 
     @patch("progress.tracker.logger")
+    @patch("progress.tracker.update_job")
     @patch("progress.tracker.JobStatus")
     @patch("progress.tracker.redis")
     def test_update_error_truncates_long_message(
-        self, mock_redis, mock_job_status, mock_logger
+        self, mock_redis, mock_job_status, mock_update_job, mock_logger
     ):
         """Test that long error messages are truncated"""
         from progress.tracker import ProgressTracker
@@ -142,21 +151,24 @@ class TestProgressTracker:
         tracker.update_error("LONG_ERROR", long_message)
 
         # Verify message was truncated to 500 chars
-        call_args = mock_redis.hset.call_args[1]["mapping"]
+        call_args = mock_update_job.call_args[0][2]
         assert len(call_args["error_message"]) == 500
         assert call_args["error_message"] == "A" * 500
 
     @patch("progress.tracker.logger")
+    @patch("progress.tracker.update_job")
     @patch("progress.tracker.JobStatus")
     @patch("progress.tracker.redis")
-    def test_update_error_redis_failure(self, mock_redis, mock_job_status, mock_logger):
+    def test_update_error_redis_failure(
+        self, mock_redis, mock_job_status, mock_update_job, mock_logger
+    ):
         """Test handling Redis failure during error update"""
         from progress.tracker import ProgressTracker
 
         mock_job_status.error.value = "error"
 
         # Make Redis fail
-        mock_redis.hset.side_effect = Exception("Redis connection failed")
+        mock_update_job.side_effect = Exception("Redis connection failed")
 
         tracker = ProgressTracker("test_job_123")
 
@@ -170,8 +182,11 @@ class TestProgressTracker:
         assert "Failed to update job error" in error_log
 
     @patch("progress.tracker.logger")
+    @patch("progress.tracker.update_job")
     @patch("progress.tracker.redis")
-    def test_structured_logging_extra_data(self, mock_redis, mock_logger):
+    def test_structured_logging_extra_data(
+        self, mock_redis, mock_update_job, mock_logger
+    ):
         """Test that structured logging includes extra data"""
         from progress.tracker import ProgressTracker
 
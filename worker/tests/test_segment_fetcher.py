@@ -0,0 +1,263 @@
+"""
+Unit tests for the HLS/DASH segment fetcher
+"""
+
+import io
+import shutil
+import sys
+import urllib.error
+from pathlib import Path
+
+import pytest
+
+# Add worker directory to path for imports
+worker_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(worker_dir))
+
+from video.segment_fetcher import (
+    SegmentFetcher,
+    SegmentFetchError,
+    fetch_clip_segments,
+    parse_dash_manifest,
+    parse_hls_playlist,
+)
+
+PLAYLIST_URL = "https://cdn.example.com/vod/720p/index.m3u8"
+
+HLS_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:7
+#EXT-X-TARGETDURATION:6
+#EXT-X-MAP:URI="init.mp4"
+#EXTINF:6.0,
+seg0.m4s
+#EXTINF:6.0,
+seg1.m4s
+#EXTINF:6.0,
+seg2.m4s
+#EXTINF:6.0,
+seg3.m4s
+#EXTINF:4.5,
+https://other.example.com/seg4.m4s
+#EXT-X-ENDLIST
+"""
+
+DASH_MANIFEST = """<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static"
+     mediaPresentationDuration="PT20S">
+  <BaseURL>https://cdn.example.com/dash/</BaseURL>
+  <Period>
+    <AdaptationSet mimeType="video/mp4">
+      <SegmentTemplate timescale="1000" initialization="$RepresentationID$/init.mp4"
+                       media="$RepresentationID$/$Number%05d$.m4s" startNumber="1">
+        <SegmentTimeline>
+          <S t="0" d="4000" r="3"/>
+          <S d="4000"/>
+        </SegmentTimeline>
+      </SegmentTemplate>
+      <Representation id="v720" bandwidth="2000000"/>
+      <Representation id="v360" bandwidth="600000"/>
+    </AdaptationSet>
+    <AdaptationSet mimeType="audio/mp4">
+      <Representation id="a128" bandwidth="128000">
+        <SegmentTemplate timescale="48000" duration="480000"
+                         initialization="audio/init.mp4" media="audio/$Time$.m4s"/>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+
+class TestManifestParsing:
+    """Test HLS playlists and DASH manifests are turned into timed segments"""
+
+    def test_hls_segments_and_init(self):
+        playlist = parse_hls_playlist(HLS_PLAYLIST, PLAYLIST_URL)
+
+        assert len(playlist.segments) == 5
+        assert playlist.duration == 28.5
+        assert playlist.init.url == "https://cdn.example.com/vod/720p/init.mp4"
+        assert playlist.segments[1].url == "https://cdn.example.com/vod/720p/seg1.m4s"
+        assert playlist.segments[1].start == 6.0
+        assert playlist.segments[4].url == "https://other.example.com/seg4.m4s"
+
+    def test_hls_select_overlapping_segments(self):
+        playlist = parse_hls_playlist(HLS_PLAYLIST, PLAYLIST_URL)
+
+        selected = playlist.select(7.5, 13.0)
+
+        assert [segment.start for segment in selected] == [6.0, 12.0]
+        with pytest.raises(SegmentFetchError):
+            playlist.select(40.0, 45.0)
+
+    def test_hls_byte_ranges(self):
+        playlist = parse_hls_playlist(
+            "#EXTM3U\n#EXTINF:5,\n#EXT-X-BYTERANGE:1000@0\nall.ts\n"
+            "#EXTINF:5,\n#EXT-X-BYTERANGE:800\nall.ts\n#EXT-X-ENDLIST\n",
+            PLAYLIST_URL,
+        )
+
+        assert [s.byte_range for s in playlist.segments] == [(0, 1000), (1000, 800)]
+
+    @pytest.mark.parametrize(
+        "playlist",
+        [
+            "#EXTM3U\n#EXTINF:6,\nseg0.ts\n",  # Live
+            '#EXTM3U\n#EXT-X-KEY:METHOD=AES-128,URI="k"\n#EXTINF:6,\nseg0.ts\n'
+            "#EXT-X-ENDLIST\n",
+            "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\n720p.m3u8\n",
+            "#EXTM3U\n#EXTINF:6,\na.ts\n#EXT-X-DISCONTINUITY\n#EXTINF:6,\nad.ts\n"
+            "#EXT-X-ENDLIST\n",
+        ],
+    )
+    def test_hls_unsupported(self, playlist):
+        with pytest.raises(SegmentFetchError):
+            parse_hls_playlist(playlist, PLAYLIST_URL)
+
+    def test_dash_segment_timeline(self):
+        playlist = parse_dash_manifest(
+            DASH_MANIFEST, "https://cdn.example.com/manifest.mpd", "dash-v720"
+        )
+
+        assert len(playlist.segments) == 5
+        assert playlist.segments[2].url == "https://cdn.example.com/dash/v720/00003.m4s"
+        assert playlist.segments[2].start == 8.0
+        assert playlist.init.url == "https://cdn.example.com/dash/v720/init.mp4"
+
+    def test_dash_template_duration(self):
+        playlist = parse_dash_manifest(
+            DASH_MANIFEST, "https://cdn.example.com/manifest.mpd", "a128"
+        )
+
+        assert [s.start for s in playlist.segments] == [0.0, 10.0]
+        assert (
+            playlist.segments[1].url == "https://cdn.example.com/dash/audio/480000.m4s"
+        )
+
+    def test_dash_unknown_representation(self):
+        with pytest.raises(SegmentFetchError):
+            parse_dash_manifest(
+                DASH_MANIFEST, "https://cdn.example.com/manifest.mpd", "v1080"
+            )
+
+    def test_dash_entity_declarations_rejected(self):
+        doctype = (
+            '<!DOCTYPE MPD [<!ENTITY a "aaaaaaaaaa">'
+            '<!ENTITY b "&a;&a;&a;&a;&a;&a;&a;&a;&a;&a;">]>\n<MPD id="&b;"'
+        )
+        manifest = DASH_MANIFEST.replace("<MPD", doctype, 1)
+        with pytest.raises(SegmentFetchError, match="DTD"):
+            parse_dash_manifest(
+                manifest, "https://cdn.example.com/manifest.mpd", "dash-v720"
+            )
+
+
+class FakeCDN:
+    """Serve playlist and segment bodies from memory, recording requests"""
+
+    def __init__(self, bodies, failures=None):
+        self.bodies = bodies
+        self.failures = dict(failures or {})
+        self.requested = []
+
+    def __call__(self, segment, headers, timeout):
+        self.requested.append(segment.url)
+        if self.failures.get(segment.url):
+            self.failures[segment.url] -= 1
+            raise urllib.error.HTTPError(
+                segment.url, 503, "Service Unavailable", {}, io.BytesIO()
+            )
+        return self.bodies[segment.url]
+
+
+@pytest.fixture
+def cdn(monkeypatch):
+    base = "https://cdn.example.com/vod/720p/"
+    bodies = {PLAYLIST_URL: HLS_PLAYLIST.encode(), f"{base}init.mp4": b"INIT"}
+    bodies.update({f"{base}seg{i}.m4s": f"SEG{i}".encode() for i in range(4)})
+    bodies["https://other.example.com/seg4.m4s"] = b"SEG4"
+    fake = FakeCDN(bodies)
+
+    monkeypatch.setattr(
+        SegmentFetcher, "_request", lambda self, *args: fake(*args), raising=True
+    )
+    # Concatenation is what is under test, not ffmpeg
+    monkeypatch.setattr(
+        SegmentFetcher,
+        "_remux",
+        lambda self, parts, output: shutil.copyfile(parts[0][0], output),
+    )
+    monkeypatch.setattr("video.segment_fetcher.SEGMENT_RETRY_BACKOFF", 0)
+    return fake
+
+
+class TestSegmentFetcher:
+    """Test only the clip's segments are fetched, in order"""
+
+    INFO = {"protocol": "m3u8_native", "url": PLAYLIST_URL, "format_id": "hls-720"}
+
+    def test_fetches_only_clip_segments(self, cdn, tmp_path):
+        progress = []
+
+        output, offset = SegmentFetcher(
+            progress_callback=lambda done, total: progress.append((done, total))
+        ).fetch(self.INFO, 7.5, 13.0, tmp_path)
+
+        assert offset == 6.0
+        assert output.read_bytes() == b"INITSEG1SEG2"
+        assert sorted(cdn.requested[1:]) == sorted(
+            [
+                "https://cdn.example.com/vod/720p/init.mp4",
+                "https://cdn.example.com/vod/720p/seg1.m4s",
+                "https://cdn.example.com/vod/720p/seg2.m4s",
+            ]
+        )
+        assert progress[-1] == (3, 3)
+        assert [path.name for path in tmp_path.iterdir()] == ["segments.mp4"]
+
+    def test_retries_server_errors(self, cdn, tmp_path):
+        cdn.failures["https://cdn.example.com/vod/720p/seg1.m4s"] = 2
+
+        output, _ = SegmentFetcher().fetch(self.INFO, 7.5, 10.0, tmp_path)
+
+        assert output.read_bytes() == b"INITSEG1"
+        assert cdn.requested.count("https://cdn.example.com/vod/720p/seg1.m4s") == 3
+
+    def test_falls_back_when_not_segmented(self, cdn, tmp_path):
+        info = {"protocol": "https", "url": "https://cdn.example.com/video.mp4"}
+
+        assert fetch_clip_segments(info, 0.0, 5.0, tmp_path) is None
+        assert cdn.requested == []
+
+    def test_falls_back_when_segments_fail(self, cdn, tmp_path):
+        cdn.failures["https://cdn.example.com/vod/720p/seg1.m4s"] = 10
+
+        assert fetch_clip_segments(self.INFO, 7.5, 10.0, tmp_path) is None
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            HLS_PLAYLIST.replace('URI="init.mp4"', 'BYTERANGE="100@0"').encode(),
+            HLS_PLAYLIST.replace("#EXTINF:6.0,", "#EXTINF:six,", 1).encode(),
+            HLS_PLAYLIST.encode("utf-16"),
+        ],
+        ids=["map-without-uri", "bad-duration", "not-utf8"],
+    )
+    def test_falls_back_on_malformed_playlist(self, cdn, tmp_path, body):
+        cdn.bodies[PLAYLIST_URL] = body
+
+        assert fetch_clip_segments(self.INFO, 7.5, 10.0, tmp_path) is None
+        assert cdn.requested == [PLAYLIST_URL]
+
+    def test_falls_back_on_malformed_dash_manifest(self, cdn, tmp_path):
+        manifest_url = "https://cdn.example.com/dash/manifest.mpd"
+        cdn.bodies[manifest_url] = DASH_MANIFEST.replace(
+            '<S d="4000"/>', "<S/>"
+        ).encode()
+        info = {
+            "protocol": "http_dash_segments",
+            "manifest_url": manifest_url,
+            "format_id": "v720",
+        }
+
+        assert fetch_clip_segments(info, 7.5, 10.0, tmp_path) is None
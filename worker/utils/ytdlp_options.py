@@ -2,15 +2,27 @@
 Common yt-dlp option builder for worker side.
 This duplicates backend/app/utils/ytdlp_options.py to avoid cross-package import
 complexities between `backend` and `worker` packages.
+
+Options are built once per process and rebuilt only when a cookie source
+changes (an env var's value or a cookie file's mtime), so a call is normally
+just a dict copy. Cookie content passed in env vars is written atomically to
+a content-addressed temp file, so concurrent jobs never read a half-written
+cookie file and a changed cookie never overwrites one still in use.
 """
 from __future__ import annotations
 
+import base64
+import functools
+import hashlib
 import os
 import re
 import subprocess
 import logging
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -20,96 +32,95 @@ INSTAGRAM_URL_RE = re.compile(
     r"https?://(www\.)?instagram\.com/((reel|p|tv)/[\w\-]+)/?"
 )
 
+# (env var, platform, description, base64-encoded) in order of preference
+COOKIE_ENV_SOURCES = (
+    ("INSTAGRAM_COOKIES_B64", "instagram", "Instagram base64", True),
+    ("FACEBOOK_COOKIES_B64", "facebook", "Facebook base64", True),
+    ("INSTAGRAM_COOKIES", "instagram", "Instagram", False),
+    ("FACEBOOK_COOKIES", "facebook", "Facebook", False),
+)
 
-def _detect_cookie_file() -> str | None:
-    """Detect available cookie files for yt-dlp authentication."""
-    logger.info("🍪 Detecting cookie files...")
+COOKIES_DIR = Path(__file__).resolve().parent.parent / "cookies"
 
-    # NEW: Check for base64 encoded Instagram cookie content in environment variable
-    env_cookie_b64 = os.getenv("INSTAGRAM_COOKIES_B64")
-    if env_cookie_b64:
-        try:
-            import base64
-            import tempfile
-            
-            # Decode the base64 content
-            cookie_content = base64.b64decode(env_cookie_b64).decode('utf-8')
-            
-            # Create a temporary cookie file from decoded content
-            temp_dir = Path("/tmp")
-            temp_dir.mkdir(exist_ok=True)
-            temp_cookie_file = temp_dir / "instagram_cookies_temp.txt"
-            
-            # Write the cookie content to the temporary file
-            with open(temp_cookie_file, 'w') as f:
-                f.write(cookie_content)
-            
-            logger.info(f"✅ Created temporary cookie file from Instagram base64 environment variable: {temp_cookie_file}")
-            return str(temp_cookie_file)
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to create temporary cookie file from Instagram base64 env var: {e}")
+# Platform-specific cookies first, then the generic fallback
+COOKIE_FILE_CANDIDATES = (
+    ("facebook_cookies.txt", "Facebook-specific cookies"),
+    ("instagram_cookies.txt", "Instagram-specific cookies"),
+    ("youtube_cookies.txt", "fallback cookie file"),
+)
 
-    # NEW: Check for base64 encoded Facebook cookie content in environment variable
-    facebook_cookie_b64 = os.getenv("FACEBOOK_COOKIES_B64")
-    if facebook_cookie_b64:
-        try:
-            import base64
-            import tempfile
-            
-            # Decode the base64 content
-            cookie_content = base64.b64decode(facebook_cookie_b64).decode('utf-8')
-            
-            # Create a temporary cookie file from decoded content
-            temp_dir = Path("/tmp")
-            temp_dir.mkdir(exist_ok=True)
-            temp_cookie_file = temp_dir / "facebook_cookies_temp.txt"
-            
-            # Write the cookie content to the temporary file
-            with open(temp_cookie_file, 'w') as f:
-                f.write(cookie_content)
-            
-            logger.info(f"✅ Created temporary cookie file from Facebook base64 environment variable: {temp_cookie_file}")
-            return str(temp_cookie_file)
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to create temporary cookie file from Facebook base64 env var: {e}")
+# Seconds between checks of the cookie sources for changes
+SOURCE_CHECK_INTERVAL = 5.0
 
-    # NEW: Check for Instagram cookie content in environment variable first
-    env_cookie_content = os.getenv("INSTAGRAM_COOKIES")
-    if env_cookie_content:
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _cookie_sources_signature() -> Tuple:
+    """Fingerprint of every cookie source, cheap enough to take per check."""
+    env_hashes = tuple(
+        hashlib.sha256(os.getenv(name, "").encode("utf-8")).hexdigest()
+        for name, _, _, _ in COOKIE_ENV_SOURCES
+    )
+    env_cookie = os.getenv("YTDLP_COOKIE_FILE")
+    paths = [Path(env_cookie).expanduser()] if env_cookie else []
+    paths += [COOKIES_DIR / candidate for candidate, _ in COOKIE_FILE_CANDIDATES]
+    return env_hashes + (env_cookie,) + tuple(_mtime(path) for path in paths)
+
+
+def _materialize_cookie_file(platform: str, content: str) -> str:
+    """Write cookie content atomically to a temp file named after its hash.
+
+    The file is shared and never rewritten: pooled YoutubeDL instances each
+    save their cookie jar to a private copy of it.
+    """
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+    temp_dir = Path(tempfile.gettempdir())
+    cookie_file = temp_dir / f"{platform}_cookies_{digest}.txt"
+    if cookie_file.is_file():
+        return str(cookie_file)
+
+    # Write under a unique name and rename, so readers never see a partial file
+    fd, partial = tempfile.mkstemp(
+        prefix=f".{platform}_cookies_", suffix=".partial", dir=temp_dir
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(partial, cookie_file)
+    except BaseException:
         try:
-            # Create a temporary cookie file from environment variable content
-            import tempfile
-            temp_dir = Path("/tmp")
-            temp_dir.mkdir(exist_ok=True)
-            temp_cookie_file = temp_dir / "instagram_cookies_temp.txt"
-            
-            # Write the cookie content to the temporary file
-            with open(temp_cookie_file, 'w') as f:
-                f.write(env_cookie_content)
-            
-            logger.info(f"✅ Created temporary cookie file from Instagram environment variable: {temp_cookie_file}")
-            return str(temp_cookie_file)
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to create temporary cookie file from Instagram env var: {e}")
+            os.unlink(partial)
+        except OSError:
+            pass
+        raise
+    return str(cookie_file)
+
+
+def _detect_cookie_file() -> str | None:
+    """Detect available cookie files for yt-dlp authentication."""
+    logger.info("🍪 Detecting cookie files...")
 
-    # NEW: Check for Facebook cookie content in environment variable
-    facebook_cookie_content = os.getenv("FACEBOOK_COOKIES")
-    if facebook_cookie_content:
+    # Check for Instagram/Facebook cookie content in environment variables
+    for env_name, platform, description, encoded in COOKIE_ENV_SOURCES:
+        value = os.getenv(env_name)
+        if not value:
+            continue
         try:
-            # Create a temporary cookie file from environment variable content
-            import tempfile
-            temp_dir = Path("/tmp")
-            temp_dir.mkdir(exist_ok=True)
-            temp_cookie_file = temp_dir / "facebook_cookies_temp.txt"
-            
-            # Write the cookie content to the temporary file
-            with open(temp_cookie_file, 'w') as f:
-                f.write(facebook_cookie_content)
-            
-            logger.info(f"✅ Created temporary cookie file from Facebook environment variable: {temp_cookie_file}")
-            return str(temp_cookie_file)
+            content = base64.b64decode(value).decode("utf-8") if encoded else value
+            cookie_file = _materialize_cookie_file(platform, content)
+            logger.info(
+                f"✅ Created temporary cookie file from {description} environment variable: {cookie_file}"
+            )
+            return cookie_file
         except Exception as e:
-            logger.warning(f"⚠️ Failed to create temporary cookie file from Facebook env var: {e}")
+            logger.warning(
+                f"⚠️ Failed to create temporary cookie file from {description} env var: {e}"
+            )
 
     # Check environment variable for file path
     env_cookie = os.getenv("YTDLP_COOKIE_FILE")
@@ -121,29 +132,11 @@ def _detect_cookie_file() -> str | None:
         else:
             logger.warning(f"⚠️ Cookie file from env var not found: {expanded_path}")
 
-    # Check for Facebook-specific cookies
-    facebook_cookies = (
-        Path(__file__).resolve().parent.parent / "cookies" / "facebook_cookies.txt"
-    )
-    if facebook_cookies.is_file():
-        logger.info(f"✅ Found Facebook-specific cookies: {facebook_cookies}")
-        return str(facebook_cookies)
-
-    # Check for Instagram-specific cookies
-    instagram_cookies = (
-        Path(__file__).resolve().parent.parent / "cookies" / "instagram_cookies.txt"
-    )
-    if instagram_cookies.is_file():
-        logger.info(f"✅ Found Instagram-specific cookies: {instagram_cookies}")
-        return str(instagram_cookies)
-
-    # Check for generic cookies
-    fallback = (
-        Path(__file__).resolve().parent.parent / "cookies" / "youtube_cookies.txt"
-    )
-    if fallback.is_file():
-        logger.info(f"✅ Found fallback cookie file: {fallback}")
-        return str(fallback)
+    for candidate, description in COOKIE_FILE_CANDIDATES:
+        candidate_path = COOKIES_DIR / candidate
+        if candidate_path.is_file():
+            logger.info(f"✅ Found {description}: {candidate_path}")
+            return str(candidate_path)
 
     logger.warning(
         "⚠️ No cookie files found. This may affect Instagram/Facebook download success."
@@ -151,6 +144,67 @@ def _detect_cookie_file() -> str | None:
     return None
 
 
+class _OptionProfiles:
+    """Option dicts derived from the cookie sources, rebuilt when they change."""
+
+    def __init__(self, check_interval: float = SOURCE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self._checked_at: Optional[float] = None
+        self._cookie_file: Optional[str] = None
+        self._profiles: Dict[str, object] = {}
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if (
+            self._checked_at is not None
+            and now - self._checked_at < self.check_interval
+        ):
+            return
+
+        signature = _cookie_sources_signature()
+        if signature != self._signature:
+            if self._signature is not None:
+                logger.info("🍪 Cookie sources changed, rebuilding yt-dlp options")
+            self._cookie_file = _detect_cookie_file()
+            self._profiles.clear()
+            self._signature = signature
+        self._checked_at = now
+
+    def get(self, name: str, build: Callable[[Optional[str]], object]) -> object:
+        """Get a shared named profile; callers must copy it before mutating."""
+        with self._lock:
+            self._refresh()
+            if name not in self._profiles:
+                self._profiles[name] = build(self._cookie_file)
+            return self._profiles[name]
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next call."""
+        with self._lock:
+            self._signature = None
+            self._checked_at = None
+            self._profiles.clear()
+
+
+_option_profiles = _OptionProfiles()
+
+
+def invalidate_ydl_opts() -> None:
+    """Discard cached options, e.g. after replacing cookies in place."""
+    _option_profiles.invalidate()
+
+
+def _copy_opts(opts: Dict) -> Dict:
+    """Copy an options dict deep enough that callers can mutate headers too."""
+    return {
+        key: dict(value) if isinstance(value, dict) else value
+        for key, value in opts.items()
+    }
+
+
+@functools.lru_cache(maxsize=1)
 def _check_browser_available() -> str | None:
     """Check if Chrome or Firefox browsers are available for cookie extraction."""
     logger.info("🔍 Checking for available browsers...")
@@ -184,7 +238,7 @@ def is_instagram_url(url: str) -> bool:
     return bool(INSTAGRAM_URL_RE.match(url))
 
 
-def build_common_ydl_opts() -> Dict:
+def _build_common_profile(cookie_file: str | None) -> Dict:
     opts: Dict[str, object] = {
         "quiet": True,
         "no_warnings": True,
@@ -192,20 +246,22 @@ def build_common_ydl_opts() -> Dict:
         "force_ipv4": True,
         "http2": True,
     }
-    cookie_file = _detect_cookie_file()
     if cookie_file:
         opts["cookiefile"] = cookie_file
     return opts
 
 
-def build_instagram_ydl_configs() -> List[Dict]:
+def build_common_ydl_opts() -> Dict:
+    return dict(_option_profiles.get("common", _build_common_profile))
+
+
+def _build_instagram_configs(cookie_file: str | None) -> List[Dict]:
     """Build multiple Instagram yt-dlp configurations for fallback strategies."""
     logger.info("🎬 Building Instagram download configurations...")
     configs = []
 
     # Check available resources
     available_browser = _check_browser_available()
-    cookie_file = _detect_cookie_file()
 
     # --- NEW: Strategy 1: Prioritize Cookie File ---
     if cookie_file:
@@ -387,6 +443,12 @@ def build_instagram_ydl_configs() -> List[Dict]:
     return configs
 
 
+def build_instagram_ydl_configs() -> List[Dict]:
+    """Get the Instagram fallback configurations (copies of the cached ones)."""
+    configs = _option_profiles.get("instagram", _build_instagram_configs)
+    return [_copy_opts(config) for config in configs]
+
+
 def build_instagram_ydl_opts() -> Dict:
     """Build Instagram-specific yt-dlp options to avoid rate limiting and authentication issues."""
     # Return the first (most likely to succeed) configuration
@@ -4,6 +4,7 @@ Video Analysis Manager
 Handles video metadata extraction, validation, and title extraction.
 """
 
+import contextlib
 import logging
 import subprocess
 import json
@@ -32,6 +33,17 @@ except ImportError:
             pass
 
 
+# Reuse pooled YoutubeDL instances when the backend package is importable
+try:
+    import sys
+
+    sys.path.append("/app/backend")
+    from app.extraction import Priority, politeness, ydl_pool
+except ImportError:
+    politeness = None
+    ydl_pool = None
+
+
 logger = logging.getLogger(__name__)
 
 
@@ -60,7 +72,14 @@ class VideoAnalyzer:
                 "extract_flat": False,
             }
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if ydl_pool is not None:
+                slot = politeness.slot(url, Priority.BACKGROUND)
+                ydl_context = ydl_pool.checkout(ydl_opts, label="title")
+            else:
+                slot = contextlib.nullcontext()
+                ydl_context = yt_dlp.YoutubeDL(ydl_opts)
+
+            with slot, ydl_context as ydl:
                 info = ydl.extract_info(url, download=False)
 
                 # Handle playlist URLs
@@ -6,9 +6,11 @@ Handles video downloading with robust fallback configurations and error handling
 
 import logging
 import tempfile
+from contextlib import contextmanager
+import time
 import yt_dlp
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 # Try imports with fallback for testing
 try:
@@ -30,148 +32,236 @@ except ImportError:
             pass
 
 
+# Adaptive config ordering is shared with the backend; fall back to the static
+# order when the backend package is not importable (e.g. isolated tests)
+try:
+    import sys
+
+    sys.path.append("/app/backend")
+    import app as backend_app
+    from app.extraction import (
+        PERMANENT_FAILURES,
+        CircuitOpenError,
+        ExtractionCircuitBreaker,
+        Priority,
+        StrategySelector,
+        classify_extraction_error,
+        politeness,
+        ydl_pool,
+    )
+    from app.utils.platform_detection import PlatformDetector
+except ImportError:
+    backend_app = None
+    StrategySelector = None
+    politeness = None
+    ydl_pool = None
+
+
 logger = logging.getLogger(__name__)
 
 
+@contextmanager
+def _youtube_dl(opts: Dict[str, Any], label: str, url: str):
+    """
+    Borrow a pooled YoutubeDL once the platform's politeness scheduler allows
+    another background call, or build one if the backend is unavailable
+    """
+    if ydl_pool is None:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            yield ydl
+        return
+
+    with politeness.slot(url, Priority.BACKGROUND), ydl_pool.checkout(
+        opts, label=label
+    ) as ydl:
+        yield ydl
+
+
 class VideoDownloader:
     """Manages video downloading with fallback configurations for robustness"""
 
-    def __init__(self, progress_tracker: ProgressTracker):
+    def __init__(self, progress_tracker: ProgressTracker, redis_client=None):
+        """
+        Initialize downloader
+
+        Args:
+            progress_tracker: Tracker for the job being downloaded
+            redis_client: Optional Redis client shared with the worker; the
+                download ladder is neither ranked nor recorded without one
+        """
         self.progress_tracker = progress_tracker
+        # The worker passes its own connection; the backend's global client is
+        # only initialised inside the API process
+        self.redis = (
+            redis_client
+            if redis_client is not None
+            else getattr(backend_app, "redis", None)
+        )
         self.config_attempts = self._build_download_configs()
 
-    def _build_download_configs(self) -> List[Dict[str, Any]]:
-        """Build a list of yt-dlp configurations to try in order"""
+    def _build_download_configs(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Build a list of named yt-dlp configurations in their default order"""
         return [
             # Attempt 1: Android Creator client (most reliable for 2025)
-            {
-                "quiet": True,
-                "no_warnings": True,
-                "writesubtitles": False,
-                "writeautomaticsub": False,
-                "extract_flat": False,
-                # 'extractor_args': {
-                #     'youtube': {
-                #         'player_client': ['android_creator'],
-                #         'skip': ['dash', 'hls']
-                #     }
-                # },
-                "http_headers": {
-                    "User-Agent": "com.google.android.apps.youtube.creator/24.47.100 (Linux; U; Android 14; SM-S918B) gzip",
-                    "Accept": "*/*",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "X-YouTube-Client-Name": "14",
-                    "X-YouTube-Client-Version": "24.47.100",
-                    "DNT": "1",
-                    "Connection": "keep-alive",
-                    "Sec-Fetch-Mode": "navigate",
+            (
+                "android_creator",
+                {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "writesubtitles": False,
+                    "writeautomaticsub": False,
+                    "extract_flat": False,
+                    # 'extractor_args': {
+                    #     'youtube': {
+                    #         'player_client': ['android_creator'],
+                    #         'skip': ['dash', 'hls']
+                    #     }
+                    # },
+                    "http_headers": {
+                        "User-Agent": "com.google.android.apps.youtube.creator/24.47.100 (Linux; U; Android 14; SM-S918B) gzip",
+                        "Accept": "*/*",
+                        "Accept-Language": "en-US,en;q=0.9",
+                        "Accept-Encoding": "gzip, deflate, br",
+                        "X-YouTube-Client-Name": "14",
+                        "X-YouTube-Client-Version": "24.47.100",
+                        "DNT": "1",
+                        "Connection": "keep-alive",
+                        "Sec-Fetch-Mode": "navigate",
+                    },
                 },
-            },
+            ),
             # Attempt 2: iOS client with proper headers
-            {
-                "quiet": True,
-                "no_warnings": True,
-                "writesubtitles": False,
-                "writeautomaticsub": False,
-                "extract_flat": False,
-                # 'extractor_args': {
-                #     'youtube': {
-                #         'player_client': ['ios'],
-                #         'skip': ['dash']
-                #     }
-                # },
-                "http_headers": {
-                    "User-Agent": "com.google.ios.youtube/19.45.4 (iPhone16,2; U; CPU iOS 17_6_1 like Mac OS X)",
-                    "Accept": "*/*",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "X-YouTube-Client-Name": "5",
-                    "X-YouTube-Client-Version": "19.45.4",
-                    "DNT": "1",
-                    "Connection": "keep-alive",
+            (
+                "ios",
+                {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "writesubtitles": False,
+                    "writeautomaticsub": False,
+                    "extract_flat": False,
+                    # 'extractor_args': {
+                    #     'youtube': {
+                    #         'player_client': ['ios'],
+                    #         'skip': ['dash']
+                    #     }
+                    # },
+                    "http_headers": {
+                        "User-Agent": "com.google.ios.youtube/19.45.4 (iPhone16,2; U; CPU iOS 17_6_1 like Mac OS X)",
+                        "Accept": "*/*",
+                        "Accept-Language": "en-US,en;q=0.9",
+                        "Accept-Encoding": "gzip, deflate, br",
+                        "X-YouTube-Client-Name": "5",
+                        "X-YouTube-Client-Version": "19.45.4",
+                        "DNT": "1",
+                        "Connection": "keep-alive",
+                    },
                 },
-            },
+            ),
             # Attempt 3: Android Music client
-            {
-                "quiet": True,
-                "no_warnings": True,
-                "writesubtitles": False,
-                "writeautomaticsub": False,
-                "extract_flat": False,
-                # 'extractor_args': {
-                #     'youtube': {
-                #         'player_client': ['android_music'],
-                #         'skip': ['dash', 'hls']
-                #     }
-                # },
-                "http_headers": {
-                    "User-Agent": "com.google.android.apps.youtube.music/6.42.52 (Linux; U; Android 14; SM-S918B) gzip",
-                    "Accept": "*/*",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "X-YouTube-Client-Name": "21",
-                    "X-YouTube-Client-Version": "6.42.52",
+            (
+                "android_music",
+                {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "writesubtitles": False,
+                    "writeautomaticsub": False,
+                    "extract_flat": False,
+                    # 'extractor_args': {
+                    #     'youtube': {
+                    #         'player_client': ['android_music'],
+                    #         'skip': ['dash', 'hls']
+                    #     }
+                    # },
+                    "http_headers": {
+                        "User-Agent": "com.google.android.apps.youtube.music/6.42.52 (Linux; U; Android 14; SM-S918B) gzip",
+                        "Accept": "*/*",
+                        "Accept-Language": "en-US,en;q=0.9",
+                        "X-YouTube-Client-Name": "21",
+                        "X-YouTube-Client-Version": "6.42.52",
+                    },
                 },
-            },
+            ),
             # Attempt 4: Web client with modern browser headers
-            {
-                "quiet": True,
-                "no_warnings": True,
-                "writesubtitles": False,
-                "writeautomaticsub": False,
-                "extract_flat": False,
-                # 'extractor_args': {
-                #     'youtube': {
-                #         'player_client': ['web'],
-                #         'skip': ['dash', 'hls']
-                #     }
-                # },
-                "http_headers": {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br, zstd",
-                    "DNT": "1",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                    "Sec-Fetch-Dest": "document",
-                    "Sec-Fetch-Mode": "navigate",
-                    "Sec-Fetch-Site": "none",
-                    "Sec-Fetch-User": "?1",
-                    "sec-ch-ua": '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
-                    "sec-ch-ua-mobile": "?0",
-                    "sec-ch-ua-platform": '"Windows"',
-                    "Pragma": "no-cache",
-                    "Cache-Control": "no-cache",
+            (
+                "web",
+                {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "writesubtitles": False,
+                    "writeautomaticsub": False,
+                    "extract_flat": False,
+                    # 'extractor_args': {
+                    #     'youtube': {
+                    #         'player_client': ['web'],
+                    #         'skip': ['dash', 'hls']
+                    #     }
+                    # },
+                    "http_headers": {
+                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+                        "Accept-Language": "en-US,en;q=0.9",
+                        "Accept-Encoding": "gzip, deflate, br, zstd",
+                        "DNT": "1",
+                        "Connection": "keep-alive",
+                        "Upgrade-Insecure-Requests": "1",
+                        "Sec-Fetch-Dest": "document",
+                        "Sec-Fetch-Mode": "navigate",
+                        "Sec-Fetch-Site": "none",
+                        "Sec-Fetch-User": "?1",
+                        "sec-ch-ua": '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
+                        "sec-ch-ua-mobile": "?0",
+                        "sec-ch-ua-platform": '"Windows"',
+                        "Pragma": "no-cache",
+                        "Cache-Control": "no-cache",
+                    },
                 },
-            },
+            ),
             # Attempt 5: TV client (often bypasses restrictions)
-            {
-                "quiet": True,
-                "no_warnings": True,
-                "writesubtitles": False,
-                "writeautomaticsub": False,
-                "extract_flat": False,
-                # 'extractor_args': {
-                #     'youtube': {
-                #         'player_client': ['tv_embedded'],
-                #         'skip': ['dash', 'hls']
-                #     }
-                # },
-                "http_headers": {
-                    "User-Agent": "Mozilla/5.0 (SMART-TV; LINUX; Tizen 2.4.0) AppleWebKit/538.1 (KHTML, like Gecko) Version/2.4.0 TV Safari/538.1"
+            (
+                "tv",
+                {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "writesubtitles": False,
+                    "writeautomaticsub": False,
+                    "extract_flat": False,
+                    # 'extractor_args': {
+                    #     'youtube': {
+                    #         'player_client': ['tv_embedded'],
+                    #         'skip': ['dash', 'hls']
+                    #     }
+                    # },
+                    "http_headers": {
+                        "User-Agent": "Mozilla/5.0 (SMART-TV; LINUX; Tizen 2.4.0) AppleWebKit/538.1 (KHTML, like Gecko) Version/2.4.0 TV Safari/538.1"
+                    },
                 },
-            },
+            ),
             # Attempt 6: Default fallback
-            {
-                "quiet": True,
-                "no_warnings": True,
-                "writesubtitles": False,
-                "writeautomaticsub": False,
-                "extract_flat": False,
-            },
+            (
+                "default",
+                {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "writesubtitles": False,
+                    "writeautomaticsub": False,
+                    "extract_flat": False,
+                },
+            ),
         ]
 
+    def _get_strategy_selector(self, url: str) -> Tuple[Optional[Any], str]:
+        """
+        Get the adaptive config selector for the download ladder
+
+        Returns:
+            Tuple of (selector or None if unavailable, platform name)
+        """
+        if StrategySelector is None or self.redis is None:
+            return None, "unknown"
+
+        platform = PlatformDetector.detect_platform(url).value
+        return StrategySelector(self.redis, ladder="download"), platform
+
     def _validate_format_availability(
         self, url: str, format_id: Optional[str]
     ) -> Optional[str]:
@@ -197,7 +287,7 @@ class VideoDownloader:
                 "extract_flat": False,
             }
 
-            with yt_dlp.YoutubeDL(validate_opts) as ydl:
+            with _youtube_dl(validate_opts, "download:validate", url) as ydl:
                 info = ydl.extract_info(url, download=False)
                 if "entries" in info and info["entries"]:
                     info = info["entries"][0]
@@ -253,9 +343,31 @@ class VideoDownloader:
         last_error = None
         actual_format_used = None
 
-        for i, config in enumerate(self.config_attempts):
+        # Try the configs that have recently been fastest to succeed first
+        configs_by_name = dict(self.config_attempts)
+        selector, platform = self._get_strategy_selector(url)
+        config_order = list(configs_by_name)
+        breaker = None
+        if selector is not None:
+            config_order = await selector.rank(platform, config_order)
+
+            # Fail fast while the platform (or a config) is rate limiting us
+            breaker = ExtractionCircuitBreaker(self.redis, ladder="download")
+            try:
+                await breaker.check(platform)
+                config_order = await breaker.allowed_configs(platform, config_order)
+            except CircuitOpenError as e:
+                raise DownloadError(
+                    str(e),
+                    job_id=self.progress_tracker.job_id,
+                    details={"platform": platform, "retry_after": e.retry_after},
+                )
+
+        for i, config_name in enumerate(config_order):
+            config = configs_by_name[config_name]
+            attempt_start = time.time()
             try:
-                logger.info(f"🎬 Download attempt {i+1}: Trying config {i+1}")
+                logger.info(f"🎬 Download attempt {i+1}: Trying config '{config_name}'")
 
                 # Update progress for each attempt
                 progress_base = 8 + (i * 3)  # Progress from 8 to 20 across attempts
@@ -268,7 +380,7 @@ class VideoDownloader:
                 ydl_opts["outtmpl"] = str(source_file)
                 ydl_opts["format"] = format_selector
 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                with _youtube_dl(ydl_opts, f"download:{config_name}", url) as ydl:
                     self.progress_tracker.update(
                         progress_base + 1,
                         stage=f"Extracting video info (attempt {i+1})...",
@@ -303,12 +415,30 @@ class VideoDownloader:
                         )
 
                 download_success = True
-                logger.info(f"✅ Download successful with config {i+1}")
+                logger.info(f"✅ Download successful with config '{config_name}'")
+                if breaker is not None:
+                    await breaker.record(platform, None, config_name)
+                if selector is not None:
+                    await selector.record(
+                        platform, config_name, True, time.time() - attempt_start
+                    )
                 break
 
             except Exception as e:
                 last_error = e
-                logger.warning(f"❌ Config {i+1} failed: {str(e)}")
+                logger.warning(f"❌ Config '{config_name}' failed: {str(e)}")
+                if breaker is not None:
+                    await breaker.record(platform, e, config_name)
+
+                # Only penalise the config for failures another config could avoid
+                if (
+                    selector is not None
+                    and "Requested format is not available" not in str(e)
+                    and classify_extraction_error(e) not in PERMANENT_FAILURES
+                ):
+                    await selector.record(
+                        platform, config_name, False, time.time() - attempt_start
+                    )
 
                 # Special handling for format not available errors
                 if "Requested format is not available" in str(e):
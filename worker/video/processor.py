@@ -104,11 +104,11 @@ try:
     import sys
 
     sys.path.append("/app/backend")
-    from app import redis
     from app.models import JobStatus
+    from app.repositories.job_repository import update_job
 except ImportError:
     # For testing, create mock objects
-    redis = None
+    update_job = None
 
     class JobStatus:
         class working:
@@ -150,10 +150,10 @@ class ProcessingResult:
 class VideoProcessor:
     """Main processing orchestrator with clear error boundaries"""
 
-    def __init__(self, job_id: str):
+    def __init__(self, job_id: str, redis_client=None):
         self.job_id = job_id
-        self.progress_tracker = ProgressTracker(job_id)
-        self.downloader = VideoDownloader(self.progress_tracker)
+        self.progress_tracker = ProgressTracker(job_id, redis_client)
+        self.downloader = VideoDownloader(self.progress_tracker, redis_client)
         self.trimmer = VideoTrimmer(self.progress_tracker)
         self.analyzer = VideoAnalyzer(self.progress_tracker)
         self.storage = StorageManager(self.progress_tracker)
@@ -317,7 +317,6 @@ class VideoProcessor:
         try:
             self.progress_tracker.update(98, stage="Finalizing...")
 
-            job_key = f"job:{job_id}"
             completion_data = {
                 "status": str(JobStatus.done.value),
                 "progress": "100",
@@ -328,8 +327,7 @@ class VideoProcessor:
                 "completed_at": str(datetime.utcnow().isoformat()),
             }
 
-            redis.hset(job_key, mapping=completion_data)
-            redis.expire(job_key, 3600)
+            update_job(self.progress_tracker.redis, job_id, completion_data)
 
             self.progress_tracker.update(
                 100, JobStatus.done.value, "Complete! Ready for download"
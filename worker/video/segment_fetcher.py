@@ -0,0 +1,712 @@
+"""
+Segment Fetcher
+
+Fetches only the part of an HLS or DASH source that a clip needs.
+
+yt-dlp downloads every fragment of a segmented source, so clipping a minute
+out of a three hour livestream VOD downloads three hours of video. For
+segmented formats the fetcher instead reads the manifest, keeps the segments
+overlapping the clip, downloads them concurrently and remuxes them into one
+file whose timestamps start at zero. The caller shifts its clip timestamps
+by the returned offset (the source time of the first kept segment).
+"""
+
+import logging
+import math
+import re
+import shutil
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from xml.etree import ElementTree
+
+# Try imports with fallback for testing
+try:
+    from ..exceptions import SegmentFetchError
+except ImportError:
+
+    class SegmentFetchError(Exception):
+        pass
+
+
+try:
+    from app.config.configuration import get_settings
+
+    settings = get_settings()
+except ImportError:
+
+    class settings:
+        ffmpeg_path = "ffmpeg"
+
+    settings = settings()
+
+logger = logging.getLogger(__name__)
+
+# Segments are small; a handful of parallel requests saturates most links
+SEGMENT_CONCURRENCY = 8
+SEGMENT_RETRIES = 3
+SEGMENT_RETRY_BACKOFF = 0.5  # Seconds, doubled after every failed attempt
+SEGMENT_TIMEOUT = 30  # Seconds per request
+REMUX_TIMEOUT = 300
+
+HLS_PROTOCOLS = frozenset({"m3u8", "m3u8_native"})
+DASH_PROTOCOLS = frozenset({"http_dash_segments", "http_dash_segments_generator"})
+
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass(frozen=True)
+class Segment:
+    """A media segment and its place on the source timeline"""
+
+    url: str
+    start: float  # Seconds from the start of the source
+    duration: float
+    byte_range: Optional[Tuple[int, int]] = None  # (offset, length)
+
+
+@dataclass
+class SegmentPlaylist:
+    """Segments of one rendition, with its initialization section if any"""
+
+    segments: List[Segment]
+    init: Optional[Segment] = None
+
+    @property
+    def duration(self) -> float:
+        last = self.segments[-1]
+        return last.start + last.duration
+
+    def select(self, in_ts: float, out_ts: float) -> List[Segment]:
+        """
+        Segments overlapping ``[in_ts, out_ts]``
+
+        Raises:
+            SegmentFetchError: If no segment overlaps the range
+        """
+        selected = [
+            segment
+            for segment in self.segments
+            if segment.start < out_ts and segment.start + segment.duration > in_ts
+        ]
+        if not selected:
+            raise SegmentFetchError(
+                f"Clip {in_ts}s-{out_ts}s is outside of the source "
+                f"(0s-{self.duration:.1f}s)"
+            )
+        return selected
+
+
+# ---------------------------------------------------------------------------
+# HLS
+# ---------------------------------------------------------------------------
+
+_HLS_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def _hls_attributes(line: str) -> Dict[str, str]:
+    _, _, attributes = line.partition(":")
+    return {
+        name: value.strip('"') for name, value in _HLS_ATTRIBUTE_RE.findall(attributes)
+    }
+
+
+def _hls_byte_range(value: str, next_offset: int) -> Tuple[int, int]:
+    """Parse ``length[@offset]``; without an offset the range follows the last"""
+    length, _, offset = value.partition("@")
+    return (int(offset) if offset else next_offset, int(length))
+
+
+def parse_hls_playlist(text: str, playlist_url: str) -> SegmentPlaylist:
+    """
+    Parse an HLS media playlist
+
+    Args:
+        text: Playlist contents
+        playlist_url: URL the playlist was fetched from, for relative URIs
+
+    Returns:
+        The playlist's segments
+
+    Raises:
+        SegmentFetchError: If the playlist is not a complete, unencrypted
+            media playlist with a continuous timeline
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or lines[0] != "#EXTM3U":
+        raise SegmentFetchError("Not an HLS playlist")
+
+    segments: List[Segment] = []
+    init: Optional[Segment] = None
+    start = 0.0
+    duration: Optional[float] = None
+    byte_range: Optional[Tuple[int, int]] = None
+    next_offset = 0
+    ended = False
+
+    for line in lines[1:]:
+        if line.startswith("#EXT-X-STREAM-INF"):
+            raise SegmentFetchError("Master playlist given instead of a rendition")
+        elif line.startswith("#EXT-X-KEY"):
+            if _hls_attributes(line).get("METHOD", "NONE") != "NONE":
+                raise SegmentFetchError("Encrypted HLS segments are not supported")
+        elif line.startswith("#EXT-X-MAP"):
+            attributes = _hls_attributes(line)
+            init = Segment(
+                url=urljoin(playlist_url, attributes["URI"]),
+                start=0.0,
+                duration=0.0,
+                byte_range=(
+                    _hls_byte_range(attributes["BYTERANGE"], 0)
+                    if "BYTERANGE" in attributes
+                    else None
+                ),
+            )
+        elif line.startswith("#EXTINF:"):
+            duration = float(line[len("#EXTINF:") :].split(",")[0])
+        elif line.startswith("#EXT-X-BYTERANGE:"):
+            byte_range = _hls_byte_range(line[len("#EXT-X-BYTERANGE:") :], next_offset)
+        elif line == "#EXT-X-DISCONTINUITY" and segments:
+            # Timestamps restart (typically inserted ads): concatenating would
+            # break the timeline, leave these sources to yt-dlp
+            raise SegmentFetchError("Discontinuous HLS playlists are not supported")
+        elif line == "#EXT-X-ENDLIST":
+            ended = True
+        elif not line.startswith("#"):
+            if duration is None:
+                raise SegmentFetchError(f"HLS segment without duration: {line}")
+            segments.append(
+                Segment(urljoin(playlist_url, line), start, duration, byte_range)
+            )
+            if byte_range:
+                next_offset = byte_range[0] + byte_range[1]
+            start += duration
+            duration = None
+            byte_range = None
+
+    if not ended:
+        raise SegmentFetchError("Live HLS playlists are not supported")
+    if not segments:
+        raise SegmentFetchError("HLS playlist has no segments")
+    return SegmentPlaylist(segments=segments, init=init)
+
+
+# ---------------------------------------------------------------------------
+# DASH
+# ---------------------------------------------------------------------------
+
+_ISO_DURATION_RE = re.compile(
+    r"^P(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>[\d.]+)S)?)?$"
+)
+_DASH_TEMPLATE_RE = re.compile(
+    r"\$(RepresentationID|Number|Time|Bandwidth)(%0(\d+)d)?\$"
+)
+# Manifests are remote input: entity expansion ("billion laughs") and external
+# entities are refused outright, as no MPD needs a document type declaration
+_XML_DECLARATIONS_RE = re.compile(r"<!\s*(DOCTYPE|ENTITY)", re.IGNORECASE)
+
+
+def _iso_duration(value: Optional[str]) -> Optional[float]:
+    """Parse an ISO 8601 duration such as ``PT1H2M3.5S``"""
+    match = _ISO_DURATION_RE.match(value or "")
+    if not match:
+        return None
+    parts = {name: float(amount or 0) for name, amount in match.groupdict().items()}
+    return (
+        parts["days"] * 86400
+        + parts["hours"] * 3600
+        + parts["minutes"] * 60
+        + parts["seconds"]
+    )
+
+
+def _local_name(element: ElementTree.Element) -> str:
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def _children(element: ElementTree.Element, name: str) -> List[ElementTree.Element]:
+    return [child for child in element if _local_name(child) == name]
+
+
+def _child(element: ElementTree.Element, name: str) -> Optional[ElementTree.Element]:
+    children = _children(element, name)
+    return children[0] if children else None
+
+
+def _base_url(element: ElementTree.Element, parent_url: str) -> str:
+    base = _child(element, "BaseURL")
+    if base is not None and base.text and base.text.strip():
+        return urljoin(parent_url, base.text.strip())
+    return parent_url
+
+
+def _fill_template(template: str, values: Dict[str, object]) -> str:
+    """Substitute ``$Identifier$`` / ``$Identifier%0Nd$`` placeholders"""
+
+    def substitute(match: re.Match) -> str:
+        value = values[match.group(1)]
+        if match.group(3):
+            return f"{int(value):0{int(match.group(3))}d}"
+        return str(value)
+
+    return _DASH_TEMPLATE_RE.sub(substitute, template).replace("$$", "$")
+
+
+def _dash_byte_range(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Convert a DASH ``first-last`` range to ``(offset, length)``"""
+    if not value:
+        return None
+    first, _, last = value.partition("-")
+    return (int(first), int(last) - int(first) + 1)
+
+
+def _dash_template_segments(
+    template: Dict[str, str],
+    timeline: Optional[ElementTree.Element],
+    base_url: str,
+    values: Dict[str, object],
+    total_duration: Optional[float],
+) -> SegmentPlaylist:
+    timescale = int(template.get("timescale", 1))
+    number = int(template.get("startNumber", 1))
+    presentation_offset = int(template.get("presentationTimeOffset", 0))
+    media = template.get("media")
+    if not media:
+        raise SegmentFetchError("DASH SegmentTemplate without media")
+
+    def segment(ticks: int, length: int) -> Segment:
+        url = _fill_template(media, {**values, "Number": number, "Time": ticks})
+        return Segment(
+            url=urljoin(base_url, url),
+            start=(ticks - presentation_offset) / timescale,
+            duration=length / timescale,
+        )
+
+    segments: List[Segment] = []
+    if timeline is not None:
+        ticks = 0
+        for entry in _children(timeline, "S"):
+            if entry.get("t") is not None:
+                ticks = int(entry.get("t"))
+            length = int(entry.get("d"))
+            repeat = int(entry.get("r", 0))
+            if repeat < 0:
+                # Repeat until the end of the period
+                if total_duration is None:
+                    raise SegmentFetchError("Open-ended SegmentTimeline")
+                end = total_duration * timescale + presentation_offset
+                repeat = math.ceil((end - ticks) / length) - 1
+            for _ in range(repeat + 1):
+                segments.append(segment(ticks, length))
+                ticks += length
+                number += 1
+    elif template.get("duration"):
+        if total_duration is None:
+            raise SegmentFetchError("DASH manifest without a duration")
+        length = int(template["duration"])
+        for index in range(math.ceil(total_duration * timescale / length)):
+            segments.append(segment(presentation_offset + index * length, length))
+            number += 1
+    else:
+        raise SegmentFetchError("DASH SegmentTemplate without timing")
+
+    init = None
+    if template.get("initialization"):
+        init_url = _fill_template(template["initialization"], values)
+        init = Segment(urljoin(base_url, init_url), 0.0, 0.0)
+    return SegmentPlaylist(segments=segments, init=init)
+
+
+def _dash_list_segments(
+    segment_list: ElementTree.Element, base_url: str
+) -> SegmentPlaylist:
+    timescale = int(segment_list.get("timescale", 1))
+    length = segment_list.get("duration")
+    if length is None:
+        raise SegmentFetchError("DASH SegmentList without duration")
+    duration = int(length) / timescale
+
+    segments = [
+        Segment(
+            url=urljoin(base_url, entry.get("media") or ""),
+            start=index * duration,
+            duration=duration,
+            byte_range=_dash_byte_range(entry.get("mediaRange")),
+        )
+        for index, entry in enumerate(_children(segment_list, "SegmentURL"))
+    ]
+
+    init = None
+    initialization = _child(segment_list, "Initialization")
+    if initialization is not None:
+        init = Segment(
+            url=urljoin(base_url, initialization.get("sourceURL") or ""),
+            start=0.0,
+            duration=0.0,
+            byte_range=_dash_byte_range(initialization.get("range")),
+        )
+    return SegmentPlaylist(segments=segments, init=init)
+
+
+def parse_dash_manifest(
+    text: str, manifest_url: str, representation_id: str
+) -> SegmentPlaylist:
+    """
+    Parse the segments of one representation of a DASH manifest
+
+    Args:
+        text: MPD contents
+        manifest_url: URL the manifest was fetched from, for relative URLs
+        representation_id: Representation id, or a yt-dlp format id ending
+            with ``-<representation id>``
+
+    Returns:
+        The representation's segments
+
+    Raises:
+        SegmentFetchError: If the manifest is live, has several periods,
+            declares a document type, or the representation is missing or
+            not segmented
+    """
+    if _XML_DECLARATIONS_RE.search(text):
+        raise SegmentFetchError("DASH manifest declares a DTD or entities")
+    try:
+        root = ElementTree.fromstring(text)
+    except ElementTree.ParseError as e:
+        raise SegmentFetchError(f"Invalid DASH manifest: {e}")
+
+    if root.get("type", "static") != "static":
+        raise SegmentFetchError("Live DASH manifests are not supported")
+    periods = _children(root, "Period")
+    if len(periods) != 1:
+        raise SegmentFetchError("Multi-period DASH manifests are not supported")
+    period = periods[0]
+    total_duration = _iso_duration(period.get("duration")) or _iso_duration(
+        root.get("mediaPresentationDuration")
+    )
+    period_url = _base_url(period, _base_url(root, manifest_url))
+
+    for adaptation in _children(period, "AdaptationSet"):
+        for representation in _children(adaptation, "Representation"):
+            rep_id = representation.get("id")
+            if not rep_id or not (
+                representation_id == rep_id or representation_id.endswith(f"-{rep_id}")
+            ):
+                continue
+
+            base_url = _base_url(representation, _base_url(adaptation, period_url))
+            levels = (period, adaptation, representation)
+
+            # Template attributes are inherited, inner levels take precedence
+            template: Dict[str, str] = {}
+            timeline = None
+            for level in levels:
+                for element in _children(level, "SegmentTemplate"):
+                    template.update(element.attrib)
+                    element_timeline = _child(element, "SegmentTimeline")
+                    if element_timeline is not None:
+                        timeline = element_timeline
+            if template:
+                values = {
+                    "RepresentationID": rep_id,
+                    "Bandwidth": representation.get("bandwidth", ""),
+                }
+                return _dash_template_segments(
+                    template, timeline, base_url, values, total_duration
+                )
+
+            for level in reversed(levels):
+                segment_list = _child(level, "SegmentList")
+                if segment_list is not None:
+                    return _dash_list_segments(segment_list, base_url)
+
+            # SegmentBase: a single file, which yt-dlp fetches efficiently
+            raise SegmentFetchError(f"Representation {rep_id} is not segmented")
+
+    raise SegmentFetchError(f"Representation {representation_id} not in manifest")
+
+
+# ---------------------------------------------------------------------------
+# Fetching
+# ---------------------------------------------------------------------------
+
+
+def _parse_manifest(
+    parser: Callable[..., SegmentPlaylist], body: bytes, url: str, *args
+) -> SegmentPlaylist:
+    """
+    Decode and parse a downloaded manifest
+
+    Raises:
+        SegmentFetchError: If the manifest is malformed (missing attributes,
+            bad numbers or bytes that are not UTF-8)
+    """
+    try:
+        return parser(body.decode("utf-8"), url, *args)
+    except (LookupError, ValueError, TypeError) as e:
+        raise SegmentFetchError(f"Malformed manifest {url}: {e!r}")
+
+
+def is_segmented(info: Dict) -> bool:
+    """Whether every selected format of a yt-dlp result is HLS or DASH"""
+    formats = info.get("requested_formats") or [info]
+    return all(fmt.get("protocol") in HLS_PROTOCOLS | DASH_PROTOCOLS for fmt in formats)
+
+
+@dataclass
+class _FetchPlan:
+    fmt: Dict
+    playlist: SegmentPlaylist
+    segments: List[Segment] = field(default_factory=list)
+
+    @property
+    def offset(self) -> float:
+        return self.segments[0].start
+
+
+class SegmentFetcher:
+    """Downloads the segments of a clip and remuxes them into one file"""
+
+    def __init__(
+        self,
+        concurrency: int = SEGMENT_CONCURRENCY,
+        retries: int = SEGMENT_RETRIES,
+        timeout: float = SEGMENT_TIMEOUT,
+        progress_callback: Optional[ProgressCallback] = None,
+        cancel_check: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Initialize segment fetcher
+
+        Args:
+            concurrency: Segments downloaded in parallel
+            retries: Retries of a failed segment before giving up
+            timeout: Seconds per request
+            progress_callback: Called with (segments done, segments total)
+            cancel_check: Called before each segment download; raises to
+                abandon the fetch
+        """
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.progress_callback = progress_callback
+        self.cancel_check = cancel_check
+        self._progress_lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+
+    def _request(
+        self, segment: Segment, headers: Dict[str, str], timeout: float
+    ) -> bytes:
+        request = urllib.request.Request(segment.url, headers=headers)
+        if segment.byte_range:
+            offset, length = segment.byte_range
+            request.add_header("Range", f"bytes={offset}-{offset + length - 1}")
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read()
+
+    def _download(self, segment: Segment, headers: Dict[str, str]) -> bytes:
+        """Download a segment, retrying network and server errors"""
+        for attempt in range(self.retries + 1):
+            try:
+                return self._request(segment, headers, self.timeout)
+            except urllib.error.HTTPError as e:
+                # Client errors will not go away by retrying (except 429)
+                if (e.code < 500 and e.code != 429) or attempt == self.retries:
+                    raise SegmentFetchError(
+                        f"Segment {segment.url} failed with HTTP {e.code}"
+                    )
+                error = e
+            except (urllib.error.URLError, OSError) as e:
+                if attempt == self.retries:
+                    raise SegmentFetchError(f"Segment {segment.url} failed: {e}")
+                error = e
+            delay = SEGMENT_RETRY_BACKOFF * 2**attempt
+            logger.warning(
+                f"⚠️ Segment download failed ({error}), retry {attempt + 1}/"
+                f"{self.retries} in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+    def load_playlist(self, fmt: Dict, info: Dict) -> SegmentPlaylist:
+        """
+        Fetch and parse the manifest of a yt-dlp format
+
+        Raises:
+            SegmentFetchError: If the format is not segmented or the manifest
+                cannot be used
+        """
+        headers = fmt.get("http_headers") or {}
+        protocol = fmt.get("protocol")
+        if protocol in HLS_PROTOCOLS:
+            # For HLS, the format URL is the rendition's media playlist
+            url = fmt.get("url")
+            if not url:
+                raise SegmentFetchError("HLS format without a playlist URL")
+            body = self._download(Segment(url, 0.0, 0.0), headers)
+            return _parse_manifest(parse_hls_playlist, body, url)
+        if protocol in DASH_PROTOCOLS:
+            url = fmt.get("manifest_url") or info.get("manifest_url")
+            if not url:
+                raise SegmentFetchError("DASH format without a manifest URL")
+            body = self._download(Segment(url, 0.0, 0.0), headers)
+            return _parse_manifest(
+                parse_dash_manifest, body, url, str(fmt.get("format_id", ""))
+            )
+        raise SegmentFetchError(f"Format protocol {protocol} is not segmented")
+
+    def _segment_done(self) -> None:
+        with self._progress_lock:
+            self._done += 1
+            done, total = self._done, self._total
+        if self.progress_callback:
+            try:
+                self.progress_callback(done, total)
+            except Exception:
+                pass
+
+    def _fetch_plan(self, plan: _FetchPlan, output: Path) -> None:
+        """Download a plan's segments in parallel and concatenate them in order"""
+        headers = plan.fmt.get("http_headers") or {}
+        parts_dir = output.with_suffix(".segments")
+        parts_dir.mkdir(parents=True, exist_ok=True)
+
+        def fetch(item: Tuple[int, Segment]) -> Path:
+            index, segment = item
+            if self.cancel_check:
+                self.cancel_check()
+            path = parts_dir / f"{index:06d}"
+            path.write_bytes(self._download(segment, headers))
+            self._segment_done()
+            return path
+
+        items = list(enumerate(plan.segments))
+        if plan.playlist.init is not None:
+            items.insert(0, (-1, plan.playlist.init))
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            paths = list(executor.map(fetch, items))
+
+        with open(output, "wb") as out:
+            for path in paths:
+                with open(path, "rb") as part:
+                    shutil.copyfileobj(part, out)
+                path.unlink()
+        parts_dir.rmdir()
+
+    def _remux(self, parts: List[Tuple[Path, float]], output: Path) -> None:
+        """
+        Remux concatenated segments into one MP4 starting at zero
+
+        ffmpeg shifts each input to start at zero; with separate video and
+        audio renditions, ``-itsoffset`` keeps the audio where it was on the
+        source timeline relative to the video.
+        """
+        base_offset = parts[0][1]
+        cmd = [settings.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y"]
+        for path, offset in parts:
+            if abs(offset - base_offset) > 0.001:
+                cmd += ["-itsoffset", f"{offset - base_offset:.3f}"]
+            cmd += ["-i", str(path)]
+        if len(parts) == 1:
+            cmd += ["-map", "0:v?", "-map", "0:a?"]
+        else:
+            cmd += ["-map", "0:v:0", "-map", "1:a:0"]
+        cmd += ["-c", "copy", "-movflags", "+faststart", str(output)]
+
+        try:
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, timeout=REMUX_TIMEOUT
+            )
+        except subprocess.TimeoutExpired:
+            raise SegmentFetchError("Remuxing segments timed out")
+        if result.returncode != 0:
+            raise SegmentFetchError(
+                f"Remuxing segments failed: {result.stderr.strip()[-300:]}"
+            )
+
+    def fetch(
+        self, info: Dict, in_ts: float, out_ts: float, temp_dir: Path
+    ) -> Tuple[Path, float]:
+        """
+        Fetch the segments covering a clip of a yt-dlp result
+
+        Args:
+            info: yt-dlp result with its formats selected (``download=False``)
+            in_ts: Clip start in seconds
+            out_ts: Clip end in seconds
+            temp_dir: Directory for intermediate and output files
+
+        Returns:
+            Tuple of (MP4 file starting at zero, source time of its start)
+
+        Raises:
+            SegmentFetchError: If the source cannot be fetched by segments
+        """
+        formats = info.get("requested_formats") or [info]
+        plans = []
+        for fmt in formats:
+            playlist = self.load_playlist(fmt, info)
+            plans.append(_FetchPlan(fmt, playlist, playlist.select(in_ts, out_ts)))
+
+        self._done = 0
+        self._total = sum(
+            len(plan.segments) + (plan.playlist.init is not None) for plan in plans
+        )
+        first = plans[0]
+        kept = first.segments[-1].start + first.segments[-1].duration - first.offset
+        logger.info(
+            f"🧩 Fetching {self._total} segments ({kept:.1f}s of "
+            f"{first.playlist.duration:.1f}s) starting at {first.offset:.2f}s"
+        )
+
+        parts = []
+        for index, plan in enumerate(plans):
+            part = temp_dir / f"segments_{index}.part"
+            self._fetch_plan(plan, part)
+            parts.append((part, plan.offset))
+
+        output = temp_dir / "segments.mp4"
+        self._remux(parts, output)
+        for part, _ in parts:
+            part.unlink()
+        return output, plans[0].offset
+
+
+def fetch_clip_segments(
+    info: Dict,
+    in_ts: float,
+    out_ts: float,
+    temp_dir: Path,
+    progress_callback: Optional[ProgressCallback] = None,
+    cancel_check: Optional[Callable[[], None]] = None,
+) -> Optional[Tuple[Path, float]]:
+    """
+    Fetch a clip's segments when its source is segmented
+
+    Never raises for unusable sources: the caller then downloads the whole
+    source with yt-dlp as before. Errors raised by cancel_check propagate.
+
+    Returns:
+        Tuple of (MP4 file starting at zero, source time of its start), or
+        None if the source is not segmented or cannot be fetched by segments
+    """
+    if not is_segmented(info):
+        return None
+
+    try:
+        return SegmentFetcher(
+            progress_callback=progress_callback, cancel_check=cancel_check
+        ).fetch(info, in_ts, out_ts, temp_dir)
+    except (SegmentFetchError, OSError) as e:
+        # OSError: a missing ffmpeg or a full temp directory
+        logger.warning(f"⚠️ Segment fetch not possible, downloading whole source: {e}")
+        return None
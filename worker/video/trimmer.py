@@ -13,13 +13,20 @@ from typing import Optional
 
 # Try imports with fallback for testing
 try:
-    from ..exceptions import TrimError, H264DimensionError, FFmpegError
+    from ..exceptions import TrimError, H264DimensionError, FFmpegError, JobCancelled
+    from ..progress.cancellation import CancellationToken, run_cancellable
     from ..progress.tracker import ProgressTracker
 except ImportError:
     # For testing, create mock classes
     class TrimError(Exception):
         pass
 
+    class JobCancelled(Exception):
+        pass
+
+    def run_cancellable(cmd, cancellation=None, timeout=None):
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+
     class H264DimensionError(Exception):
         pass
 
@@ -57,8 +64,14 @@ logger = logging.getLogger(__name__)
 class VideoTrimmer:
     """Manages video trimming with rotation correction and smart encoding"""
 
-    def __init__(self, progress_tracker: ProgressTracker):
+    def __init__(
+        self,
+        progress_tracker: ProgressTracker,
+        cancellation: Optional["CancellationToken"] = None,
+    ):
         self.progress_tracker = progress_tracker
+        # FFmpeg is killed as soon as the job is cancelled
+        self.cancellation = cancellation
         self.ffmpeg_path = settings.ffmpeg_path
         self.ffprobe_path = settings.ffprobe_path
 
@@ -276,7 +289,7 @@ class VideoTrimmer:
                 )
 
         except Exception as e:
-            if isinstance(e, (TrimError, H264DimensionError, FFmpegError)):
+            if isinstance(e, (TrimError, H264DimensionError, FFmpegError, JobCancelled)):
                 raise
             raise TrimError(
                 f"Video analysis failed: {e}", job_id=self.progress_tracker.job_id
@@ -396,8 +409,8 @@ class VideoTrimmer:
         ffmpeg_start = time.time()
 
         try:
-            # Execute FFmpeg with detailed logging
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # Execute FFmpeg with detailed logging, stopping it on cancellation
+            result = run_cancellable(cmd, self.cancellation)
             ffmpeg_duration = time.time() - ffmpeg_start
 
             logger.info(f"🎬 FFmpeg completed in {ffmpeg_duration:.2f}s")